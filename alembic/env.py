@@ -108,6 +108,10 @@ def run_migrations_online() -> None:
             Base.metadata.create_all(sync_connection)
         except Exception:
             pass
+        # create_all открыл транзакцию: без commit begin_transaction() ниже встроится в неё
+        # и миграции откатятся при закрытии соединения
+        if sync_connection.in_transaction():
+            sync_connection.commit()
         context.configure(connection=sync_connection, target_metadata=target_metadata)
         with context.begin_transaction():
             context.run_migrations()
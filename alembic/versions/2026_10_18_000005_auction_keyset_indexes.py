@@ -0,0 +1,36 @@
+"""auction listing keyset indexes
+
+Revision ID: 000005
+Revises: 000004
+Create Date: 2026-10-18 00:00:05
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '000005'
+down_revision = '000004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    existing_indexes = {ix['name'] for ix in insp.get_indexes('auctions')}
+
+    # (status, end_time) покрывается новым (status, end_time, id)
+    op.execute("DROP INDEX IF EXISTS ix_auctions_end_time_status")
+    # Индексы могли быть созданы через create_all на свежей БД
+    if 'ix_auctions_status_end_time_id' not in existing_indexes:
+        op.create_index('ix_auctions_status_end_time_id', 'auctions', ['status', 'end_time', 'id'])
+    if 'ix_auctions_status_current_price_id' not in existing_indexes:
+        op.create_index('ix_auctions_status_current_price_id', 'auctions', ['status', 'current_price', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_auctions_status_current_price_id', table_name='auctions')
+    op.drop_index('ix_auctions_status_end_time_id', table_name='auctions')
+    op.create_index('ix_auctions_end_time_status', 'auctions', ['status', 'end_time'])
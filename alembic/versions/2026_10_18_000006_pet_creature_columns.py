@@ -0,0 +1,133 @@
+"""denormalized creature attribute columns on pets
+
+Revision ID: 000006
+Revises: 000005
+Create Date: 2026-10-18 00:00:06
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+
+from generator.enums import Habitat, CreatureType, Size
+
+
+# revision identifiers, used by Alembic.
+revision = '000006'
+down_revision = '000005'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 500
+
+_ENUMS = {
+    'habitat': (Habitat, 'creaturehabitat'),
+    'creature_type': (CreatureType, 'creaturetype'),
+    'size': (Size, 'creaturesize'),
+}
+
+# Ключи в creature_json для каждой колонки
+_JSON_KEYS = {'habitat': 'habitat', 'creature_type': 'type', 'size': 'size'}
+
+
+def _sa_enum(column: str) -> sa.Enum:
+    enum_cls, type_name = _ENUMS[column]
+    return sa.Enum(*[m.name for m in enum_cls], name=type_name)
+
+
+def _name_by_value(column: str, value):
+    enum_cls, _ = _ENUMS[column]
+    for member in enum_cls:
+        if member.value == value:
+            return member.name
+    return None
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    existing_cols = {c['name'] for c in insp.get_columns('pets')}
+    existing_indexes = {ix['name'] for ix in insp.get_indexes('pets')}
+
+    for column in _ENUMS:
+        try:
+            _sa_enum(column).create(bind, checkfirst=True)
+        except Exception:
+            pass
+
+    new_columns = [
+        sa.Column('habitat', _sa_enum('habitat'), nullable=True),
+        sa.Column('creature_type', _sa_enum('creature_type'), nullable=True),
+        sa.Column('size', _sa_enum('size'), nullable=True),
+        sa.Column('surface', sa.String(), nullable=True),
+    ]
+    missing = [c for c in new_columns if c.name not in existing_cols]
+    if missing:
+        with op.batch_alter_table('pets') as batch_op:
+            for column in missing:
+                batch_op.add_column(column)
+    for column in ('habitat', 'creature_type', 'size', 'surface'):
+        if f'ix_pets_{column}' not in existing_indexes:
+            op.create_index(f'ix_pets_{column}', 'pets', [column])
+
+    # Бэкфилл пачками по id: разбираем creature_json один раз и пишем колонки
+    pets = sa.table(
+        'pets',
+        sa.column('id', sa.Integer),
+        sa.column('creature_json', sa.Text),
+        sa.column('habitat', _sa_enum('habitat')),
+        sa.column('creature_type', _sa_enum('creature_type')),
+        sa.column('size', _sa_enum('size')),
+        sa.column('surface', sa.String),
+    )
+    update_stmt = (
+        pets.update()
+        .where(pets.c.id == sa.bindparam('pet_id'))
+        .values(
+            habitat=sa.bindparam('habitat'),
+            creature_type=sa.bindparam('creature_type'),
+            size=sa.bindparam('size'),
+            surface=sa.bindparam('surface'),
+        )
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(pets.c.id, pets.c.creature_json)
+            .where(pets.c.id > last_id, pets.c.creature_json.is_not(None))
+            .order_by(pets.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        params = []
+        for pet_id, raw in rows:
+            try:
+                creature = json.loads(raw) or {}
+            except Exception:
+                continue
+            params.append({
+                'pet_id': pet_id,
+                **{col: _name_by_value(col, creature.get(key)) for col, key in _JSON_KEYS.items()},
+                'surface': creature.get('surface'),
+            })
+        if params:
+            bind.execute(update_stmt, params)
+        last_id = rows[-1][0]
+
+
+def downgrade():
+    op.drop_index('ix_pets_surface', table_name='pets')
+    op.drop_index('ix_pets_size', table_name='pets')
+    op.drop_index('ix_pets_creature_type', table_name='pets')
+    op.drop_index('ix_pets_habitat', table_name='pets')
+    with op.batch_alter_table('pets') as batch_op:
+        batch_op.drop_column('surface')
+        batch_op.drop_column('size')
+        batch_op.drop_column('creature_type')
+        batch_op.drop_column('habitat')
+    for column in _ENUMS:
+        try:
+            op.execute(f"DROP TYPE IF EXISTS {_ENUMS[column][1]}")
+        except Exception:
+            pass
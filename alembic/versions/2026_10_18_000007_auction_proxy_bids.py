@@ -0,0 +1,42 @@
+"""auction proxy (max) bids
+
+Revision ID: 000007
+Revises: 000006
+Create Date: 2026-10-18 00:00:07
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '000007'
+down_revision = '000006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    # Таблица могла быть создана через create_all на свежей БД
+    if 'auction_proxy_bids' in insp.get_table_names():
+        return
+    op.create_table(
+        'auction_proxy_bids',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('auction_id', sa.Integer(), sa.ForeignKey('auctions.id'), nullable=False),
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.user_id'), nullable=False),
+        sa.Column('max_amount', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint('auction_id', 'user_id', name='uq_auction_proxy_bids_auction_user'),
+    )
+    op.create_index('ix_auction_proxy_bids_id', 'auction_proxy_bids', ['id'])
+    op.create_index('ix_auction_proxy_bids_auction_id', 'auction_proxy_bids', ['auction_id'])
+
+
+def downgrade():
+    op.drop_index('ix_auction_proxy_bids_auction_id', table_name='auction_proxy_bids')
+    op.drop_index('ix_auction_proxy_bids_id', table_name='auction_proxy_bids')
+    op.drop_table('auction_proxy_bids')
@@ -0,0 +1,45 @@
+"""market stats rollup
+
+Revision ID: 000008
+Revises: 000007
+Create Date: 2026-10-18 00:00:08
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '000008'
+down_revision = '000007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    # Таблица могла быть создана через create_all на свежей БД
+    if 'market_stats' in insp.get_table_names():
+        return
+    op.create_table(
+        'market_stats',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('habitat', sa.String(), nullable=False),
+        sa.Column('creature_type', sa.String(), nullable=False),
+        sa.Column('stage', sa.String(), nullable=False),
+        sa.Column('sales_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('volume_total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_price', sa.Integer(), nullable=True),
+        sa.Column('last_sale_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('median_sketch', sa.Text(), nullable=True),
+        sa.Column('hourly_buckets', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint('habitat', 'creature_type', 'stage', name='uq_market_stats_group'),
+    )
+    op.create_index('ix_market_stats_id', 'market_stats', ['id'])
+
+
+def downgrade():
+    op.drop_index('ix_market_stats_id', table_name='market_stats')
+    op.drop_table('market_stats')
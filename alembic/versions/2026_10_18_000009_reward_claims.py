@@ -0,0 +1,41 @@
+"""reward claims ledger
+
+Revision ID: 000009
+Revises: 000008
+Create Date: 2026-10-18 00:00:09
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '000009'
+down_revision = '000008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    # Таблица могла быть создана через create_all на свежей БД
+    if 'reward_claims' in insp.get_table_names():
+        return
+    op.create_table(
+        'reward_claims',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.user_id'), nullable=False),
+        sa.Column('reward_type', sa.String(), nullable=False),
+        sa.Column('period_key', sa.String(), nullable=False),
+        sa.Column('claims_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint('user_id', 'reward_type', 'period_key', name='uq_reward_claims_period'),
+    )
+    op.create_index('ix_reward_claims_id', 'reward_claims', ['id'])
+
+
+def downgrade():
+    op.drop_index('ix_reward_claims_id', table_name='reward_claims')
+    op.drop_table('reward_claims')
@@ -0,0 +1,64 @@
+"""ledger checkpoints
+
+Revision ID: 000011
+Revises: 000010
+Create Date: 2026-10-18 00:00:11
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '000011'
+down_revision = '000010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    wallet_cols = {c['name'] for c in insp.get_columns('wallets')}
+    if 'ledger_tail_count' not in wallet_cols:
+        with op.batch_alter_table('wallets') as batch_op:
+            batch_op.add_column(sa.Column('ledger_tail_count', sa.Integer(), nullable=False, server_default='0'))
+        # Вся существующая история — хвост до первого чекпоинта
+        op.execute(
+            "UPDATE wallets SET ledger_tail_count = "
+            "(SELECT COUNT(*) FROM transactions t WHERE t.user_id = wallets.user_id)"
+        )
+
+    txn_indexes = {i['name'] for i in insp.get_indexes('transactions')}
+    if 'ix_transactions_user_id_id' not in txn_indexes:
+        op.create_index('ix_transactions_user_id_id', 'transactions', ['user_id', 'id'])
+    if 'ix_transactions_user_id_created_at' not in txn_indexes:
+        op.create_index('ix_transactions_user_id_created_at', 'transactions', ['user_id', 'created_at'])
+
+    # Таблица могла быть создана через create_all на свежей БД
+    if 'ledger_checkpoints' not in insp.get_table_names():
+        op.create_table(
+            'ledger_checkpoints',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.String(), sa.ForeignKey('users.user_id'), nullable=False),
+            sa.Column('last_transaction_id', sa.Integer(), nullable=False),
+            sa.Column('as_of', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('balance', sa.Integer(), nullable=False),
+            sa.Column('transactions_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('totals', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.UniqueConstraint('user_id', 'last_transaction_id', name='uq_ledger_checkpoints_user_txn'),
+        )
+        op.create_index('ix_ledger_checkpoints_id', 'ledger_checkpoints', ['id'])
+        op.create_index('ix_ledger_checkpoints_user_id_as_of', 'ledger_checkpoints', ['user_id', 'as_of'])
+
+
+def downgrade():
+    op.drop_index('ix_ledger_checkpoints_user_id_as_of', table_name='ledger_checkpoints')
+    op.drop_index('ix_ledger_checkpoints_id', table_name='ledger_checkpoints')
+    op.drop_table('ledger_checkpoints')
+    op.drop_index('ix_transactions_user_id_created_at', table_name='transactions')
+    op.drop_index('ix_transactions_user_id_id', table_name='transactions')
+    with op.batch_alter_table('wallets') as batch_op:
+        batch_op.drop_column('ledger_tail_count')
@@ -0,0 +1,52 @@
+"""economy rollups
+
+Revision ID: 000012
+Revises: 000011
+Create Date: 2026-10-18 00:00:12
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '000012'
+down_revision = '000011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    tables = set(insp.get_table_names())
+
+    # Таблицы могли быть созданы через create_all на свежей БД
+    if 'economy_rollups' not in tables:
+        op.create_table(
+            'economy_rollups',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('hour', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('transaction_type', sa.String(), nullable=False),
+            sa.Column('source', sa.String(), nullable=False),
+            sa.Column('amount_total', sa.BigInteger(), nullable=False, server_default='0'),
+            sa.Column('transactions_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.UniqueConstraint('hour', 'transaction_type', 'source', name='uq_economy_rollups_bucket'),
+        )
+        op.create_index('ix_economy_rollups_id', 'economy_rollups', ['id'])
+
+    # Водяной знак с нуля: фоновая задача свернёт всю существующую историю
+    if 'rollup_watermarks' not in tables:
+        op.create_table(
+            'rollup_watermarks',
+            sa.Column('name', sa.String(), primary_key=True),
+            sa.Column('last_id', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+
+def downgrade():
+    op.drop_table('rollup_watermarks')
+    op.drop_index('ix_economy_rollups_id', table_name='economy_rollups')
+    op.drop_table('economy_rollups')
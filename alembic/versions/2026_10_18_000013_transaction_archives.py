@@ -0,0 +1,52 @@
+"""transaction archives
+
+Revision ID: 000013
+Revises: 000012
+Create Date: 2026-10-18 00:00:13
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '000013'
+down_revision = '000012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    # Таблица могла быть создана через create_all на свежей БД
+    if 'transaction_archives' not in insp.get_table_names():
+        op.create_table(
+            'transaction_archives',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.String(), sa.ForeignKey('users.user_id'), nullable=False),
+            sa.Column('period', sa.String(length=7), nullable=False),
+            sa.Column('first_transaction_id', sa.Integer(), nullable=False),
+            sa.Column('last_transaction_id', sa.Integer(), nullable=False),
+            sa.Column('first_at', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('last_at', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('transactions_count', sa.Integer(), nullable=False),
+            sa.Column('opening_balance', sa.Integer(), nullable=False),
+            sa.Column('closing_balance', sa.Integer(), nullable=False),
+            sa.Column('totals', sa.Text(), nullable=False),
+            sa.Column('payload', sa.LargeBinary(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index('ix_transaction_archives_id', 'transaction_archives', ['id'])
+        op.create_index(
+            'ix_transaction_archives_user_id_last_id', 'transaction_archives', ['user_id', 'last_transaction_id']
+        )
+        op.create_index('ix_transaction_archives_user_id_first_at', 'transaction_archives', ['user_id', 'first_at'])
+
+
+def downgrade():
+    op.drop_index('ix_transaction_archives_user_id_first_at', table_name='transaction_archives')
+    op.drop_index('ix_transaction_archives_user_id_last_id', table_name='transaction_archives')
+    op.drop_index('ix_transaction_archives_id', table_name='transaction_archives')
+    op.drop_table('transaction_archives')
@@ -0,0 +1,56 @@
+"""creature seed on pets
+
+Revision ID: 000014
+Revises: 000013
+Create Date: 2026-10-18 00:00:14
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '000014'
+down_revision = '000013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    existing_cols = {c['name'] for c in insp.get_columns('pets')}
+
+    # Существующие питомцы сида не получают: их существа генерировались глобальным random,
+    # промпты остаются в prompt_*_en
+    if 'creature_seed' not in existing_cols:
+        op.add_column('pets', sa.Column('creature_seed', sa.BigInteger(), nullable=True))
+
+
+def downgrade():
+    # Промпты питомцев с сидом восстанавливаются перед удалением колонки
+    from generator.promt_gen import generate_seeded
+
+    bind = op.get_bind()
+    pets = sa.table(
+        'pets',
+        sa.column('id', sa.Integer),
+        sa.column('creature_seed', sa.BigInteger),
+        sa.column('prompt_egg_en', sa.Text),
+        sa.column('prompt_baby_en', sa.Text),
+        sa.column('prompt_adult_en', sa.Text),
+    )
+    rows = bind.execute(
+        sa.select(pets.c.id, pets.c.creature_seed).where(pets.c.creature_seed.isnot(None))
+    ).fetchall()
+    for pet_id, seed in rows:
+        stage_prompts = generate_seeded(seed)["stage_prompts"]
+        bind.execute(
+            pets.update().where(pets.c.id == pet_id).values(
+                prompt_egg_en=stage_prompts["egg"]["en"],
+                prompt_baby_en=stage_prompts["baby"]["en"],
+                prompt_adult_en=stage_prompts["adult"]["en"],
+            )
+        )
+    with op.batch_alter_table('pets') as batch_op:
+        batch_op.drop_column('creature_seed')
@@ -0,0 +1,39 @@
+"""creature pool
+
+Revision ID: 000015
+Revises: 000014
+Create Date: 2026-10-18 00:00:15
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '000015'
+down_revision = '000014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    # Таблица могла быть создана через create_all на свежей БД
+    if 'creature_pool' not in insp.get_table_names():
+        op.create_table(
+            'creature_pool',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('creature_seed', sa.BigInteger(), nullable=False),
+            sa.Column('creature_json', sa.Text(), nullable=False),
+            sa.Column('image_egg_b64', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index('ix_creature_pool_id', 'creature_pool', ['id'])
+
+
+def downgrade():
+    # Пул — только кэш готовых существ, его содержимое не переносится
+    op.drop_index('ix_creature_pool_id', table_name='creature_pool')
+    op.drop_table('creature_pool')
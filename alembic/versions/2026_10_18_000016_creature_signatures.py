@@ -0,0 +1,97 @@
+"""creature signatures
+
+Revision ID: 000016
+Revises: 000015
+Create Date: 2026-10-18 00:00:16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '000016'
+down_revision = '000015'
+branch_labels = None
+depends_on = None
+
+# Питомцев на одну порцию пересчёта сигнатур
+BACKFILL_CHUNK = 1000
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    existing_cols = {c['name'] for c in insp.get_columns('pets')}
+
+    if 'creature_signature' not in existing_cols:
+        op.add_column('pets', sa.Column('creature_signature', sa.LargeBinary(), nullable=True))
+
+    # Таблица могла быть создана через create_all на свежей БД
+    if 'creature_signature_bands' not in insp.get_table_names():
+        op.create_table(
+            'creature_signature_bands',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('pet_id', sa.Integer(), sa.ForeignKey('pets.id'), nullable=False),
+            sa.Column('band', sa.Integer(), nullable=False),
+            sa.Column('bucket', sa.BigInteger(), nullable=False),
+        )
+        op.create_index('ix_creature_signature_bands_id', 'creature_signature_bands', ['id'])
+        op.create_index('ix_creature_signature_bands_pet_id', 'creature_signature_bands', ['pet_id'])
+        op.create_index('ix_creature_signature_bands_band_bucket', 'creature_signature_bands', ['band', 'bucket'])
+
+    _backfill(bind)
+
+
+def _backfill(bind):
+    """Сигнатуры и корзины для питомцев с creature_json, у которых сигнатуры ещё нет"""
+    import json
+    from generator.similarity import band_buckets, creature_signature, pack_signature
+
+    pets = sa.table(
+        'pets',
+        sa.column('id', sa.Integer),
+        sa.column('creature_json', sa.Text),
+        sa.column('creature_signature', sa.LargeBinary),
+    )
+    bands = sa.table(
+        'creature_signature_bands',
+        sa.column('pet_id', sa.Integer),
+        sa.column('band', sa.Integer),
+        sa.column('bucket', sa.BigInteger),
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(pets.c.id, pets.c.creature_json)
+            .where(pets.c.id > last_id, pets.c.creature_json.is_not(None), pets.c.creature_signature.is_(None))
+            .order_by(pets.c.id)
+            .limit(BACKFILL_CHUNK)
+        ).all()
+        if not rows:
+            break
+        band_rows = []
+        for pet_id, creature_json in rows:
+            try:
+                creature = json.loads(creature_json) or {}
+            except ValueError:
+                continue
+            if not creature:
+                continue
+            sig = creature_signature(creature)
+            bind.execute(
+                pets.update().where(pets.c.id == pet_id).values(creature_signature=pack_signature(sig))
+            )
+            band_rows.extend({"pet_id": pet_id, "band": band, "bucket": bucket} for band, bucket in band_buckets(sig))
+        if band_rows:
+            bind.execute(bands.insert(), band_rows)
+        last_id = rows[-1][0]
+
+
+def downgrade():
+    op.drop_index('ix_creature_signature_bands_band_bucket', table_name='creature_signature_bands')
+    op.drop_index('ix_creature_signature_bands_pet_id', table_name='creature_signature_bands')
+    op.drop_index('ix_creature_signature_bands_id', table_name='creature_signature_bands')
+    op.drop_table('creature_signature_bands')
+    with op.batch_alter_table('pets') as batch_op:
+        batch_op.drop_column('creature_signature')
@@ -0,0 +1,163 @@
+"""pet prompts store
+
+Revision ID: 000017
+Revises: 000016
+Create Date: 2026-10-18 00:00:17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '000017'
+down_revision = '000016'
+branch_labels = None
+depends_on = None
+
+STAGES = ('egg', 'baby', 'adult')
+# Питомцев на одну порцию переноса промптов
+COPY_CHUNK = 1000
+# Как в prompt_store и 000018: ключ — sha256 текста, текст сжат zlib
+COMPRESSION_LEVEL = 6
+
+
+def _pets_table():
+    return sa.table(
+        'pets',
+        sa.column('id', sa.Integer),
+        *(sa.column(f'prompt_{stage}_en', sa.Text) for stage in STAGES),
+    )
+
+
+def _prompts_table():
+    return sa.table(
+        'pet_prompts',
+        sa.column('pet_id', sa.Integer),
+        sa.column('stage', sa.String),
+        sa.column('prompt_en', sa.Text),
+    )
+
+
+def _interned_prompts_table():
+    return sa.table(
+        'pet_prompts',
+        sa.column('pet_id', sa.Integer),
+        sa.column('stage', sa.String),
+        sa.column('prompt_id', sa.Integer),
+    )
+
+
+def _texts_table():
+    return sa.table(
+        'prompts',
+        sa.column('id', sa.Integer),
+        sa.column('content_hash', sa.String),
+        sa.column('text_z', sa.LargeBinary),
+    )
+
+
+def _intern(bind, prompt_rows):
+    """Строки с prompt_en -> строки с prompt_id: текст кладётся в prompts (один id на одинаковый текст)."""
+    import hashlib
+    import zlib
+
+    texts_table = _texts_table()
+    hashes = [hashlib.sha256(row['prompt_en'].encode('utf-8')).hexdigest() for row in prompt_rows]
+    texts = {content_hash: row['prompt_en'] for content_hash, row in zip(hashes, prompt_rows)}
+    known = dict(bind.execute(
+        sa.select(texts_table.c.content_hash, texts_table.c.id).where(texts_table.c.content_hash.in_(list(texts)))
+    ).all())
+    new = [content_hash for content_hash in texts if content_hash not in known]
+    if new:
+        bind.execute(texts_table.insert(), [
+            {"content_hash": content_hash, "text_z": zlib.compress(texts[content_hash].encode('utf-8'), COMPRESSION_LEVEL)}
+            for content_hash in new
+        ])
+        known.update(bind.execute(
+            sa.select(texts_table.c.content_hash, texts_table.c.id).where(texts_table.c.content_hash.in_(new))
+        ).all())
+    return [
+        {"pet_id": row['pet_id'], "stage": row['stage'], "prompt_id": known[content_hash]}
+        for content_hash, row in zip(hashes, prompt_rows)
+    ]
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    existing_cols = {c['name'] for c in insp.get_columns('pets')}
+
+    # Таблица могла быть создана через create_all на свежей БД
+    if 'pet_prompts' not in insp.get_table_names():
+        op.create_table(
+            'pet_prompts',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('pet_id', sa.Integer(), sa.ForeignKey('pets.id'), nullable=False),
+            sa.Column('stage', sa.String(length=8), nullable=False),
+            sa.Column('prompt_en', sa.Text(), nullable=False),
+            sa.UniqueConstraint('pet_id', 'stage', name='uq_pet_prompts_pet_stage'),
+        )
+        op.create_index('ix_pet_prompts_id', 'pet_prompts', ['id'])
+
+    prompt_cols = [f'prompt_{stage}_en' for stage in STAGES if f'prompt_{stage}_en' in existing_cols]
+    if not prompt_cols:
+        return
+
+    # create_all в env.py строит pet_prompts уже в форме головы (prompt_id -> prompts):
+    # тогда тексты сразу кладутся в prompts, как это делает 000018
+    interned = 'prompt_en' not in {c['name'] for c in insp.get_columns('pet_prompts')}
+    if interned and 'prompts' not in insp.get_table_names():
+        op.create_table(
+            'prompts',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('content_hash', sa.String(length=64), nullable=False),
+            sa.Column('text_z', sa.LargeBinary(), nullable=False),
+            sa.UniqueConstraint('content_hash', name='uq_prompts_content_hash'),
+        )
+        op.create_index('ix_prompts_id', 'prompts', ['id'])
+
+    # Промпты из колонок pets переносятся в pet_prompts (у питомцев с сидом колонки пусты)
+    pets = _pets_table()
+    prompts = _interned_prompts_table() if interned else _prompts_table()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(pets.c.id, *(pets.c[col] for col in prompt_cols))
+            .where(pets.c.id > last_id)
+            .order_by(pets.c.id)
+            .limit(COPY_CHUNK)
+        ).all()
+        if not rows:
+            break
+        prompt_rows = [
+            {"pet_id": row[0], "stage": col[len('prompt_'):-len('_en')], "prompt_en": value}
+            for row in rows
+            for col, value in zip(prompt_cols, row[1:])
+            if value
+        ]
+        if prompt_rows:
+            bind.execute(prompts.insert(), _intern(bind, prompt_rows) if interned else prompt_rows)
+        last_id = rows[-1][0]
+
+    with op.batch_alter_table('pets') as batch_op:
+        for col in prompt_cols:
+            batch_op.drop_column(col)
+
+
+def downgrade():
+    bind = op.get_bind()
+    with op.batch_alter_table('pets') as batch_op:
+        for stage in STAGES:
+            batch_op.add_column(sa.Column(f'prompt_{stage}_en', sa.Text(), nullable=True))
+
+    pets = _pets_table()
+    prompts = _prompts_table()
+    for pet_id, stage, prompt_en in bind.execute(
+        sa.select(prompts.c.pet_id, prompts.c.stage, prompts.c.prompt_en)
+    ).all():
+        if stage in STAGES:
+            bind.execute(pets.update().where(pets.c.id == pet_id).values({f'prompt_{stage}_en': prompt_en}))
+
+    op.drop_index('ix_pet_prompts_id', table_name='pet_prompts')
+    op.drop_table('pet_prompts')
@@ -0,0 +1,131 @@
+"""deduplicated compressed prompts
+
+Revision ID: 000018
+Revises: 000017
+Create Date: 2026-10-18 00:00:18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '000018'
+down_revision = '000017'
+branch_labels = None
+depends_on = None
+
+# Строк pet_prompts на одну порцию переноса
+COPY_CHUNK = 1000
+# Как в prompt_store: ключ — sha256 текста, текст сжат zlib
+COMPRESSION_LEVEL = 6
+
+
+def _prompts_table():
+    return sa.table(
+        'prompts',
+        sa.column('id', sa.Integer),
+        sa.column('content_hash', sa.String),
+        sa.column('text_z', sa.LargeBinary),
+    )
+
+
+def _pet_prompts_table():
+    return sa.table(
+        'pet_prompts',
+        sa.column('id', sa.Integer),
+        sa.column('prompt_en', sa.Text),
+        sa.column('prompt_id', sa.Integer),
+    )
+
+
+def upgrade():
+    import hashlib
+    import zlib
+
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    # Таблица могла быть создана через create_all на свежей БД
+    if 'prompts' not in insp.get_table_names():
+        op.create_table(
+            'prompts',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('content_hash', sa.String(length=64), nullable=False),
+            sa.Column('text_z', sa.LargeBinary(), nullable=False),
+            sa.UniqueConstraint('content_hash', name='uq_prompts_content_hash'),
+        )
+        op.create_index('ix_prompts_id', 'prompts', ['id'])
+
+    existing_cols = {c['name'] for c in insp.get_columns('pet_prompts')}
+    if 'prompt_en' not in existing_cols:
+        return
+    if 'prompt_id' not in existing_cols:
+        with op.batch_alter_table('pet_prompts') as batch_op:
+            batch_op.add_column(sa.Column('prompt_id', sa.Integer(), nullable=True))
+
+    # Одинаковые тексты получают один id в prompts
+    prompts = _prompts_table()
+    pet_prompts = _pet_prompts_table()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(pet_prompts.c.id, pet_prompts.c.prompt_en)
+            .where(pet_prompts.c.id > last_id)
+            .order_by(pet_prompts.c.id)
+            .limit(COPY_CHUNK)
+        ).all()
+        if not rows:
+            break
+        hashes = {row_id: hashlib.sha256(text.encode('utf-8')).hexdigest() for row_id, text in rows}
+        texts = {hashes[row_id]: text for row_id, text in rows}
+        known = {
+            content_hash: prompt_id
+            for prompt_id, content_hash in bind.execute(
+                sa.select(prompts.c.id, prompts.c.content_hash).where(prompts.c.content_hash.in_(list(texts)))
+            ).all()
+        }
+        new = [content_hash for content_hash in texts if content_hash not in known]
+        if new:
+            bind.execute(prompts.insert(), [
+                {"content_hash": content_hash, "text_z": zlib.compress(texts[content_hash].encode('utf-8'), COMPRESSION_LEVEL)}
+                for content_hash in new
+            ])
+            known.update(bind.execute(
+                sa.select(prompts.c.content_hash, prompts.c.id).where(prompts.c.content_hash.in_(new))
+            ).all())
+        bind.execute(
+            pet_prompts.update().where(pet_prompts.c.id == sa.bindparam('row_id')).values(prompt_id=sa.bindparam('new_prompt_id')),
+            [{"row_id": row_id, "new_prompt_id": known[hashes[row_id]]} for row_id, _ in rows],
+        )
+        last_id = rows[-1][0]
+
+    with op.batch_alter_table('pet_prompts') as batch_op:
+        batch_op.alter_column('prompt_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_pet_prompts_prompt_id', 'prompts', ['prompt_id'], ['id'])
+        batch_op.drop_column('prompt_en')
+
+
+def downgrade():
+    import zlib
+
+    bind = op.get_bind()
+    with op.batch_alter_table('pet_prompts') as batch_op:
+        batch_op.add_column(sa.Column('prompt_en', sa.Text(), nullable=True))
+
+    prompts = _prompts_table()
+    pet_prompts = _pet_prompts_table()
+    for prompt_id, text_z in bind.execute(sa.select(prompts.c.id, prompts.c.text_z)).all():
+        bind.execute(
+            pet_prompts.update()
+            .where(pet_prompts.c.prompt_id == prompt_id)
+            .values(prompt_en=zlib.decompress(text_z).decode('utf-8'))
+        )
+
+    with op.batch_alter_table('pet_prompts') as batch_op:
+        batch_op.drop_constraint('fk_pet_prompts_prompt_id', type_='foreignkey')
+        batch_op.drop_column('prompt_id')
+        batch_op.alter_column('prompt_en', existing_type=sa.Text(), nullable=False)
+
+    op.drop_index('ix_prompts_id', table_name='prompts')
+    op.drop_table('prompts')
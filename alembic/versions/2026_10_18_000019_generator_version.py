@@ -0,0 +1,106 @@
+"""generator version next to creature seed
+
+Revision ID: 000019
+Revises: 000018
+Create Date: 2026-10-18 00:00:19
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '000019'
+down_revision = '000018'
+branch_labels = None
+depends_on = None
+
+# Строк на одну порцию заполнения
+COPY_CHUNK = 500
+
+
+def _seeded_table(name):
+    return sa.table(
+        name,
+        sa.column('id', sa.Integer),
+        sa.column('creature_seed', sa.BigInteger),
+        sa.column('generator_version', sa.Integer),
+        sa.column('creature_json', sa.Text),
+    )
+
+
+def _detect_version(seed, creature_json):
+    """Версия генератора, которая из seed даёт сохранённое существо (при совпадении нескольких — новейшая)"""
+    from generator.promt_gen import SEEDED_GENERATORS, generate_seeded
+
+    try:
+        creature = json.loads(creature_json) if creature_json else None
+    except ValueError:
+        return None
+    if not creature:
+        return None
+    for version in sorted(SEEDED_GENERATORS, reverse=True):
+        if generate_seeded(seed, version)["creature"] == creature:
+            return version
+    return None
+
+
+def _backfill(bind, name, delete_unknown):
+    table = _seeded_table(name)
+    last_id = 0
+    unknown = []
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, table.c.creature_seed, table.c.creature_json)
+            .where(
+                table.c.id > last_id,
+                table.c.creature_seed.isnot(None),
+                table.c.generator_version.is_(None),
+            )
+            .order_by(table.c.id)
+            .limit(COPY_CHUNK)
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for row_id, seed, creature_json in rows:
+            version = _detect_version(seed, creature_json)
+            if version is None:
+                unknown.append(row_id)
+            else:
+                updates.append({"row_id": row_id, "version": version})
+        if updates:
+            bind.execute(
+                table.update().where(table.c.id == sa.bindparam('row_id')).values(generator_version=sa.bindparam('version')),
+                updates,
+            )
+        last_id = rows[-1][0]
+    # Существо из пула, которое не восстанавливается ни одной версией, проще сгенерировать заново
+    if delete_unknown and unknown:
+        for start in range(0, len(unknown), COPY_CHUNK):
+            bind.execute(table.delete().where(table.c.id.in_(unknown[start:start + COPY_CHUNK])))
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    tables = set(insp.get_table_names())
+
+    # На свежей БД колонки уже созданы через create_all
+    for name in ('pets', 'creature_pool'):
+        if name in tables and 'generator_version' not in {c['name'] for c in insp.get_columns(name)}:
+            op.add_column(name, sa.Column('generator_version', sa.Integer(), nullable=True))
+
+    # Сиды до версионирования: версия определяется по совпадению сохранённого существа
+    _backfill(bind, 'pets', delete_unknown=False)
+    if 'creature_pool' in tables:
+        _backfill(bind, 'creature_pool', delete_unknown=True)
+
+
+def downgrade():
+    with op.batch_alter_table('creature_pool') as batch_op:
+        batch_op.drop_column('generator_version')
+    with op.batch_alter_table('pets') as batch_op:
+        batch_op.drop_column('generator_version')
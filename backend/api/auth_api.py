@@ -16,8 +16,10 @@ async def issue_token(user_id: str, username: str = None, db: AsyncSession = Dep
     Также создаёт пользователя/кошелёк при необходимости.
     """
     try:
-        # Гарантируем наличие кошелька/пользователя
-        await EconomyService.create_user_wallet(db, user_id, username)
+        # Гарантируем наличие кошелька/пользователя (известный пользователь — без запросов)
+        await EconomyService.provision_user(db, user_id, username)
+        if db.in_transaction():
+            await db.commit()
         token = create_user_token(user_id)
         return {"access_token": token, "token_type": "bearer", "user_id": user_id}
     except Exception as e:
@@ -6,8 +6,8 @@ from models import Pet, PetState, PetLifeStatus
 from config.settings import HEALTH_MAX, ACTION_COSTS
 from economy import EconomyService
 import logging
-from prompt_store import generate_and_store_prompts
 from services.stages import StageLifecycleService
+from services.creature_pool import CreaturePoolService
 from .validators import CreatePetRequest
 
 logger = logging.getLogger(__name__)
@@ -44,15 +44,28 @@ async def create_pet(user_id: str, name: str, override: bool = False, request: R
         if same_name.scalar_one_or_none():
             raise HTTPException(status_code=400, detail="Питомец с таким именем у вас уже существует")
         
+        # Проверяем средства до генерации: отказ не должен стоить генерации изображения
+        if is_paid_creation_required:
+            paid_cost = ACTION_COSTS.get('paid_pet', 500)
+            available = await EconomyService.get_available_balance(db, user_id)
+            if available < paid_cost:
+                raise HTTPException(status_code=400, detail=f"Недостаточно монет для создания питомца. Требуется: {paid_cost}, доступно: {available}")
+
+        # Готовое существо из пула (строка удаляется в этой же транзакции); пул пуст — генерируем
+        # на месте, до записей в БД, чтобы медленная генерация не держала транзакцию
+        artifacts = await CreaturePoolService.claim(db)
+        if artifacts is None:
+            try:
+                artifacts = await StageLifecycleService.build_creation_artifacts(user_id, name)
+            except Exception as e:
+                logger.warning(f"Подготовка стадий/изображения не удалась: {e}")
+
+        # Дальше — одна единица работы с единственным commit в конце
         # Создаем кошелек для пользователя (если его нет)
         wallet = await EconomyService.create_user_wallet(db, user_id)
 
-        # Если требуется платное создание — списываем монеты
+        # Если требуется платное создание — списываем монеты (проверка баланса атомарна в SQL)
         if is_paid_creation_required:
-            paid_cost = ACTION_COSTS.get('paid_pet', 500)
-            # Проверяем достаточность средств
-            if wallet.coins < paid_cost:
-                raise HTTPException(status_code=400, detail=f"Недостаточно монет для создания питомца. Требуется: {paid_cost}, доступно: {wallet.coins}")
             spent = await EconomyService.spend_coins(
                 db=db,
                 user_id=user_id,
@@ -61,19 +74,16 @@ async def create_pet(user_id: str, name: str, override: bool = False, request: R
                 transaction_data={"action": "create_pet", "pet_name": name}
             )
             if not spent:
-                raise HTTPException(status_code=500, detail="Не удалось списать монеты за создание питомца")
+                raise HTTPException(status_code=400, detail=f"Недостаточно монет для создания питомца. Требуется: {paid_cost}")
         
         # Создание нового питомца
         new_pet = Pet(user_id=user_id, name=name, state=PetState.egg, health=HEALTH_MAX, status=PetLifeStatus.alive)
         db.add(new_pet)
-        await db.commit()
-        await db.refresh(new_pet)
+        await db.flush()
 
-        # Подготовка стадий (сохранение creature_json и всех промтов в БД)
-        try:
-            await StageLifecycleService.prepare_on_create(db, user_id, name)
-        except Exception as e:
-            logger.warning(f"Подготовка стадий/изображения не удалась: {e}")
+        # Сохранение creature_json, промптов и изображения яйца
+        if artifacts:
+            await StageLifecycleService.apply_creation_artifacts(db, new_pet, artifacts)
         
         # Проверяем достижение "Первый питомец"
         await EconomyService.check_achievement(
@@ -84,6 +94,8 @@ async def create_pet(user_id: str, name: str, override: bool = False, request: R
             description="Создал своего первого питомца!",
             coins_reward=50
         )
+
+        await db.commit()
         
         # URL эндпоинта получения изображения (абсолютный URL для корректной загрузки с фронтенда)
         base_url = str(request.base_url).rstrip("/") if request is not None else ""
@@ -3,15 +3,22 @@ API endpoints для экономики Telepets.
 Управляет кошельками, транзакциями и покупками.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from db import get_db
-from models import Pet, PetState, PetLifeStatus, User, Wallet, Transaction
+from auth import require_admin
+from models import Pet, PetState, PetLifeStatus, User, Wallet
 from economy import EconomyService
-from config.settings import ACTION_COSTS, PURCHASE_OPTIONS, GAME_REWARD_ALLOWED_GAMES, GAME_REWARD_COINS_PER_SCORE, GAME_REWARD_MAX_PER_REQUEST
+from services.ledger import LedgerService
+from config.settings import ACTION_COSTS, ACTION_REWARDS, PURCHASE_OPTIONS, GAME_REWARD_ALLOWED_GAMES, GAME_REWARD_COINS_PER_SCORE, GAME_REWARD_MAX_PER_REQUEST
+from config.settings import CREDIT_BATCH_CHUNK_SIZE, USER_ID_PATTERN, USER_ID_MAX_LENGTH
+import codecs
+import csv
 import logging
-from typing import Dict, List
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -24,8 +31,10 @@ async def get_wallet(user_id: str, db: AsyncSession = Depends(get_db)):
     Создает кошелек, если его нет.
     """
     try:
-        # Создаем кошелек, если его нет
-        wallet = await EconomyService.create_user_wallet(db, user_id)
+        # Создаем кошелек, если его нет; известный пользователь из кэша — без запросов к БД
+        wallet = await EconomyService.get_wallet_snapshot(db, user_id, create=True)
+        if db.in_transaction():
+            await db.commit()
         
         return {
             "user_id": user_id,
@@ -103,6 +112,40 @@ async def get_user_stats(user_id: str, db: AsyncSession = Depends(get_db)):
         logger.error(f"Ошибка получения статистики: {e}")
         raise HTTPException(status_code=500, detail="Ошибка получения статистики")
 
+@router.get("/balance/{user_id}/at")
+async def get_balance_at(user_id: str, at: datetime, db: AsyncSession = Depends(get_db)):
+    """
+    Баланс пользователя на момент времени (UTC): чекпоинт леджера + короткий хвост.
+    """
+    try:
+        return {
+            "user_id": user_id,
+            "at": at,
+            "coins": await LedgerService.balance_at(db, user_id, at),
+        }
+    except Exception as e:
+        logger.error(f"Ошибка получения баланса на момент времени: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка получения баланса")
+
+@router.get("/statement/{user_id}")
+async def get_statement(
+    user_id: str,
+    start: datetime,
+    end: Optional[datetime] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Выписка за период: входящий и исходящий баланс, итоги по типам и транзакции периода.
+    """
+    try:
+        return await LedgerService.statement(db, user_id, start, end or datetime.utcnow(), limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Ошибка получения выписки: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка получения выписки")
+
 @router.post("/purchase/{user_id}")
 async def purchase_coins(
     user_id: str,
@@ -131,6 +174,7 @@ async def purchase_coins(
             description=f"Покупка {coins} монет за ${price}",
             source="purchase"
         )
+        await db.commit()
         
         return {
             "success": True,
@@ -179,13 +223,22 @@ async def claim_game_reward(
         if coins == 0:
             return {"success": True, "coins_added": 0, "new_balance": await EconomyService.get_balance(db, user_id), "message": "Недостаточно очков для награды"}
 
-        await EconomyService.add_coins(
+        # Лимит наград за мини-игры в сутки (REWARD_LIMITS['game'])
+        if not await EconomyService.claim_reward(db, user_id, "game"):
+            raise HTTPException(status_code=400, detail="Лимит наград за мини-игры на сегодня исчерпан")
+
+        credited = await EconomyService.add_coins(
             db=db,
             user_id=user_id,
             amount=coins,
             description=f"Награда за игру {game_key}: {score} очков",
             source="game"
         )
+        if not credited:
+            # Резерв лимита откатывается вместе с несостоявшимся начислением
+            await db.rollback()
+            raise HTTPException(status_code=500, detail="Ошибка начисления награды")
+        await db.commit()
 
         return {
             "success": True,
@@ -240,18 +293,22 @@ async def health_up_with_cost(
                 detail=f"Недостаточно монет. Требуется: {cost}, доступно: {wallet.coins if wallet else 0}"
             )
         
-        # Тратим монеты
-        await EconomyService.spend_coins(
+        # Тратим монеты (проверка баланса атомарна — параллельный запрос мог успеть раньше)
+        spent = await EconomyService.spend_coins(
             db=db,
             user_id=user_id,
             amount=cost,
             description=f"Увеличение здоровья питомца {pet.name} (стадия: {pet.state.value})",
                             transaction_data={"pet_id": pet.id, "action": "health_up", "stage": pet.state.value}
         )
+        if not spent:
+            raise HTTPException(status_code=400, detail=f"Недостаточно монет. Требуется: {cost}")
         
         # Увеличиваем здоровье
         from api.health_up import health_up_logic
         result = await health_up_logic(user_id, db, pet.name)
+        # Списание и лечение — одна единица работы
+        await db.commit()
         
         return {
             "success": True,
@@ -312,8 +369,8 @@ async def resurrect_pet(
         pet.health = HEALTH_MAX
         from datetime import datetime
         pet.updated_at = datetime.utcnow()
+        # Списание и воскрешение — одна единица работы
         await db.commit()
-        await db.refresh(pet)
 
         return {
             "success": True,
@@ -348,33 +405,23 @@ async def claim_daily_login_reward(
     Получение ежедневной награды за вход.
     """
     try:
-        # Проверяем, получал ли пользователь награду сегодня
-        from datetime import datetime, timedelta
-        today = datetime.utcnow().date()
-        
-        # Проверяем последнюю транзакцию ежедневной награды
-        result = await db.execute(
-            select(Transaction)
-            .where(
-                Transaction.user_id == user_id,
-                Transaction.description.like("%ежедневная награда%"),
-                Transaction.created_at >= today
-            )
-            .order_by(Transaction.created_at.desc())
-        )
-        
-        if result.scalar_one_or_none():
+        # Одна награда в сутки: уникальный ключ (user_id, 'daily_login', дата UTC)
+        if not await EconomyService.claim_reward(db, user_id, "daily_login"):
             raise HTTPException(status_code=400, detail="Ежедневная награда уже получена сегодня")
         
         # Выдаем награду
-        reward_amount = 5  # Из настроек
-        await EconomyService.add_coins(
+        reward_amount = ACTION_REWARDS['daily_login']
+        credited = await EconomyService.add_coins(
             db=db,
             user_id=user_id,
             amount=reward_amount,
             description="Ежедневная награда за вход",
             source="daily_login"
         )
+        if not credited:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail="Ошибка получения награды")
+        await db.commit()
         
         return {
             "success": True,
@@ -387,4 +434,90 @@ async def claim_daily_login_reward(
         raise
     except Exception as e:
         logger.error(f"Ошибка получения ежедневной награды: {e}")
-        raise HTTPException(status_code=500, detail="Ошибка получения награды") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Ошибка получения награды")
+
+MAX_REPORTED_CSV_ERRORS = 100
+
+async def _csv_rows(request: Request):
+    """Строки CSV из тела запроса по мере чтения потока: (номер строки, поля)."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    line_no = 0
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                yield line_no, next(csv.reader([line.rstrip("\r")]))
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield line_no + 1, next(csv.reader([buffer.rstrip("\r")]))
+
+@router.post("/admin/credit")
+async def admin_credit_from_csv(
+    request: Request,
+    reason: str = "Начисление",
+    batch_id: Optional[str] = None,
+    current_user: dict = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Массовое начисление монет (события, компенсации) из CSV в теле запроса.
+    Формат строк: user_id,amount[,reason]; строка заголовка допускается.
+    Тело читается потоком и сначала проверяется целиком: при любой ошибочной строке ничего
+    не начисляется. Затем начисление идёт пакетами, каждый — своей транзакцией: одна общая
+    транзакция на весь файл жила бы дольше лага роллапов экономики, и её строки выпали бы
+    из них. Если пакет упал, начисленные строки файла идут подряд с начала — в ответе
+    409 их число (`credited`), остаток файла нужно отправить заново.
+    """
+    user_id_re = re.compile(USER_ID_PATTERN)
+    summary = {"entries": 0, "total_amount": 0, "new_wallets": 0}
+    errors = []
+    entries = []
+    transaction_data = {"source": "admin_batch", "batch_id": batch_id, "admin": current_user["user_id"]}
+    try:
+        async for line_no, row in _csv_rows(request):
+            user_id = row[0].strip() if row else ""
+            amount_raw = row[1].strip() if len(row) > 1 else ""
+            if line_no == 1 and not amount_raw.lstrip("-").isdigit():
+                continue  # заголовок
+            if not user_id_re.match(user_id) or len(user_id) > USER_ID_MAX_LENGTH:
+                errors.append({"line": line_no, "error": "Некорректный user_id"})
+            elif not amount_raw.isdigit() or int(amount_raw) <= 0:
+                errors.append({"line": line_no, "error": "Сумма должна быть положительным целым числом"})
+            elif not errors:
+                row_reason = row[2].strip() if len(row) > 2 and row[2].strip() else reason
+                entries.append((user_id, int(amount_raw), row_reason))
+            if len(errors) >= MAX_REPORTED_CSV_ERRORS:
+                break
+        if errors:
+            raise HTTPException(status_code=400, detail={"message": "Ошибки в CSV, ничего не начислено", "errors": errors})
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    for start in range(0, len(entries), CREDIT_BATCH_CHUNK_SIZE):
+        try:
+            part = await EconomyService.credit_many(
+                db, entries[start:start + CREDIT_BATCH_CHUNK_SIZE], transaction_data=transaction_data
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Ошибка массового начисления {batch_id or ''} после {summary['entries']} записей: {e}")
+            if not summary["entries"]:
+                if isinstance(e, ValueError):
+                    raise HTTPException(status_code=400, detail=str(e))
+                raise HTTPException(status_code=500, detail="Ошибка массового начисления")
+            # Не 5xx: повтор с тем же Idempotency-Key не должен начислить уже начисленное
+            raise HTTPException(status_code=409, detail={
+                "message": "Начисление прервано: начислены только первые записи файла",
+                "batch_id": batch_id,
+                "credited": summary,
+            })
+        summary = {k: summary[k] + part[k] for k in summary}
+
+    logger.info(f"Массовое начисление {batch_id or ''}: {summary}")
+    return {"success": True, "batch_id": batch_id, **summary}
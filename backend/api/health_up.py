@@ -13,7 +13,7 @@ router = APIRouter(prefix="/health_up", tags=["Pet"])
 async def health_up_logic(user_id: str, db: AsyncSession, pet_name: str | None = None) -> dict:
     """
     Логика увеличения здоровья питомца.
-    Используется как в обычном API, так и в экономике.
+    Используется как в обычном API, так и в экономике. Commit выполняет вызывающий эндпоинт.
     """
     # Находим питомца пользователя: либо конкретного по имени, либо единственного живого
     if pet_name:
@@ -48,8 +48,7 @@ async def health_up_logic(user_id: str, db: AsyncSession, pet_name: str | None =
     # Получаем сообщение для текущей стадии
     stage_message = STAGE_MESSAGES.get(pet.state.value, {}).get('health_up', 'Здоровье увеличено')
     
-    await db.commit()
-    await db.refresh(pet)
+    await db.flush()
     
     return {
         "message": stage_message,
@@ -65,4 +64,6 @@ async def health_up(user_id: str, pet_name: str | None = None, db: AsyncSession
     Увеличивает здоровье питомца в зависимости от его стадии.
     Для каждой стадии используется разная логика и сообщения.
     """
-    return await health_up_logic(user_id, db, pet_name)
\ No newline at end of file
+    result = await health_up_logic(user_id, db, pet_name)
+    await db.commit()
+    return result
\ No newline at end of file
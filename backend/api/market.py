@@ -1,17 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from typing import Optional
 from typing import List
 from datetime import datetime
+import asyncio
+import json
 
-from db import get_db
+from db import get_db, AsyncSessionLocal, session_scope
 from services.auction import AuctionService
+from services.auction_events import auction_events
+from services.market_stats import MarketStatsService
 from services.user_profile import UserProfileService
-from models import Auction, AuctionStatus
-from config.settings import AUCTION_LIST_PAGE_SIZE, MARKET_ENABLED
-from auth import get_current_user
+from models import Auction, AuctionStatus, PetState, Habitat, CreatureType
+from config.settings import AUCTION_LIST_PAGE_SIZE, AUCTION_LIST_MAX_PAGE_SIZE, MARKET_ENABLED
+from auth import get_current_user, AuthService
 
 router = APIRouter(prefix="/market", tags=["Market"])
 
@@ -37,8 +41,8 @@ class AuctionDetailOut(AuctionOut):
 
 class AuctionListOut(BaseModel):
     items: List[AuctionOut]
-    page: int
     page_size: int
+    next_cursor: Optional[str] = None
 
 
 class BidOut(BaseModel):
@@ -54,34 +58,103 @@ class PlaceBidResponse(BaseModel):
     bid: BidOut
 
 
+class ProxyBidOut(BaseModel):
+    auction_id: int
+    max_amount: int
+    is_leading: bool
+    updated_at: Optional[datetime] = None
+
+
+class PlaceProxyBidResponse(BaseModel):
+    auction: AuctionOut
+    proxy_bid: ProxyBidOut
+
+
+class MarketStatOut(BaseModel):
+    habitat: str
+    creature_type: str
+    stage: str
+    sales_count: int
+    volume_total: int
+    median_price: Optional[int] = None
+    floor_price_24h: Optional[int] = None
+    sales_24h: int
+    volume_24h: int
+    last_price: Optional[int] = None
+    last_sale_at: Optional[datetime] = None
+
+
+class MarketStatsOut(BaseModel):
+    items: List[MarketStatOut]
+
+
+def _resolve_enum(enum_cls, raw: Optional[str]):
+    """Принимает имя члена Enum (AQUATIC) или его значение (Водное) и возвращает член Enum."""
+    if not raw:
+        return None
+    if raw.upper() in enum_cls.__members__:
+        return enum_cls[raw.upper()]
+    for member in enum_cls:
+        if member.value == raw:
+            return member
+    raise ValueError(f"Неизвестное значение фильтра: {raw}")
+
+
 @router.get("/auctions", response_model=AuctionListOut, response_model_exclude_none=True)
 async def list_auctions(
     status: str = "active",
-    page: int = 1,
     page_size: int = AUCTION_LIST_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    sort: str = "end_time",
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    has_buy_now: Optional[bool] = None,
+    stage: Optional[str] = None,
+    habitat: Optional[str] = None,
+    creature_type: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
 ):
+    """
+    Листинг аукционов с фильтрами и курсорной пагинацией.
+    Для следующей страницы передайте `cursor` из поля `next_cursor` предыдущего ответа.
+    """
     if not MARKET_ENABLED:
         raise HTTPException(status_code=503, detail="Рынок временно недоступен")
 
     try:
         status_enum = AuctionStatus[status] if status in AuctionStatus.__members__ else AuctionStatus.active
-        q = select(Auction).where(Auction.status == status_enum).order_by(Auction.end_time.asc())
-        offset = max(0, (page - 1) * page_size)
-        result = await db.execute(q.offset(offset).limit(page_size))
-        auctions = result.scalars().all()
-        
-        # Получаем анонимные имена продавцов
+        stage_enum = PetState[stage] if stage in PetState.__members__ else None
+        if stage and stage_enum is None:
+            raise ValueError(f"Неизвестная стадия: {stage}")
+        auctions, next_cursor = await AuctionService.search_auctions(
+            db=db,
+            status=status_enum,
+            sort=sort,
+            cursor=cursor,
+            limit=page_size,
+            min_price=min_price,
+            max_price=max_price,
+            has_buy_now=has_buy_now,
+            stage=stage_enum,
+            habitat=_resolve_enum(Habitat, habitat),
+            creature_type=_resolve_enum(CreatureType, creature_type),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    try:
+        # Публичные имена продавцов одним запросом вместо запроса на каждый лот
+        seller_names = await UserProfileService.get_public_names(db, [a.seller_user_id for a in auctions])
+
         auction_items = []
         for a in auctions:
-            seller_info = await UserProfileService.get_public_user_info(db, a.seller_user_id)
-            seller_name = (seller_info or {}).get("public_name", "Неизвестный игрок")
-            
             auction_items.append({
                 "id": a.id,
                 "pet_id": a.pet_id,
                 "seller_user_id": a.seller_user_id,
-                "seller_name": seller_name,
+                "seller_name": seller_names.get(a.seller_user_id, "Неизвестный игрок"),
                 "current_price": a.current_price,
                 "buy_now_price": a.buy_now_price,
                 "end_time": a.end_time,
@@ -91,8 +164,8 @@ async def list_auctions(
         
         return {
             "items": auction_items,
-            "page": page,
-            "page_size": page_size,
+            "page_size": max(1, min(page_size, AUCTION_LIST_MAX_PAGE_SIZE)),
+            "next_cursor": next_cursor,
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -152,6 +225,7 @@ async def create_auction(
             min_increment_abs=min_increment_abs,
             min_increment_pct=min_increment_pct,
         )
+        await db.commit()
         return {"id": a.id, "end_time": a.end_time, "status": a.status.value}
     except (ValueError, PermissionError) as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -170,6 +244,7 @@ async def place_bid(
         raise HTTPException(status_code=503, detail="Рынок временно недоступен")
     try:
         a, b = await AuctionService.place_bid(db=db, auction_id=auction_id, bidder_user_id=current_user["user_id"], amount=amount)
+        await db.commit()
         
         # Получаем анонимное имя продавца
         seller_info = await UserProfileService.get_public_user_info(db, a.seller_user_id)
@@ -201,6 +276,72 @@ async def place_bid(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/auctions/{auction_id}/proxy_bids", response_model=PlaceProxyBidResponse, response_model_exclude_none=True)
+async def place_proxy_bid(
+    auction_id: int,
+    max_amount: int,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Скрытая максимальная ставка. Цена поднимается автоматически минимальным шагом
+    только при перебитии, пока не будет достигнут максимум.
+    """
+    if not MARKET_ENABLED:
+        raise HTTPException(status_code=503, detail="Рынок временно недоступен")
+    try:
+        a, p = await AuctionService.place_proxy_bid(db=db, auction_id=auction_id, bidder_user_id=current_user["user_id"], max_amount=max_amount)
+        await db.commit()
+
+        seller_info = await UserProfileService.get_public_user_info(db, a.seller_user_id)
+        seller_name = (seller_info or {}).get("public_name", "Неизвестный игрок")
+
+        return {
+            "auction": {
+                "id": a.id,
+                "pet_id": a.pet_id,
+                "seller_user_id": a.seller_user_id,
+                "seller_name": seller_name,
+                "current_price": a.current_price,
+                "buy_now_price": a.buy_now_price,
+                "end_time": a.end_time,
+                "status": a.status.value,
+                "current_winner_user_id": a.current_winner_user_id,
+            },
+            "proxy_bid": {
+                "auction_id": p.auction_id,
+                "max_amount": p.max_amount,
+                "is_leading": a.current_winner_user_id == p.user_id,
+                "updated_at": p.updated_at or p.created_at,
+            },
+        }
+    except (ValueError, PermissionError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/auctions/{auction_id}/proxy_bids/me", response_model=ProxyBidOut, response_model_exclude_none=True)
+async def get_my_proxy_bid(
+    auction_id: int,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Максимальная ставка текущего пользователя (видна только ему)."""
+    if not MARKET_ENABLED:
+        raise HTTPException(status_code=503, detail="Рынок временно недоступен")
+    p = await AuctionService.get_proxy_bid(db, auction_id, current_user["user_id"])
+    if not p:
+        raise HTTPException(status_code=404, detail="Прокси-ставка не найдена")
+    a = await AuctionService._get_auction(db, auction_id)
+    return {
+        "auction_id": p.auction_id,
+        "max_amount": p.max_amount,
+        "is_leading": bool(a and a.current_winner_user_id == p.user_id),
+        "updated_at": p.updated_at or p.created_at,
+    }
+
+
 @router.post("/auctions/{auction_id}/buy_now", response_model=dict)
 async def buy_now(
     auction_id: int,
@@ -211,6 +352,7 @@ async def buy_now(
         raise HTTPException(status_code=503, detail="Рынок временно недоступен")
     try:
         a = await AuctionService.buy_now(db=db, auction_id=auction_id, buyer_user_id=current_user["user_id"])
+        await db.commit()
         return {"id": a.id, "status": a.status.value}
     except (ValueError, PermissionError) as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -228,6 +370,7 @@ async def cancel_auction(
         raise HTTPException(status_code=503, detail="Рынок временно недоступен")
     try:
         a = await AuctionService.cancel_auction(db=db, auction_id=auction_id, seller_user_id=current_user["user_id"])
+        await db.commit()
         return {"id": a.id, "status": a.status.value}
     except (ValueError, PermissionError) as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -235,3 +378,178 @@ async def cancel_auction(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+
+
+@router.get("/stats", response_model=MarketStatsOut, response_model_exclude_none=True)
+async def market_stats(
+    habitat: Optional[str] = None,
+    creature_type: Optional[str] = None,
+    stage: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Статистика продаж по группам (habitat, creature_type, stage): медиана, минимальная цена
+    и объём за 24 часа. Отдаётся из роллапа `market_stats`, без сканирования истории.
+    """
+    if not MARKET_ENABLED:
+        raise HTTPException(status_code=503, detail="Рынок временно недоступен")
+    try:
+        habitat_enum = _resolve_enum(Habitat, habitat)
+        type_enum = _resolve_enum(CreatureType, creature_type)
+        stage_enum = PetState[stage] if stage in PetState.__members__ else None
+        if stage and stage_enum is None:
+            raise ValueError(f"Неизвестная стадия: {stage}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    items = await MarketStatsService.get_stats(
+        db,
+        habitat=habitat_enum.name if habitat_enum else None,
+        creature_type=type_enum.name if type_enum else None,
+        stage=stage_enum.name if stage_enum else None,
+    )
+    return {"items": items}
+
+
+# ===== Живой канал аукционов (WebSocket) =====
+
+def _ws_user_id(websocket: WebSocket) -> Optional[str]:
+    """Пользователь по токену из query (?token=...); без токена — только наблюдение."""
+    token = websocket.query_params.get("token")
+    return AuthService.verify_token(token) if token else None
+
+
+def _ws_auction_ids(value) -> Optional[List[int]]:
+    """auction_ids из команды: None или список id; иначе ValueError."""
+    if value is None:
+        return None
+    if not isinstance(value, list):
+        raise ValueError("auction_ids должен быть списком")
+    try:
+        return [int(a) for a in value]
+    except (TypeError, ValueError):
+        raise ValueError("auction_ids должен содержать числовые id")
+
+
+async def _ws_handle_command(message: dict, user_id: Optional[str], sub, default_auction_id: Optional[int]) -> Optional[dict]:
+    """Выполняет команду клиента и возвращает подтверждение (ack)."""
+    action = message.get("action")
+    ack = {"type": "ack", "action": action, "request_id": message.get("request_id")}
+
+    if action == "ping":
+        return {**ack, "ok": True}
+
+    if action in ("subscribe", "unsubscribe") and default_auction_id is None:
+        try:
+            ids = _ws_auction_ids(message.get("auction_ids"))
+        except ValueError as e:
+            return {**ack, "ok": False, "error": str(e)}
+        if action == "unsubscribe":
+            # Исключений из «всех лотов» хаб не хранит: пустой набор молча отключил бы все события
+            if sub.auction_ids is None:
+                return {**ack, "ok": False, "error": "Подписка на все лоты: сначала subscribe со списком auction_ids"}
+            ids = sorted(sub.auction_ids - set(ids or []))
+        auction_events.update(sub, ids)
+        return {**ack, "ok": True, "auction_ids": sorted(sub.auction_ids) if sub.auction_ids is not None else None}
+
+    if action not in ("bid", "proxy_bid"):
+        return {**ack, "ok": False, "error": "Неизвестная команда"}
+    if not user_id:
+        return {**ack, "ok": False, "error": "Требуется авторизация"}
+
+    try:
+        auction_id = int(message.get("auction_id") or default_auction_id)
+        async with session_scope() as db:
+            if action == "bid":
+                a, b = await AuctionService.place_bid(
+                    db=db, auction_id=auction_id, bidder_user_id=user_id, amount=int(message.get("amount")),
+                )
+                return {**ack, "ok": True, "auction": auction_events.snapshot(a), "bid_id": b.id}
+            a, p = await AuctionService.place_proxy_bid(
+                db=db, auction_id=auction_id, bidder_user_id=user_id, max_amount=int(message.get("max_amount")),
+            )
+            return {
+                **ack,
+                "ok": True,
+                "auction": auction_events.snapshot(a),
+                "max_amount": p.max_amount,
+                "is_leading": a.current_winner_user_id == user_id,
+            }
+    except Exception as e:
+        return {**ack, "ok": False, "error": str(e)}
+
+
+async def _ws_session(websocket: WebSocket, auction_id: Optional[int], initial: Optional[dict]) -> None:
+    """Общий цикл сокета: события хаба уходят клиенту, команды клиента — в сервис."""
+    user_id = _ws_user_id(websocket)
+    sub = auction_events.subscribe([auction_id] if auction_id is not None else None)
+    send_lock = asyncio.Lock()
+
+    async def send(payload: dict) -> None:
+        async with send_lock:
+            await websocket.send_json(payload)
+
+    async def pump_events() -> None:
+        while True:
+            await send(await sub.get())
+
+    async def read_commands() -> None:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                await send({"type": "ack", "ok": False, "error": "Ожидается JSON-объект"})
+                continue
+            ack = await _ws_handle_command(message, user_id, sub, auction_id)
+            if ack is not None:
+                await send(ack)
+
+    try:
+        if initial is not None:
+            await send(initial)
+        tasks = [asyncio.create_task(pump_events()), asyncio.create_task(read_commands())]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for t in pending:
+            t.cancel()
+        for t in done:
+            exc = t.exception()
+            if exc and not isinstance(exc, WebSocketDisconnect):
+                raise exc
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sub.close()
+
+
+@router.websocket("/ws/auctions/{auction_id}")
+async def auction_socket(websocket: WebSocket, auction_id: int):
+    """
+    Канал одного аукциона: снимок состояния при подключении, затем события
+    bid / extension / close / buy_now. Команды: {"action": "bid", "amount": N, "request_id": ...}
+    и {"action": "proxy_bid", "max_amount": N}; ответ — {"type": "ack", ...}.
+    """
+    if not MARKET_ENABLED:
+        await websocket.close(code=1013)
+        return
+    async with AsyncSessionLocal() as db:
+        a = await AuctionService._get_auction(db, auction_id)
+    if not a:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+    await _ws_session(websocket, auction_id, {"type": "snapshot", **auction_events.snapshot(a)})
+
+
+@router.websocket("/ws/auctions")
+async def auctions_socket(websocket: WebSocket):
+    """
+    Мультиплексированный канал для листинга: по умолчанию события всех аукционов.
+    {"action": "subscribe", "auction_ids": [...]} сужает набор, null — снова все.
+    Ставки принимаются с явным auction_id.
+    """
+    if not MARKET_ENABLED:
+        await websocket.close(code=1013)
+        return
+    await websocket.accept()
+    await _ws_session(websocket, None, None)
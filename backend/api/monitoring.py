@@ -10,9 +10,15 @@ from sqlalchemy import func
 from db import get_db
 from models import Pet, Notification, PetState, PetLifeStatus
 from monitoring import metrics_collector, get_health_status
-from config.settings import APP_VERSION
-from auth import get_current_user
+from services.ledger import LedgerService
+from services.economy_rollups import EconomyRollupService
+from services.wallet_cache import wallet_cache
+from prompt_store import prompt_cache
+from services.creature_similarity import CreatureSimilarityService
+from config.settings import APP_VERSION, ECONOMY_SERIES_MAX_HOURS
+from auth import get_current_user, require_admin
 import logging
+from typing import Optional
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
@@ -33,7 +39,7 @@ async def get_metrics():
     Получение метрик системы.
     Возвращает статистику по питомцам, производительности и ошибкам.
     """
-    return metrics_collector.get_metrics()
+    return {**metrics_collector.get_metrics(), "wallet_cache": wallet_cache.stats(), "prompt_cache": prompt_cache.stats()}
 
 @router.get("/stats")
 async def get_statistics(db: AsyncSession = Depends(get_db)):
@@ -143,6 +149,9 @@ async def get_user_history(
         alive_pets = len([p for p in pets if p.status == PetLifeStatus.alive])
         dead_pets = len([p for p in pets if p.status == PetLifeStatus.dead])
         
+        # Экономика: итоги по типам транзакций из чекпоинта леджера + хвоста
+        ledger_stats = await LedgerService.get_stats(db, user_id)
+        
         # Группировка уведомлений по типам
         notification_stats = {}
         for notification in notifications:
@@ -169,6 +178,7 @@ async def get_user_history(
                     for pet in pets
                 ]
             },
+            "economy": ledger_stats,
             "notifications": {
                 "total": len(notifications),
                 "types": notification_stats,
@@ -188,6 +198,71 @@ async def get_user_history(
         logger.error(f"Ошибка получения истории пользователя {user_id}: {e}")
         raise HTTPException(status_code=500, detail="Ошибка получения истории")
 
+@router.get("/ledger")
+async def get_ledger_report(
+    user_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Отчёт сверки леджера.
+    Без user_id — последний отчёт фоновой сверки; с user_id — сверка цепочки этого пользователя сейчас.
+    """
+    try:
+        if user_id:
+            return await LedgerService.reconcile(db, user_id=user_id)
+        return LedgerService.last_report or {"status": "pending", "detail": "Сверка ещё не выполнялась"}
+    except Exception as e:
+        logger.error(f"Ошибка сверки леджера: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка сверки леджера")
+
+@router.get("/economy")
+async def get_economy_series(
+    hours: int = 24,
+    bucket: str = "hour",
+    transaction_type: Optional[str] = None,
+    source: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Эмиссия и стоки монет за последние `hours` часов по типу транзакции и источнику.
+    Считается из почасовых роллапов (плюс несвёрнутый хвост), без скана transactions.
+    """
+    if hours < 1 or hours > ECONOMY_SERIES_MAX_HOURS:
+        raise HTTPException(status_code=400, detail=f"hours должен быть от 1 до {ECONOMY_SERIES_MAX_HOURS}")
+    try:
+        return await EconomyRollupService.series(
+            db,
+            since=datetime.utcnow() - timedelta(hours=hours),
+            bucket=bucket,
+            transaction_type=transaction_type,
+            source=source,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Ошибка получения статистики экономики: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка получения статистики экономики")
+
+@router.get("/creatures/duplicates")
+async def get_creature_duplicates(
+    limit: int = 10,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Распределение похожих существ по всей популяции (MinHash-сигнатуры признаков).
+    Кандидаты берутся из индекса корзин LSH, похожесть подтверждается сигнатурами.
+    """
+    if limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="limit должен быть от 1 до 100")
+    try:
+        return await CreatureSimilarityService.duplicates_report(db, limit=limit)
+    except Exception as e:
+        logger.error(f"Ошибка отчёта о похожих существах: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка отчёта о похожих существах")
+
 @router.get("/debug")
 async def debug_info(db: AsyncSession = Depends(get_db)):
     """
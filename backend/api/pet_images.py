@@ -8,9 +8,8 @@ from pet_generator_alternative import pet_generator_alternative
 from typing import Optional
 import json
 from . import *  # noqa: F401
-from backend.generator.image_gen import HFImageGenerator
 from backend.generator.promt_gen import CreatureGenerator
-from prompt_store import load_prompts, generate_and_store_prompts
+from prompt_store import PromptStore
 from config.settings import GENERATION_DEFAULTS, get_file_settings
 from services.stages import StageLifecycleService
 import logging
@@ -66,45 +65,12 @@ async def get_pet_image(
         # 2) Нет изображения — генерируем по промпту из БД/хранилища и сохраняем в БД
         image_path: Optional[str] = None
         try:
-            from config.settings import (
-                get_generation_defaults,
-                get_quality_settings,
-                get_stage_negative_prompt,
-                get_realism_prompt,
-            )
-            generator = HFImageGenerator()
-
-            # Промпт: сначала пытаемся из БД
-            prompt_en = None
-            try:
-                prompt_en = StageLifecycleService._get_prompt_from_db_sync(user_id, pet_name, stage_key)
-            except Exception:
-                prompt_en = None
-            if not prompt_en:
-                stored = load_prompts(user_id, pet_name) or {}
-                prompt_en = ((stored.get("stage_prompts", {}) or {}).get(stage_key, {}) or {}).get("en")
+            # Промпт: из хранилища или восстановленный из сида
+            prompt_en = await PromptStore.stage_prompt_en(db, pet, stage_key)
 
             if prompt_en:
-                gen_defaults = get_generation_defaults()
-                preferred_model = gen_defaults["preferred_model"]
-                quality_settings = get_quality_settings(gen_defaults["quality_preset"])  # type: ignore
-                stage_negative = get_stage_negative_prompt(stage_key, include_global=True)
-                realism_prompt = get_realism_prompt(gen_defaults["realism_style"])  # type: ignore
-                enhanced_prompt = f"{prompt_en}, {realism_prompt}, masterpiece, best quality, highly detailed, ultra detailed, 8k resolution, professional photography, natural lighting, realistic creature, detailed anatomy, natural environment, realistic proportions, detailed features, natural colors, realistic shadows, depth of field, natural pose"
-
-                img = generator.generate_image(
-                    enhanced_prompt,
-                    model=preferred_model,
-                    negative_prompt=stage_negative,
-                    **quality_settings,
-                )
-                if img is not None:
-                    # Сохраняем в файловую систему временно, затем кладем в БД через persist
-                    out_dir = get_file_settings()["output_dir"]
-                    os.makedirs(out_dir, exist_ok=True)
-                    temp_path = os.path.join(out_dir, f"{user_id}_{pet_name}_{stage_key}_temp.png")
-                    img.save(temp_path)
-                    image_path = temp_path
+                # HF — в executor, чтобы генерация не блокировала event loop
+                image_path, _ = await StageLifecycleService.render_stage_png(user_id, pet_name, stage_key, prompt_en)
             # Если не удалось — SVG fallback
             if image_path is None:
                 image_path, _ = await pet_generator_alternative.generate_pet_image(
@@ -116,9 +82,9 @@ async def get_pet_image(
 
             # Persist в БД и повторная отдача
             await StageLifecycleService.persist_stage_artifacts(db, user_id, pet_name, stage_key, prompt_en, image_path)
+            await db.commit()
 
-            # Обновим pet и отдадим
-            await db.refresh(pet)
+            # Отдаём только что сохранённое изображение
             refreshed_b64 = {
                 'egg': pet.image_egg_b64,
                 'baby': pet.image_baby_b64,
@@ -2,7 +2,9 @@ from fastapi import APIRouter, HTTPException, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from db import get_db
-from models import Pet, PetState, PetLifeStatus, User, Wallet
+from models import Pet, PetState, PetLifeStatus, User
+from economy import EconomyService
+from prompt_store import PromptStore
 import logging
 from datetime import datetime, timedelta
 from config.settings import STAGE_TRANSITION_INTERVAL, STAGE_ORDER, HEALTH_MAX, INITIAL_COINS
@@ -54,11 +56,8 @@ async def get_summary(user_id: str, request: Request, db: AsyncSession = Depends
         if not pets:
             logger.info(f"Питомцы для пользователя {user_id} не найдены")
             
-            # Получаем кошелек пользователя
-            wallet_result = await db.execute(
-                select(Wallet).where(Wallet.user_id == user_id)
-            )
-            wallet = wallet_result.scalar_one_or_none()
+            # Получаем кошелек пользователя (из кэша чтений)
+            wallet = await EconomyService.get_wallet_snapshot(db, user_id)
             
             return {
                 "status": "no_pets",
@@ -82,11 +81,8 @@ async def get_summary(user_id: str, request: Request, db: AsyncSession = Depends
         if not alive_pets:
             logger.info(f"У пользователя {user_id} только мертвые питомцы")
             
-            # Получаем кошелек пользователя
-            wallet_result = await db.execute(
-                select(Wallet).where(Wallet.user_id == user_id)
-            )
-            wallet = wallet_result.scalar_one_or_none()
+            # Получаем кошелек пользователя (из кэша чтений)
+            wallet = await EconomyService.get_wallet_snapshot(db, user_id)
             
             return {
                 "status": "all_dead",
@@ -105,11 +101,8 @@ async def get_summary(user_id: str, request: Request, db: AsyncSession = Depends
         # Берем самого нового живого питомца
         active_pet = alive_pets[0]
         
-        # Получаем кошелек пользователя
-        wallet_result = await db.execute(
-            select(Wallet).where(Wallet.user_id == user_id)
-        )
-        wallet = wallet_result.scalar_one_or_none()
+        # Получаем кошелек пользователя (из кэша чтений)
+        wallet = await EconomyService.get_wallet_snapshot(db, user_id)
         
         # Рассчитываем время до следующей стадии
         time_to_next_stage = calculate_time_to_next_stage(
@@ -137,11 +130,7 @@ async def get_summary(user_id: str, request: Request, db: AsyncSession = Depends
         except Exception:
             creature = None
 
-        prompts = {
-            "egg_en": active_pet.prompt_egg_en,
-            "baby_en": active_pet.prompt_baby_en,
-            "adult_en": active_pet.prompt_adult_en,
-        }
+        prompts = (await PromptStore.stage_prompts_en(db, [active_pet]))[active_pet.id]
 
         return {
             "status": "success",
@@ -173,9 +162,11 @@ async def get_summary(user_id: str, request: Request, db: AsyncSession = Depends
         raise HTTPException(status_code=500, detail="Ошибка получения питомца")
 
 @router.get("/all")
-async def get_all_pets_summary(user_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+async def get_all_pets_summary(user_id: str, request: Request, details: bool = False, db: AsyncSession = Depends(get_db)):
     """
     Получает сводку всех питомцев пользователя из базы данных.
+    По умолчанию `creature` собирается из денормализованных колонок (без разбора JSON);
+    полное описание существа возвращается при `details=true`.
     """
     try:
         # Получаем всех питомцев пользователя
@@ -184,11 +175,8 @@ async def get_all_pets_summary(user_id: str, request: Request, db: AsyncSession
         )
         pets = result.scalars().all()
         
-        # Получаем кошелек пользователя
-        wallet_result = await db.execute(
-            select(Wallet).where(Wallet.user_id == user_id)
-        )
-        wallet = wallet_result.scalar_one_or_none()
+        # Получаем кошелек пользователя (из кэша чтений)
+        wallet = await EconomyService.get_wallet_snapshot(db, user_id)
         
         # Если питомцев нет
         if not pets:
@@ -214,6 +202,7 @@ async def get_all_pets_summary(user_id: str, request: Request, db: AsyncSession
         dead_pets = 0
         
         base_url = str(request.base_url).rstrip("/")
+        prompts_by_pet = await PromptStore.stage_prompts_en(db, pets)
         for pet in pets:
             status = pet.status.value
             if pet.status == PetLifeStatus.alive:
@@ -222,15 +211,13 @@ async def get_all_pets_summary(user_id: str, request: Request, db: AsyncSession
                 dead_pets += 1
                 
             # Расширенные данные для каждого питомца
-            try:
-                creature = json.loads(pet.creature_json) if pet.creature_json else None
-            except Exception:
-                creature = None
-            prompts = {
-                "egg_en": pet.prompt_egg_en,
-                "baby_en": pet.prompt_baby_en,
-                "adult_en": pet.prompt_adult_en,
-            }
+            creature = None if details else pet.creature_summary()
+            if creature is None:
+                try:
+                    creature = json.loads(pet.creature_json) if pet.creature_json else None
+                except Exception:
+                    creature = None
+            prompts = prompts_by_pet[pet.id]
 
             # Рассчитываем таймер перехода стадии для каждого питомца (0 для последней стадии и мёртвых)
             try:
@@ -85,6 +85,8 @@ async def update_user_profile(
             is_anonymous=request.is_anonymous,
             display_name=request.display_name
         )
+        if profile:
+            await db.commit()
         
         if not profile:
             # Попробуем отдать актуальный профиль, если апдейт не вернул данных (например, no-op)
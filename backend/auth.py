@@ -16,7 +16,7 @@ from typing import Optional
 
 logger = logging.getLogger(__name__)
 
-from config.settings import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from config.settings import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, ADMIN_USER_IDS
 
 # Простая система безопасности для MVP
 
@@ -88,6 +88,15 @@ async def require_user_with_pet(
         )
     return current_user
 
+async def require_admin(current_user: dict = Depends(get_current_user)):
+    """Требует, чтобы пользователь был в ADMIN_USER_IDS"""
+    if current_user["user_id"] not in ADMIN_USER_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав"
+        )
+    return current_user
+
 def create_user_token(user_id: str) -> str:
     """Создает токен для пользователя (для MVP)"""
     return AuthService.create_access_token(
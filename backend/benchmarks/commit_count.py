@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк числа commit на запрос для основных эндпоинтов.
+
+Поднимает приложение на временной SQLite-базе, выполняет запросы через TestClient
+и считает commit по событию движка. После перехода на единицу работы каждый
+изменяющий запрос должен фиксировать ровно один commit.
+
+Запуск: python backend/benchmarks/commit_count.py
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# База и кэш картинок — во временном каталоге, удаляется после прогона
+BENCH_DIR = tempfile.mkdtemp(prefix="telepets_bench_")
+DB_PATH = os.path.join(BENCH_DIR, "bench.db")
+IMAGES_DIR = os.path.join(BENCH_DIR, "pet_images")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+# Корень репозитория — для `import backend.main`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import logging
+
+logging.disable(logging.CRITICAL)
+
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import backend.main as main_module
+import db as db_module
+from auth import AuthService
+from config.settings import FILE_SETTINGS
+from models import Auction, Pet, User, Wallet
+from pet_generator_alternative import pet_generator_alternative
+
+db_module.engine.echo = False
+# /create пишет svg/json питомцев — не в cache/pet_images репозитория
+os.makedirs(IMAGES_DIR, exist_ok=True)
+FILE_SETTINGS["output_dir"] = IMAGES_DIR
+pet_generator_alternative.cache_dir = IMAGES_DIR
+
+_commits = 0
+
+
+@event.listens_for(db_module.engine.sync_engine, "commit")
+def _count_commit(conn):
+    global _commits
+    _commits += 1
+
+
+async def _seed() -> int:
+    await db_module.init_db()
+    async with db_module.AsyncSessionLocal() as s:
+        for user_id in ("seller", "bidder"):
+            s.add(User(user_id=user_id))
+            s.add(Wallet(user_id=user_id, coins=100000, coins_locked=0))
+        pet = Pet(user_id="seller", name="lot")
+        s.add(pet)
+        await s.flush()
+        auction = Auction(
+            pet_id=pet.id,
+            seller_user_id="seller",
+            start_price=10,
+            current_price=10,
+            end_time=datetime.utcnow() + timedelta(hours=1),
+        )
+        s.add(auction)
+        await s.commit()
+        return auction.id
+
+
+def _measure(client: TestClient, label: str, method: str, url: str, repeat: int = 5, **kwargs) -> None:
+    global _commits
+    counts = []
+    started = time.perf_counter()
+    status = None
+    for i in range(repeat):
+        before = _commits
+        response = client.request(method, url(i) if callable(url) else url, **kwargs)
+        status = response.status_code
+        counts.append(_commits - before)
+    elapsed = (time.perf_counter() - started) / repeat * 1000
+    print(f"{label:<28} status={status:<4} commits/req={max(counts)}  {elapsed:7.1f} ms/req")
+
+
+def main():
+    try:
+        _run()
+    finally:
+        shutil.rmtree(BENCH_DIR, ignore_errors=True)
+
+
+def _run():
+    auction_id = asyncio.run(_seed())
+    app = main_module.app
+    while not hasattr(app, "router") and hasattr(app, "app"):
+        app = app.app
+    client = TestClient(app)
+    token = AuthService.create_access_token({"sub": "bidder"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    print(f"База: {DB_PATH}")
+    _measure(client, "POST /auth/token", "POST", lambda i: f"/auth/token?user_id=bench{i}")
+    _measure(client, "POST /create", "POST", lambda i: f"/create?user_id=bench{i}&name=Pet{'abc'[i]}", repeat=3)
+    _measure(client, "POST /health_up", "POST", lambda i: f"/health_up?user_id=bench{i % 3}")
+    _measure(client, "GET /economy/wallet", "GET", lambda i: f"/economy/wallet/bench{i}")
+    _measure(
+        client,
+        "POST /market/.../bids",
+        "POST",
+        lambda i: f"/market/auctions/{auction_id}/bids?amount={100 + i * 10}",
+        headers=headers,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк генератора существ.
+
+Меряет пропускную способность «существо + стадийные промпты + JSON-описание»
+в двух режимах: новый CreatureGenerator() на каждое существо (как раньше делали
+prompt_store, StageLifecycleService и HFImageGenerator) и общий генератор процесса.
+Отдельно меряется стоимость самого конструктора и пакетная выборка generate_batch
+(только признаки, без промптов; NumPy — если установлен).
+
+Запуск: python backend/benchmarks/creature_generator.py [число_существ]
+"""
+
+import os
+import random
+import sys
+import time
+
+# Каталог backend — для `import generator.promt_gen` и `config.settings`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generator import promt_gen
+from generator.promt_gen import CreatureGenerator
+
+
+def _shared_generator() -> CreatureGenerator:
+    factory = getattr(promt_gen, "get_creature_generator", None)
+    return factory() if factory else CreatureGenerator()
+
+
+def _generate(generator: CreatureGenerator) -> None:
+    creature = generator.generate_creature()
+    generator.generate_stage_prompts(creature)
+    generator.generate_json_description(creature)
+
+
+def _measure(label: str, count: int, make_generator) -> None:
+    started = time.perf_counter()
+    for _ in range(count):
+        _generate(make_generator())
+    elapsed = time.perf_counter() - started
+    print(f"{label:<34} {count:>7} шт.  {elapsed:7.3f} s  {count / elapsed:9.0f} существ/с")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    random.seed(0)
+
+    started = time.perf_counter()
+    for _ in range(count):
+        CreatureGenerator()
+    elapsed = time.perf_counter() - started
+    print(f"{'CreatureGenerator()':<34} {count:>7} шт.  {elapsed:7.3f} s  {elapsed / count * 1e6:9.1f} мкс/шт")
+
+    _measure("новый генератор на каждое существо", count, CreatureGenerator)
+    shared = _shared_generator()
+    _measure("общий генератор", count, lambda: shared)
+
+    if hasattr(shared, "generate_batch"):
+        from generator.batch import NUMPY_AVAILABLE
+
+        batch_count = count * 10
+        started = time.perf_counter()
+        batch = shared.generate_batch(batch_count, seed=0)
+        elapsed = time.perf_counter() - started
+        label = f"generate_batch (numpy={NUMPY_AVAILABLE})"
+        print(f"{label:<34} {batch_count:>7} шт.  {elapsed:7.3f} s  {batch_count / elapsed:9.0f} существ/с"
+              f"  ({batch.nbytes / max(batch_count, 1):.0f} байт/шт)")
+
+
+if __name__ == "__main__":
+    main()
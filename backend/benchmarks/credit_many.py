@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк массового начисления монет.
+
+Сравнивает поштучный EconomyService.add_coins с пакетным credit_many на временной
+SQLite-базе и прогоняет админский CSV-эндпоинт /economy/admin/credit.
+Половина получателей — существующие кошельки, половина создаётся при начислении.
+
+Запуск: python backend/benchmarks/credit_many.py [число_пользователей]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="telepets_bench_"), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("ADMIN_USER_IDS", "bench_admin")
+
+# Корень репозитория — для `import backend.main`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import logging
+
+logging.disable(logging.CRITICAL)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, insert
+from sqlalchemy.future import select
+
+import backend.main as main_module
+import db as db_module
+from auth import AuthService
+from economy import EconomyService
+from models import Transaction, User, Wallet
+from services.ledger import LedgerService
+
+db_module.engine.echo = False
+
+LOOP_SAMPLE = 1000
+
+
+async def _seed(existing: int) -> None:
+    await db_module.init_db()
+    async with db_module.AsyncSessionLocal() as s:
+        await s.execute(insert(User), [{"user_id": f"u{i}", "is_anonymous": False} for i in range(existing)])
+        await s.execute(insert(Wallet), [
+            {"user_id": f"u{i}", "coins": 100, "coins_locked": 0, "total_earned": 0,
+             "total_spent": 0, "ledger_tail_count": 0}
+            for i in range(existing)
+        ])
+        await s.commit()
+
+
+async def _loop(users: int) -> float:
+    started = time.perf_counter()
+    async with db_module.session_scope() as s:
+        for i in range(users):
+            await EconomyService.add_coins(s, f"u{i}", 5, "Поштучно")
+    return time.perf_counter() - started
+
+
+async def _batch(users: int) -> float:
+    started = time.perf_counter()
+    async with db_module.session_scope() as s:
+        await EconomyService.credit_many(s, ((f"u{i}", 10, "Событие") for i in range(users)))
+    return time.perf_counter() - started
+
+
+async def _verify(users: int) -> None:
+    async with db_module.AsyncSessionLocal() as s:
+        wallets = (await s.execute(select(func.count(Wallet.id)))).scalar_one()
+        transactions = (await s.execute(select(func.count(Transaction.id)))).scalar_one()
+        report = await LedgerService.reconcile(s)
+    print(f"Кошельков: {wallets}, транзакций: {transactions}, расхождений в журнале: {report['mismatch_count']}")
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    asyncio.run(_seed(users // 2))
+    print(f"База: {DB_PATH}, получателей: {users}")
+
+    sample = min(LOOP_SAMPLE, users)
+    elapsed = asyncio.run(_loop(sample))
+    print(f"add_coins в цикле     {sample:>7} польз.  {elapsed:7.2f} s  (~{elapsed / sample * users:7.1f} s на {users})")
+
+    elapsed = asyncio.run(_batch(users))
+    print(f"credit_many           {users:>7} польз.  {elapsed:7.2f} s")
+
+    app = main_module.app
+    while not hasattr(app, "router") and hasattr(app, "app"):
+        app = app.app
+    client = TestClient(app)
+    token = AuthService.create_access_token({"sub": "bench_admin"})
+    body = "user_id,amount\n" + "".join(f"csv{i},7\n" for i in range(users))
+    started = time.perf_counter()
+    response = client.post(
+        "/economy/admin/credit?batch_id=bench",
+        content=body.encode("utf-8"),
+        headers={"Authorization": f"Bearer {token}", "Content-Type": "text/csv"},
+    )
+    elapsed = time.perf_counter() - started
+    print(f"POST /economy/admin/credit {users:>7} строк  {elapsed:7.2f} s  status={response.status_code}")
+
+    asyncio.run(_verify(users))
+
+
+if __name__ == "__main__":
+    main()
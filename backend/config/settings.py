@@ -79,6 +79,20 @@ TELEGRAM_MESSAGES = {
 # Начальные монеты для новых пользователей
 INITIAL_COINS = 100
 
+# Сколько user_id помнит процесс как уже заведённых (пропуск провижининга на /auth/token)
+KNOWN_USERS_CACHE_SIZE = 10000
+
+# Процессный кэш кошельков для чтений (summary, баланс, кнопка кошелька в боте).
+# Пути записи обновляют его значениями из своего UPDATE; TTL — страховка от записей в обход сервиса.
+WALLET_CACHE_SIZE = 10000
+WALLET_CACHE_TTL_SECONDS = 60
+# local — инвалидация только внутри процесса; postgres — LISTEN/NOTIFY между воркерами
+WALLET_CACHE_BUS = os.getenv("WALLET_CACHE_BUS", "local").strip().lower()
+WALLET_CACHE_PG_CHANNEL = "wallet_cache"
+
+# Процессный LRU промптов стадий по (pet_id, stage): и сохранённых, и восстановленных из сида
+PROMPT_CACHE_SIZE = 10000
+
 # Стоимость действий в монетах
 ACTION_COSTS = {
     'health_up': {
@@ -130,9 +144,47 @@ REWARD_LIMITS = {
     'pet_care': 10,          # 10 раз в день
     'stage_completion': 1,   # Раз за стадию
     'referral': 10,          # 10 приглашений
-    'achievement': 1         # Раз за достижение
+    'achievement': 1,        # Раз за достижение
+    'game': 20               # 20 наград за мини-игры в день
 }
 
+# Леджер: чекпоинт баланса и итогов по типам каждые N транзакций пользователя
+LEDGER_CHECKPOINT_EVERY = 100
+LEDGER_TASK_INTERVAL = 5 * 60              # сворачивание хвостов в чекпоинты
+LEDGER_RECONCILE_INTERVAL = 24 * 60 * 60   # полная сверка цепочки balance_before/balance_after
+LEDGER_RECONCILE_CHUNK = 1000              # транзакций за один запрос сверки
+LEDGER_STATEMENT_MAX_LIMIT = 500
+
+# Почасовые роллапы экономики (эмиссия и стоки по типу и источнику)
+ECONOMY_ROLLUP_INTERVAL = 60               # как часто агрегатор сворачивает новые транзакции
+ECONOMY_ROLLUP_LAG_SECONDS = 120           # моложе — ещё не сворачиваются; пишущая транзакция обязана закоммититься быстрее
+ECONOMY_ROLLUP_CHUNK = 5000                # транзакций за один проход агрегатора
+ECONOMY_SERIES_MAX_HOURS = 31 * 24         # максимальное окно GET /monitoring/economy
+
+# Холодный архив транзакций: в горячей таблице остаются последние месяцы,
+# более старые строки переезжают в сжатые сегменты transaction_archives
+TRANSACTIONS_HOT_MONTHS = 3                # текущий месяц и два предыдущих
+TRANSACTIONS_ARCHIVE_INTERVAL = 6 * 60 * 60
+TRANSACTIONS_ARCHIVE_CHUNK = 5000          # строк за одну транзакцию архиватора
+
+# Массовые начисления (события, компенсации): строк на один пакетный запрос к БД
+CREDIT_BATCH_CHUNK_SIZE = 500
+
+# Пул заранее сгенерированных существ: POST /create забирает готовую строку, фоновая задача
+# дозаполняет пул до верхней отметки, как только он опускается до нижней
+CREATURE_POOL_LOW_WATERMARK = 20
+CREATURE_POOL_HIGH_WATERMARK = 100
+CREATURE_POOL_CHUNK = 25                   # существ за одну транзакцию дозаполнения
+CREATURE_POOL_INTERVAL = 30                # как часто проверяется размер пула
+# Заранее рисовать и изображение яйца (HF): создание питомца перестаёт ждать генерацию картинки
+CREATURE_POOL_WITH_IMAGES = os.getenv("CREATURE_POOL_WITH_IMAGES", "false").strip().lower() in {"1", "true", "yes", "y"}
+
+# Похожие существа (MinHash по признакам): новое существо, похожее на одно из недавних,
+# перегенерируется с другим сидом
+CREATURE_DUPLICATE_THRESHOLD = 0.75        # оценка коэффициента Жаккара, с которой существа похожи
+CREATURE_RECENT_INDEX_SIZE = 5000          # сколько последних существ помнит индекс процесса
+CREATURE_DISTINCT_ATTEMPTS = 8             # сидов на одно существо, дальше берётся последнее
+
 # Настройки покупок
 PURCHASE_OPTIONS = {
     'coins_100': {'coins': 100, 'price_usd': 0.99},
@@ -162,6 +214,13 @@ MARKET_FEE_PERCENT = 5
 
 # Пагинация
 AUCTION_LIST_PAGE_SIZE = 20
+AUCTION_LIST_MAX_PAGE_SIZE = 100
+
+# Живой канал аукционов (WebSocket)
+# local — события только внутри процесса; postgres — LISTEN/NOTIFY между воркерами
+AUCTION_EVENTS_BUS = os.getenv("AUCTION_EVENTS_BUS", "local").strip().lower()
+AUCTION_EVENTS_PG_CHANNEL = "auction_events"
+AUCTION_EVENTS_QUEUE_SIZE = 100  # буфер событий на один сокет, старые вытесняются
 
 # Telegram Stars настройки
 TELEGRAM_STARS = {
@@ -170,13 +229,39 @@ TELEGRAM_STARS = {
     'min_stars_for_purchase': 1
 }
 
+# ===== ИДЕМПОТЕНТНОСТЬ ДЕНЕЖНЫХ ЗАПРОСОВ =====
+# Повтор запроса с тем же заголовком Idempotency-Key возвращает сохранённый ответ
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_PATHS = [
+    r"^/create/?$",
+    r"^/economy/purchase/[^/]+$",
+    r"^/economy/games/[^/]+/claim$",
+    r"^/economy/actions/[^/]+/(health_up|resurrect)$",
+    r"^/economy/rewards/[^/]+/daily_login$",
+    r"^/market/auctions/\d+/(bids|proxy_bids|buy_now)$",
+    r"^/economy/admin/credit$",
+]
+IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60     # сколько хранится ответ
+IDEMPOTENCY_PENDING_TIMEOUT = 60           # «зависшее» выполнение (упавший воркер) можно перехватить
+IDEMPOTENCY_HEARTBEAT_INTERVAL = 20        # продление pending-ключа, пока запрос выполняется (< PENDING_TIMEOUT)
+IDEMPOTENCY_WAIT_SECONDS = 10              # сколько дубль ждёт завершения первого запроса
+IDEMPOTENCY_MEMORY_SIZE = 1000             # ответы в памяти процесса (быстрый путь)
+IDEMPOTENCY_CLEANUP_INTERVAL = 60 * 60     # очистка просроченных ключей
+
 # ===== НАСТРОЙКИ БЕЗОПАСНОСТИ =====
 SECRET_KEY = os.getenv("SECRET_KEY", "telepets-secret-key-2024")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# user_id администраторов через запятую (служебные эндпоинты вроде массовых начислений)
+ADMIN_USER_IDS = {u.strip() for u in os.getenv("ADMIN_USER_IDS", "").split(",") if u.strip()}
 
 # ===== НАСТРОЙКИ БАЗЫ ДАННЫХ =====
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./telepets.db")
+# Таймауты PostgreSQL для соединений приложения (0 — без ограничения). Должны быть меньше
+# ECONOMY_ROLLUP_LAG_SECONDS: агрегатор роллапов не двигает водяной знак назад, и строка
+# транзакции, закоммиченная позже лага, в роллапы уже не попадёт
+DB_STATEMENT_TIMEOUT_SECONDS = int(os.getenv("DB_STATEMENT_TIMEOUT_SECONDS", "30"))
+DB_IDLE_IN_TRANSACTION_TIMEOUT_SECONDS = int(os.getenv("DB_IDLE_IN_TRANSACTION_TIMEOUT_SECONDS", "30"))
 
 # ===== НАСТРОЙКИ API =====
 API_HOST = os.getenv("API_HOST", "127.0.0.1")
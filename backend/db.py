@@ -1,11 +1,21 @@
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import event
+from contextlib import asynccontextmanager
 from models import Base
-from config.settings import DATABASE_URL
+from config.settings import (
+    DATABASE_URL,
+    DB_IDLE_IN_TRANSACTION_TIMEOUT_SECONDS,
+    DB_STATEMENT_TIMEOUT_SECONDS,
+)
+import asyncio
+import logging
 import ssl
 import certifi
 from urllib.parse import urlparse
 
+logger = logging.getLogger(__name__)
+
 # Преобразуем синхронные URL в асинхронные драйверы при необходимости
 if DATABASE_URL.startswith("sqlite://"):
     async_database_url = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://")
@@ -23,6 +33,14 @@ if async_database_url.startswith("postgresql+asyncpg://"):
     if is_external_host:
         ssl_context = ssl.create_default_context(cafile=certifi.where())
         connect_args = {"ssl": ssl_context}
+    # Ни одна транзакция приложения не должна висеть дольше лага роллапов экономики
+    server_settings = {}
+    if DB_STATEMENT_TIMEOUT_SECONDS > 0:
+        server_settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_SECONDS * 1000)
+    if DB_IDLE_IN_TRANSACTION_TIMEOUT_SECONDS > 0:
+        server_settings["idle_in_transaction_session_timeout"] = str(DB_IDLE_IN_TRANSACTION_TIMEOUT_SECONDS * 1000)
+    if server_settings:
+        connect_args["server_settings"] = server_settings
 
 engine = create_async_engine(
     async_database_url,
@@ -31,14 +49,96 @@ engine = create_async_engine(
     connect_args=connect_args,
 )
 
+if async_database_url.startswith("sqlite+aiosqlite://"):
+    # Драйвер sqlite сам решает, когда открывать транзакцию, и ломает SAVEPOINT.
+    # Отдаём управление SQLAlchemy: явный BEGIN в начале каждой транзакции.
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        # WAL: читатели не блокируют единственного писателя и наоборот
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _sqlite_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
 AsyncSessionLocal = sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
 
+# ===== Unit of work =====
+# Сервисы только делают flush; commit выполняет владелец сессии один раз:
+# эндпоинт в конце обработки или `session_scope()` в фоновых задачах и сокетах.
+# Частичный откат внутри единицы работы — через `db.begin_nested()` (SAVEPOINT).
+
+_AFTER_COMMIT_KEY = "after_commit_callbacks"
+
+
+def run_after_commit(db: AsyncSession, callback) -> None:
+    """Откладывает побочный эффект (уведомление, событие) до успешного commit.
+
+    callback — функция без аргументов, возвращающая корутину. При rollback отбрасывается.
+    """
+    db.sync_session.info.setdefault(_AFTER_COMMIT_KEY, []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit_callbacks(session) -> None:
+    if session.in_nested_transaction():
+        # after_commit приходит и на RELEASE SAVEPOINT — ждём commit корневой транзакции
+        return
+    callbacks = session.info.pop(_AFTER_COMMIT_KEY, [])
+    if not callbacks:
+        return
+    loop = asyncio.get_event_loop()
+    for callback in callbacks:
+        try:
+            loop.create_task(callback())
+        except Exception as e:
+            logger.warning(f"Ошибка запуска post-commit действия: {e}")
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_after_commit_callbacks(session, transaction) -> None:
+    # Корневая транзакция закончилась без commit (откат SAVEPOINT не в счёт)
+    if transaction.parent is None:
+        session.info.pop(_AFTER_COMMIT_KEY, None)
+
+
+def dialect_insert(db: AsyncSession, model):
+    """INSERT с поддержкой ON CONFLICT для PostgreSQL/SQLite; None для прочих диалектов."""
+    dialect = db.bind.dialect.name if db.bind is not None else ""
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert(model)
+
+
+@asynccontextmanager
+async def session_scope():
+    """Единица работы вне HTTP-запроса: один commit в конце, rollback при ошибке."""
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
 async def get_db():
+    """Сессия на запрос. Commit делает эндпоинт (один раз), незавершённая работа откатывается."""
     async with AsyncSessionLocal() as session:
-        yield session 
\ No newline at end of file
+        try:
+            yield session
+        finally:
+            if session.in_transaction():
+                await session.rollback() 
\ No newline at end of file
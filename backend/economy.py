@@ -5,61 +5,110 @@
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func
-from models import User, Wallet, Transaction, TransactionType, TransactionStatus, Achievement
+from sqlalchemy import bindparam, func, insert, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+from models import User, Wallet, Transaction, TransactionType, TransactionStatus, Achievement, RewardClaim
 from config.settings import (
     INITIAL_COINS, ACTION_COSTS, ACHIEVEMENT_REWARDS, 
-    ACTION_REWARDS, REWARD_LIMITS
+    ACTION_REWARDS, REWARD_LIMITS, KNOWN_USERS_CACHE_SIZE,
+    CREDIT_BATCH_CHUNK_SIZE,
 )
+from collections import OrderedDict
+from db import dialect_insert
+from services.ledger import LedgerService
+from services.transaction_archive import TransactionArchiveService
+from services.wallet_cache import WalletSnapshot, wallet_cache
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List
+from typing import Optional, Dict, Iterable, List, Tuple
 import json
 
 logger = logging.getLogger(__name__)
 
+# Направление изменения баланса по типу транзакции
+CREDIT_TRANSACTION_TYPES = {
+    TransactionType.purchase,
+    TransactionType.earning,
+    TransactionType.bonus,
+    TransactionType.refund,
+    TransactionType.market_sale,
+}
+DEBIT_TRANSACTION_TYPES = {
+    TransactionType.spending,
+    TransactionType.market_purchase,
+}
+# Что учитывается в total_earned (покупка монет и возвраты — не заработок)
+EARNED_TRANSACTION_TYPES = {
+    TransactionType.earning,
+    TransactionType.bonus,
+    TransactionType.market_sale,
+}
+
+
+class KnownUsersCache:
+    """
+    Процессный LRU-набор user_id, у которых точно есть пользователь и кошелёк.
+    Записи не удаляются: пользователи и кошельки в системе не удаляются.
+    """
+
+    def __init__(self, max_size: int = KNOWN_USERS_CACHE_SIZE):
+        self._max_size = max_size
+        self._items: "OrderedDict[str, None]" = OrderedDict()
+
+    def __contains__(self, user_id: str) -> bool:
+        if user_id in self._items:
+            self._items.move_to_end(user_id)
+            return True
+        return False
+
+    def add(self, user_id: str) -> None:
+        self._items[user_id] = None
+        self._items.move_to_end(user_id)
+        while len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+known_users = KnownUsersCache()
+
+
 class EconomyService:
     """Сервис для управления экономикой"""
     
     @staticmethod
-    async def create_user_wallet(db: AsyncSession, user_id: str, username: str = None, _retry: bool = False) -> Wallet:
-        """Создает кошелек для нового пользователя.
-        При первой ошибке (например, если таблицы ещё не созданы) выполнит init_db() и повторит попытку один раз.
+    async def provision_user(db: AsyncSession, user_id: str, username: str = None) -> bool:
+        """Гарантирует наличие пользователя и кошелька (без commit — его делает вызывающий).
+
+        Уже известный процессу пользователь не стоит ни одного запроса. Иначе —
+        INSERT ... ON CONFLICT DO NOTHING для пользователя и для кошелька; кошелёк
+        вставляется с RETURNING, и только новый кошелёк получает начальные монеты.
+        Ошибка пробрасывается без rollback: откатывать единицу работы решает вызывающий.
+        Возвращает True, если кошелёк создан этим вызовом.
         """
+        if user_id in known_users:
+            return False
         try:
-            # Проверяем, существует ли пользователь
-            user_result = await db.execute(
-                select(User).where(User.user_id == user_id)
-            )
-            user = user_result.scalar_one_or_none()
-            
-            if not user:
-                # Создаем пользователя с telegram_username
-                user = User(
-                    user_id=user_id,
-                    telegram_username=username,
-                    username=username  # Оставляем для обратной совместимости
-                )
-                db.add(user)
-                await db.commit()
-                await db.refresh(user)
-            
-            # Проверяем, есть ли уже кошелек
-            wallet_result = await db.execute(
-                select(Wallet).where(Wallet.user_id == user_id)
-            )
-            wallet = wallet_result.scalar_one_or_none()
-            
-            if not wallet:
-                # Создаем кошелек с начальными монетами
-                wallet = Wallet(
-                    user_id=user_id,
-                    coins=INITIAL_COINS
+            user_insert = dialect_insert(db, User)
+            if user_insert is None:
+                created = await EconomyService._provision_user_fallback(db, user_id, username)
+            else:
+                await db.execute(
+                    user_insert
+                    .values(user_id=user_id, telegram_username=username, username=username, is_anonymous=False)
+                    .on_conflict_do_nothing(index_elements=["user_id"])
                 )
-                db.add(wallet)
-                await db.commit()
-                await db.refresh(wallet)
-                
+                wallet_id = (await db.execute(
+                    dialect_insert(db, Wallet)
+                    .values(user_id=user_id, coins=INITIAL_COINS, coins_locked=0, total_earned=0, total_spent=0, ledger_tail_count=0)
+                    .on_conflict_do_nothing(index_elements=["user_id"])
+                    .returning(Wallet.id)
+                )).scalar_one_or_none()
+                created = wallet_id is not None
+
+            if created:
                 # Создаем транзакцию для начальных монет
                 await EconomyService.create_transaction(
                     db=db,
@@ -69,23 +118,46 @@ class EconomyService:
                     description="Начальные монеты",
                     transaction_data={"source": "new_user"}
                 )
-                
                 logger.info(f"Создан кошелек для пользователя {user_id} с {INITIAL_COINS} монетами")
-            
-            return wallet
-            
+
+            # Кэшируем только после commit: при откате пользователь может не сохраниться
+            from db import run_after_commit  # локальный импорт, чтобы избежать циклов
+
+            async def _remember():
+                known_users.add(user_id)
+
+            run_after_commit(db, _remember)
+            return created
+
         except Exception as e:
             logger.error(f"Ошибка создания кошелька для {user_id}: {e}")
-            if not _retry:
-                try:
-                    # Пытаемся инициализировать БД и повторить
-                    from db import init_db  # локальный импорт, чтобы избежать циклов
-                    await init_db()
-                    logger.info("Выполнен init_db() после ошибки — повторяю создание кошелька")
-                    return await EconomyService.create_user_wallet(db, user_id, username, _retry=True)
-                except Exception as e2:
-                    logger.error(f"Повторная ошибка после init_db для {user_id}: {e2}")
             raise
+
+    @staticmethod
+    async def _provision_user_fallback(db: AsyncSession, user_id: str, username: str = None) -> bool:
+        """Провижининг через select + insert для диалектов без ON CONFLICT."""
+        user = (await db.execute(select(User).where(User.user_id == user_id))).scalar_one_or_none()
+        if not user:
+            db.add(User(user_id=user_id, telegram_username=username, username=username))
+            await db.flush()
+        wallet = (await db.execute(select(Wallet).where(Wallet.user_id == user_id))).scalar_one_or_none()
+        if wallet:
+            return False
+        db.add(Wallet(user_id=user_id, coins=INITIAL_COINS))
+        await db.flush()
+        return True
+
+    @staticmethod
+    async def create_user_wallet(db: AsyncSession, user_id: str, username: str = None) -> Wallet:
+        """Возвращает кошелек пользователя, при необходимости создав пользователя и кошелек (без commit)."""
+        await EconomyService.provision_user(db, user_id, username)
+        wallet = await EconomyService.get_wallet(db, user_id)
+        if wallet is None:
+            # Кэш известных пользователей разошёлся с БД (например, база пересоздана)
+            known_users.clear()
+            await EconomyService.provision_user(db, user_id, username)
+            wallet = await EconomyService.get_wallet(db, user_id)
+        return wallet
     
     @staticmethod
     async def get_wallet(db: AsyncSession, user_id: str) -> Optional[Wallet]:
@@ -95,21 +167,129 @@ class EconomyService:
         )
         return result.scalar_one_or_none()
     
+    @staticmethod
+    async def get_wallet_snapshot(db: AsyncSession, user_id: str, create: bool = False) -> Optional[WalletSnapshot]:
+        """Кошелек для чтения: записи текущей транзакции, затем кэш процесса, затем БД.
+
+        create=True — завести пользователя и кошелек, если их нет (без commit).
+        """
+        if create:
+            await EconomyService.provision_user(db, user_id)
+        written, snapshot = wallet_cache.staged(db, user_id)
+        if snapshot is not None:
+            return snapshot
+        if not written:
+            snapshot = wallet_cache.get(user_id)
+            if snapshot is not None:
+                return snapshot
+
+        row = (await db.execute(
+            select(
+                Wallet.user_id, Wallet.coins, Wallet.coins_locked, Wallet.total_earned,
+                Wallet.total_spent, Wallet.created_at, Wallet.updated_at,
+            ).where(Wallet.user_id == user_id)
+        )).one_or_none()
+        if row is None:
+            if create:
+                # Кэш известных пользователей разошёлся с БД (например, база пересоздана)
+                known_users.clear()
+                await EconomyService.provision_user(db, user_id)
+                return await EconomyService.get_wallet_snapshot(db, user_id)
+            return None
+        snapshot = WalletSnapshot.from_row(row)
+        if not written:
+            wallet_cache.fill(snapshot, wallet_cache.transaction_token(db))
+        return snapshot
+
     @staticmethod
     async def get_balance(db: AsyncSession, user_id: str) -> int:
         """Получает баланс пользователя (включая замороженные монеты)."""
-        wallet = await EconomyService.get_wallet(db, user_id)
+        wallet = await EconomyService.get_wallet_snapshot(db, user_id)
         return wallet.coins if wallet else 0
 
     @staticmethod
     async def get_available_balance(db: AsyncSession, user_id: str) -> int:
         """Доступный баланс (с учётом замороженных монет)."""
-        wallet = await EconomyService.get_wallet(db, user_id)
-        if not wallet:
-            return 0
-        locked = getattr(wallet, 'coins_locked', 0) or 0
-        return max(0, wallet.coins - locked)
+        wallet = await EconomyService.get_wallet_snapshot(db, user_id)
+        return wallet.available if wallet else 0
     
+    @staticmethod
+    async def _apply_wallet_delta(
+        db: AsyncSession,
+        user_id: str,
+        delta: int = 0,
+        locked_delta: int = 0,
+        earned: int = 0,
+        spent: int = 0,
+        ledger_entries: int = 0,
+    ) -> Tuple[int, int]:
+        """
+        Атомарно меняет кошелек одним `UPDATE wallets ... RETURNING coins, coins_locked`.
+        Проверка средств — в том же WHERE, поэтому параллельные начисления и списания
+        не теряют обновлений. `ledger_entries` — сколько строк транзакций добавляется
+        (счётчик хвоста леджера). Возвращает (coins, coins_locked) после изменения.
+        """
+        conditions = [Wallet.user_id == user_id]
+        free_delta = delta - locked_delta
+        if free_delta < 0:
+            # Свободный остаток (без замороженных монет) не уходит в минус
+            conditions.append(Wallet.coins - Wallet.coins_locked >= -free_delta)
+        if delta < 0:
+            conditions.append(Wallet.coins >= -delta)
+        if locked_delta < 0:
+            conditions.append(Wallet.coins_locked >= -locked_delta)
+
+        values = {"updated_at": func.now()}
+        if delta:
+            values["coins"] = Wallet.coins + delta
+        if locked_delta:
+            values["coins_locked"] = Wallet.coins_locked + locked_delta
+        if earned:
+            values["total_earned"] = Wallet.total_earned + earned
+        if spent:
+            values["total_spent"] = Wallet.total_spent + spent
+        if ledger_entries:
+            values["ledger_tail_count"] = Wallet.ledger_tail_count + ledger_entries
+
+        result = await db.execute(
+            update(Wallet)
+            .where(*conditions)
+            .values(**values)
+            .returning(
+                Wallet.id, Wallet.user_id, Wallet.coins, Wallet.coins_locked,
+                Wallet.total_earned, Wallet.total_spent, Wallet.created_at, Wallet.updated_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        row = result.one_or_none()
+        if row is None:
+            wallet = await EconomyService.get_wallet(db, user_id)
+            if not wallet:
+                raise ValueError(f"Кошелек пользователя {user_id} не найден")
+            available = wallet.coins - (wallet.coins_locked or 0)
+            raise ValueError(f"Недостаточно монет. Требуется: {max(-free_delta, -delta)}, доступно: {available}")
+
+        # Кошелек в сессии получает значения из БД, а не из своей (возможно устаревшей) копии
+        wallet = db.identity_map.get(identity_key(Wallet, row.id))
+        if wallet is not None:
+            set_committed_value(wallet, "coins", row.coins)
+            set_committed_value(wallet, "coins_locked", row.coins_locked)
+            set_committed_value(wallet, "total_earned", row.total_earned)
+            set_committed_value(wallet, "total_spent", row.total_spent)
+            set_committed_value(wallet, "updated_at", row.updated_at)
+        # Кэш чтений получит это значение после commit, без повторного запроса
+        wallet_cache.stage(db, WalletSnapshot.from_row(row))
+        return row.coins, row.coins_locked
+
+    @staticmethod
+    async def adjust_locked_coins(db: AsyncSession, user_id: str, delta: int) -> int:
+        """Замораживает (delta > 0) или размораживает (delta < 0) монеты под холды. Без commit."""
+        if delta == 0:
+            wallet = await EconomyService.get_wallet(db, user_id)
+            return wallet.coins_locked if wallet else 0
+        _, locked = await EconomyService._apply_wallet_delta(db, user_id, locked_delta=delta)
+        return locked
+
     @staticmethod
     async def create_transaction(
         db: AsyncSession,
@@ -117,43 +297,45 @@ class EconomyService:
         transaction_type: TransactionType,
         amount: int,
         description: str,
-        transaction_data: Dict = None
+        transaction_data: Dict = None,
+        release_locked: int = 0,
     ) -> Transaction:
-        """Создает транзакцию"""
+        """Создает транзакцию.
+
+        Баланс меняется атомарно в SQL, `balance_after` берется из RETURNING.
+        `release_locked` одновременно снимает заморозку (захват холда при покупке на рынке).
+        """
         try:
-            wallet = await EconomyService.get_wallet(db, user_id)
-            if not wallet:
-                raise ValueError(f"Кошелек пользователя {user_id} не найден")
-            
-            balance_before = wallet.coins
-            
-            # Обновляем баланс
-            if transaction_type in [TransactionType.purchase, TransactionType.earning, TransactionType.bonus, TransactionType.refund]:
-                wallet.coins += amount
-                if transaction_type in [TransactionType.earning, TransactionType.bonus]:
-                    wallet.total_earned += amount
-            elif transaction_type == TransactionType.spending:
-                if wallet.coins < amount:
-                    raise ValueError(f"Недостаточно монет. Требуется: {amount}, доступно: {wallet.coins}")
-                wallet.coins -= amount
-                wallet.total_spent += amount
-            
-            balance_after = wallet.coins
-            
+            if transaction_type in CREDIT_TRANSACTION_TYPES:
+                delta = amount
+            elif transaction_type in DEBIT_TRANSACTION_TYPES:
+                delta = -amount
+            else:
+                delta = 0
+
+            balance_after, _ = await EconomyService._apply_wallet_delta(
+                db,
+                user_id,
+                delta=delta,
+                locked_delta=-release_locked,
+                earned=amount if transaction_type in EARNED_TRANSACTION_TYPES else 0,
+                spent=amount if transaction_type in DEBIT_TRANSACTION_TYPES else 0,
+                ledger_entries=1,
+            )
+
             # Создаем транзакцию
             transaction = Transaction(
                 user_id=user_id,
                 transaction_type=transaction_type,
                 amount=amount,
-                balance_before=balance_before,
+                balance_before=balance_after - delta,
                 balance_after=balance_after,
                 description=description,
                 transaction_data=json.dumps(transaction_data) if transaction_data else None
             )
             
+            # Строка транзакции уходит в БД вместе с остальной единицей работы при commit
             db.add(transaction)
-            await db.commit()
-            await db.refresh(transaction)
             
             logger.info(f"Транзакция создана: {user_id} - {transaction_type.value} {amount} монет")
             return transaction
@@ -213,11 +395,206 @@ class EconomyService:
             logger.error(f"Ошибка добавления монет: {e}")
             return False
     
+    @staticmethod
+    async def credit_many(
+        db: AsyncSession,
+        entries: Iterable[Tuple[str, int, str]],
+        transaction_type: TransactionType = TransactionType.earning,
+        transaction_data: Dict = None,
+        chunk_size: int = CREDIT_BATCH_CHUNK_SIZE,
+    ) -> Dict[str, int]:
+        """Массовое начисление [(user_id, amount, reason), ...] (без commit — одна транзакция у вызывающего).
+
+        На пакет из chunk_size строк: upsert пользователей и кошельков (новым — начальные монеты),
+        executemany-UPDATE кошельков по user_id и одна пакетная вставка транзакций.
+        Цепочка balance_before/balance_after сохраняется и при повторах user_id в пакете.
+        Транзакция вызывающего должна закоммититься быстрее ECONOMY_ROLLUP_LAG_SECONDS, иначе
+        её строки выпадут из роллапов экономики: большие выплаты коммитят каждый пакет отдельно.
+        """
+        if transaction_type not in CREDIT_TRANSACTION_TYPES:
+            raise ValueError(f"Тип {transaction_type.value} не является начислением")
+        summary = {"entries": 0, "total_amount": 0, "new_wallets": 0}
+        chunk: List[Tuple[str, int, str]] = []
+        for entry in entries:
+            chunk.append(entry)
+            if len(chunk) >= chunk_size:
+                await EconomyService._credit_chunk(db, chunk, transaction_type, transaction_data, summary)
+                chunk = []
+        if chunk:
+            await EconomyService._credit_chunk(db, chunk, transaction_type, transaction_data, summary)
+        return summary
+
+    @staticmethod
+    async def _credit_chunk(
+        db: AsyncSession,
+        chunk: List[Tuple[str, int, str]],
+        transaction_type: TransactionType,
+        transaction_data: Optional[Dict],
+        summary: Dict[str, int],
+    ) -> None:
+        for user_id, amount, _ in chunk:
+            if not isinstance(amount, int) or amount <= 0:
+                raise ValueError(f"Некорректная сумма начисления для {user_id}: {amount}")
+        user_ids = list(dict.fromkeys(user_id for user_id, _, _ in chunk))
+
+        if dialect_insert(db, User) is None:
+            new_wallets = {u for u in user_ids if await EconomyService.provision_user(db, u)}
+            # Начальные монеты уже проведены provision_user
+            starting = set()
+        else:
+            # executemany по таблицам: один скомпилированный запрос на любой размер пакета
+            await db.execute(
+                dialect_insert(db, User.__table__).on_conflict_do_nothing(index_elements=["user_id"]),
+                [{"user_id": u, "is_anonymous": False} for u in user_ids],
+            )
+            new_wallets = set((await db.execute(
+                dialect_insert(db, Wallet.__table__)
+                .on_conflict_do_nothing(index_elements=["user_id"])
+                .returning(Wallet.__table__.c.user_id),
+                [
+                    {"user_id": u, "coins": INITIAL_COINS, "coins_locked": 0, "total_earned": 0,
+                     "total_spent": 0, "ledger_tail_count": 0}
+                    for u in user_ids
+                ],
+            )).scalars().all())
+            starting = new_wallets
+
+        # Проводки по пользователям в исходном порядке; новым кошелькам — сначала начальные монеты
+        plan: Dict[str, List[Tuple[TransactionType, int, str, Optional[Dict]]]] = {u: [] for u in user_ids}
+        for user_id in starting:
+            plan[user_id].append((TransactionType.bonus, INITIAL_COINS, "Начальные монеты", {"source": "new_user"}))
+        for user_id, amount, reason in chunk:
+            plan[user_id].append((transaction_type, amount, reason, transaction_data))
+
+        deltas = {u: sum(p[1] for p in items) for u, items in plan.items()}
+        earned = {u: sum(p[1] for p in items if p[0] in EARNED_TRANSACTION_TYPES) for u, items in plan.items()}
+
+        # Одно executemany-обновление кошельков; строки остаются заблокированы до конца транзакции,
+        # поэтому балансы, прочитанные следом, — ровно результат наших начислений
+        wallets = Wallet.__table__
+        await db.execute(
+            update(wallets)
+            .where(wallets.c.user_id == bindparam("b_user_id"))
+            .values(
+                coins=wallets.c.coins + bindparam("b_delta"),
+                total_earned=wallets.c.total_earned + bindparam("b_earned"),
+                ledger_tail_count=wallets.c.ledger_tail_count + bindparam("b_count"),
+                updated_at=func.now(),
+            ),
+            [
+                {"b_user_id": u, "b_delta": deltas[u], "b_earned": earned[u], "b_count": len(plan[u])}
+                for u in user_ids
+            ],
+        )
+        rows = (await db.execute(
+            select(
+                Wallet.id, Wallet.user_id, Wallet.coins, Wallet.coins_locked, Wallet.total_earned,
+                Wallet.total_spent, Wallet.ledger_tail_count, Wallet.created_at, Wallet.updated_at,
+            )
+            .where(Wallet.user_id.in_(user_ids))
+        )).all()
+        balances = {}
+        for row in rows:
+            balances[row.user_id] = row.coins
+            wallet = db.identity_map.get(identity_key(Wallet, row.id))
+            if wallet is not None:
+                set_committed_value(wallet, "coins", row.coins)
+                set_committed_value(wallet, "total_earned", row.total_earned)
+                set_committed_value(wallet, "ledger_tail_count", row.ledger_tail_count)
+                set_committed_value(wallet, "updated_at", row.updated_at)
+            wallet_cache.stage(db, WalletSnapshot.from_row(row))
+        missing = set(user_ids) - set(balances)
+        if missing:
+            raise ValueError(f"Кошельки не найдены: {', '.join(sorted(missing)[:5])}")
+
+        transactions = []
+        for user_id, items in plan.items():
+            running = balances[user_id] - deltas[user_id]
+            for ttype, amount, description, data in items:
+                transactions.append({
+                    "user_id": user_id,
+                    "transaction_type": ttype,
+                    "amount": amount,
+                    "balance_before": running,
+                    "balance_after": running + amount,
+                    "description": description,
+                    "status": TransactionStatus.completed,
+                    "transaction_data": json.dumps(data) if data else None,
+                })
+                running += amount
+        # Core-вставка по таблице — один executemany без возврата ключей в ORM
+        await db.execute(insert(Transaction.__table__), transactions)
+
+        summary["entries"] += len(chunk)
+        summary["total_amount"] += sum(amount for _, amount, _ in chunk)
+        summary["new_wallets"] += len(new_wallets)
+
+    @staticmethod
+    def reward_period_key(now: Optional[datetime] = None) -> str:
+        """Ключ суточного периода наград (дата UTC)"""
+        return (now or datetime.utcnow()).date().isoformat()
+
+    @staticmethod
+    async def claim_reward(
+        db: AsyncSession,
+        user_id: str,
+        reward_type: str,
+        period_key: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> bool:
+        """Резервирует одно получение награды в пределах лимита периода (без commit).
+
+        Один upsert по уникальному ключу (user_id, reward_type, period_key):
+        счётчик растёт только пока он меньше лимита, поэтому параллельные запросы
+        не превысят REWARD_LIMITS. Возвращает False, если лимит исчерпан.
+        Резерв откатывается вместе с транзакцией, если начисление не состоялось.
+        """
+        limit = REWARD_LIMITS.get(reward_type, 1) if limit is None else limit
+        period_key = period_key or EconomyService.reward_period_key()
+        if limit <= 0:
+            return False
+        # Строка счётчика ссылается на пользователя
+        await EconomyService.provision_user(db, user_id)
+
+        claim_insert = dialect_insert(db, RewardClaim)
+        if claim_insert is not None:
+            claimed = (await db.execute(
+                claim_insert
+                .values(user_id=user_id, reward_type=reward_type, period_key=period_key, claims_count=1)
+                .on_conflict_do_update(
+                    index_elements=["user_id", "reward_type", "period_key"],
+                    set_={"claims_count": RewardClaim.claims_count + 1, "updated_at": func.now()},
+                    where=RewardClaim.claims_count < limit,
+                )
+                .returning(RewardClaim.claims_count)
+            )).scalar_one_or_none()
+            return claimed is not None
+
+        claim = (await db.execute(
+            select(RewardClaim)
+            .where(
+                RewardClaim.user_id == user_id,
+                RewardClaim.reward_type == reward_type,
+                RewardClaim.period_key == period_key,
+            )
+            .with_for_update()
+        )).scalar_one_or_none()
+        if claim is None:
+            db.add(RewardClaim(user_id=user_id, reward_type=reward_type, period_key=period_key, claims_count=1))
+            await db.flush()
+            return True
+        if claim.claims_count >= limit:
+            return False
+        claim.claims_count += 1
+        await db.flush()
+        return True
+
     @staticmethod
     async def can_afford_action(db: AsyncSession, user_id: str, action: str, stage: str = None) -> bool:
         """Проверяет, может ли пользователь позволить себе действие"""
         try:
-            wallet = await EconomyService.get_wallet(db, user_id)
+            # Предварительная проверка по кэшу чтений; окончательная — атомарно в UPDATE списания
+            wallet = await EconomyService.get_wallet_snapshot(db, user_id)
             if not wallet:
                 return False
             
@@ -226,7 +603,8 @@ class EconomyService:
             else:
                 cost = ACTION_COSTS.get(action, 0)
             
-            return wallet.coins >= cost
+            # Замороженные под ставки монеты тратить нельзя
+            return wallet.coins - (wallet.coins_locked or 0) >= cost
             
         except Exception as e:
             logger.error(f"Ошибка проверки возможности действия: {e}")
@@ -245,14 +623,19 @@ class EconomyService:
         user_id: str,
         limit: int = 50
     ) -> List[Transaction]:
-        """Получает историю транзакций пользователя"""
+        """Получает историю транзакций пользователя (если горячих строк не хватило — дочитывает архив)"""
         result = await db.execute(
             select(Transaction)
             .where(Transaction.user_id == user_id)
             .order_by(Transaction.created_at.desc())
             .limit(limit)
         )
-        return result.scalars().all()
+        history = list(result.scalars().all())
+        if len(history) < limit and await TransactionArchiveService.archived_upto(db):
+            history.extend(await TransactionArchiveService.rows(
+                db, user_id, newest_first=True, limit=limit - len(history)
+            ))
+        return history
     
     @staticmethod
     async def get_user_stats(db: AsyncSession, user_id: str) -> Dict:
@@ -262,23 +645,9 @@ class EconomyService:
             if not wallet:
                 return {}
             
-            # Статистика транзакций
-            transactions_result = await db.execute(
-                select(
-                    Transaction.transaction_type,
-                    func.sum(Transaction.amount).label('total_amount'),
-                    func.count(Transaction.id).label('count')
-                )
-                .where(Transaction.user_id == user_id)
-                .group_by(Transaction.transaction_type)
-            )
-            
-            transaction_stats = {}
-            for row in transactions_result:
-                transaction_stats[row.transaction_type.value] = {
-                    'total_amount': row.total_amount,
-                    'count': row.count
-                }
+            # Статистика транзакций: последний чекпоинт леджера + короткий хвост
+            ledger_stats = await LedgerService.get_stats(db, user_id)
+            transaction_stats = ledger_stats['transaction_stats']
             
             return {
                 'current_balance': wallet.coins,
@@ -315,17 +684,16 @@ class EconomyService:
             if existing:
                 return False  # Достижение уже получено
             
-            # Создаем достижение
-            achievement = Achievement(
-                user_id=user_id,
-                achievement_type=achievement_type,
-                title=title,
-                description=description,
-                coins_reward=coins_reward
-            )
-            db.add(achievement)
-            await db.commit()
-            await db.refresh(achievement)
+            # Создаем достижение в точке сохранения: сбой откатит только его, не всю единицу работы
+            async with db.begin_nested():
+                achievement = Achievement(
+                    user_id=user_id,
+                    achievement_type=achievement_type,
+                    title=title,
+                    description=description,
+                    coins_reward=coins_reward
+                )
+                db.add(achievement)
             
             # Выдаем награду
             await EconomyService.add_coins(
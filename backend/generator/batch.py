@@ -0,0 +1,632 @@
+"""
+Пакетная генерация существ: выборки на сотни тысяч особей для пулов, тестов и аналитики.
+
+Справочники генератора индексируются целыми числами (BatchLayout), и все случайные выборы
+для n существ делаются разом: индексные массивы NumPy поверх таблиц «среда -> варианты»,
+без объектов и строк. Ограничения те же, что у CreatureGenerator (ConstraintSolver):
+у каждой строки своя маска запрещённых тегов, кандидат слота допустим, если его маска с ней
+не пересекается, выбор — равномерно среди допустимых (без повторных бросков); носители
+обязательных признаков берутся из скомпилированных планов контекста.
+
+Результат — CreatureBatch: по столбцу int16 на признак (примерно 46 байт на существо,
+-1 — пустой слот). Существо и промпты собираются лениво, по запросу.
+
+NumPy объявлен в requirements.txt. Без него (или при числе тегов больше MAX_NUMPY_TAGS)
+пакет заполняется построчно на random.Random(seed) — на порядок медленнее, об этом
+пишется предупреждение в лог. Выборка воспроизводима по seed только в пределах одного
+бэкенда (CreatureBatch.backend): тот же seed на «numpy» и «python» даёт разные пакеты.
+"""
+
+import csv
+import logging
+import random
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, TextIO, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+try:
+    from .constraints import CARRIER_SLOTS, ConstraintSolver
+    from .promt_gen import (
+        CONSTRAINTS, TABLES, SEED_BITS,
+        CreatureCharacteristics, CreatureGenerator, CreatureTables, CreatureType, Habitat, Size,
+    )
+except ImportError:
+    # Запуск модуля как скрипта (python backend/generator/batch.py)
+    from constraints import CARRIER_SLOTS, ConstraintSolver  # type: ignore
+    from promt_gen import (  # type: ignore
+        CONSTRAINTS, TABLES, SEED_BITS,
+        CreatureCharacteristics, CreatureGenerator, CreatureTables, CreatureType, Habitat, Size,
+    )
+
+logger = logging.getLogger(__name__)
+
+# Вероятности из CreatureGenerator: хвост, второй базовый цвет, особый цветовой эффект
+TAIL_PROBABILITY = 0.7
+SECOND_COLOR_PROBABILITY = 0.5
+COLOR_EFFECT_PROBABILITY = 0.3
+MAX_ADAPTATIONS = 2
+EMPTY = -1
+# Маски тегов в NumPy — int64; при большем числе тегов работает построчный сэмплер
+MAX_NUMPY_TAGS = 62
+
+
+def _padded(rows: Sequence[Sequence[int]]) -> Tuple[Tuple[Tuple[int, ...], ...], Tuple[int, ...]]:
+    """Таблица строк разной длины -> (строки, дополненные EMPTY до общей ширины; длины строк)"""
+    width = max((len(row) for row in rows), default=0) or 1
+    return (
+        tuple(tuple(row) + (EMPTY,) * (width - len(row)) for row in rows),
+        tuple(len(row) for row in rows),
+    )
+
+
+@dataclass(frozen=True)
+class BatchLayout:
+    """Целочисленная раскладка справочников: словари признаков и таблицы «среда/размер -> индексы»"""
+    tables: CreatureTables
+    habitats: Tuple[Habitat, ...]
+    creature_types: Tuple[CreatureType, ...]
+    sizes: Tuple[Size, ...]
+    # Словари столбцов: индекс в столбце -> значение
+    surfaces: Tuple[str, ...]
+    eyes: Tuple[str, ...]
+    mouths: Tuple[str, ...]
+    head_appendages: Tuple[str, ...]
+    limbs: Tuple[str, ...]
+    torsos: Tuple[str, ...]
+    tails: Tuple[str, ...]
+    adaptations: Tuple[str, ...]
+    abilities: Tuple[str, ...]
+    colors: Tuple[str, ...]
+    behavior_traits: Tuple[str, ...]
+    # По среде: допустимые типы, покрытия и адаптации (индексы словарей, дополнены EMPTY)
+    types_by_habitat: Tuple[Tuple[int, ...], ...]
+    types_len: Tuple[int, ...]
+    surfaces_by_habitat: Tuple[Tuple[int, ...], ...]
+    surfaces_len: Tuple[int, ...]
+    adaptations_by_habitat: Tuple[Tuple[int, ...], ...]
+    adaptations_len: Tuple[int, ...]
+    # Способности: категории — непрерывные отрезки словаря
+    ability_offsets: Tuple[int, ...]
+    ability_lengths: Tuple[int, ...]
+    ability_counts: Tuple[int, ...]  # по размеру
+    # Окраска: схемы — непрерывные отрезки словаря цветов, эффекты — хвост словаря
+    scheme_offsets: Tuple[int, ...]
+    scheme_lengths: Tuple[int, ...]
+    scheme_by_habitat: Tuple[int, ...]  # EMPTY — схема выбирается случайно
+    effect_offset: int
+    effect_count: int
+    trait_counts: Tuple[int, ...]  # по размеру
+    # Ограничения: маски тегов словарей и исключаемые ими теги (обычные, для HYBRID)
+    tag_count: int
+    tag_masks: Mapping[str, Tuple[int, ...]]
+    tag_blocks: Mapping[str, Tuple[Tuple[int, ...], Tuple[int, ...]]]
+    # Контексты (среда, размер, тип) -> номер; по номеру — гибрид ли, планы носителей
+    context_index: Tuple[Tuple[Tuple[int, ...], ...], ...]
+    context_hybrid: Tuple[bool, ...]
+    context_plans: Tuple[int, ...]
+    plan_banned: Tuple[Tuple[int, ...], ...]
+    plan_forced: Mapping[str, Tuple[Tuple[int, ...], ...]]  # слот -> (контекст, план) -> индекс словаря
+
+    @property
+    def widths(self) -> Dict[str, int]:
+        """Число слотов на существо по столбцам"""
+        return {
+            "habitat": 1, "creature_type": 1, "size": 1, "surface": 1,
+            "eyes": 1, "mouth": 1, "head_appendage": 1,
+            "limbs": 1, "torso": 1, "tail": 1,
+            "adaptations": min(MAX_ADAPTATIONS, max(self.adaptations_len, default=0)) or 1,
+            "abilities": max(self.ability_counts),
+            "colors": 3,
+            "behavior_traits": max(self.trait_counts),
+        }
+
+    def vocabulary(self, column: str) -> Sequence[Any]:
+        """Словарь столбца: значение слота -> признак"""
+        return {
+            "habitat": self.habitats, "creature_type": self.creature_types, "size": self.sizes,
+            "surface": self.surfaces, "eyes": self.eyes, "mouth": self.mouths,
+            "head_appendage": self.head_appendages, "limbs": self.limbs, "torso": self.torsos,
+            "tail": self.tails, "adaptations": self.adaptations, "abilities": self.abilities,
+            "colors": self.colors, "behavior_traits": self.behavior_traits,
+        }[column]
+
+
+def compile_layout(tables: CreatureTables, solver: Optional[ConstraintSolver] = None) -> BatchLayout:
+    """Индексирует справочники генератора и ограничения для пакетной выборки"""
+    solver = solver or (CONSTRAINTS if tables is TABLES else ConstraintSolver(tables))
+    habitats = tables.habitats
+    creature_types = tuple(CreatureType)
+    type_index = {ctype: i for i, ctype in enumerate(creature_types)}
+
+    surfaces: List[str] = []
+    surface_rows = []
+    for habitat in habitats:
+        row = []
+        for surface in tables.habitat_data[habitat]["surfaces"]:
+            row.append(len(surfaces))
+            surfaces.append(surface)
+        surface_rows.append(row)
+
+    adaptations: List[str] = []
+    adaptation_rows = []
+    for habitat in habitats:
+        row = []
+        for item in tables.environmental_adaptations.get(habitat, ()):
+            row.append(len(adaptations))
+            adaptations.append(item)
+        adaptation_rows.append(row)
+
+    abilities: List[str] = []
+    ability_offsets, ability_lengths = [], []
+    for category in tables.special_ability_categories:
+        ability_offsets.append(len(abilities))
+        ability_lengths.append(len(tables.special_abilities[category]))
+        abilities.extend(tables.special_abilities[category])
+
+    colors: List[str] = []
+    scheme_offsets, scheme_lengths = [], []
+    for scheme in tables.coloration_scheme_names:
+        scheme_offsets.append(len(colors))
+        scheme_lengths.append(len(tables.coloration_schemes[scheme]))
+        colors.extend(tables.coloration_schemes[scheme])
+    effect_offset = len(colors)
+    colors.extend(tables.color_effects)
+    scheme_index = {scheme: i for i, scheme in enumerate(tables.coloration_scheme_names)}
+
+    types_by_habitat, types_len = _padded([
+        [type_index[ctype] for ctype in tables.habitat_data[habitat]["types"]] for habitat in habitats
+    ])
+    surfaces_by_habitat, surfaces_len = _padded(surface_rows)
+    adaptations_by_habitat, adaptations_len = _padded(adaptation_rows)
+
+    vocabularies = {
+        "surface": surfaces, "eyes": tables.head_variants["eyes"], "mouth": tables.head_variants["mouths"],
+        "head_appendage": tables.head_variants["appendages"], "limbs": tables.body_features["limbs"],
+        "torso": tables.body_features["torso"], "tail": tables.body_features["tail"],
+        "adaptations": adaptations, "abilities": abilities, "colors": colors,
+    }
+    tag_masks = {column: tuple(solver.mask(phrase) for phrase in vocabulary)
+                 for column, vocabulary in vocabularies.items()}
+    tag_blocks = {
+        column: tuple(tuple(solver.blocks_mask(mask, hybrid) for mask in masks) for hybrid in (False, True))
+        for column, masks in tag_masks.items()
+    }
+
+    # Планы носителей: фраза слота -> индекс словаря (покрытия и адаптации — в строке своей среды)
+    def forced_index(habitat_row: int, slot: str, phrase: str) -> int:
+        if slot == "surface":
+            return next(i for i in surface_rows[habitat_row] if surfaces[i] == phrase)
+        if slot == "adaptations":
+            return next(i for i in adaptation_rows[habitat_row] if adaptations[i] == phrase)
+        return list(vocabularies[slot]).index(phrase)
+
+    context_index = [[[EMPTY] * len(creature_types) for _ in tables.sizes] for _ in habitats]
+    context_hybrid, context_plans, plan_banned = [], [], []
+    plan_forced: Dict[str, List[List[int]]] = {slot: [] for slot in CARRIER_SLOTS}
+    for (habitat, size, creature_type), context in solver.contexts().items():
+        h = habitats.index(habitat)
+        context_index[h][tables.sizes.index(size)][type_index[creature_type]] = len(context_hybrid)
+        context_hybrid.append(context.hybrid)
+        context_plans.append(len(context.plans))
+        plan_banned.append(list(context.plan_banned))
+        for slot in CARRIER_SLOTS:
+            plan_forced[slot].append([
+                forced_index(h, slot, plan[slot]) if slot in plan else EMPTY for plan in context.plans
+            ])
+
+    return BatchLayout(
+        tables=tables,
+        habitats=habitats,
+        creature_types=creature_types,
+        sizes=tables.sizes,
+        surfaces=tuple(surfaces),
+        eyes=tables.head_variants["eyes"],
+        mouths=tables.head_variants["mouths"],
+        head_appendages=tables.head_variants["appendages"],
+        limbs=tables.body_features["limbs"],
+        torsos=tables.body_features["torso"],
+        tails=tables.body_features["tail"],
+        adaptations=tuple(adaptations),
+        abilities=tuple(abilities),
+        colors=tuple(colors),
+        behavior_traits=tables.behavior_traits,
+        types_by_habitat=types_by_habitat,
+        types_len=types_len,
+        surfaces_by_habitat=surfaces_by_habitat,
+        surfaces_len=surfaces_len,
+        adaptations_by_habitat=adaptations_by_habitat,
+        adaptations_len=adaptations_len,
+        ability_offsets=tuple(ability_offsets),
+        ability_lengths=tuple(ability_lengths),
+        ability_counts=tuple(tables.ability_counts.get(size, 2) for size in tables.sizes),
+        scheme_offsets=tuple(scheme_offsets),
+        scheme_lengths=tuple(scheme_lengths),
+        scheme_by_habitat=tuple(
+            scheme_index[tables.forced_color_schemes[habitat]] if habitat in tables.forced_color_schemes else EMPTY
+            for habitat in habitats
+        ),
+        effect_offset=effect_offset,
+        effect_count=len(tables.color_effects),
+        trait_counts=tuple(tables.trait_counts.get(size, 2) for size in tables.sizes),
+        tag_count=len(solver.tags),
+        tag_masks=MappingProxyType(tag_masks),
+        tag_blocks=MappingProxyType(tag_blocks),
+        context_index=tuple(tuple(tuple(row) for row in by_size) for by_size in context_index),
+        context_hybrid=tuple(context_hybrid),
+        context_plans=tuple(context_plans),
+        plan_banned=_padded(plan_banned)[0],
+        plan_forced=MappingProxyType({slot: _padded(rows)[0] for slot, rows in plan_forced.items()}),
+    )
+
+
+# Раскладка на набор справочников (справочники процесса живут всё время работы)
+_layouts: Dict[int, Tuple[CreatureTables, BatchLayout]] = {}
+
+
+def get_layout(tables: Optional[CreatureTables] = None) -> BatchLayout:
+    tables = tables or TABLES
+    cached = _layouts.get(id(tables))
+    if cached is None or cached[0] is not tables:
+        cached = (tables, compile_layout(tables))
+        _layouts[id(tables)] = cached
+    return cached[1]
+
+
+# =============================
+# Сэмплеры: столбец -> (n, ширина) индексов
+# =============================
+def _pick_valid(rng: Any, valid: Any) -> Any:
+    """Номер случайного допустимого столбца в каждой строке (равномерно); EMPTY — допустимых нет"""
+    # Узкий счётчик: кандидатов в слоте — десятки, а cumsum по (n, k) — основная стоимость выборки
+    running = np.cumsum(valid, axis=1, dtype=np.int16)
+    count = running[:, -1]
+    ticket = (rng.random(len(valid)) * count).astype(np.int16)
+    position = (running > ticket[:, None]).argmax(axis=1)
+    return np.where(count > 0, position, EMPTY)
+
+
+def _sample_numpy(layout: BatchLayout, n: int, seed: int) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    rows = np.arange(n)
+    masks = {column: np.asarray(values, dtype=np.int64) for column, values in layout.tag_masks.items()}
+    blocks = {column: np.asarray(values, dtype=np.int64) for column, values in layout.tag_blocks.items()}
+
+    def pick(lengths):
+        # Равномерный индекс в [0, length) для каждой строки (length может зависеть от строки)
+        return (rng.random(n) * lengths).astype(np.intp)
+
+    def uniform(length: int):
+        return rng.integers(0, length, n)
+
+    def choose(column: str, candidates, banned):
+        # candidates: (n, k) индексов словаря (EMPTY — нет кандидата); выбор среди допустимых
+        valid = (candidates != EMPTY) & ((masks[column][candidates] & banned[:, None]) == 0)
+        position = _pick_valid(rng, valid)
+        chosen = candidates[rows, np.maximum(position, 0)]
+        return np.where(position != EMPTY, chosen, EMPTY)
+
+    def take(column: str, chosen, banned):
+        # Выбранные признаки запрещают несовместимые с ними теги
+        added = blocks[column][hybrid, np.maximum(chosen, 0)]
+        return banned | np.where(chosen != EMPTY, added, 0)
+
+    def everything(column: str):
+        return np.broadcast_to(np.arange(len(masks[column])), (n, len(masks[column])))
+
+    habitat = uniform(len(layout.habitats))
+    types_table = np.asarray(layout.types_by_habitat)
+    creature_type = types_table[habitat, pick(np.asarray(layout.types_len)[habitat])]
+    size = uniform(len(layout.sizes))
+    columns: Dict[str, Any] = {"habitat": habitat, "creature_type": creature_type, "size": size}
+
+    # Контекст строки и план носителей обязательных признаков
+    context = np.asarray(layout.context_index)[habitat, size, creature_type]
+    hybrid = np.asarray(layout.context_hybrid, dtype=np.intp)[context]
+    plan = pick(np.asarray(layout.context_plans)[context])
+    banned = np.asarray(layout.plan_banned, dtype=np.int64)[context, plan]
+    forced = {slot: np.asarray(table)[context, plan] for slot, table in layout.plan_forced.items()}
+
+    def with_forced(slot: str, chosen):
+        return np.where(forced[slot] != EMPTY, forced[slot], chosen)
+
+    surfaces_table = np.asarray(layout.surfaces_by_habitat)
+    columns["surface"] = with_forced("surface", choose("surface", surfaces_table[habitat], banned))
+    banned = take("surface", columns["surface"], banned)
+
+    for column in ("eyes", "mouth", "head_appendage", "limbs", "torso"):
+        chosen = choose(column, everything(column), banned)
+        if column in forced:
+            chosen = with_forced(column, chosen)
+        columns[column] = chosen
+        banned = take(column, chosen, banned)
+
+    active = (forced["tail"] != EMPTY) | (rng.random(n) < TAIL_PROBABILITY)
+    tail = np.where(active, with_forced("tail", choose("tail", everything("tail"), banned)), EMPTY)
+    columns["tail"] = tail
+    banned = take("tail", tail, banned)
+
+    # Две разные адаптации среды: вторая — из допустимых без первой
+    width = layout.widths["adaptations"]
+    candidates = np.asarray(layout.adaptations_by_habitat)[habitat]
+    first = with_forced("adaptations", choose("adaptations", candidates, banned))
+    banned = take("adaptations", first, banned)
+    slots = [first]
+    if width > 1:
+        second = choose("adaptations", np.where(candidates == first[:, None], EMPTY, candidates), banned)
+        banned = take("adaptations", second, banned)
+        slots.append(second)
+    columns["adaptations"] = np.stack(slots, axis=1)
+
+    # Способности: категория (из тех, где есть допустимые), затем способность в ней; повторы отбрасываются
+    width = layout.widths["abilities"]
+    wanted = np.asarray(layout.ability_counts)[size]
+    offsets = np.asarray(layout.ability_offsets)
+    category_of = np.repeat(np.arange(len(offsets)), layout.ability_lengths)
+    abilities = np.full((n, width), EMPTY, dtype=np.int64)
+    for slot in range(width):
+        valid = (masks["abilities"][None, :] & banned[:, None]) == 0
+        category = _pick_valid(rng, np.add.reduceat(valid, offsets, axis=1) > 0)
+        value = _pick_valid(rng, valid & (category_of[None, :] == category[:, None]))
+        if slot == 0:
+            value = with_forced("abilities", value)
+        value = np.where(slot < wanted, value, EMPTY)
+        banned = take("abilities", value, banned)
+        duplicate = (abilities[:, :slot] == value[:, None]).any(axis=1)
+        abilities[:, slot] = np.where(duplicate, EMPTY, value)
+    columns["abilities"] = abilities
+
+    # Окраска: схема среды или случайная из схем с допустимыми цветами; два базовых цвета и эффект
+    scheme_of = np.full(len(layout.colors), EMPTY)
+    for scheme, (offset, length) in enumerate(zip(layout.scheme_offsets, layout.scheme_lengths)):
+        scheme_of[offset:offset + length] = scheme
+    is_effect = np.arange(len(layout.colors)) >= layout.effect_offset
+
+    def color_valid(banned):
+        return (masks["colors"][None, :] & banned[:, None]) == 0
+
+    scheme = np.asarray(layout.scheme_by_habitat)[habitat]
+    valid = color_valid(banned)[:, :layout.effect_offset]
+    random_scheme = _pick_valid(rng, np.add.reduceat(valid, np.asarray(layout.scheme_offsets), axis=1) > 0)
+    scheme = np.where(scheme == EMPTY, random_scheme, scheme)
+
+    base = _pick_valid(rng, color_valid(banned) & (scheme_of[None, :] == scheme[:, None]))
+    banned = take("colors", base, banned)
+    second = _pick_valid(rng, color_valid(banned) & (scheme_of[None, :] == scheme[:, None]))
+    second = np.where(rng.random(n) < SECOND_COLOR_PROBABILITY, second, EMPTY)
+    banned = take("colors", second, banned)
+    effect = _pick_valid(rng, color_valid(banned) & is_effect[None, :])
+    effect = np.where(rng.random(n) < COLOR_EFFECT_PROBABILITY, effect, EMPTY)
+    columns["colors"] = np.stack([base, second, effect], axis=1)
+
+    # Черты поведения без возвращения: k наименьших из случайных ключей; ключи упорядочиваем,
+    # чтобы первые count слотов были равномерной подвыборкой
+    width = layout.widths["behavior_traits"]
+    keys = rng.random((n, len(layout.behavior_traits)))
+    chosen = np.argpartition(keys, width - 1, axis=1)[:, :width]
+    chosen = np.take_along_axis(chosen, np.argsort(np.take_along_axis(keys, chosen, axis=1), axis=1), axis=1)
+    wanted = np.asarray(layout.trait_counts)[size]
+    columns["behavior_traits"] = np.where(np.arange(width)[None, :] < wanted[:, None], chosen, EMPTY)
+
+    return {
+        name: np.ascontiguousarray(values, dtype=np.int16).reshape(n, layout.widths[name])
+        for name, values in columns.items()
+    }
+
+
+def _sample_python(layout: BatchLayout, n: int, seed: int) -> Dict[str, Any]:
+    """Построчно: существа обычного генератора, закодированные индексами словарей раскладки"""
+    generator = CreatureGenerator(rng=random.Random(seed), tables=layout.tables)
+    widths = layout.widths
+    columns = {name: array("h") for name in widths}
+
+    def index(vocabulary: Sequence[Any], lower: bool = False) -> Dict[Any, int]:
+        result: Dict[Any, int] = {}
+        for i, value in enumerate(vocabulary):
+            result.setdefault(value.lower() if lower else value, i)
+        return result
+
+    habitats, types, sizes = index(layout.habitats), index(layout.creature_types), index(layout.sizes)
+    surfaces = [{layout.surfaces[i]: i for i in row if i != EMPTY} for row in layout.surfaces_by_habitat]
+    adaptations = [{layout.adaptations[i]: i for i in row if i != EMPTY} for row in layout.adaptations_by_habitat]
+    eyes, mouths, appendages = index(layout.eyes), index(layout.mouths, True), index(layout.head_appendages, True)
+    limbs, torsos, tails = index(layout.limbs), index(layout.torsos), index(layout.tails)
+    abilities, traits = index(layout.abilities), index(layout.behavior_traits)
+    base_colors = index(layout.colors[:layout.effect_offset])
+    effects = {color: layout.effect_offset + i for i, color in enumerate(layout.colors[layout.effect_offset:])}
+
+    def put(name: str, values: Sequence[int]) -> None:
+        columns[name].extend(list(values) + [EMPTY] * (widths[name] - len(values)))
+
+    for _ in range(n):
+        creature = generator.generate_creature()
+        habitat = habitats[creature.habitat]
+        columns["habitat"].append(habitat)
+        columns["creature_type"].append(types[creature.creature_type])
+        columns["size"].append(sizes[creature.size])
+        columns["surface"].append(surfaces[habitat][creature.surface])
+        head = creature.head_description.split(", ")
+        columns["eyes"].append(eyes[head[0]])
+        columns["mouth"].append(mouths[head[1]])
+        columns["head_appendage"].append(appendages[head[2]])
+        columns["limbs"].append(limbs[creature.body_features[0]])
+        columns["torso"].append(torsos[creature.body_features[1]])
+        rest = creature.body_features[2:]
+        put("tail", [tails[feature] for feature in rest if feature in tails])
+        put("adaptations", [adaptations[habitat][feature] for feature in rest if feature not in tails])
+        put("abilities", [abilities[ability] for ability in creature.special_abilities])
+        base = [base_colors[color] for color in creature.coloration if color not in effects]
+        effect = [effects[color] for color in creature.coloration if color in effects]
+        put("colors", (base + [EMPTY])[:2] + (effect or [EMPTY]))
+        put("behavior_traits", [traits[trait] for trait in creature.behavior_traits])
+
+    return columns
+
+
+_python_backend_warned = False
+
+
+def _warn_python_backend(layout: BatchLayout) -> None:
+    """Одно предупреждение на процесс: пакет идёт медленным построчным путём"""
+    global _python_backend_warned
+    if _python_backend_warned:
+        return
+    _python_backend_warned = True
+    reason = "NumPy не установлен" if not NUMPY_AVAILABLE else f"тегов {layout.tag_count} > {MAX_NUMPY_TAGS}"
+    logger.warning(
+        f"Пакетная генерация без векторизации ({reason}): выборка построчная и медленная, "
+        f"а пакеты по тем же seed не совпадают с пакетами NumPy-бэкенда"
+    )
+
+
+class CreatureBatch:
+    """
+    Пакет существ в столбцовом виде: столбец — индексы словаря BatchLayout, по ширине слотов
+    на существо (EMPTY — пусто). Существа, JSON и промпты собираются лениво по номеру строки.
+    """
+
+    def __init__(self, layout: BatchLayout, columns: Dict[str, Any], size: int, seed: int, backend: str):
+        self.layout = layout
+        self.columns = columns
+        self.seed = seed
+        # «numpy» или «python»: пакет по seed воспроизводится только на том же бэкенде
+        self.backend = backend
+        self._size = size
+
+    @classmethod
+    def sample(cls, n: int, seed: Optional[int] = None, tables: Optional[CreatureTables] = None) -> "CreatureBatch":
+        """Выборка n существ; seed=None — случайный сид (он сохраняется в пакете)"""
+        if n < 0:
+            raise ValueError("Размер пакета не может быть отрицательным")
+        if seed is None:
+            seed = random.getrandbits(SEED_BITS)
+        layout = get_layout(tables)
+        if NUMPY_AVAILABLE and layout.tag_count <= MAX_NUMPY_TAGS:
+            return cls(layout, _sample_numpy(layout, n, seed), n, seed, "numpy")
+        _warn_python_backend(layout)
+        return cls(layout, _sample_python(layout, n, seed), n, seed, "python")
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """Память под столбцы, байт"""
+        return sum(
+            values.nbytes if NUMPY_AVAILABLE and isinstance(values, np.ndarray) else len(values) * values.itemsize
+            for values in self.columns.values()
+        )
+
+    def row(self, index: int) -> Dict[str, List[int]]:
+        """Сырые индексы строки по столбцам (пустые слоты отброшены)"""
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        widths = self.layout.widths
+        result = {}
+        for name, values in self.columns.items():
+            width = widths[name]
+            if NUMPY_AVAILABLE and isinstance(values, np.ndarray):
+                slots = values[index].tolist()
+            else:
+                slots = values[index * width:(index + 1) * width].tolist()
+            result[name] = [slot for slot in slots if slot != EMPTY]
+        return result
+
+    def creature(self, index: int) -> CreatureCharacteristics:
+        """Существо строки index в том же виде, что и CreatureGenerator.generate_creature"""
+        layout, tables = self.layout, self.layout.tables
+        row = self.row(index)
+        habitat = layout.habitats[row["habitat"][0]]
+        head_description = (
+            f"{layout.eyes[row['eyes'][0]]}, {layout.mouths[row['mouth'][0]].lower()}, "
+            f"{layout.head_appendages[row['head_appendage'][0]].lower()}"
+        )
+        body_features = [layout.limbs[row["limbs"][0]], layout.torsos[row["torso"][0]]]
+        body_features += [layout.tails[i] for i in row["tail"]]
+        body_features += [layout.adaptations[i] for i in row["adaptations"]]
+        return CreatureCharacteristics(
+            habitat=habitat,
+            creature_type=layout.creature_types[row["creature_type"][0]],
+            size=layout.sizes[row["size"][0]],
+            surface=layout.surfaces[row["surface"][0]],
+            form_rules=tables.habitat_data[habitat]["form_rules"],
+            head_description=head_description,
+            body_features=body_features,
+            special_abilities=[layout.abilities[i] for i in row["abilities"]],
+            coloration=[layout.colors[i] for i in row["colors"]],
+            behavior_traits=[layout.behavior_traits[i] for i in row["behavior_traits"]],
+            environmental_adaptations=list(tables.environmental_adaptations.get(habitat, ())),
+        )
+
+    def creatures(self) -> Iterator[CreatureCharacteristics]:
+        for index in range(self._size):
+            yield self.creature(index)
+
+    def _renderer(self, index: int) -> CreatureGenerator:
+        # Промпты тоже содержат случайный выбор (гнездо яйца воздушной среды): свой rng на строку
+        return CreatureGenerator(rng=random.Random(f"{self.seed}:{index}"), tables=self.layout.tables)
+
+    def stage_prompts(self, index: int) -> Dict[str, Dict[str, str]]:
+        """Промпты стадий существа index (воспроизводимы для пары seed/index)"""
+        return self._renderer(index).generate_stage_prompts(self.creature(index))
+
+    def json_description(self, index: int) -> str:
+        return self._renderer(index).generate_json_description(self.creature(index))
+
+    def value_counts(self, column: str) -> Dict[Any, int]:
+        """Распределение значений столбца (по всем слотам) — для проверки баланса выборки"""
+        vocabulary = self.layout.vocabulary(column)
+        values = self.columns[column]
+        if NUMPY_AVAILABLE and isinstance(values, np.ndarray):
+            flat = values.ravel()
+            counts = np.bincount(flat[flat != EMPTY], minlength=len(vocabulary)).tolist()
+        else:
+            tally = Counter(value for value in values if value != EMPTY)
+            counts = [tally.get(i, 0) for i in range(len(vocabulary))]
+        result: Dict[Any, int] = {}
+        for value, count in zip(vocabulary, counts):
+            key = getattr(value, "value", value)
+            result[key] = result.get(key, 0) + count
+        return result
+
+    def export_csv(self, fp: TextIO, delimiter: str = ",") -> int:
+        """
+        Выгрузка пакета для анализа: строка на существо, списки через «; ».
+        Промпты не рендерятся — только признаки. Возвращает число строк.
+        """
+        writer = csv.writer(fp, delimiter=delimiter)
+        writer.writerow([
+            "index", "habitat", "type", "size", "surface", "head_description",
+            "body_features", "special_abilities", "coloration", "behavior_traits",
+        ])
+        for index in range(self._size):
+            creature = self.creature(index)
+            writer.writerow([
+                index, creature.habitat.value, creature.creature_type.value, creature.size.value, creature.surface,
+                creature.head_description, "; ".join(creature.body_features), "; ".join(creature.special_abilities),
+                "; ".join(creature.coloration), "; ".join(creature.behavior_traits),
+            ])
+        return self._size
+
+
+def main():
+    """Выгрузка выборки в CSV: python backend/generator/batch.py <n> [seed] > sample.csv"""
+    import sys
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    batch = CreatureBatch.sample(n, seed=seed)
+    batch.export_csv(sys.stdout)
+    print(f"seed={batch.seed}, {len(batch)} существ, {batch.nbytes} байт, бэкенд {batch.backend}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
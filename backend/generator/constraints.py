@@ -0,0 +1,401 @@
+"""
+Ограничения генератора существ на битовых масках.
+
+Теги ограничений (`incompatible_features`, `required_combinations`, запреты сред) получают
+по биту; каждая фраза справочников — маску своих тегов (`feature_tags`) и маску тегов,
+которые она исключает. Выбор существа ведёт маску запрещённых тегов: кандидат слота
+допустим, если `маска & запрещено == 0`, а списки допустимых кандидатов кэшируются по
+(слоту, значимой части маски) — выбор в слоте O(1) и без повторных бросков.
+
+Обязательные признаки гарантируются планами: для каждого контекста (среда, размер, тип)
+заранее перечислены совместимые наборы «носителей» (слот -> фраза), один из них
+выбирается при старте и резервирует свои слоты. Тупики исключаются при компиляции:
+у каждого обязательного слота есть кандидат без тегов либо все кандидаты несут одни и те
+же теги (тогда они учитываются сразу). Нарушение этих условий — ValueError при импорте.
+
+Проверка свойства на выборке: python backend/generator/constraints.py [число_существ]
+"""
+
+import itertools
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+# Слоты, которые генератор заполняет всегда (остальные могут остаться пустыми)
+MANDATORY_SLOTS = ("surface", "eyes", "mouth", "head_appendage", "limbs", "torso", "colors")
+# Слоты, которым можно поручить обязательный признак (окраска зависит от схемы — не используется)
+CARRIER_SLOTS = ("surface", "head_appendage", "limbs", "torso", "tail", "adaptations", "abilities")
+
+
+@dataclass(frozen=True)
+class CreatureContext:
+    """Скомпилированные условия для (среды, размера, типа)"""
+    hybrid: bool
+    required: int  # теги, которые должны быть среди выбранных признаков
+    implied: int  # теги, которые у существа будут в любом случае (адаптации среды, общие теги слотов)
+    plans: Tuple[Mapping[str, str], ...]  # носители обязательных признаков: слот -> фраза
+    plan_banned: Tuple[int, ...]  # запрещённые теги после применения плана
+
+
+class CreatureSelection:
+    """Состояние выбора одного существа: запрещённые теги и зарезервированные планом слоты"""
+
+    __slots__ = ("solver", "hybrid", "banned", "forced")
+
+    def __init__(self, solver: "ConstraintSolver", hybrid: bool, banned: int, forced: Mapping[str, str]):
+        self.solver = solver
+        self.hybrid = hybrid
+        self.banned = banned
+        self.forced = dict(forced)
+
+    def valid_groups(self, groups: Mapping[str, Sequence[str]], names: Sequence[str]) -> Sequence[str]:
+        return self.solver.valid_groups(groups, names, self.banned)
+
+    def is_forced(self, slot: str) -> bool:
+        return slot in self.forced
+
+    def valid(self, candidates: Sequence[str]) -> Tuple[str, ...]:
+        return self.solver.valid(candidates, self.banned)
+
+    def take(self, phrase: str) -> str:
+        """Учитывает выбранную фразу: запрещает несовместимые с ней теги"""
+        self.banned |= self.solver.blocks(phrase, self.hybrid)
+        return phrase
+
+    def pick(self, rng: Any, slot: str, candidates: Sequence[str]) -> Optional[str]:
+        """Случайная допустимая фраза слота (или фраза плана); None — допустимых нет"""
+        if self.forced and slot in self.forced:
+            return self.forced.pop(slot)
+        valid = self.solver.valid(candidates, self.banned)
+        if not valid:
+            return None
+        phrase = rng.choice(valid)
+        self.banned |= self.solver.blocks(phrase, self.hybrid)
+        return phrase
+
+    def pick_many(self, rng: Any, slot: str, candidates: Sequence[str], count: int) -> List[str]:
+        """До count разных допустимых фраз слота (выборка без возвращения)"""
+        chosen: List[str] = []
+        forced = self.forced.pop(slot, None)
+        if forced is not None:
+            chosen.append(forced)
+        while len(chosen) < count:
+            valid = [phrase for phrase in self.solver.valid(candidates, self.banned) if phrase not in chosen]
+            if not valid:
+                break
+            chosen.append(self.take(rng.choice(valid)))
+        return chosen
+
+
+class ConstraintSolver:
+    """Скомпилированные ограничения для набора справочников генератора"""
+
+    def __init__(self, tables: Any):
+        self.tables = tables
+        names: Dict[str, None] = {}
+        for tag, others in itertools.chain(
+            tables.incompatible_features.items(), tables.hybrid_incompatible_features.items()
+        ):
+            names[tag] = None
+            names.update(dict.fromkeys(others))
+        for required in tables.required_combinations.values():
+            names.update(dict.fromkeys(required))
+        for info in tables.habitat_data.values():
+            names.update(dict.fromkeys(info.get("forbidden_features", ())))
+        names.update(dict.fromkeys(tables.feature_tags))
+        self.tags: Tuple[str, ...] = tuple(names)
+        self._bit = {tag: 1 << i for i, tag in enumerate(self.tags)}
+
+        # Маски фраз (без учёта регистра: в описании головы рот и придаток в нижнем регистре)
+        phrase_masks: Dict[str, int] = {}
+        for tag in self.tags:
+            phrase_masks[tag.lower()] = phrase_masks.get(tag.lower(), 0) | self._bit[tag]
+        for tag, phrases in tables.feature_tags.items():
+            for phrase in phrases:
+                phrase_masks[phrase.lower()] = phrase_masks.get(phrase.lower(), 0) | self._bit[tag]
+        self._phrase_masks = phrase_masks
+
+        # Несовместимость симметрична: A исключает B, значит и B исключает A
+        self._conflicts = {
+            False: self._symmetric(tables.incompatible_features),
+            True: self._symmetric(tables.hybrid_incompatible_features),
+        }
+        self._blocks_cache: Dict[Tuple[int, bool], int] = {}
+        self._phrase_blocks: Dict[bool, Dict[str, int]] = {False: {}, True: {}}
+        # id(кандидатов) -> (кандидаты, значимые теги, маски кандидатов, {значимая часть запрета: допустимые})
+        self._candidates: Dict[int, Tuple[Sequence[str], int, Tuple[int, ...], Dict[int, Tuple[str, ...]]]] = {}
+        self._groups: Dict[int, Tuple[Sequence[str], int, Dict[int, Tuple[str, ...]]]] = {}
+        self._contexts = {
+            (habitat, size, creature_type): self._compile_context(habitat, size, creature_type)
+            for habitat in tables.habitats
+            for size in tables.sizes
+            for creature_type in tables.habitat_data[habitat]["types"]
+        }
+
+    # --- маски ---
+
+    def _symmetric(self, incompatible: Mapping[str, Iterable[str]]) -> Dict[int, int]:
+        conflicts: Dict[int, int] = {}
+        for tag, others in incompatible.items():
+            for other in others:
+                conflicts[self._bit[tag]] = conflicts.get(self._bit[tag], 0) | self._bit[other]
+                conflicts[self._bit[other]] = conflicts.get(self._bit[other], 0) | self._bit[tag]
+        return conflicts
+
+    def mask(self, phrase: str) -> int:
+        """Теги фразы (0 — фраза ни на что не влияет)"""
+        return self._phrase_masks.get(phrase.lower(), 0)
+
+    def mask_of(self, phrases: Iterable[str]) -> int:
+        result = 0
+        for phrase in phrases:
+            result |= self.mask(phrase)
+        return result
+
+    def blocks_mask(self, mask: int, hybrid: bool) -> int:
+        """Теги, несовместимые хотя бы с одним тегом из mask"""
+        key = (mask, hybrid)
+        blocked = self._blocks_cache.get(key)
+        if blocked is None:
+            blocked = 0
+            conflicts = self._conflicts[hybrid]
+            rest = mask
+            while rest:
+                bit = rest & -rest
+                blocked |= conflicts.get(bit, 0)
+                rest ^= bit
+            self._blocks_cache[key] = blocked
+        return blocked
+
+    def blocks(self, phrase: str, hybrid: bool) -> int:
+        cache = self._phrase_blocks[hybrid]
+        blocked = cache.get(phrase)
+        if blocked is None:
+            blocked = cache[phrase] = self.blocks_mask(self.mask(phrase), hybrid)
+        return blocked
+
+    def names(self, mask: int) -> List[str]:
+        return [tag for tag in self.tags if mask & self._bit[tag]]
+
+    def valid(self, candidates: Sequence[str], banned: int) -> Sequence[str]:
+        """Допустимые кандидаты при запрещённых тегах banned (кэш по значимой части маски)"""
+        entry = self._candidates.get(id(candidates))
+        if entry is None or entry[0] is not candidates:
+            masks = tuple(self.mask(phrase) for phrase in candidates)
+            relevant = 0
+            for mask in masks:
+                relevant |= mask
+            entry = (candidates, relevant, masks, {})
+            self._candidates[id(candidates)] = entry
+        key = banned & entry[1]
+        if not key:
+            return candidates
+        valid = entry[3].get(key)
+        if valid is None:
+            valid = entry[3][key] = tuple(phrase for phrase, mask in zip(candidates, entry[2]) if not mask & banned)
+        return valid
+
+    def valid_groups(self, groups: Mapping[str, Sequence[str]], names: Sequence[str], banned: int) -> Sequence[str]:
+        """Группы кандидатов (категории способностей, схемы окраски), где есть допустимый кандидат"""
+        entry = self._groups.get(id(names))
+        if entry is None or entry[0] is not names:
+            entry = (names, self.mask_of(phrase for name in names for phrase in groups[name]), {})
+            self._groups[id(names)] = entry
+        key = banned & entry[1]
+        if not key:
+            return names
+        valid = entry[2].get(key)
+        if valid is None:
+            valid = entry[2][key] = tuple(name for name in names if self.valid(groups[name], banned))
+        return valid
+
+    # --- контексты ---
+
+    def slot_candidates(self, habitat: Any, slot: str) -> Tuple[str, ...]:
+        """Кандидаты слота в среде; для окраски — цвета навязанной схемы (пусто, если схема случайна)"""
+        tables = self.tables
+        if slot == "surface":
+            return tuple(tables.habitat_data[habitat]["surfaces"])
+        if slot == "eyes":
+            return tuple(tables.head_variants["eyes"])
+        if slot == "mouth":
+            return tuple(tables.head_variants["mouths"])
+        if slot == "head_appendage":
+            return tuple(tables.head_variants["appendages"])
+        if slot in ("limbs", "torso", "tail"):
+            return tuple(tables.body_features[slot])
+        if slot == "adaptations":
+            return tuple(tables.environmental_adaptations.get(habitat, ()))
+        if slot == "abilities":
+            return tuple(dict.fromkeys(
+                ability for category in tables.special_ability_categories
+                for ability in tables.special_abilities[category]
+            ))
+        if slot == "colors":
+            scheme = tables.forced_color_schemes.get(habitat)
+            return tuple(tables.coloration_schemes[scheme]) if scheme else ()
+        raise ValueError(f"Неизвестный слот: {slot}")
+
+    def _compile_context(self, habitat: Any, size: Any, creature_type: Any) -> CreatureContext:
+        tables = self.tables
+        hybrid = creature_type.name == "HYBRID"
+        where = f"{habitat.name}/{size.name}/{creature_type.name}"
+
+        required = 0
+        for key in (habitat, size, creature_type):
+            for tag in tables.required_combinations.get(key, ()):
+                required |= self._bit[tag]
+        forbidden = 0
+        for tag in tables.habitat_data[habitat].get("forbidden_features", ()):
+            forbidden |= self._bit[tag]
+
+        # Адаптации среды есть у существа целиком (environmental_adaptations)
+        implied = self.mask_of(tables.environmental_adaptations.get(habitat, ()))
+        # Обязательный слот без «нейтрального» кандидата: все кандидаты обязаны нести одни и те же теги,
+        # и эти теги достаются существу в любом случае. Окраска при случайной схеме — группа схем:
+        # схемы без допустимых цветов просто не выбираются, нужна хотя бы одна нейтральная
+        visible = 0
+        schemes = [tables.forced_color_schemes[habitat]] if habitat in tables.forced_color_schemes \
+            else list(tables.coloration_scheme_names)
+        for slot in MANDATORY_SLOTS:
+            groups = [self.slot_candidates(habitat, slot)] if slot != "colors" else \
+                [tuple(tables.coloration_schemes[scheme]) for scheme in schemes]
+            masks = [{self.mask(phrase) for phrase in candidates} for candidates in groups]
+            if any(0 in group for group in masks):
+                continue
+            if len(groups) > 1 or len(masks[0]) != 1:
+                raise ValueError(f"{where}: у обязательного слота {slot} нет кандидата без тегов")
+            visible |= masks[0].pop()
+        implied |= visible
+
+        if implied & forbidden:
+            raise ValueError(f"{where}: среда запрещает неизбежные признаки {self.names(implied & forbidden)}")
+        if (required | implied) & self.blocks_mask(required | implied, hybrid):
+            raise ValueError(f"{where}: обязательные признаки несовместимы между собой")
+        banned = forbidden | self.blocks_mask(required | implied, hybrid)
+
+        # Носители обязательных признаков, ещё не гарантированных слотами
+        options = []
+        for tag in self.names(required & ~visible):
+            bit = self._bit[tag]
+            tag_options = [
+                (slot, phrase, self.mask(phrase))
+                for slot in CARRIER_SLOTS
+                for phrase in self.slot_candidates(habitat, slot)
+                if self.mask(phrase) & bit and not self.mask(phrase) & banned
+            ]
+            if not tag_options:
+                raise ValueError(f"{where}: обязательный признак «{tag}» нечем обеспечить")
+            options.append(tag_options)
+
+        plans: List[Mapping[str, str]] = []
+        plan_banned: List[int] = []
+        seen = set()
+        for combination in itertools.product(*options):
+            plan: Dict[str, str] = {}
+            mask = 0
+            for slot, phrase, phrase_mask in combination:
+                if plan.get(slot, phrase) != phrase:
+                    break
+                plan[slot] = phrase
+                mask |= phrase_mask
+            else:
+                if mask & (banned | self.blocks_mask(mask, hybrid)):
+                    continue
+                key = tuple(sorted(plan.items()))
+                if key in seen:
+                    continue
+                seen.add(key)
+                plans.append(plan)
+                plan_banned.append(banned | self.blocks_mask(mask, hybrid))
+        if not plans:
+            raise ValueError(f"{where}: обязательные признаки нельзя совместить")
+
+        return CreatureContext(
+            hybrid=hybrid,
+            required=required,
+            implied=implied,
+            plans=tuple(plans),
+            plan_banned=tuple(plan_banned),
+        )
+
+    def context(self, habitat: Any, size: Any, creature_type: Any) -> CreatureContext:
+        return self._contexts[(habitat, size, creature_type)]
+
+    def contexts(self) -> Mapping[Tuple[Any, Any, Any], CreatureContext]:
+        return self._contexts
+
+    def start(self, rng: Any, habitat: Any, size: Any, creature_type: Any) -> CreatureSelection:
+        """Начинает выбор существа: случайный план носителей обязательных признаков"""
+        context = self._contexts[(habitat, size, creature_type)]
+        index = rng.randrange(len(context.plans)) if len(context.plans) > 1 else 0
+        return CreatureSelection(self, context.hybrid, context.plan_banned[index], context.plans[index])
+
+    # --- проверка ---
+
+    def conflicts(self, features: Iterable[str], hybrid: bool = False) -> List[Tuple[str, str]]:
+        """Пары несовместимых тегов среди признаков"""
+        mask = self.mask_of(features)
+        pairs = []
+        for tag in self.names(mask):
+            for other in self.names(self.blocks_mask(self._bit[tag], hybrid) & mask):
+                if self.tags.index(tag) < self.tags.index(other):
+                    pairs.append((tag, other))
+        return pairs
+
+    def violations(self, creature: Any) -> List[str]:
+        """Нарушения ограничений готовым существом (пустой список — существо корректно)"""
+        visible = [creature.surface, *creature.head_description.split(", "), *creature.body_features,
+                   *creature.special_abilities, *creature.coloration]
+        context = self._contexts.get((creature.habitat, creature.size, creature.creature_type))
+        if context is None:
+            return [f"тип {creature.creature_type.name} не обитает в среде {creature.habitat.name}"]
+        problems = [
+            f"несовместимы: {tag} и {other}"
+            for tag, other in self.conflicts(visible + list(creature.environmental_adaptations), context.hybrid)
+        ]
+        missing = context.required & ~self.mask_of(visible)
+        problems += [f"нет обязательного признака: {tag}" for tag in self.names(missing)]
+        forbidden = self.mask_of(self.tables.habitat_data[creature.habitat].get("forbidden_features", ()))
+        problems += [f"запрещено средой: {tag}" for tag in self.names(forbidden & self.mask_of(visible))]
+        return problems
+
+
+def main():
+    """Проверка свойства: ни одно сгенерированное существо не нарушает ограничений"""
+    import random
+    import sys
+    import time
+    from collections import Counter
+
+    from promt_gen import CreatureGenerator
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    generator = CreatureGenerator(rng=random.Random(0))
+    solver = generator.constraints
+    problems: Counter = Counter()
+    started = time.perf_counter()
+    for _ in range(count):
+        problems.update(solver.violations(generator.generate_creature()))
+    elapsed = time.perf_counter() - started
+    print(f"generate_creature: {count} существ за {elapsed:.1f} s, нарушений: {sum(problems.values())}")
+
+    from batch import NUMPY_AVAILABLE
+
+    started = time.perf_counter()
+    batch = generator.generate_batch(count, seed=0)
+    batch_problems: Counter = Counter()
+    for creature in batch.creatures():
+        batch_problems.update(solver.violations(creature))
+    elapsed = time.perf_counter() - started
+    print(f"generate_batch (numpy={NUMPY_AVAILABLE}): {count} существ за {elapsed:.1f} s, "
+          f"нарушений: {sum(batch_problems.values())}")
+
+    for problem, hits in (problems + batch_problems).most_common(20):
+        print(f"    {problem}: {hits}")
+    plans = sum(len(context.plans) for context in solver.contexts().values())
+    print(f"Тегов: {len(solver.tags)}, контекстов: {len(solver.contexts())}, планов: {plans}")
+    sys.exit(1 if problems or batch_problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Перечисления признаков существ (среда, тип, размер).
+
+Отдельный модуль без зависимостей: модели БД и миграции импортируют перечисления отсюда,
+не загружая справочники и генератор.
+"""
+
+from enum import Enum
+
+
+class Habitat(Enum):
+    """Среды обитания существ"""
+    # Детализация наземной среды
+    FOREST_TROPICAL = "Тропический лес"
+    GRASSLAND = "Луговое"
+    MOUNTAIN = "Горное"
+    # Прочие среды
+    AQUATIC = "Водное"
+    AERIAL = "Воздушное"
+    UNDERGROUND = "Подземное"
+    AMPHIBIOUS = "Амфибия"
+    COSMIC = "Космическое"
+    VOLCANIC = "Вулканическое"
+    ARCTIC = "Арктическое"
+    DESERT = "Пустынное"
+    SWAMP = "Болотное"
+
+
+class CreatureType(Enum):
+    """Типы существ"""
+    MAMMAL = "Млекопитающее"
+    REPTILE = "Рептилия"
+    BIRD = "Птица"
+    FISH = "Рыба"
+    INSECT = "Насекомое"
+    AMPHIBIAN = "Амфибия"
+    FANTASY = "Фэнтези"
+    CRYSTAL = "Кристаллическое"
+    MECHANICAL = "Механическое"
+    ELEMENTAL = "Элементальное"
+    HYBRID = "Гибрид"
+
+
+class Size(Enum):
+    """Размеры существ"""
+    MICROSCOPIC = "Микроскопическое"
+    TINY = "Крошечное"
+    SMALL = "Маленькое"
+    MEDIUM = "Среднее"
+    LARGE = "Большое"
+    HUGE = "Огромное"
+    COLOSSAL = "Колоссальное"
@@ -8,7 +8,7 @@ import re
 from PIL import Image
 from typing import Optional, Dict, Any
 import argparse
-from .promt_gen import CreatureGenerator
+from .promt_gen import CreatureGenerator, get_creature_generator
 from config.settings import (
     MODELS, DEFAULT_SETTINGS, QUALITY_PRESETS, 
     FILE_SETTINGS, API_SETTINGS, REALISM_PROMPTS, GENERATION_DEFAULTS,
@@ -365,7 +365,7 @@ def main():
     print("[CLI] Генератор (HF)")
     print("=" * 60)
 
-    creature_generator = CreatureGenerator()
+    creature_generator = get_creature_generator()
     image_generator = HFImageGenerator()
 
     # Генерация изображения по стадии
@@ -1,53 +1,23 @@
 import random
 import json
-from typing import Dict, List, Set, Tuple, Optional
+import hashlib
+import logging
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Set, Tuple, Optional
 from dataclasses import dataclass, field
-from enum import Enum
-
-
-class Habitat(Enum):
-    """Среды обитания существ"""
-    # Детализация наземной среды
-    FOREST_TROPICAL = "Тропический лес"
-    GRASSLAND = "Луговое"
-    MOUNTAIN = "Горное"
-    # Прочие среды
-    AQUATIC = "Водное"
-    AERIAL = "Воздушное"
-    UNDERGROUND = "Подземное"
-    AMPHIBIOUS = "Амфибия"
-    COSMIC = "Космическое"
-    VOLCANIC = "Вулканическое"
-    ARCTIC = "Арктическое"
-    DESERT = "Пустынное"
-    SWAMP = "Болотное"
-
-
-class CreatureType(Enum):
-    """Типы существ"""
-    MAMMAL = "Млекопитающее"
-    REPTILE = "Рептилия"
-    BIRD = "Птица"
-    FISH = "Рыба"
-    INSECT = "Насекомое"
-    AMPHIBIAN = "Амфибия"
-    FANTASY = "Фэнтези"
-    CRYSTAL = "Кристаллическое"
-    MECHANICAL = "Механическое"
-    ELEMENTAL = "Элементальное"
-    HYBRID = "Гибрид"
-
-
-class Size(Enum):
-    """Размеры существ"""
-    MICROSCOPIC = "Микроскопическое"
-    TINY = "Крошечное"
-    SMALL = "Маленькое"
-    MEDIUM = "Среднее"
-    LARGE = "Большое"
-    HUGE = "Огромное"
-    COLOSSAL = "Колоссальное"
 
+try:
+    from .constraints import ConstraintSolver, CreatureSelection
+    from .enums import CreatureType, Habitat, Size
+    from .translator import PhraseTranslator
+except ImportError:
+    # Запуск модуля как скрипта (python backend/generator/promt_gen.py)
+    from constraints import ConstraintSolver, CreatureSelection  # type: ignore
+    from enums import CreatureType, Habitat, Size  # type: ignore
+    from translator import PhraseTranslator  # type: ignore
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class CreatureCharacteristics:
@@ -66,774 +36,923 @@ class CreatureCharacteristics:
     environmental_adaptations: List[str] = field(default_factory=list)
 
 
-class CreatureGenerator:
-    """Генератор существ с логическими ограничениями"""
-    
-    def __init__(self):
-        self._initialize_data()
-        self._setup_constraints()
-        # Подготовка case-insensitive словаря переводов
-        self._build_ci_translations()
-        # Стадии развития и модификаторы промптов из глобальных настроек
-        try:
-            from config.settings import CREATURE_LIFE_STAGES, STAGE_PROMPT_MODIFIERS
-            self.life_stages = CREATURE_LIFE_STAGES
-            self.stage_modifiers = STAGE_PROMPT_MODIFIERS
-        except Exception:
-            # Фолбэк на случай отсутствия настроек
-            self.life_stages = {
-                "egg": {"ru": "яйцо", "en": "egg"},
-                "baby": {"ru": "детёныш", "en": "hatchling"},
-                "adult": {"ru": "взрослая особь", "en": "adult"}
-            }
-            self.stage_modifiers = {
-                "egg": {"ru": "одиночное яйцо", "en": "single egg"},
-                "baby": {"ru": "умилительные пропорции", "en": "cute proportions"},
-                "adult": {"ru": "полностью сформировавшиеся признаки", "en": "fully developed traits"}
-            }
-    
-    def _initialize_data(self):
-        """Инициализация данных о существах"""
-        
-        # Характеристики по средам обитания
-        self.habitat_data = {
-            Habitat.FOREST_TROPICAL: {
-                "types": [CreatureType.MAMMAL, CreatureType.REPTILE, CreatureType.FANTASY, CreatureType.HYBRID],
-                "surfaces": ["Шерсть", "Чешуя", "Кожа", "Перья", "Экзоскелет", "Панцирь"],
-                "form_rules": "Любая форма, кроме плавников",
-                "forbidden_features": ["Жабры", "Плавники", "Водные мембраны"],
-                "preferred_features": ["Конечности", "Хвост", "Уши"]
-            },
-            Habitat.GRASSLAND: {
-                "types": [CreatureType.MAMMAL, CreatureType.REPTILE, CreatureType.FANTASY, CreatureType.HYBRID],
-                "surfaces": ["Шерсть", "Чешуя", "Кожа", "Перья", "Экзоскелет", "Панцирь"],
-                "form_rules": "Любая форма, кроме плавников",
-                "forbidden_features": ["Жабры", "Плавники", "Водные мембраны"],
-                "preferred_features": ["Конечности", "Хвост", "Уши"]
-            },
-            Habitat.MOUNTAIN: {
-                "types": [CreatureType.MAMMAL, CreatureType.REPTILE, CreatureType.FANTASY, CreatureType.HYBRID],
-                "surfaces": ["Шерсть", "Чешуя", "Кожа", "Перья", "Экзоскелет", "Панцирь"],
-                "form_rules": "Любая форма, кроме плавников",
-                "forbidden_features": ["Жабры", "Плавники", "Водные мембраны"],
-                "preferred_features": ["Конечности", "Хвост", "Уши"]
-            },
-            Habitat.AQUATIC: {
-                "types": [CreatureType.FISH, CreatureType.FANTASY, CreatureType.AMPHIBIAN, CreatureType.HYBRID],
-                "surfaces": ["Чешуя", "Гладкая кожа", "Слизь", "Кристаллы", "Биолюминесцентная кожа"],
-                "form_rules": "Без крыльев и перьев, с плавательными приспособлениями",
-                "forbidden_features": ["Крылья", "Перья", "Сухопутные конечности"],
-                "preferred_features": ["Плавники", "Жабры", "Хвостовой плавник", "Боковая линия"]
-            },
-            Habitat.AERIAL: {
-                "types": [CreatureType.BIRD, CreatureType.INSECT, CreatureType.FANTASY, CreatureType.HYBRID],
-                "surfaces": ["Перья", "Крылья", "Легкий экзоскелет", "Мембраны"],
-                "form_rules": "Обязательны крылья, допустимы перья",
-                "forbidden_features": ["Тяжелый панцирь", "Водные приспособления"],
-                "preferred_features": ["Крылья", "Перья", "Легкие кости", "Аэродинамическая форма"]
-            },
-            Habitat.UNDERGROUND: {
-                "types": [CreatureType.INSECT, CreatureType.REPTILE, CreatureType.MAMMAL, CreatureType.HYBRID],
-                "surfaces": ["Гладкая кожа", "Панцирь", "Шипы", "Твердая чешуя"],
-                "form_rules": "Без крыльев, предпочтительно панцирь",
-                "forbidden_features": ["Крылья", "Перья", "Светлые цвета"],
-                "preferred_features": ["Копательные конечности", "Усики", "Темная окраска"]
-            },
-            Habitat.AMPHIBIOUS: {
-                "types": [CreatureType.AMPHIBIAN, CreatureType.FANTASY, CreatureType.HYBRID],
-                "surfaces": ["Слизь", "Кожа", "Легкая чешуя", "Водонепроницаемая кожа"],
-                "form_rules": "Без крыльев, с плавательными конечностями",
-                "forbidden_features": ["Крылья", "Тяжелый панцирь"],
-                "preferred_features": ["Перепонки", "Жабры и легкие", "Влажная кожа"]
-            },
-            Habitat.COSMIC: {
-                "types": [CreatureType.FANTASY, CreatureType.CRYSTAL, CreatureType.ELEMENTAL, CreatureType.HYBRID],
-                "surfaces": ["Кристаллы", "Металл", "Энергетическая оболочка", "Космическая материя"],
-                "form_rules": "Допустимы любые формы тела",
-                "forbidden_features": [],
-                "preferred_features": ["Энергетические поля", "Кристаллические структуры", "Необычные формы"]
-            },
-            Habitat.VOLCANIC: {
-                "types": [CreatureType.REPTILE, CreatureType.FANTASY, CreatureType.ELEMENTAL, CreatureType.HYBRID],
-                "surfaces": ["Огнеупорная чешуя", "Лавовая кожа", "Теплоизоляционный панцирь"],
-                "form_rules": "Устойчивость к высоким температурам",
-                "forbidden_features": ["Водные приспособления", "Холодолюбивые черты"],
-                "preferred_features": ["Тепловые рецепторы", "Огнестойкие покровы", "Темная окраска"]
-            },
-            Habitat.ARCTIC: {
-                "types": [CreatureType.MAMMAL, CreatureType.BIRD, CreatureType.FANTASY],
-                "surfaces": ["Густой мех", "Теплые перья", "Жировая прослойка", "Плотная кожа"],
-                "form_rules": "Адаптация к холоду",
-                "forbidden_features": ["Тропические черты", "Теплолюбивые адаптации"],
-                "preferred_features": ["Густой мех", "Жировая прослойка", "Компактная форма"]
-            },
-            Habitat.DESERT: {
-                "types": [CreatureType.REPTILE, CreatureType.MAMMAL, CreatureType.INSECT],
-                "surfaces": ["Сухая чешуя", "Песчаная кожа", "Водоудерживающая кожа"],
-                "form_rules": "Адаптация к засухе",
-                "forbidden_features": ["Водные приспособления", "Влажные покровы"],
-                "preferred_features": ["Водоудерживающие механизмы", "Песочная окраска", "Эффективная терморегуляция"]
-            },
-            Habitat.SWAMP: {
-                "types": [CreatureType.AMPHIBIAN, CreatureType.REPTILE, CreatureType.FANTASY],
-                "surfaces": ["Влажная кожа", "Слизь", "Водонепроницаемая чешуя"],
-                "form_rules": "Адаптация к влажной среде",
-                "forbidden_features": ["Сухие покровы", "Пустынные адаптации"],
-                "preferred_features": ["Перепонки", "Влажная кожа", "Болотная окраска"]
-            }
-        }
-        
-        # Размеры и их характеристики
-        self.size_characteristics = {
-            Size.MICROSCOPIC: {"speed": "Очень медленное", "strength": "Минимальная", "visibility": "Почти невидимое"},
-            Size.TINY: {"speed": "Быстрое", "strength": "Слабая", "visibility": "Маленькое"},
-            Size.SMALL: {"speed": "Очень быстрое", "strength": "Умеренная", "visibility": "Заметное"},
-            Size.MEDIUM: {"speed": "Среднее", "strength": "Средняя", "visibility": "Обычное"},
-            Size.LARGE: {"speed": "Медленное", "strength": "Сильная", "visibility": "Крупное"},
-            Size.HUGE: {"speed": "Очень медленное", "strength": "Очень сильная", "visibility": "Огромное"},
-            Size.COLOSSAL: {"speed": "Крайне медленное", "strength": "Колоссальная", "visibility": "Гигантское"}
-        }
-        
-        # Детальные характеристики головы
-        self.head_variants = {
-            "eyes": [
-                "Одна пара круглых глаз",
-                "Три глаза треугольником",
-                "Множество маленьких глаз",
-                "Большие светящиеся глаза",
-                "Глаза с вертикальными зрачками",
-                "Сложные фасеточные глаза",
-                "Глаза с биолюминесценцией",
-                "Глаза с тепловым зрением"
-            ],
-            "mouths": [
-                "Клыкастая пасть",
-                "Клюв с острыми краями",
-                "Мягкие губы",
-                "Хоботок для сосания",
-                "Челюсти с множественными рядами зубов",
-                "Ротовой аппарат с хелицерами",
-                "Круглый рот с присосками",
-                "Многочисленные щупальца вокруг рта",
-                "Грызущие резцы"
-            ],
-            "appendages": [
-                "Длинные усы",
-                "Антенны с чувствительными рецепторами",
-                "Рога различной формы",
-                "Бивни",
-                "Грива",
-                "Длинные уши",
-                "Гребень на голове",
-                "Бородавки и наросты",
-                "Кристаллические выросты",
-                "Энергетические коронки",
-                "Биолюминесцентные органы"
-            ]
-        }
-        
-        # Характеристики тела
-        self.body_features = {
-            "limbs": [
-                "Четыре конечности с когтями",
-                "Четыре конечности с копытами",
-                "Четыре конечности с втяжными когтями",
-                "Шесть конечностей как у насекомого",
-                "Восемь щупалец",
-                "Щупальца с присосками",
-                "Крылья и две ноги",
-                "Передние клешни",
-                "Длинные сильные ноги",
-                "Плавники и хвост",
-                "Множественные придатки",
-                "Энергетические конечности",
-                "Кристаллические выросты"
-            ],
-            "torso": [
-                "Сегментированное тело",
-                "Гибкий позвоночник",
-                "Бронированная грудь",
-                "Прозрачные участки",
-                "Биолюминесцентные полосы",
-                "Кристаллические включения",
-                "Энергетические узоры",
-                "Множественные сердца"
-            ],
-            "tail": [
-                "Длинный хвост с чешуей",
-                "Хвост с ядовитым жалом",
-                "Пушистый хвост",
-                "Хвост-плавник",
-                "Хвост с биолюминесценцией",
-                "Кристаллический хвост",
-                "Энергетический хвост",
-                "Хвост с множественными отростками"
-            ]
-        }
-        
-        # Специальные способности
-        self.special_abilities = {
-            "combat": [
-                "Ядовитые железы",
-                "Электрические разряды",
-                "Кислотные выделения",
-                "Огненное дыхание",
-                "Ледяные кристаллы",
-                "Психические атаки",
-                "Клонирование",
-                "Телепортация",
-                "Выброс чернил",
-                "Сильный прикус",
-                "Удар клешнями"
-            ],
-            "defense": [
-                "Камуфляж",
-                "Бронированная кожа",
-                "Регенерация",
-                "Невидимость",
-                "Энергетический щит",
-                "Кристаллическая броня",
-                "Биолюминесцентное отвлечение",
-                "Множественные жизни",
-                "Сворачивание в клубок",
-                "Флуоресценция в УФ"
-            ],
-            "movement": [
-                "Полет",
-                "Плавание",
-                "Копание",
-                "Телепортация",
-                "Планирование",
-                "Быстрое бегание",
-                "Прыжки",
-                "Ползание по стенам",
-                "Бесшумный полет",
-                "Боковое передвижение"
-            ]
-        }
-        
-        # Цветовые схемы
-        self.coloration_schemes = {
-            "natural": ["Коричневый", "Зеленый", "Серый", "Черный", "Белый", "Рыжий"],
-            "bright": ["Красный", "Оранжевый", "Желтый", "Розовый", "Фиолетовый", "Голубой"],
-            "metallic": ["Золотой", "Серебряный", "Бронзовый", "Медный", "Платиновый"],
-            "crystal": ["Прозрачный", "Радужный", "Кристаллический", "Биолюминесцентный"],
-            "dark": ["Черный", "Темно-синий", "Темно-фиолетовый", "Темно-зеленый"],
-            "camouflage": ["Песочный", "Лесной", "Снежный", "Болотный", "Скальный"]
+def _initialize_data() -> Dict[str, Any]:
+    """Исходные справочники о существах (компилируются один раз при импорте модуля)"""
+    # Характеристики по средам обитания
+    habitat_data = {
+        Habitat.FOREST_TROPICAL: {
+            "types": [CreatureType.MAMMAL, CreatureType.REPTILE, CreatureType.FANTASY, CreatureType.HYBRID],
+            "surfaces": ["Шерсть", "Чешуя", "Кожа", "Перья", "Экзоскелет", "Панцирь"],
+            "form_rules": "Любая форма, кроме плавников",
+            "forbidden_features": ["Жабры", "Плавники", "Водные мембраны"],
+            "preferred_features": ["Конечности", "Хвост", "Уши"]
+        },
+        Habitat.GRASSLAND: {
+            "types": [CreatureType.MAMMAL, CreatureType.REPTILE, CreatureType.FANTASY, CreatureType.HYBRID],
+            "surfaces": ["Шерсть", "Чешуя", "Кожа", "Перья", "Экзоскелет", "Панцирь"],
+            "form_rules": "Любая форма, кроме плавников",
+            "forbidden_features": ["Жабры", "Плавники", "Водные мембраны"],
+            "preferred_features": ["Конечности", "Хвост", "Уши"]
+        },
+        Habitat.MOUNTAIN: {
+            "types": [CreatureType.MAMMAL, CreatureType.REPTILE, CreatureType.FANTASY, CreatureType.HYBRID],
+            "surfaces": ["Шерсть", "Чешуя", "Кожа", "Перья", "Экзоскелет", "Панцирь"],
+            "form_rules": "Любая форма, кроме плавников",
+            "forbidden_features": ["Жабры", "Плавники", "Водные мембраны"],
+            "preferred_features": ["Конечности", "Хвост", "Уши"]
+        },
+        Habitat.AQUATIC: {
+            "types": [CreatureType.FISH, CreatureType.FANTASY, CreatureType.AMPHIBIAN, CreatureType.HYBRID],
+            "surfaces": ["Чешуя", "Гладкая кожа", "Слизь", "Кристаллы", "Биолюминесцентная кожа"],
+            "form_rules": "Без крыльев и перьев, с плавательными приспособлениями",
+            "forbidden_features": ["Крылья", "Перья", "Сухопутные конечности"],
+            "preferred_features": ["Плавники", "Жабры", "Хвостовой плавник", "Боковая линия"]
+        },
+        Habitat.AERIAL: {
+            "types": [CreatureType.BIRD, CreatureType.INSECT, CreatureType.FANTASY, CreatureType.HYBRID],
+            "surfaces": ["Перья", "Крылья", "Легкий экзоскелет", "Мембраны"],
+            "form_rules": "Обязательны крылья, допустимы перья",
+            "forbidden_features": ["Тяжелый панцирь", "Водные приспособления"],
+            "preferred_features": ["Крылья", "Перья", "Легкие кости", "Аэродинамическая форма"]
+        },
+        Habitat.UNDERGROUND: {
+            "types": [CreatureType.INSECT, CreatureType.REPTILE, CreatureType.MAMMAL, CreatureType.HYBRID],
+            "surfaces": ["Гладкая кожа", "Панцирь", "Шипы", "Твердая чешуя"],
+            "form_rules": "Без крыльев, предпочтительно панцирь",
+            "forbidden_features": ["Крылья", "Перья", "Светлые цвета"],
+            "preferred_features": ["Копательные конечности", "Усики", "Темная окраска"]
+        },
+        Habitat.AMPHIBIOUS: {
+            "types": [CreatureType.AMPHIBIAN, CreatureType.FANTASY, CreatureType.HYBRID],
+            "surfaces": ["Слизь", "Кожа", "Легкая чешуя", "Водонепроницаемая кожа"],
+            "form_rules": "Без крыльев, с плавательными конечностями",
+            "forbidden_features": ["Крылья", "Тяжелый панцирь"],
+            "preferred_features": ["Перепонки", "Жабры и легкие", "Влажная кожа"]
+        },
+        Habitat.COSMIC: {
+            "types": [CreatureType.FANTASY, CreatureType.CRYSTAL, CreatureType.ELEMENTAL, CreatureType.HYBRID],
+            "surfaces": ["Кристаллы", "Металл", "Энергетическая оболочка", "Космическая материя"],
+            "form_rules": "Допустимы любые формы тела",
+            "forbidden_features": [],
+            "preferred_features": ["Энергетические поля", "Кристаллические структуры", "Необычные формы"]
+        },
+        Habitat.VOLCANIC: {
+            "types": [CreatureType.REPTILE, CreatureType.FANTASY, CreatureType.ELEMENTAL, CreatureType.HYBRID],
+            "surfaces": ["Огнеупорная чешуя", "Лавовая кожа", "Теплоизоляционный панцирь"],
+            "form_rules": "Устойчивость к высоким температурам",
+            "forbidden_features": ["Водные приспособления", "Холодолюбивые черты"],
+            "preferred_features": ["Тепловые рецепторы", "Огнестойкие покровы", "Темная окраска"]
+        },
+        Habitat.ARCTIC: {
+            "types": [CreatureType.MAMMAL, CreatureType.BIRD, CreatureType.FANTASY],
+            "surfaces": ["Густой мех", "Теплые перья", "Жировая прослойка", "Плотная кожа"],
+            "form_rules": "Адаптация к холоду",
+            "forbidden_features": ["Тропические черты", "Теплолюбивые адаптации"],
+            "preferred_features": ["Густой мех", "Жировая прослойка", "Компактная форма"]
+        },
+        Habitat.DESERT: {
+            "types": [CreatureType.REPTILE, CreatureType.MAMMAL, CreatureType.INSECT],
+            "surfaces": ["Сухая чешуя", "Песчаная кожа", "Водоудерживающая кожа"],
+            "form_rules": "Адаптация к засухе",
+            "forbidden_features": ["Водные приспособления", "Влажные покровы"],
+            "preferred_features": ["Водоудерживающие механизмы", "Песочная окраска", "Эффективная терморегуляция"]
+        },
+        Habitat.SWAMP: {
+            "types": [CreatureType.AMPHIBIAN, CreatureType.REPTILE, CreatureType.FANTASY],
+            "surfaces": ["Влажная кожа", "Слизь", "Водонепроницаемая чешуя"],
+            "form_rules": "Адаптация к влажной среде",
+            "forbidden_features": ["Сухие покровы", "Пустынные адаптации"],
+            "preferred_features": ["Перепонки", "Влажная кожа", "Болотная окраска"]
         }
-        
-        # Поведенческие черты
-        self.behavior_traits = [
-            "Агрессивный охотник",
-            "Мирный травоядный",
-            "Социальное существо",
-            "Одиночка",
-            "Ночной образ жизни",
-            "Дневной образ жизни",
-            "Территориальный",
-            "Кочевой",
-            "Интеллектуальный",
-            "Инстинктивный",
-            "Любопытный",
-            "Осторожный",
-            "Игривый",
-            "Серьезный",
-            "Хитрый",
-            "Скрытный",
-            "Засадный хищник",
-            "Пугливый",
-            "Стадное поведение"
+    }
+
+    # Размеры и их характеристики
+    size_characteristics = {
+        Size.MICROSCOPIC: {"speed": "Очень медленное", "strength": "Минимальная", "visibility": "Почти невидимое"},
+        Size.TINY: {"speed": "Быстрое", "strength": "Слабая", "visibility": "Маленькое"},
+        Size.SMALL: {"speed": "Очень быстрое", "strength": "Умеренная", "visibility": "Заметное"},
+        Size.MEDIUM: {"speed": "Среднее", "strength": "Средняя", "visibility": "Обычное"},
+        Size.LARGE: {"speed": "Медленное", "strength": "Сильная", "visibility": "Крупное"},
+        Size.HUGE: {"speed": "Очень медленное", "strength": "Очень сильная", "visibility": "Огромное"},
+        Size.COLOSSAL: {"speed": "Крайне медленное", "strength": "Колоссальная", "visibility": "Гигантское"}
+    }
+
+    # Детальные характеристики головы
+    head_variants = {
+        "eyes": [
+            "Одна пара круглых глаз",
+            "Три глаза треугольником",
+            "Множество маленьких глаз",
+            "Большие светящиеся глаза",
+            "Глаза с вертикальными зрачками",
+            "Сложные фасеточные глаза",
+            "Глаза с биолюминесценцией",
+            "Глаза с тепловым зрением"
+        ],
+        "mouths": [
+            "Клыкастая пасть",
+            "Клюв с острыми краями",
+            "Мягкие губы",
+            "Хоботок для сосания",
+            "Челюсти с множественными рядами зубов",
+            "Ротовой аппарат с хелицерами",
+            "Круглый рот с присосками",
+            "Многочисленные щупальца вокруг рта",
+            "Грызущие резцы"
+        ],
+        "appendages": [
+            "Длинные усы",
+            "Антенны с чувствительными рецепторами",
+            "Рога различной формы",
+            "Бивни",
+            "Грива",
+            "Длинные уши",
+            "Гребень на голове",
+            "Бородавки и наросты",
+            "Кристаллические выросты",
+            "Энергетические коронки",
+            "Биолюминесцентные органы"
         ]
-        
-        # Экологические адаптации
-        self.environmental_adaptations = {
-            Habitat.FOREST_TROPICAL: [
-                "Эффективная терморегуляция",
-                "Развитые органы чувств",
-                "Адаптация к различным ландшафтам",
-                "Эффективные конечности для передвижения"
-            ],
-            Habitat.GRASSLAND: [
-                "Эффективная терморегуляция",
-                "Развитые органы чувств",
-                "Адаптация к различным ландшафтам",
-                "Эффективные конечности для передвижения"
-            ],
-            Habitat.MOUNTAIN: [
-                "Эффективная терморегуляция",
-                "Развитые органы чувств",
-                "Адаптация к различным ландшафтам",
-                "Эффективные конечности для передвижения"
-            ],
-            Habitat.AQUATIC: [
-                "Жабры для дыхания",
-                "Плавательный пузырь",
-                "Боковая линия для ориентации",
-                "Гидродинамическая форма тела"
-            ],
-            Habitat.AERIAL: [
-                "Полые кости для легкости",
-                "Развитые мышцы крыльев",
-                "Острое зрение",
-                "Аэродинамическая форма"
-            ],
-            Habitat.UNDERGROUND: [
-                "Копательные конечности",
-                "Развитое обоняние",
-                "Сниженное зрение",
-                "Адаптация к темноте"
-            ],
-            Habitat.AMPHIBIOUS: [
-                "Двойное дыхание",
-                "Влажная кожа",
-                "Перепонки",
-                "Адаптация к двум средам"
-            ],
-            Habitat.COSMIC: [
-                "Независимость от кислорода",
-                "Радиационная устойчивость",
-                "Энергетическая подпитка",
-                "Космическая навигация"
-            ]
-        }
+    }
 
-        # Словари для перевода на английский
-        self.english_translations = {
-            # Среды обитания
-            "Тропический лес": "tropical forest", "Луговое": "grassland", "Горное": "mountain",
-            "Водное": "aquatic", "Воздушное": "aerial", 
-            "Подземное": "underground", "Амфибия": "amphibious", "Космическое": "cosmic",
-            "Вулканическое": "volcanic", "Арктическое": "arctic", "Пустынное": "desert", "Болотное": "swamp",
-            
-            # Типы существ
-            "Млекопитающее": "mammal", "Рептилия": "reptile", "Птица": "bird", "Рыба": "fish",
-            "Насекомое": "insect", "Амфибия": "amphibian", "Фэнтези": "fantasy hybrid",
-            "Кристаллическое": "crystalline", "Механическое": "mechanical", "Элементальное": "elemental",
-            "Гибрид": "hybrid",
-            
-            # Размеры
-            "Микроскопическое": "microscopic", "Крошечное": "tiny", "Маленькое": "small",
-            "Среднее": "medium", "Большое": "large", "Огромное": "huge", "Колоссальное": "colossal",
-            
-            # Покрытия
-            "Шерсть": "fur", "Чешуя": "scales", "Кожа": "skin", "Перья": "feathers",
-            "Экзоскелет": "exoskeleton", "Панцирь": "shell", "Гладкая кожа": "smooth skin",
-            "Слизь": "slime", "Кристаллы": "crystals", "Биолюминесцентная кожа": "bioluminescent skin",
-            "Крылья": "wings", "Легкий экзоскелет": "light exoskeleton", "Мембраны": "membranes",
-            "Шипы": "spikes", "Твердая чешуя": "hard scales", "Слизь": "mucus",
-            "Водонепроницаемая кожа": "waterproof skin", "Кристаллы": "crystal",
-            "Металл": "metal", "Энергетическая оболочка": "energy shell", "Космическая материя": "cosmic matter",
-            "Огнеупорная чешуя": "fireproof scales", "Лавовая кожа": "lava skin",
-            "Теплоизоляционный панцирь": "heat-insulating shell", "Густой мех": "thick fur",
-            "Теплые перья": "warm feathers", "Жировая прослойка": "fat layer", "Плотная кожа": "thick skin",
-            "Сухая чешуя": "dry scales", "Песочная кожа": "sandy skin", "Водоудерживающая кожа": "water-retaining skin",
-            "Влажная кожа": "wet skin", "Водонепроницаемая чешуя": "waterproof scales",
-            
-            # Глаза
-            "Одна пара круглых глаз": "one pair of round eyes", "Три глаза треугольником": "three eyes in triangle",
-            "Множество маленьких глаз": "multiple small eyes", "Большие светящиеся глаза": "large glowing eyes",
-            "Глаза с вертикальными зрачками": "eyes with vertical pupils", "Сложные фасеточные глаза": "complex compound eyes",
-            "Глаза с биолюминесценцией": "bioluminescent eyes", "Глаза с тепловым зрением": "thermal vision eyes",
-            
-            # Рты
-            "Клыкастая пасть": "fanged mouth", "Клюв с острыми краями": "sharp-beaked mouth",
-            "Мягкие губы": "soft lips", "Хоботок для сосания": "sucking proboscis",
-            "Челюсти с множественными рядами зубов": "jaws with multiple rows of teeth",
-            "Ротовой аппарат с хелицерами": "mouth with chelicerae", "Круглый рот с присосками": "round mouth with suckers",
-            "Многочисленные щупальца вокруг рта": "numerous tentacles around mouth",
-            "Грызущие резцы": "gnawing incisors",
-            
-            # Придатки
-            "Длинные усы": "long whiskers", "Антенны с чувствительными рецепторами": "antennae with sensitive receptors",
-            "Рога различной формы": "horns of various shapes", "Бивни": "tusks", "Грива": "mane", "Длинные уши": "long ears", "Гребень на голове": "crest on head",
-            "Бородавки и наросты": "warts and growths", "Кристаллические выросты": "crystalline growths",
-            "Энергетические коронки": "energy crowns", "Биолюминесцентные органы": "bioluminescent organs",
-            
-            # Конечности
-            "Четыре конечности с когтями": "four limbs with claws", "Четыре конечности с копытами": "four limbs with hooves", "Четыре конечности с втяжными когтями": "four limbs with retractable claws", "Шесть конечностей как у насекомого": "six insect-like limbs",
-            "Восемь щупалец": "eight tentacles", "Щупальца с присосками": "tentacles with suckers", "Крылья и две ноги": "wings and two legs",
-            "Передние клешни": "front claws", "Длинные сильные ноги": "long powerful legs", "Плавники и хвост": "fins and tail", "Множественные придатки": "multiple appendages",
-            "Энергетические конечности": "energy limbs", "Кристаллические выросты": "crystalline appendages",
-            
-            # Тело
-            "Сегментированное тело": "segmented body", "Гибкий позвоночник": "flexible spine",
-            "Бронированная грудь": "armored chest", "Прозрачные участки": "transparent areas",
-            "Биолюминесцентные полосы": "bioluminescent stripes", "Кристаллические включения": "crystalline inclusions",
-            "Энергетические узоры": "energy patterns", "Множественные сердца": "multiple hearts",
-            
-            # Хвосты
-            "Длинный хвост с чешуей": "long scaly tail", "Хвост с ядовитым жалом": "tail with venomous stinger",
-            "Пушистый хвост": "fluffy tail", "Хвост-плавник": "fin-like tail",
-            "Хвост с биолюминесценцией": "bioluminescent tail", "Кристаллический хвост": "crystalline tail",
-            "Энергетический хвост": "energy tail", "Хвост с множественными отростками": "tail with multiple appendages",
-            
-            # Способности
-            "Ядовитые железы": "venom glands", "Электрические разряды": "electric discharges",
-            "Кислотные выделения": "acid secretions", "Огненное дыхание": "fire breath",
-            "Ледяные кристаллы": "ice crystals", "Психические атаки": "psychic attacks",
-            "Клонирование": "cloning", "Телепортация": "teleportation", "Камуфляж": "camouflage",
-            "Бронированная кожа": "armored skin", "Регенерация": "regeneration",
-            "Невидимость": "invisibility", "Энергетический щит": "energy shield",
-            "Кристаллическая броня": "crystalline armor", "Биолюминесцентное отвлечение": "bioluminescent distraction",
-            "Множественные жизни": "multiple lives", "Полет": "flight", "Плавание": "swimming",
-            "Копание": "digging", "Планирование": "gliding", "Быстрое бегание": "fast running",
-            "Прыжки": "jumping", "Ползание по стенам": "wall crawling", "Выброс чернил": "ink jet",
-            "Сильный прикус": "powerful bite", "Удар клешнями": "claw strike",
-            "Сворачивание в клубок": "curling into a ball", "Флуоресценция в УФ": "UV fluorescence",
-            
-            # Цвета
-            "Коричневый": "brown", "Зеленый": "green", "Серый": "gray", "Черный": "black",
-            "Белый": "white", "Рыжий": "reddish", "Красный": "red", "Оранжевый": "orange",
-            "Желтый": "yellow", "Розовый": "pink", "Фиолетовый": "purple", "Голубой": "blue",
-            "Золотой": "golden", "Серебряный": "silver", "Бронзовый": "bronze", "Медный": "copper",
-            "Платиновый": "platinum", "Прозрачный": "transparent", "Радужный": "rainbow",
-            "Кристаллический": "crystalline", "Биолюминесцентный": "bioluminescent",
-            "Темно-синий": "dark blue", "Темно-фиолетовый": "dark purple", "Темно-зеленый": "dark green",
-            "Песочный": "sand", "Лесной": "forest", "Снежный": "snow", "Болотный": "swamp",
-            "Скальный": "rock",
-            
-            # Поведение
-            "Агрессивный охотник": "aggressive hunter", "Мирный травоядный": "peaceful herbivore",
-            "Социальное существо": "social creature", "Одиночка": "solitary",
-            "Ночной образ жизни": "nocturnal", "Дневной образ жизни": "diurnal",
-            "Территориальный": "territorial", "Кочевой": "nomadic", "Интеллектуальный": "intelligent",
-            "Инстинктивный": "instinctive", "Любопытный": "curious", "Осторожный": "cautious",
-            "Игривый": "playful", "Серьезный": "serious", "Хитрый": "cunning", "Скрытный": "stealthy",
-            "Засадный хищник": "ambush predator", "Пугливый": "skittish", "Стадное поведение": "herd behavior",
-
-            # Доп. движения
-            "Бесшумный полет": "silent flight", "Боковое передвижение": "sideways movement",
-            
-            # Адаптации
-            "Эффективная терморегуляция": "efficient thermoregulation", "Развитые органы чувств": "developed sensory organs",
-            "Адаптация к различным ландшафтам": "adaptation to various landscapes",
-            "Эффективные конечности для передвижения": "efficient limbs for movement",
-            "Жабры для дыхания": "gills for breathing", "Плавательный пузырь": "swim bladder",
-            "Боковая линия для ориентации": "lateral line for orientation",
-            "Гидродинамическая форма тела": "hydrodynamic body shape", "Полые кости для легкости": "hollow bones for lightness",
-            "Развитые мышцы крыльев": "developed wing muscles", "Острое зрение": "sharp vision",
-            "Аэродинамическая форма": "aerodynamic shape", "Копательные конечности": "digging limbs",
-            "Развитое обоняние": "developed sense of smell", "Сниженное зрение": "reduced vision",
-            "Адаптация к темноте": "adaptation to darkness", "Двойное дыхание": "dual breathing",
-            "Влажная кожа": "wet skin", "Перепонки": "webbed feet", "Адаптация к двум средам": "adaptation to two environments",
-            "Независимость от кислорода": "oxygen independence", "Радиационная устойчивость": "radiation resistance",
-            "Энергетическая подпитка": "energy feeding", "Космическая навигация": "cosmic navigation",
-            
-            # Дополнительные переводы для непереведенных слов
-            "ротовой аппарат с хелицерами": "mouth with chelicerae",
-            "биолюминесцентные органы": "bioluminescent organs",
-            "кристаллические выросты": "crystalline growths",
-            "множественные сердца": "multiple hearts",
-            "хвост с множественными отростками": "tail with multiple appendages",
-            "телепортация": "teleportation",
-            "ядовитые железы": "venom glands",
-            "камуфляж": "camouflage",
-            "лесной": "forest",
-            "агрессивный охотник": "aggressive hunter",
-            "одиночка": "solitary",
-            "инстинктивный": "instinctive",
-            "песчаная кожа": "sandy skin",
-            "адаптация к засухе": "adaptation to drought",
-            "бородавки и наросты": "warts and growths",
-            "крылья и две ноги": "wings and two legs",
-            "гибкий позвоночник": "flexible spine",
-            "клонирование": "cloning",
-            "кислотные выделения": "acid secretions",
-            "планирование": "gliding",
-            "дневной образ жизни": "diurnal",
-            "любопытный": "curious",
-            "социальное существо": "social creature",
-            "кристаллы": "crystals",
-            "без крыльев и перьев, с плавательными приспособлениями": "without wings and feathers, with swimming adaptations",
-            "энергетические коронки": "energy crowns",
-            "восемь щупалец": "eight tentacles",
-            "биолюминесцентные полосы": "bioluminescent stripes",
-            "хвост с ядовитым жалом": "tail with venomous stinger",
-            "жабры для дыхания": "gills for breathing",
-            "плавательный пузырь": "swim bladder",
-            "энергетический щит": "energy shield",
-            "ползание по стенам": "wall crawling",
-            "кристаллический": "crystalline",
-            "переливающиеся чешуйки": "iridescent scales",
-            "клюв с острыми краями": "sharp beak",
-            "хвост с биолюминесценцией": "bioluminescent tail",
-            "огненное дыхание": "fire breath",
-            "копание": "digging",
-            "прыжки": "jumping",
-            "песочный": "sand",
-            "болотный": "swamp",
-            "серьезный": "serious",
-            "игривый": "playful",
-            "копательные конечности": "digging limbs",
-            "развитое обоняние": "developed sense of smell",
-            "сниженное зрение": "reduced vision",
-            "адаптация к темноте": "adaptation to darkness",
-            "прозрачные участки": "transparent areas",
-            "антенны с чувствительными рецепторами": "antennae with sensitive receptors",
-            "множественные жизни": "multiple lives",
-            "ледяные кристаллы": "ice crystals",
-            "бронзовый": "bronze",
-            "серебряный": "silver",
-            "мирный травоядный": "peaceful herbivore",
-            "ночной образ жизни": "nocturnal",
-            "двойное дыхание": "dual breathing",
-            "адаптация к двум средам": "adaptation to two environments",
-            "четыре конечности с когтями": "four limbs with claws",
-            "боковая линия для ориентации": "lateral line for orientation",
-            "гидродинамическая форма тела": "hydrodynamic body shape",
-            "быстрое бегание": "fast running",
-            "металлический блеск": "metallic shine",
-            "без крыльев, предпочтительно панцирь": "without wings, preferably with shell",
-            "глаза с вертикальными зрачками": "eyes with vertical pupils",
-            "круглый рот с присосками": "round mouth with suckers",
-            "кристаллическая броня": "crystalline armor",
-            "полет": "flight",
-            "территориальный": "territorial",
-            "осторожный": "cautious",
-            "независимость от кислорода": "oxygen independence",
-            "радиационная устойчивость": "radiation resistance",
-            "энергетическая подпитка": "energy feeding",
-            "космическая навигация": "cosmic navigation",
-            "допустимы любые формы тела": "any body forms allowed",
-            "энергетический хвост": "energy tail",
-            "психические атаки": "psychic attacks",
-            "зеленый": "green",
-            "множество маленьких глаз": "multiple small eyes",
-            "длинные усы": "long whiskers",
-            "энергетические конечности": "energy limbs",
-            "платиновый": "platinum",
-            "золотой": "golden",
-            "без крыльев, с плавательными конечностями": "without wings, with swimming limbs"
-        }
-    
-    def _setup_constraints(self):
-        """Настройка логических ограничений"""
-        
-        # Несовместимые комбинации (для HYBRID действуют минимальные ограничения: только физически невозможные)
-        base_incompatible = {
-            "Крылья": ["Плавники", "Жабры", "Водные мембраны"],
-            "Плавники": ["Крылья", "Перья", "Сухопутные конечности"],
-            "Жабры": ["Крылья", "Перья", "Сухопутные конечности"],
-            "Перья": ["Плавники", "Жабры", "Водные мембраны"],
-            "Огненное дыхание": ["Водные адаптации", "Ледяные способности"],
-            "Ледяные кристаллы": ["Огненные способности", "Вулканические адаптации"],
-            "Биолюминесценция": ["Темная окраска", "Камуфляж"],
-            "Невидимость": ["Яркая окраска", "Биолюминесценция"]
-        }
-        # Для простоты: храним базовый набор, а при генерации проверяем тип существа
-        self.incompatible_features = base_incompatible
-        
-        # Обязательные комбинации
-        self.required_combinations = {
-            Habitat.AERIAL: ["Крылья"],
-            Habitat.AQUATIC: ["Плавники"],
-            Habitat.UNDERGROUND: ["Копательные конечности"],
-            Habitat.AMPHIBIOUS: ["Перепонки"],
-            Size.COLOSSAL: ["Множественные сердца"],
-            CreatureType.CRYSTAL: ["Кристаллические структуры"]
-        }
+    # Характеристики тела
+    body_features = {
+        "limbs": [
+            "Четыре конечности с когтями",
+            "Четыре конечности с копытами",
+            "Четыре конечности с втяжными когтями",
+            "Шесть конечностей как у насекомого",
+            "Восемь щупалец",
+            "Щупальца с присосками",
+            "Крылья и две ноги",
+            "Передние клешни",
+            "Длинные сильные ноги",
+            "Плавники и хвост",
+            "Множественные придатки",
+            "Энергетические конечности",
+            "Кристаллические выросты"
+        ],
+        "torso": [
+            "Сегментированное тело",
+            "Гибкий позвоночник",
+            "Бронированная грудь",
+            "Прозрачные участки",
+            "Биолюминесцентные полосы",
+            "Кристаллические включения",
+            "Энергетические узоры",
+            "Множественные сердца"
+        ],
+        "tail": [
+            "Длинный хвост с чешуей",
+            "Хвост с ядовитым жалом",
+            "Пушистый хвост",
+            "Хвост-плавник",
+            "Хвост с биолюминесценцией",
+            "Кристаллический хвост",
+            "Энергетический хвост",
+            "Хвост с множественными отростками"
+        ]
+    }
+
+    # Специальные способности
+    special_abilities = {
+        "combat": [
+            "Ядовитые железы",
+            "Электрические разряды",
+            "Кислотные выделения",
+            "Огненное дыхание",
+            "Ледяные кристаллы",
+            "Психические атаки",
+            "Клонирование",
+            "Телепортация",
+            "Выброс чернил",
+            "Сильный прикус",
+            "Удар клешнями"
+        ],
+        "defense": [
+            "Камуфляж",
+            "Бронированная кожа",
+            "Регенерация",
+            "Невидимость",
+            "Энергетический щит",
+            "Кристаллическая броня",
+            "Биолюминесцентное отвлечение",
+            "Множественные жизни",
+            "Сворачивание в клубок",
+            "Флуоресценция в УФ"
+        ],
+        "movement": [
+            "Полет",
+            "Плавание",
+            "Копание",
+            "Телепортация",
+            "Планирование",
+            "Быстрое бегание",
+            "Прыжки",
+            "Ползание по стенам",
+            "Бесшумный полет",
+            "Боковое передвижение"
+        ]
+    }
+
+    # Цветовые схемы
+    coloration_schemes = {
+        "natural": ["Коричневый", "Зеленый", "Серый", "Черный", "Белый", "Рыжий"],
+        "bright": ["Красный", "Оранжевый", "Желтый", "Розовый", "Фиолетовый", "Голубой"],
+        "metallic": ["Золотой", "Серебряный", "Бронзовый", "Медный", "Платиновый"],
+        "crystal": ["Прозрачный", "Радужный", "Кристаллический", "Биолюминесцентный"],
+        "dark": ["Черный", "Темно-синий", "Темно-фиолетовый", "Темно-зеленый"],
+        "camouflage": ["Песочный", "Лесной", "Снежный", "Болотный", "Скальный"]
+    }
+    # Схема окраски, навязанная средой (в остальных средах схема случайна)
+    forced_color_schemes = {
+        Habitat.UNDERGROUND: "camouflage",
+        Habitat.DESERT: "camouflage",
+        Habitat.COSMIC: "crystal",
+        Habitat.VOLCANIC: "bright",
+    }
+
+    # Поведенческие черты
+    behavior_traits = [
+        "Агрессивный охотник",
+        "Мирный травоядный",
+        "Социальное существо",
+        "Одиночка",
+        "Ночной образ жизни",
+        "Дневной образ жизни",
+        "Территориальный",
+        "Кочевой",
+        "Интеллектуальный",
+        "Инстинктивный",
+        "Любопытный",
+        "Осторожный",
+        "Игривый",
+        "Серьезный",
+        "Хитрый",
+        "Скрытный",
+        "Засадный хищник",
+        "Пугливый",
+        "Стадное поведение"
+    ]
+
+    # Экологические адаптации
+    environmental_adaptations = {
+        Habitat.FOREST_TROPICAL: [
+            "Эффективная терморегуляция",
+            "Развитые органы чувств",
+            "Адаптация к различным ландшафтам",
+            "Эффективные конечности для передвижения"
+        ],
+        Habitat.GRASSLAND: [
+            "Эффективная терморегуляция",
+            "Развитые органы чувств",
+            "Адаптация к различным ландшафтам",
+            "Эффективные конечности для передвижения"
+        ],
+        Habitat.MOUNTAIN: [
+            "Эффективная терморегуляция",
+            "Развитые органы чувств",
+            "Адаптация к различным ландшафтам",
+            "Эффективные конечности для передвижения"
+        ],
+        Habitat.AQUATIC: [
+            "Жабры для дыхания",
+            "Плавательный пузырь",
+            "Боковая линия для ориентации",
+            "Гидродинамическая форма тела"
+        ],
+        Habitat.AERIAL: [
+            "Полые кости для легкости",
+            "Развитые мышцы крыльев",
+            "Острое зрение",
+            "Аэродинамическая форма"
+        ],
+        Habitat.UNDERGROUND: [
+            "Копательные конечности",
+            "Развитое обоняние",
+            "Сниженное зрение",
+            "Адаптация к темноте"
+        ],
+        Habitat.AMPHIBIOUS: [
+            "Двойное дыхание",
+            "Влажная кожа",
+            "Перепонки",
+            "Адаптация к двум средам"
+        ],
+        Habitat.COSMIC: [
+            "Независимость от кислорода",
+            "Радиационная устойчивость",
+            "Энергетическая подпитка",
+            "Космическая навигация"
+        ]
+    }
+
+    # Словари для перевода на английский
+    english_translations = {
+        # Среды обитания
+        "Тропический лес": "tropical forest", "Луговое": "grassland", "Горное": "mountain",
+        "Водное": "aquatic", "Воздушное": "aerial", 
+        "Подземное": "underground", "Амфибия": "amphibious", "Космическое": "cosmic",
+        "Вулканическое": "volcanic", "Арктическое": "arctic", "Пустынное": "desert", "Болотное": "swamp",
+
+        # Типы существ
+        "Млекопитающее": "mammal", "Рептилия": "reptile", "Птица": "bird", "Рыба": "fish",
+        "Насекомое": "insect", "Амфибия": "amphibian", "Фэнтези": "fantasy hybrid",
+        "Кристаллическое": "crystalline", "Механическое": "mechanical", "Элементальное": "elemental",
+        "Гибрид": "hybrid",
+
+        # Размеры
+        "Микроскопическое": "microscopic", "Крошечное": "tiny", "Маленькое": "small",
+        "Среднее": "medium", "Большое": "large", "Огромное": "huge", "Колоссальное": "colossal",
+
+        # Покрытия
+        "Шерсть": "fur", "Чешуя": "scales", "Кожа": "skin", "Перья": "feathers",
+        "Экзоскелет": "exoskeleton", "Панцирь": "shell", "Гладкая кожа": "smooth skin",
+        "Слизь": "slime", "Кристаллы": "crystals", "Биолюминесцентная кожа": "bioluminescent skin",
+        "Крылья": "wings", "Легкий экзоскелет": "light exoskeleton", "Мембраны": "membranes",
+        "Шипы": "spikes", "Твердая чешуя": "hard scales", "Слизь": "mucus",
+        "Водонепроницаемая кожа": "waterproof skin", "Кристаллы": "crystal",
+        "Металл": "metal", "Энергетическая оболочка": "energy shell", "Космическая материя": "cosmic matter",
+        "Огнеупорная чешуя": "fireproof scales", "Лавовая кожа": "lava skin",
+        "Теплоизоляционный панцирь": "heat-insulating shell", "Густой мех": "thick fur",
+        "Теплые перья": "warm feathers", "Жировая прослойка": "fat layer", "Плотная кожа": "thick skin",
+        "Сухая чешуя": "dry scales", "Песочная кожа": "sandy skin", "Водоудерживающая кожа": "water-retaining skin",
+        "Влажная кожа": "wet skin", "Водонепроницаемая чешуя": "waterproof scales",
+
+        # Глаза
+        "Одна пара круглых глаз": "one pair of round eyes", "Три глаза треугольником": "three eyes in triangle",
+        "Множество маленьких глаз": "multiple small eyes", "Большие светящиеся глаза": "large glowing eyes",
+        "Глаза с вертикальными зрачками": "eyes with vertical pupils", "Сложные фасеточные глаза": "complex compound eyes",
+        "Глаза с биолюминесценцией": "bioluminescent eyes", "Глаза с тепловым зрением": "thermal vision eyes",
+
+        # Рты
+        "Клыкастая пасть": "fanged mouth", "Клюв с острыми краями": "sharp-beaked mouth",
+        "Мягкие губы": "soft lips", "Хоботок для сосания": "sucking proboscis",
+        "Челюсти с множественными рядами зубов": "jaws with multiple rows of teeth",
+        "Ротовой аппарат с хелицерами": "mouth with chelicerae", "Круглый рот с присосками": "round mouth with suckers",
+        "Многочисленные щупальца вокруг рта": "numerous tentacles around mouth",
+        "Грызущие резцы": "gnawing incisors",
+
+        # Придатки
+        "Длинные усы": "long whiskers", "Антенны с чувствительными рецепторами": "antennae with sensitive receptors",
+        "Рога различной формы": "horns of various shapes", "Бивни": "tusks", "Грива": "mane", "Длинные уши": "long ears", "Гребень на голове": "crest on head",
+        "Бородавки и наросты": "warts and growths", "Кристаллические выросты": "crystalline growths",
+        "Энергетические коронки": "energy crowns", "Биолюминесцентные органы": "bioluminescent organs",
+
+        # Конечности
+        "Четыре конечности с когтями": "four limbs with claws", "Четыре конечности с копытами": "four limbs with hooves", "Четыре конечности с втяжными когтями": "four limbs with retractable claws", "Шесть конечностей как у насекомого": "six insect-like limbs",
+        "Восемь щупалец": "eight tentacles", "Щупальца с присосками": "tentacles with suckers", "Крылья и две ноги": "wings and two legs",
+        "Передние клешни": "front claws", "Длинные сильные ноги": "long powerful legs", "Плавники и хвост": "fins and tail", "Множественные придатки": "multiple appendages",
+        "Энергетические конечности": "energy limbs", "Кристаллические выросты": "crystalline appendages",
+
+        # Тело
+        "Сегментированное тело": "segmented body", "Гибкий позвоночник": "flexible spine",
+        "Бронированная грудь": "armored chest", "Прозрачные участки": "transparent areas",
+        "Биолюминесцентные полосы": "bioluminescent stripes", "Кристаллические включения": "crystalline inclusions",
+        "Энергетические узоры": "energy patterns", "Множественные сердца": "multiple hearts",
+
+        # Хвосты
+        "Длинный хвост с чешуей": "long scaly tail", "Хвост с ядовитым жалом": "tail with venomous stinger",
+        "Пушистый хвост": "fluffy tail", "Хвост-плавник": "fin-like tail",
+        "Хвост с биолюминесценцией": "bioluminescent tail", "Кристаллический хвост": "crystalline tail",
+        "Энергетический хвост": "energy tail", "Хвост с множественными отростками": "tail with multiple appendages",
+
+        # Способности
+        "Ядовитые железы": "venom glands", "Электрические разряды": "electric discharges",
+        "Кислотные выделения": "acid secretions", "Огненное дыхание": "fire breath",
+        "Ледяные кристаллы": "ice crystals", "Психические атаки": "psychic attacks",
+        "Клонирование": "cloning", "Телепортация": "teleportation", "Камуфляж": "camouflage",
+        "Бронированная кожа": "armored skin", "Регенерация": "regeneration",
+        "Невидимость": "invisibility", "Энергетический щит": "energy shield",
+        "Кристаллическая броня": "crystalline armor", "Биолюминесцентное отвлечение": "bioluminescent distraction",
+        "Множественные жизни": "multiple lives", "Полет": "flight", "Плавание": "swimming",
+        "Копание": "digging", "Планирование": "gliding", "Быстрое бегание": "fast running",
+        "Прыжки": "jumping", "Ползание по стенам": "wall crawling", "Выброс чернил": "ink jet",
+        "Сильный прикус": "powerful bite", "Удар клешнями": "claw strike",
+        "Сворачивание в клубок": "curling into a ball", "Флуоресценция в УФ": "UV fluorescence",
+
+        # Цвета
+        "Коричневый": "brown", "Зеленый": "green", "Серый": "gray", "Черный": "black",
+        "Белый": "white", "Рыжий": "reddish", "Красный": "red", "Оранжевый": "orange",
+        "Желтый": "yellow", "Розовый": "pink", "Фиолетовый": "purple", "Голубой": "blue",
+        "Золотой": "golden", "Серебряный": "silver", "Бронзовый": "bronze", "Медный": "copper",
+        "Платиновый": "platinum", "Прозрачный": "transparent", "Радужный": "rainbow",
+        "Кристаллический": "crystalline", "Биолюминесцентный": "bioluminescent",
+        "Темно-синий": "dark blue", "Темно-фиолетовый": "dark purple", "Темно-зеленый": "dark green",
+        "Песочный": "sand", "Лесной": "forest", "Снежный": "snow", "Болотный": "swamp",
+        "Скальный": "rock",
+
+        # Поведение
+        "Агрессивный охотник": "aggressive hunter", "Мирный травоядный": "peaceful herbivore",
+        "Социальное существо": "social creature", "Одиночка": "solitary",
+        "Ночной образ жизни": "nocturnal", "Дневной образ жизни": "diurnal",
+        "Территориальный": "territorial", "Кочевой": "nomadic", "Интеллектуальный": "intelligent",
+        "Инстинктивный": "instinctive", "Любопытный": "curious", "Осторожный": "cautious",
+        "Игривый": "playful", "Серьезный": "serious", "Хитрый": "cunning", "Скрытный": "stealthy",
+        "Засадный хищник": "ambush predator", "Пугливый": "skittish", "Стадное поведение": "herd behavior",
+
+        # Доп. движения
+        "Бесшумный полет": "silent flight", "Боковое передвижение": "sideways movement",
+
+        # Адаптации
+        "Эффективная терморегуляция": "efficient thermoregulation", "Развитые органы чувств": "developed sensory organs",
+        "Адаптация к различным ландшафтам": "adaptation to various landscapes",
+        "Эффективные конечности для передвижения": "efficient limbs for movement",
+        "Жабры для дыхания": "gills for breathing", "Плавательный пузырь": "swim bladder",
+        "Боковая линия для ориентации": "lateral line for orientation",
+        "Гидродинамическая форма тела": "hydrodynamic body shape", "Полые кости для легкости": "hollow bones for lightness",
+        "Развитые мышцы крыльев": "developed wing muscles", "Острое зрение": "sharp vision",
+        "Аэродинамическая форма": "aerodynamic shape", "Копательные конечности": "digging limbs",
+        "Развитое обоняние": "developed sense of smell", "Сниженное зрение": "reduced vision",
+        "Адаптация к темноте": "adaptation to darkness", "Двойное дыхание": "dual breathing",
+        "Влажная кожа": "wet skin", "Перепонки": "webbed feet", "Адаптация к двум средам": "adaptation to two environments",
+        "Независимость от кислорода": "oxygen independence", "Радиационная устойчивость": "radiation resistance",
+        "Энергетическая подпитка": "energy feeding", "Космическая навигация": "cosmic navigation",
+
+        # Дополнительные переводы для непереведенных слов
+        "ротовой аппарат с хелицерами": "mouth with chelicerae",
+        "биолюминесцентные органы": "bioluminescent organs",
+        "кристаллические выросты": "crystalline growths",
+        "множественные сердца": "multiple hearts",
+        "хвост с множественными отростками": "tail with multiple appendages",
+        "телепортация": "teleportation",
+        "ядовитые железы": "venom glands",
+        "камуфляж": "camouflage",
+        "лесной": "forest",
+        "агрессивный охотник": "aggressive hunter",
+        "одиночка": "solitary",
+        "инстинктивный": "instinctive",
+        "песчаная кожа": "sandy skin",
+        "адаптация к засухе": "adaptation to drought",
+        "бородавки и наросты": "warts and growths",
+        "крылья и две ноги": "wings and two legs",
+        "гибкий позвоночник": "flexible spine",
+        "клонирование": "cloning",
+        "кислотные выделения": "acid secretions",
+        "планирование": "gliding",
+        "дневной образ жизни": "diurnal",
+        "любопытный": "curious",
+        "социальное существо": "social creature",
+        "кристаллы": "crystals",
+        "без крыльев и перьев, с плавательными приспособлениями": "without wings and feathers, with swimming adaptations",
+        "энергетические коронки": "energy crowns",
+        "восемь щупалец": "eight tentacles",
+        "биолюминесцентные полосы": "bioluminescent stripes",
+        "хвост с ядовитым жалом": "tail with venomous stinger",
+        "жабры для дыхания": "gills for breathing",
+        "плавательный пузырь": "swim bladder",
+        "энергетический щит": "energy shield",
+        "ползание по стенам": "wall crawling",
+        "кристаллический": "crystalline",
+        "переливающиеся чешуйки": "iridescent scales",
+        "клюв с острыми краями": "sharp beak",
+        "хвост с биолюминесценцией": "bioluminescent tail",
+        "огненное дыхание": "fire breath",
+        "копание": "digging",
+        "прыжки": "jumping",
+        "песочный": "sand",
+        "болотный": "swamp",
+        "серьезный": "serious",
+        "игривый": "playful",
+        "копательные конечности": "digging limbs",
+        "развитое обоняние": "developed sense of smell",
+        "сниженное зрение": "reduced vision",
+        "адаптация к темноте": "adaptation to darkness",
+        "прозрачные участки": "transparent areas",
+        "антенны с чувствительными рецепторами": "antennae with sensitive receptors",
+        "множественные жизни": "multiple lives",
+        "ледяные кристаллы": "ice crystals",
+        "бронзовый": "bronze",
+        "серебряный": "silver",
+        "мирный травоядный": "peaceful herbivore",
+        "ночной образ жизни": "nocturnal",
+        "двойное дыхание": "dual breathing",
+        "адаптация к двум средам": "adaptation to two environments",
+        "четыре конечности с когтями": "four limbs with claws",
+        "боковая линия для ориентации": "lateral line for orientation",
+        "гидродинамическая форма тела": "hydrodynamic body shape",
+        "быстрое бегание": "fast running",
+        "металлический блеск": "metallic shine",
+        "биолюминесцентные пятна": "bioluminescent spots",
+        "энергетическое свечение": "energy glow",
+        "легкая чешуя": "light scales",
+        "без крыльев, предпочтительно панцирь": "without wings, preferably with shell",
+        "глаза с вертикальными зрачками": "eyes with vertical pupils",
+        "круглый рот с присосками": "round mouth with suckers",
+        "кристаллическая броня": "crystalline armor",
+        "полет": "flight",
+        "территориальный": "territorial",
+        "осторожный": "cautious",
+        "независимость от кислорода": "oxygen independence",
+        "радиационная устойчивость": "radiation resistance",
+        "энергетическая подпитка": "energy feeding",
+        "космическая навигация": "cosmic navigation",
+        "допустимы любые формы тела": "any body forms allowed",
+        "энергетический хвост": "energy tail",
+        "психические атаки": "psychic attacks",
+        "зеленый": "green",
+        "множество маленьких глаз": "multiple small eyes",
+        "длинные усы": "long whiskers",
+        "энергетические конечности": "energy limbs",
+        "платиновый": "platinum",
+        "золотой": "golden",
+        "без крыльев, с плавательными конечностями": "without wings, with swimming limbs"
+    }
+
+    # Количество способностей и поведенческих черт по размеру
+    ability_counts = {
+        Size.MICROSCOPIC: 1,
+        Size.TINY: 1,
+        Size.SMALL: 2,
+        Size.MEDIUM: 2,
+        Size.LARGE: 3,
+        Size.HUGE: 3,
+        Size.COLOSSAL: 4
+    }
+    trait_counts = {
+        Size.MICROSCOPIC: 1,
+        Size.TINY: 2,
+        Size.SMALL: 2,
+        Size.MEDIUM: 3,
+        Size.LARGE: 3,
+        Size.HUGE: 4,
+        Size.COLOSSAL: 4
+    }
+
+    # Особые эффекты окраски
+    color_effects = ["Биолюминесцентные пятна", "Металлический блеск", "Переливающиеся чешуйки", "Энергетическое свечение"]
+
+    # Фон по среде обитания (RU, EN)
+    backgrounds = {
+        Habitat.FOREST_TROPICAL: ("тропический лес", "tropical forest environment"),
+        Habitat.GRASSLAND: ("луговая равнина", "grassland plains environment"),
+        Habitat.MOUNTAIN: ("горная местность", "mountain environment"),
+        Habitat.AQUATIC: ("подводная среда с водой", "underwater aquatic environment"),
+        Habitat.AERIAL: ("небесная среда с облаками", "sky environment with clouds"),
+        Habitat.UNDERGROUND: ("подземная среда в мягком свете", "underground environment with soft light"),
+        Habitat.AMPHIBIOUS: ("береговая/болотная прибрежная среда", "coastal/marsh shoreline environment"),
+        Habitat.COSMIC: ("космическая среда с частицами и звёздами", "cosmic environment with particles and stars"),
+        Habitat.VOLCANIC: ("вулканическая среда с раскалёнными породами", "volcanic environment with glowing rocks"),
+        Habitat.ARCTIC: ("арктическая ледяная среда", "arctic icy environment"),
+        Habitat.DESERT: ("песчаная пустынная среда", "sandy desert environment"),
+        Habitat.SWAMP: ("болотная среда с туманом", "swampy environment with mist")
+    }
+
+    # Гнёзда для яйца в воздушной среде (RU, EN): яйцо не должно «висеть в небе» без опоры
+    aerial_nests = [
+        ("гнездо из прутьев на верхушке высокого дерева", "a twig nest on top of a tall tree"),
+        ("гнездо на скальном уступе в горах", "a nest on a cliff ledge in the mountains"),
+        ("гнездо в кронах густого леса", "a nest within the dense forest canopy"),
+        ("гнездо на балке заброшенной башни", "a nest on a beam of an abandoned tower"),
+        ("гнездо на парящей скале среди облаков", "a nest on a floating rock among clouds"),
+    ]
+    return {
+        "habitat_data": habitat_data,
+        "size_characteristics": size_characteristics,
+        "head_variants": head_variants,
+        "body_features": body_features,
+        "special_abilities": special_abilities,
+        "coloration_schemes": coloration_schemes,
+        "forced_color_schemes": forced_color_schemes,
+        "behavior_traits": behavior_traits,
+        "environmental_adaptations": environmental_adaptations,
+        "english_translations": english_translations,
+        "ability_counts": ability_counts,
+        "trait_counts": trait_counts,
+        "color_effects": color_effects,
+        "backgrounds": backgrounds,
+        "aerial_nests": aerial_nests,
+    }
+
+
+def _setup_constraints() -> Dict[str, Any]:
+    """Логические ограничения"""
+    # Несовместимые комбинации (для HYBRID действуют минимальные ограничения: только физически невозможные)
+    incompatible_features = {
+        "Крылья": ["Плавники", "Жабры", "Водные мембраны"],
+        "Плавники": ["Крылья", "Перья", "Сухопутные конечности"],
+        "Жабры": ["Крылья", "Перья", "Сухопутные конечности"],
+        "Перья": ["Плавники", "Жабры", "Водные мембраны"],
+        "Огненное дыхание": ["Водные адаптации", "Ледяные способности"],
+        "Ледяные кристаллы": ["Огненные способности", "Вулканические адаптации"],
+        "Биолюминесценция": ["Темная окраска", "Камуфляж"],
+        "Невидимость": ["Яркая окраска", "Биолюминесценция"]
+    }
+
+    # Обязательные комбинации
+    required_combinations = {
+        Habitat.AERIAL: ["Крылья"],
+        Habitat.AQUATIC: ["Плавники"],
+        Habitat.UNDERGROUND: ["Копательные конечности"],
+        Habitat.AMPHIBIOUS: ["Перепонки"],
+        Size.COLOSSAL: ["Множественные сердца"],
+        CreatureType.CRYSTAL: ["Кристаллические структуры"]
+    }
+
+    # Для HYBRID — только физически невозможные сочетания
+    hybrid_incompatible_features = {
+        "Крылья": ["Плавники"],
+        "Плавники": ["Крылья"],
+        "Жабры": ["Сухопутные конечности"],
+    }
+
+    # Какие фразы справочников несут признак ограничения (фраза, совпадающая с признаком, несёт его сама)
+    water_adaptations = [
+        "Жабры для дыхания", "Плавательный пузырь", "Боковая линия для ориентации",
+        "Гидродинамическая форма тела", "Перепонки",
+    ]
+    feature_tags = {
+        "Крылья": ["Крылья и две ноги", "Развитые мышцы крыльев"],
+        "Плавники": ["Плавники и хвост", "Хвост-плавник"],
+        "Жабры": ["Жабры для дыхания"],
+        "Перья": ["Теплые перья"],
+        "Сухопутные конечности": [
+            "Четыре конечности с когтями", "Четыре конечности с копытами", "Четыре конечности с втяжными когтями",
+            "Длинные сильные ноги", "Эффективные конечности для передвижения",
+        ],
+        "Водные адаптации": water_adaptations,
+        "Водные приспособления": water_adaptations,
+        "Огненные способности": ["Огненное дыхание"],
+        "Ледяные способности": ["Ледяные кристаллы"],
+        "Холодолюбивые черты": ["Ледяные кристаллы", "Густой мех"],
+        "Вулканические адаптации": ["Огнеупорная чешуя", "Лавовая кожа", "Теплоизоляционный панцирь"],
+        "Биолюминесценция": [
+            "Биолюминесцентные полосы", "Хвост с биолюминесценцией", "Биолюминесцентные органы",
+            "Биолюминесцентная кожа", "Биолюминесцентное отвлечение", "Биолюминесцентный",
+            "Биолюминесцентные пятна",
+        ],
+        "Темная окраска": ["Черный", "Темно-синий", "Темно-фиолетовый", "Темно-зеленый"],
+        "Яркая окраска": ["Красный", "Оранжевый", "Желтый", "Розовый", "Фиолетовый", "Голубой"],
+        "Светлые цвета": ["Белый", "Снежный"],
+        "Влажные покровы": ["Влажная кожа", "Слизь"],
+        "Сухие покровы": ["Сухая чешуя", "Песчаная кожа"],
+        "Копательные конечности": ["Копание"],
+        "Кристаллические структуры": [
+            "Кристаллические выросты", "Кристаллические включения", "Кристаллический хвост",
+            "Кристаллы", "Кристаллическая броня", "Кристаллический",
+        ],
+    }
+    return {
+        "incompatible_features": incompatible_features,
+        "required_combinations": required_combinations,
+        "hybrid_incompatible_features": hybrid_incompatible_features,
+        "feature_tags": feature_tags,
+    }
+
+
+def _freeze(value: Any) -> Any:
+    """dict -> MappingProxyType, list -> tuple (рекурсивно): справочники нельзя случайно изменить"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+@dataclass(frozen=True)
+class CreatureTables:
+    """Скомпилированные справочники генератора: неизменяемые, общие для всех экземпляров"""
+    habitat_data: Mapping[Habitat, Mapping[str, Any]]
+    size_characteristics: Mapping[Size, Mapping[str, str]]
+    head_variants: Mapping[str, Tuple[str, ...]]
+    body_features: Mapping[str, Tuple[str, ...]]
+    special_abilities: Mapping[str, Tuple[str, ...]]
+    coloration_schemes: Mapping[str, Tuple[str, ...]]
+    forced_color_schemes: Mapping[Habitat, str]
+    behavior_traits: Tuple[str, ...]
+    environmental_adaptations: Mapping[Habitat, Tuple[str, ...]]
+    english_translations: Mapping[str, str]
+    english_translations_ci: Mapping[str, str]
+    incompatible_features: Mapping[str, Tuple[str, ...]]
+    required_combinations: Mapping[Any, Tuple[str, ...]]
+    hybrid_incompatible_features: Mapping[str, Tuple[str, ...]]
+    feature_tags: Mapping[str, Tuple[str, ...]]
+    ability_counts: Mapping[Size, int]
+    trait_counts: Mapping[Size, int]
+    color_effects: Tuple[str, ...]
+    backgrounds: Mapping[Habitat, Tuple[str, str]]
+    aerial_nests: Tuple[Tuple[str, str], ...]
+    # Производные последовательности для random.choice без list(...) на каждый вызов
+    habitats: Tuple[Habitat, ...]
+    sizes: Tuple[Size, ...]
+    coloration_scheme_names: Tuple[str, ...]
+    special_ability_categories: Tuple[str, ...]
+
+
+def compile_tables() -> CreatureTables:
+    """Собирает и замораживает справочники генератора"""
+    data = _freeze({**_initialize_data(), **_setup_constraints()})
+    return CreatureTables(
+        **data,
+        # Нижнерегистровый индекс переводов для устойчивости к регистру
+        english_translations_ci=MappingProxyType({k.lower(): v for k, v in data["english_translations"].items()}),
+        habitats=tuple(Habitat),
+        sizes=tuple(Size),
+        coloration_scheme_names=tuple(data["coloration_schemes"]),
+        special_ability_categories=tuple(data["special_abilities"]),
+    )
+
+
+# Справочники процесса: компилируются один раз при импорте
+TABLES = compile_tables()
+TRANSLATOR = PhraseTranslator(TABLES.english_translations)
+CONSTRAINTS = ConstraintSolver(TABLES)
+
+
+def translation_vocabulary(tables: CreatureTables) -> Dict[str, List[str]]:
+    """Все фразы, которые генератор переводит на английский, по категориям (для отчёта о покрытии)"""
+    return {
+        "habitats": [habitat.value for habitat in tables.habitats],
+        "types": [ctype.value for ctype in CreatureType],
+        "sizes": [size.value for size in tables.sizes],
+        "surfaces": [surface for info in tables.habitat_data.values() for surface in info["surfaces"]],
+        # Рот и придаток попадают в описание головы в нижнем регистре
+        "head.eyes": list(tables.head_variants["eyes"]),
+        "head.mouths": [mouth.lower() for mouth in tables.head_variants["mouths"]],
+        "head.appendages": [appendage.lower() for appendage in tables.head_variants["appendages"]],
+        "body": [feature for features in tables.body_features.values() for feature in features],
+        "abilities": [ability for abilities in tables.special_abilities.values() for ability in abilities],
+        "coloration": [color for colors in tables.coloration_schemes.values() for color in colors]
+        + list(tables.color_effects),
+        "behavior": list(tables.behavior_traits),
+        "adaptations": [item for items in tables.environmental_adaptations.values() for item in items],
+    }
+
+_FALLBACK_LIFE_STAGES = MappingProxyType({
+    "egg": {"ru": "яйцо", "en": "egg"},
+    "baby": {"ru": "детёныш", "en": "hatchling"},
+    "adult": {"ru": "взрослая особь", "en": "adult"}
+})
+_FALLBACK_STAGE_MODIFIERS = MappingProxyType({
+    "egg": {"ru": "одиночное яйцо", "en": "single egg"},
+    "baby": {"ru": "умилительные пропорции", "en": "cute proportions"},
+    "adult": {"ru": "полностью сформировавшиеся признаки", "en": "fully developed traits"}
+})
+_stage_settings_cache: Optional[Tuple[Any, Any, Callable[..., str]]] = None
+
+
+def _stage_settings() -> Tuple[Any, Any, Callable[..., str]]:
+    """Стадии, модификаторы и негативные промпты из глобальных настроек (импорт — один раз)"""
+    global _stage_settings_cache
+    if _stage_settings_cache is None:
+        try:
+            from config.settings import CREATURE_LIFE_STAGES, STAGE_PROMPT_MODIFIERS, get_stage_negative_prompt
+        except Exception:
+            # Фолбэк на случай отсутствия настроек (не кэшируется: настройки могут стать доступны позже)
+            return _FALLBACK_LIFE_STAGES, _FALLBACK_STAGE_MODIFIERS, lambda s, include_global=True: ""
+        _stage_settings_cache = (CREATURE_LIFE_STAGES, STAGE_PROMPT_MODIFIERS, get_stage_negative_prompt)
+    return _stage_settings_cache
+
+class CreatureGenerator:
+    """
+    Генератор существ с логическими ограничениями.
+
+    Справочники общие и неизменяемые (TABLES), поэтому конструктор почти ничего не стоит;
+    состояние случайности — отдельный объект rng (по умолчанию глобальный модуль random).
+    """
+
+    def __init__(self, rng: Optional[random.Random] = None, tables: Optional[CreatureTables] = None):
+        self.tables = tables or TABLES
+        self.translator = TRANSLATOR if self.tables is TABLES else PhraseTranslator(self.tables.english_translations)
+        self.constraints = CONSTRAINTS if self.tables is TABLES else ConstraintSolver(self.tables)
+        self.rng = rng if rng is not None else random
+        # Стадии развития и модификаторы промптов из глобальных настроек
+        self.life_stages, self.stage_modifiers, self._negative_prompt = _stage_settings()
     
     def _validate_combination(self, features: List[str], creature_type: Optional[CreatureType] = None) -> bool:
         """Проверка совместимости характеристик. Для HYBRID ограничения минимальны."""
-        # Гибрид: пропускаем мягкие стилистические ограничения, оставляем только грубо-физические
-        if creature_type == CreatureType.HYBRID:
-            strict_conflicts = {
-                "Крылья": ["Плавники"],
-                "Плавники": ["Крылья"],
-                "Жабры": ["Сухопутные конечности"],
-            }
-            for feature in features:
-                if feature in strict_conflicts:
-                    for incompatible in strict_conflicts[feature]:
-                        if incompatible in features:
-                            return False
-            return True
-
-        # Для остальных типов — полный набор несовместимостей
-        for feature in features:
-            if feature in self.incompatible_features:
-                for incompatible in self.incompatible_features[feature]:
-                    if incompatible in features:
-                        return False
-        return True
+        return not self.constraints.conflicts(features, hybrid=creature_type == CreatureType.HYBRID)
     
     def _get_required_features(self, habitat: Habitat, size: Size, creature_type: CreatureType) -> List[str]:
         """Получение обязательных характеристик"""
         required = []
         
         # Обязательные для среды обитания
-        if habitat in self.required_combinations:
-            required.extend(self.required_combinations[habitat])
+        if habitat in self.tables.required_combinations:
+            required.extend(self.tables.required_combinations[habitat])
         
         # Обязательные для размера
-        if size in self.required_combinations:
-            required.extend(self.required_combinations[size])
+        if size in self.tables.required_combinations:
+            required.extend(self.tables.required_combinations[size])
         
         # Обязательные для типа
-        if creature_type in self.required_combinations:
-            required.extend(self.required_combinations[creature_type])
+        if creature_type in self.tables.required_combinations:
+            required.extend(self.tables.required_combinations[creature_type])
         
         return required
     
-    def _generate_head_description(self) -> str:
+    def _generate_head_description(self, selection: CreatureSelection) -> str:
         """Генерация описания головы"""
-        eyes = random.choice(self.head_variants["eyes"])
-        mouth = random.choice(self.head_variants["mouths"])
-        appendage = random.choice(self.head_variants["appendages"])
+        eyes = selection.pick(self.rng, "eyes", self.tables.head_variants["eyes"])
+        mouth = selection.pick(self.rng, "mouth", self.tables.head_variants["mouths"])
+        appendage = selection.pick(self.rng, "head_appendage", self.tables.head_variants["appendages"])
         
         return f"{eyes}, {mouth.lower()}, {appendage.lower()}"
     
-    def _generate_body_features(self, habitat: Habitat) -> List[str]:
+    def _generate_body_features(self, habitat: Habitat, selection: CreatureSelection) -> List[str]:
         """Генерация характеристик тела"""
         features = []
         
         # Основные части тела
-        features.append(random.choice(self.body_features["limbs"]))
-        features.append(random.choice(self.body_features["torso"]))
+        features.append(selection.pick(self.rng, "limbs", self.tables.body_features["limbs"]))
+        features.append(selection.pick(self.rng, "torso", self.tables.body_features["torso"]))
         
-        # Хвост (не для всех существ)
-        if random.random() < 0.7:
-            features.append(random.choice(self.body_features["tail"]))
+        # Хвост (не для всех существ; обязателен, если несёт обязательный признак)
+        if selection.is_forced("tail") or self.rng.random() < 0.7:
+            tail = selection.pick(self.rng, "tail", self.tables.body_features["tail"])
+            if tail:
+                features.append(tail)
         
         # Адаптации к среде обитания
-        if habitat in self.environmental_adaptations:
-            features.extend(random.sample(
-                self.environmental_adaptations[habitat], 
-                min(2, len(self.environmental_adaptations[habitat]))
+        if habitat in self.tables.environmental_adaptations:
+            features.extend(selection.pick_many(
+                self.rng, "adaptations", self.tables.environmental_adaptations[habitat], 2
             ))
         
         return features
     
-    def _generate_special_abilities(self, habitat: Habitat, size: Size) -> List[str]:
+    def _generate_special_abilities(self, habitat: Habitat, size: Size, selection: CreatureSelection) -> List[str]:
         """Генерация специальных способностей"""
         abilities = []
         
         # Количество способностей зависит от размера
-        ability_count = {
-            Size.MICROSCOPIC: 1,
-            Size.TINY: 1,
-            Size.SMALL: 2,
-            Size.MEDIUM: 2,
-            Size.LARGE: 3,
-            Size.HUGE: 3,
-            Size.COLOSSAL: 4
-        }
+        count = self.tables.ability_counts.get(size, 2)
         
-        count = ability_count.get(size, 2)
+        # Способность-носитель обязательного признака идёт первой
+        if selection.is_forced("abilities"):
+            abilities.append(selection.pick(self.rng, "abilities", ()))
+            count -= 1
         
-        # Выбираем способности из разных категорий
-        categories = list(self.special_abilities.keys())
+        # Выбираем способности из разных категорий (только категории, где есть допустимые)
         for _ in range(count):
-            category = random.choice(categories)
-            ability = random.choice(self.special_abilities[category])
+            categories = selection.valid_groups(self.tables.special_abilities, self.tables.special_ability_categories)
+            if not categories:
+                break
+            category = self.rng.choice(categories)
+            ability = selection.pick(self.rng, "abilities", self.tables.special_abilities[category])
             if ability not in abilities:
                 abilities.append(ability)
         
         return abilities
     
-    def _generate_coloration(self, habitat: Habitat) -> List[str]:
+    def _generate_coloration(self, habitat: Habitat, selection: CreatureSelection) -> List[str]:
         """Генерация окраски"""
         colors = []
         
-        # Основная окраска зависит от среды обитания
-        if habitat in [Habitat.UNDERGROUND, Habitat.DESERT]:
-            scheme = "camouflage"
-        elif habitat == Habitat.COSMIC:
-            scheme = "crystal"
-        elif habitat == Habitat.VOLCANIC:
-            scheme = "bright"
-        else:
-            scheme = random.choice(list(self.coloration_schemes.keys()))
+        # Основная окраска зависит от среды обитания (случайная схема — из тех, где есть допустимые цвета)
+        scheme = self.tables.forced_color_schemes.get(habitat)
+        if scheme is None:
+            scheme = self.rng.choice(
+                selection.valid_groups(self.tables.coloration_schemes, self.tables.coloration_scheme_names)
+            )
         
-        base_colors = self.coloration_schemes[scheme]
-        colors.append(random.choice(base_colors))
+        base_colors = self.tables.coloration_schemes[scheme]
+        colors.append(selection.pick(self.rng, "colors", base_colors))
         
         # Дополнительные цвета
-        if random.random() < 0.5:
-            colors.append(random.choice(base_colors))
+        if self.rng.random() < 0.5:
+            colors.append(selection.pick(self.rng, "colors", base_colors))
         
         # Особые эффекты
-        effects = ["Биолюминесцентные пятна", "Металлический блеск", "Переливающиеся чешуйки", "Энергетическое свечение"]
-        if random.random() < 0.3:
-            colors.append(random.choice(effects))
+        if self.rng.random() < 0.3:
+            colors.append(selection.pick(self.rng, "colors", self.tables.color_effects))
         
-        return colors
+        return [color for color in colors if color]
     
     def _generate_behavior_traits(self, size: Size) -> List[str]:
         """Генерация поведенческих черт"""
-        traits = []
-        
         # Количество черт зависит от размера
-        trait_count = {
-            Size.MICROSCOPIC: 1,
-            Size.TINY: 2,
-            Size.SMALL: 2,
-            Size.MEDIUM: 3,
-            Size.LARGE: 3,
-            Size.HUGE: 4,
-            Size.COLOSSAL: 4
-        }
-        
-        count = trait_count.get(size, 2)
-        traits = random.sample(self.behavior_traits, count)
+        count = self.tables.trait_counts.get(size, 2)
+        traits = self.rng.sample(self.tables.behavior_traits, count)
         
         return traits
     
     def _translate_to_english(self, russian_text: str) -> str:
-        """Перевод русского текста на английский"""
-        if not russian_text:
-            return ""
-        # Разбиваем текст на части и переводим каждую
-        parts = russian_text.split(', ')
-        translated_parts = []
-        
-        for part in parts:
-            part = part.strip()
-            # Ищем точное совпадение в словаре переводов
-            if part in self.english_translations:
-                translated_parts.append(self.english_translations[part])
-            elif hasattr(self, 'english_translations_ci') and part.lower() in self.english_translations_ci:
-                translated_parts.append(self.english_translations_ci[part.lower()])
-            else:
-                # Если нет точного совпадения, пытаемся перевести по частям
-                words = part.split()
-                translated_words = []
-                for word in words:
-                    # Сначала пытаемся по исходному регистру, затем по нижнему
-                    if word in self.english_translations:
-                        translated_words.append(self.english_translations[word])
-                    elif hasattr(self, 'english_translations_ci') and word.lower() in self.english_translations_ci:
-                        translated_words.append(self.english_translations_ci[word.lower()])
-                    else:
-                        # Если слово не найдено, оставляем как есть
-                        translated_words.append(word)
-                translated_parts.append(' '.join(translated_words))
-        
-        return ', '.join(translated_parts)
-
-    def _build_ci_translations(self) -> None:
-        """Создает нижнерегистровый индекс переводов для устойчивости к регистру"""
-        self.english_translations_ci = {k.lower(): v for k, v in getattr(self, 'english_translations', {}).items()}
+        """Перевод русского текста на английский (самые длинные фразы словаря, один проход)"""
+        return self.translator.translate(russian_text)
 
     def generate_creature(self) -> CreatureCharacteristics:
         """Генерация полного описания существа"""
         
         # Выбор среды: наземная теперь разделена на отдельные подтипы (FOREST_TROPICAL, GRASSLAND, MOUNTAIN)
         # Поэтому просто выбираем из Enum равновероятно
-        habitat = random.choice(list(Habitat))
-        habitat_info = self.habitat_data[habitat]
+        habitat = self.rng.choice(self.tables.habitats)
+        habitat_info = self.tables.habitat_data[habitat]
+        
+        creature_type = self.rng.choice(habitat_info["types"])
+        size = self.rng.choice(self.tables.sizes)
         
-        creature_type = random.choice(habitat_info["types"])
-        surface = random.choice(habitat_info["surfaces"])
-        size = random.choice(list(Size))
+        # Дальше — только совместимые признаки: маска ограничений и носители обязательных признаков
+        selection = self.constraints.start(self.rng, habitat, size, creature_type)
+        surface = selection.pick(self.rng, "surface", habitat_info["surfaces"])
         
         # Генерация детальных характеристик
-        head_description = self._generate_head_description()
-        body_features = self._generate_body_features(habitat)
-        special_abilities = self._generate_special_abilities(habitat, size)
-        coloration = self._generate_coloration(habitat)
+        head_description = self._generate_head_description(selection)
+        body_features = self._generate_body_features(habitat, selection)
+        special_abilities = self._generate_special_abilities(habitat, size, selection)
+        coloration = self._generate_coloration(habitat, selection)
         behavior_traits = self._generate_behavior_traits(size)
-        environmental_adaptations = self.environmental_adaptations.get(habitat, [])
+        environmental_adaptations = list(self.tables.environmental_adaptations.get(habitat, ()))
         
         # Создание объекта характеристик
         creature = CreatureCharacteristics(
@@ -855,7 +974,7 @@ class CreatureGenerator:
     def generate_detailed_prompt(self, creature: CreatureCharacteristics) -> str:
         """Генерация детального промпта для изображения"""
         
-        size_info = self.size_characteristics[creature.size]
+        size_info = self.tables.size_characteristics[creature.size]
         
         prompt = f"Детальное изображение {creature.creature_type.value.lower()} из среды '{creature.habitat.value}'. "
         prompt += f"Размер: {creature.size.value.lower()} ({size_info['speed']}, {size_info['strength']}). "
@@ -886,10 +1005,10 @@ class CreatureGenerator:
         _, background_type_en = self._determine_background_type(creature.habitat)
         
         # Формируем финальный промпт
-        creature_type_eng = self.english_translations.get(creature.creature_type.value, creature.creature_type.value.lower())
-        habitat_eng = self.english_translations.get(creature.habitat.value, creature.habitat.value.lower())
-        size_eng = self.english_translations.get(creature.size.value, creature.size.value.lower())
-        surface_eng = self.english_translations.get(creature.surface, creature.surface.lower())
+        creature_type_eng = self.tables.english_translations.get(creature.creature_type.value, creature.creature_type.value.lower())
+        habitat_eng = self.tables.english_translations.get(creature.habitat.value, creature.habitat.value.lower())
+        size_eng = self.tables.english_translations.get(creature.size.value, creature.size.value.lower())
+        surface_eng = self._translate_to_english(creature.surface)
         
         prompt = f"A detailed {creature_type_eng} from {habitat_eng} environment. "
         prompt += f"Size: {size_eng}. Surface: {surface_eng}. "
@@ -942,7 +1061,7 @@ class CreatureGenerator:
             motif_ru_parts.append(f"характерный признак головы: {appendage.lower()}")
         motif_ru = ", ".join(motif_ru_parts)
 
-        surface_en = self.english_translations.get(creature.surface, creature.surface.lower())
+        surface_en = self._translate_to_english(creature.surface)
         key_color_en = self._translate_to_english(key_color_ru) if key_color_ru else ""
         appendage_en = self._translate_to_english(appendage) if appendage else ""
         motif_en_parts = []
@@ -956,10 +1075,15 @@ class CreatureGenerator:
 
         return motif_ru, motif_en
 
-    def _stage_ru_prompt(self, creature: CreatureCharacteristics, stage_key: str) -> str:
+    def _stage_ru_prompt(
+        self,
+        creature: CreatureCharacteristics,
+        stage_key: str,
+        motif: Optional[Tuple[str, str]] = None,
+    ) -> str:
         stage_name = self.life_stages[stage_key]["ru"]
         modifier = self.stage_modifiers[stage_key]["ru"]
-        motif_ru, _ = self._build_species_motif(creature)
+        motif_ru, _ = motif or self._build_species_motif(creature)
         base = f"{stage_name} вида '{creature.creature_type.value.lower()}' из среды '{creature.habitat.value}'. "
         continuity = f"Сквозные признаки вида: {motif_ru}. " if motif_ru else ""
         bg_ru, _ = self._determine_background_type(creature.habitat)
@@ -978,12 +1102,17 @@ class CreatureGenerator:
             base_prompt = self.generate_detailed_prompt(creature)
             return base_prompt + f" {continuity}"
 
-    def _stage_en_prompt(self, creature: CreatureCharacteristics, stage_key: str) -> str:
+    def _stage_en_prompt(
+        self,
+        creature: CreatureCharacteristics,
+        stage_key: str,
+        motif: Optional[Tuple[str, str]] = None,
+    ) -> str:
         stage_name = self.life_stages[stage_key]["en"]
         modifier = self.stage_modifiers[stage_key]["en"]
-        _, motif_en = self._build_species_motif(creature)
-        creature_type_eng = self.english_translations.get(creature.creature_type.value, creature.creature_type.value.lower())
-        habitat_eng = self.english_translations.get(creature.habitat.value, creature.habitat.value.lower())
+        _, motif_en = motif or self._build_species_motif(creature)
+        creature_type_eng = self.tables.english_translations.get(creature.creature_type.value, creature.creature_type.value.lower())
+        habitat_eng = self.tables.english_translations.get(creature.habitat.value, creature.habitat.value.lower())
         _, bg_en = self._determine_background_type(creature.habitat)
         # Egg override for aerial habitat: use nest/roost context
         if stage_key == "egg" and creature.habitat == Habitat.AERIAL:
@@ -1006,16 +1135,13 @@ class CreatureGenerator:
         """Генерация набора промптов для 4 стадий развития (RU/EN)"""
         stages = ["egg", "baby", "adult"]
         result: Dict[str, Dict[str, str]] = {}
-        # Получаем специализированные негативные промпты
-        try:
-            from config.settings import get_stage_negative_prompt
-        except Exception:
-            get_stage_negative_prompt = lambda s, include_global=True: ""  # noqa: E731
+        # Мотив вида общий для всех стадий — считаем один раз
+        motif = self._build_species_motif(creature)
 
         for s in stages:
-            ru = self._stage_ru_prompt(creature, s)
-            en = self._stage_en_prompt(creature, s)
-            neg = get_stage_negative_prompt(s, include_global=True)
+            ru = self._stage_ru_prompt(creature, s, motif)
+            en = self._stage_en_prompt(creature, s, motif)
+            neg = self._negative_prompt(s, include_global=True)
             result[s] = {
                 "ru": ru,
                 "en": en,
@@ -1028,57 +1154,33 @@ class CreatureGenerator:
         Сейчас детально обрабатываем воздушную среду: вместо неба используем контекст гнезда.
         """
         if creature.habitat == Habitat.AERIAL:
-            nest_variants_ru_en: List[Tuple[str, str]] = [
-                ("гнездо из прутьев на верхушке высокого дерева", "a twig nest on top of a tall tree"),
-                ("гнездо на скальном уступе в горах", "a nest on a cliff ledge in the mountains"),
-                ("гнездо в кронах густого леса", "a nest within the dense forest canopy"),
-                ("гнездо на балке заброшенной башни", "a nest on a beam of an abandoned tower"),
-                ("гнездо на парящей скале среди облаков", "a nest on a floating rock among clouds"),
-            ]
-            chosen_ru, chosen_en = random.choice(nest_variants_ru_en)
+            chosen_ru, chosen_en = self.rng.choice(self.tables.aerial_nests)
             return chosen_ru, chosen_en
         # Для прочих сред пока используем базовый фон
         return None, None
     def _determine_background_type(self, habitat: Habitat) -> Tuple[str, str]:
         """Определение описания фона по среде обитания (RU, EN)"""
-        ru = {
-            Habitat.FOREST_TROPICAL: "тропический лес",
-            Habitat.GRASSLAND: "луговая равнина",
-            Habitat.MOUNTAIN: "горная местность",
-            Habitat.AQUATIC: "подводная среда с водой",
-            Habitat.AERIAL: "небесная среда с облаками",
-            Habitat.UNDERGROUND: "подземная среда в мягком свете",
-            Habitat.AMPHIBIOUS: "береговая/болотная прибрежная среда",
-            Habitat.COSMIC: "космическая среда с частицами и звёздами",
-            Habitat.VOLCANIC: "вулканическая среда с раскалёнными породами",
-            Habitat.ARCTIC: "арктическая ледяная среда",
-            Habitat.DESERT: "песчаная пустынная среда",
-            Habitat.SWAMP: "болотная среда с туманом"
-        }
-        en = {
-            Habitat.FOREST_TROPICAL: "tropical forest environment",
-            Habitat.GRASSLAND: "grassland plains environment",
-            Habitat.MOUNTAIN: "mountain environment",
-            Habitat.AQUATIC: "underwater aquatic environment",
-            Habitat.AERIAL: "sky environment with clouds",
-            Habitat.UNDERGROUND: "underground environment with soft light",
-            Habitat.AMPHIBIOUS: "coastal/marsh shoreline environment",
-            Habitat.COSMIC: "cosmic environment with particles and stars",
-            Habitat.VOLCANIC: "volcanic environment with glowing rocks",
-            Habitat.ARCTIC: "arctic icy environment",
-            Habitat.DESERT: "sandy desert environment",
-            Habitat.SWAMP: "swampy environment with mist"
-        }
-
-        return ru.get(habitat, "нейтральная среда"), en.get(habitat, "neutral environment")
+        return self.tables.backgrounds.get(habitat, ("нейтральная среда", "neutral environment"))
 
     def _create_english_description(self, creature: CreatureCharacteristics) -> str:
         """Создание базового английского описания существа"""
-        description = f"{self.english_translations.get(creature.creature_type.value, creature.creature_type.value.lower())} "
-        description += f"with {self.english_translations.get(creature.surface, creature.surface.lower())} "
+        description = f"{self.tables.english_translations.get(creature.creature_type.value, creature.creature_type.value.lower())} "
+        description += f"with {self._translate_to_english(creature.surface)} "
         description += f"and {self._translate_to_english(creature.head_description)}"
         return description
 
+    def generate_batch(self, n: int, seed: Optional[int] = None) -> "CreatureBatch":
+        """
+        Пакетная выборка n существ в столбцовом виде (NumPy при наличии); промпты — лениво,
+        через CreatureBatch.stage_prompts(i). Случайность пакета задаётся seed, а не self.rng;
+        один seed даёт один пакет только на том же бэкенде (CreatureBatch.backend).
+        """
+        try:
+            from .batch import CreatureBatch
+        except ImportError:
+            from batch import CreatureBatch  # type: ignore
+        return CreatureBatch.sample(n, seed=seed, tables=self.tables)
+
     def generate_json_description(self, creature: CreatureCharacteristics) -> str:
         """Генерация JSON описания существа"""
         return json.dumps({
@@ -1096,9 +1198,177 @@ class CreatureGenerator:
         }, ensure_ascii=False, indent=2)
 
 
+class LegacyCreatureGenerator(CreatureGenerator):
+    """
+    Генератор версии 1: признаки выбираются независимыми random.choice, без решателя
+    ограничений. Нужен только для восстановления существ, сохранённых с generator_version=1
+    (порядок обращений к rng менять нельзя — от него зависят существо и промпты).
+    """
+
+    def generate_creature(self) -> CreatureCharacteristics:
+        """Генерация полного описания существа (выборка версии 1)"""
+        tables = self.tables
+        rng = self.rng
+        habitat = rng.choice(tables.habitats)
+        habitat_info = tables.habitat_data[habitat]
+
+        creature_type = rng.choice(habitat_info["types"])
+        surface = rng.choice(habitat_info["surfaces"])
+        size = rng.choice(tables.sizes)
+
+        # Голова
+        eyes = rng.choice(tables.head_variants["eyes"])
+        mouth = rng.choice(tables.head_variants["mouths"])
+        appendage = rng.choice(tables.head_variants["appendages"])
+        head_description = f"{eyes}, {mouth.lower()}, {appendage.lower()}"
+
+        # Тело
+        body_features = [rng.choice(tables.body_features["limbs"]), rng.choice(tables.body_features["torso"])]
+        if rng.random() < 0.7:
+            body_features.append(rng.choice(tables.body_features["tail"]))
+        if habitat in tables.environmental_adaptations:
+            adaptations = tables.environmental_adaptations[habitat]
+            body_features.extend(rng.sample(adaptations, min(2, len(adaptations))))
+
+        # Способности
+        special_abilities: List[str] = []
+        for _ in range(tables.ability_counts.get(size, 2)):
+            category = rng.choice(tables.special_ability_categories)
+            ability = rng.choice(tables.special_abilities[category])
+            if ability not in special_abilities:
+                special_abilities.append(ability)
+
+        # Окраска
+        scheme = tables.forced_color_schemes.get(habitat)
+        if scheme is None:
+            scheme = rng.choice(tables.coloration_scheme_names)
+        base_colors = tables.coloration_schemes[scheme]
+        coloration = [rng.choice(base_colors)]
+        if rng.random() < 0.5:
+            coloration.append(rng.choice(base_colors))
+        if rng.random() < 0.3:
+            coloration.append(rng.choice(tables.color_effects))
+
+        return CreatureCharacteristics(
+            habitat=habitat,
+            creature_type=creature_type,
+            size=size,
+            surface=surface,
+            form_rules=habitat_info["form_rules"],
+            head_description=head_description,
+            body_features=body_features,
+            special_abilities=special_abilities,
+            coloration=coloration,
+            behavior_traits=self._generate_behavior_traits(size),
+            environmental_adaptations=list(tables.environmental_adaptations.get(habitat, ())),
+        )
+
+
+# Общий генератор процесса (глобальный random); для изолированного состояния —
+# CreatureGenerator(rng=random.Random(seed)) поверх тех же справочников
+_shared_generator: Optional[CreatureGenerator] = None
+
+
+def get_creature_generator() -> CreatureGenerator:
+    """Возвращает общий для процесса генератор существ"""
+    global _shared_generator
+    if _shared_generator is None:
+        _shared_generator = CreatureGenerator()
+    return _shared_generator
+
+
+# =============================
+# Детерминированная генерация по сиду
+# =============================
+SEED_BITS = 63  # помещается в знаковый BIGINT
+
+# Версия генерации по сиду хранится рядом с сидом (Pet.generator_version): новая выборка —
+# новая версия, а прежняя остаётся в SEEDED_GENERATORS, чтобы сохранённые сиды давали то же существо.
+# 1 — независимые random.choice; 2 — решатель ограничений (constraints.py)
+GENERATOR_VERSION = 2
+SEEDED_GENERATORS = MappingProxyType({
+    1: LegacyCreatureGenerator,
+    2: CreatureGenerator,
+})
+
+
+def creature_seed(user_id: str, pet_name: str, attempt: int = 0) -> int:
+    """Сид существа питомца — стабильный хэш (user_id, pet_name); attempt > 0 — запасные сиды"""
+    key = f"{user_id}\x00{pet_name}" if not attempt else f"{user_id}\x00{pet_name}\x00{attempt}"
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") >> (64 - SEED_BITS)
+
+
+@lru_cache(maxsize=1024)
+def _seeded_payload(seed: int, version: int) -> str:
+    rng = random.Random(seed)
+    generator = SEEDED_GENERATORS[version](rng=rng)
+    creature = generator.generate_creature()
+    stage_prompts = generator.generate_stage_prompts(creature)
+    return json.dumps({
+        "seed": seed,
+        "generator_version": version,
+        "creature": json.loads(generator.generate_json_description(creature)),
+        "stage_prompts": stage_prompts,
+    }, ensure_ascii=False)
+
+
+# Отпечаток вывода каждой версии (существа и EN-промпты на FINGERPRINT_SEEDS), снятый при её фиксации.
+# Правка справочников, переводчика или настроек стадий меняет вывод — версия с несовпавшим
+# отпечатком больше не восстанавливает сиды (restore_seeded), промпты берутся из pet_prompts
+FINGERPRINT_SEEDS = range(64)
+GENERATOR_FINGERPRINTS = MappingProxyType({
+    1: "461058db46552d30d15aa6d71487ad4b8a54b06ecb512d94c7b5572bd4b24022",
+    2: "318c5ff10563f2b23a5cad70c191d6eda11325d1e0fb464d1e460fe4b42a90ef",
+})
+
+
+def generate_seeded(seed: int, version: int = GENERATOR_VERSION) -> Dict[str, Any]:
+    """
+    Существо и промпты всех стадий как чистая функция (сида, версии генератора) на
+    изолированном random.Random. Формат: {"seed", "generator_version", "creature",
+    "stage_prompts"}; каждый вызов — новая копия. Неизвестная версия — ValueError.
+    """
+    if version not in SEEDED_GENERATORS:
+        raise ValueError(f"Неизвестная версия генератора: {version}")
+    return json.loads(_seeded_payload(seed, version))
+
+
+def seeded_fingerprint(version: int) -> str:
+    """sha256 вывода версии на FINGERPRINT_SEEDS: существа и EN-промпты стадий"""
+    digest = hashlib.sha256()
+    for seed in FINGERPRINT_SEEDS:
+        stored = generate_seeded(seed, version)
+        restored = [stored["creature"], {stage: prompts["en"] for stage, prompts in stored["stage_prompts"].items()}]
+        digest.update(json.dumps(restored, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def seeded_version_intact(version: Optional[int]) -> bool:
+    """Версия известна и выдаёт то же, что при фиксации отпечатка (проверяется один раз на процесс)"""
+    if version not in SEEDED_GENERATORS:
+        return False
+    fingerprint = seeded_fingerprint(version)
+    if fingerprint != GENERATOR_FINGERPRINTS.get(version):
+        logger.error(
+            f"Вывод генератора версии {version} изменился (отпечаток {fingerprint}): "
+            f"сиды этой версии не восстанавливаются, промпты берутся из pet_prompts"
+        )
+        return False
+    return True
+
+
+def restore_seeded(seed: int, version: Optional[int]) -> Optional[Dict[str, Any]]:
+    """generate_seeded для сохранённого сида; None, если версия неизвестна или её вывод изменился"""
+    if not seeded_version_intact(version):
+        return None
+    return generate_seeded(seed, version)
+
+
 def main():
     """Основная функция для демонстрации генератора"""
-    generator = CreatureGenerator()
+    generator = get_creature_generator()
     
     print("🎲 Генератор существ с детальными характеристиками")
     print("=" * 60)
@@ -0,0 +1,261 @@
+"""
+Похожесть существ: MinHash-сигнатуры по признакам и LSH-индекс недавних существ.
+
+Существо описывается множеством признаков (среда, тип, поверхность, черты головы,
+особенности тела, окраска); сигнатура — NUM_PERM минимумов 32-битных хэшей признаков
+под разными перестановками, доля совпавших позиций двух сигнатур оценивает коэффициент
+Жаккара их множеств. Для поиска сигнатура режется на BANDS полос по ROWS значений:
+похожие существа с высокой вероятностью совпадают хотя бы в одной полосе, поэтому
+сравниваются только существа из общих корзин. Хэши стабильны (blake2b) — сигнатуры и
+корзины хранятся в БД и не зависят от процесса и PYTHONHASHSEED.
+
+Распределение похожих в случайной выборке и время проверки:
+python backend/generator/similarity.py [число_существ]
+"""
+
+import hashlib
+import struct
+import threading
+from collections import Counter, deque
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+# Порог оценки Жаккара, начиная с которого существа считаются похожими
+DEFAULT_THRESHOLD = 0.75
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = 0xFFFFFFFF
+_PACK = struct.Struct(f"<{NUM_PERM}I")
+_BAND_PACK = struct.Struct(f"<{ROWS}I")
+
+Signature = Tuple[int, ...]
+
+
+def _generate_seeded(seed: int) -> Dict[str, Any]:
+    # Генератор загружается по требованию: сигнатуры (models.Pet.set_creature) без него
+    try:
+        from .promt_gen import generate_seeded
+    except ImportError:
+        # Запуск модуля как скрипта (python backend/generator/similarity.py)
+        from promt_gen import generate_seeded  # type: ignore
+    return generate_seeded(seed)
+
+
+def _stable_hash(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+# Перестановки h -> (a*h + b) mod p фиксированы: от них зависят сохранённые сигнатуры
+_PERMUTATIONS = tuple(
+    (_stable_hash(f"minhash:{i}:a".encode()) % (_MERSENNE_PRIME - 1) + 1, _stable_hash(f"minhash:{i}:b".encode()) % _MERSENNE_PRIME)
+    for i in range(NUM_PERM)
+)
+EMPTY_SIGNATURE: Signature = (_MAX_HASH,) * NUM_PERM
+
+
+@lru_cache(maxsize=8192)
+def _permuted(feature: str) -> Signature:
+    # Словарь признаков конечен — хэши под всеми перестановками считаются один раз на признак
+    h = _stable_hash(feature.encode("utf-8"))
+    return tuple(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for a, b in _PERMUTATIONS)
+
+
+def creature_features(creature: Mapping[str, Any]) -> frozenset:
+    """Множество признаков существа (формат creature_json) для сравнения"""
+    features = set()
+    for key in ("habitat", "type", "surface"):
+        if creature.get(key):
+            features.add(f"{key}:{creature[key]}")
+    for part in (creature.get("head_description") or "").split(","):
+        if part.strip():
+            features.add(f"head:{part.strip()}")
+    for feature in creature.get("body_features") or ():
+        features.add(f"body:{feature}")
+    for color in creature.get("coloration") or ():
+        features.add(f"color:{color}")
+    return frozenset(features)
+
+
+def signature(features: Iterable[str]) -> Signature:
+    """MinHash-сигнатура множества признаков"""
+    permuted = [_permuted(feature) for feature in features]
+    if not permuted:
+        return EMPTY_SIGNATURE
+    return tuple(map(min, zip(*permuted)))
+
+
+def creature_signature(creature: Mapping[str, Any]) -> Signature:
+    return signature(creature_features(creature))
+
+
+def similarity(left: Signature, right: Signature) -> float:
+    """Оценка коэффициента Жаккара по двум сигнатурам"""
+    return sum(1 for a, b in zip(left, right) if a == b) / NUM_PERM
+
+
+def pack_signature(sig: Signature) -> bytes:
+    return _PACK.pack(*sig)
+
+
+def unpack_signature(data: bytes) -> Signature:
+    return _PACK.unpack(data)
+
+
+def band_buckets(sig: Signature) -> List[Tuple[int, int]]:
+    """Корзины LSH: (полоса, 63-битный хэш значений полосы) — помещается в знаковый BIGINT"""
+    return [
+        (band, _stable_hash(_BAND_PACK.pack(*sig[band * ROWS:(band + 1) * ROWS])) >> 1)
+        for band in range(BANDS)
+    ]
+
+
+class RecentCreatureIndex:
+    """
+    LSH-индекс последних capacity существ: проверка «есть ли похожее» — поиск по BANDS
+    корзинам и сравнение только с кандидатами из них. Старые существа вытесняются.
+    Потокобезопасен: пул существ генерирует в executor, создание питомца — в event loop.
+    """
+
+    def __init__(self, capacity: int, threshold: float = DEFAULT_THRESHOLD):
+        self.capacity = capacity
+        self.threshold = threshold
+        self._entries: deque = deque()  # (ключ, корзины) в порядке добавления
+        self._signatures: Dict[int, Signature] = {}
+        self._buckets: Dict[Tuple[int, int], set] = {}
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def nearest(self, sig: Signature) -> float:
+        """Наибольшая похожесть на существо из индекса среди кандидатов LSH (0.0 — кандидатов нет)"""
+        best = 0.0
+        with self._lock:
+            seen = set()
+            for bucket in band_buckets(sig):
+                for key in self._buckets.get(bucket, ()):
+                    if key not in seen:
+                        seen.add(key)
+                        best = max(best, similarity(sig, self._signatures[key]))
+        return best
+
+    def is_near_duplicate(self, sig: Signature) -> bool:
+        return self.nearest(sig) >= self.threshold
+
+    def add(self, sig: Signature) -> None:
+        buckets = band_buckets(sig)
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._entries.append((key, buckets))
+            self._signatures[key] = sig
+            for bucket in buckets:
+                self._buckets.setdefault(bucket, set()).add(key)
+            while len(self._entries) > self.capacity:
+                old_key, old_buckets = self._entries.popleft()
+                del self._signatures[old_key]
+                for bucket in old_buckets:
+                    members = self._buckets[bucket]
+                    members.discard(old_key)
+                    if not members:
+                        del self._buckets[bucket]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._signatures.clear()
+            self._buckets.clear()
+
+
+def generate_distinct(seeds: Iterable[int], index: RecentCreatureIndex) -> Dict[str, Any]:
+    """
+    Первое существо generate_seeded(seed), не похожее на недавние из index; если похожи все
+    (сиды кончились) — последнее. Выбранное существо добавляется в индекс.
+    """
+    stored: Optional[Dict[str, Any]] = None
+    sig = EMPTY_SIGNATURE
+    for seed in seeds:
+        stored = _generate_seeded(seed)
+        sig = creature_signature(stored["creature"])
+        if not index.is_near_duplicate(sig):
+            break
+    if stored is None:
+        raise ValueError("Нет сидов для генерации существа")
+    index.add(sig)
+    return stored
+
+
+def near_duplicate_clusters(
+    groups: Iterable[Sequence[int]],
+    signatures: Mapping[int, Signature],
+    threshold: float = DEFAULT_THRESHOLD,
+    max_group: int = 200,
+) -> List[List[int]]:
+    """
+    Кластеры похожих по группам-кандидатам (членам общих корзин LSH): пары внутри группы
+    проверяются по сигнатурам, связанные пары объединяются. Из слишком больших групп
+    сравниваются только первые max_group членов. Кластеры — по убыванию размера.
+    """
+    parent: Dict[int, int] = {}
+
+    def find(item: int) -> int:
+        parent.setdefault(item, item)
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    for group in groups:
+        members = list(dict.fromkeys(group))[:max_group]
+        for i, left in enumerate(members):
+            for right in members[i + 1:]:
+                if find(left) != find(right) and similarity(signatures[left], signatures[right]) >= threshold:
+                    parent[find(left)] = find(right)
+    clusters: Dict[int, List[int]] = {}
+    for item in parent:
+        clusters.setdefault(find(item), []).append(item)
+    return sorted((sorted(members) for members in clusters.values() if len(members) > 1), key=len, reverse=True)
+
+
+def cluster_size_histogram(clusters: Iterable[Sequence[int]]) -> Dict[str, int]:
+    """{размер кластера: число кластеров} по возрастанию размера"""
+    sizes = Counter(len(cluster) for cluster in clusters)
+    return {str(size): sizes[size] for size in sorted(sizes)}
+
+
+def main():
+    """Доля похожих существ в случайной выборке и время проверки по индексу"""
+    import random
+    import sys
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(0)
+    signatures = {i: creature_signature(_generate_seeded(rng.getrandbits(63))["creature"]) for i in range(count)}
+
+    groups: Dict[Tuple[int, int], List[int]] = {}
+    for key, sig in signatures.items():
+        for bucket in band_buckets(sig):
+            groups.setdefault(bucket, []).append(key)
+    clusters = near_duplicate_clusters((g for g in groups.values() if len(g) > 1), signatures)
+    duplicated = sum(len(cluster) for cluster in clusters)
+    print(f"Существ: {count}, похожих (Жаккар >= {DEFAULT_THRESHOLD}): {duplicated} ({duplicated / count:.2%})")
+    print(f"Кластеры по размеру: {cluster_size_histogram(clusters)}")
+
+    index = RecentCreatureIndex(capacity=count)
+    for sig in signatures.values():
+        index.add(sig)
+    fresh = [creature_signature(_generate_seeded(rng.getrandbits(63))["creature"]) for _ in range(1000)]
+    started = time.perf_counter()
+    rejected = sum(index.is_near_duplicate(sig) for sig in fresh)
+    elapsed = time.perf_counter() - started
+    print(f"Проверка новых существ по индексу из {len(index)}: {elapsed / len(fresh) * 1e6:.1f} мкс/существо"
+          f" (похожих: {rejected} из {len(fresh)})")
+
+
+if __name__ == "__main__":
+    main()
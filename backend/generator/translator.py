@@ -0,0 +1,150 @@
+"""
+Перевод фраз генератора существ RU→EN по словарю.
+
+Словарь компилируется в префиксное дерево по токенам (без учёта регистра), перевод —
+один проход по строке с поиском самого длинного совпадения в каждой позиции; длина
+просмотра вперёд ограничена самой длинной фразой словаря. Переводы целых строк
+кэшируются: словарь генератора конечен, и одни и те же фразы повторяются постоянно.
+Непереведённые токены с кириллицей собираются — по ним строится отчёт о покрытии.
+
+Отчёт о покрытии словаря генератора: python backend/generator/translator.py
+"""
+
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Mapping, Tuple
+
+_TOKEN_RE = re.compile(r"[\w-]+|[^\w\s]")
+_CYRILLIC_RE = re.compile(r"[а-яё]", re.IGNORECASE)
+# Ключ узла дерева с переводом: (перевод без учёта регистра, {исходное написание: перевод})
+_TERMINAL = ""
+
+
+class PhraseTranslator:
+    """Перевод по словарю фраз: самое длинное совпадение за один проход по токенам"""
+
+    def __init__(self, translations: Mapping[str, str], cache_size: int = 4096):
+        self._root: Dict[str, Any] = {}
+        for phrase, english in translations.items():
+            tokens = [token.lower() for token in _TOKEN_RE.findall(phrase)]
+            if not tokens:
+                continue
+            node = self._root
+            for token in tokens:
+                node = node.setdefault(token, {})
+            ci_value, exact = node.get(_TERMINAL, (None, {}))
+            exact[phrase] = english
+            # Как и прежний нижнерегистровый индекс: при совпадении без учёта регистра побеждает последний
+            node[_TERMINAL] = (english, exact)
+        self._translate_cached = lru_cache(maxsize=cache_size)(self._translate)
+
+    def _translate(self, text: str) -> Tuple[str, Tuple[str, ...]]:
+        matches = list(_TOKEN_RE.finditer(text))
+        lowered = [match.group().lower() for match in matches]
+        parts = []
+        missing = []
+        copied = 0
+        i = 0
+        while i < len(matches):
+            node = self._root
+            best = None
+            j = i
+            while j < len(matches):
+                node = node.get(lowered[j])
+                if node is None:
+                    break
+                j += 1
+                if _TERMINAL in node:
+                    best = (j, node[_TERMINAL])
+            if best is None:
+                # Нет фразы с этого токена — оставляем как есть
+                if _CYRILLIC_RE.search(lowered[i]):
+                    missing.append(matches[i].group())
+                i += 1
+                continue
+            end, (ci_value, exact) = best
+            start_at, end_at = matches[i].start(), matches[end - 1].end()
+            parts.append(text[copied:start_at])
+            # Точное написание приоритетнее совпадения без учёта регистра
+            parts.append(exact.get(text[start_at:end_at], ci_value))
+            copied = end_at
+            i = end
+        parts.append(text[copied:])
+        return "".join(parts), tuple(missing)
+
+    def translate(self, text: str) -> str:
+        """Перевод строки; непереведённые слова остаются как есть"""
+        if not text:
+            return ""
+        return self._translate_cached(text)[0]
+
+    def untranslated(self, text: str) -> Tuple[str, ...]:
+        """Токены с кириллицей, для которых не нашлось перевода"""
+        if not text:
+            return ()
+        return self._translate_cached(text)[1]
+
+    def cache_info(self):
+        return self._translate_cached.cache_info()
+
+    def coverage(self, vocabulary: Mapping[str, Iterable[str]]) -> Dict[str, Any]:
+        """
+        Отчёт о покрытии: по каждой категории — число фраз, полностью переведённых фраз
+        и непереведённые токены (с примером фразы). Общий итог — в ключе 'total'.
+        """
+        categories: Dict[str, Any] = {}
+        all_missing: Counter = Counter()
+        total_phrases = 0
+        total_translated = 0
+        for category, phrases in vocabulary.items():
+            phrases = list(dict.fromkeys(phrases))
+            missing: Counter = Counter()
+            examples: Dict[str, str] = {}
+            translated = 0
+            for phrase in phrases:
+                tokens = self.untranslated(phrase)
+                if not tokens:
+                    translated += 1
+                for token in tokens:
+                    missing[token.lower()] += 1
+                    examples.setdefault(token.lower(), phrase)
+            categories[category] = {
+                "phrases": len(phrases),
+                "translated": translated,
+                "untranslated_tokens": [
+                    {"token": token, "count": count, "example": examples[token]}
+                    for token, count in missing.most_common()
+                ],
+            }
+            all_missing.update(missing)
+            total_phrases += len(phrases)
+            total_translated += translated
+        return {
+            "categories": categories,
+            "total": {
+                "phrases": total_phrases,
+                "translated": total_translated,
+                "coverage": round(total_translated / total_phrases, 4) if total_phrases else 1.0,
+                "untranslated_tokens": sorted(all_missing),
+            },
+        }
+
+
+def main():
+    """Печатает отчёт о покрытии словаря генератора существ"""
+    from promt_gen import TABLES, TRANSLATOR, translation_vocabulary
+
+    report = TRANSLATOR.coverage(translation_vocabulary(TABLES))
+    for category, info in report["categories"].items():
+        print(f"{category:<28} фраз: {info['phrases']:>4}  переведено полностью: {info['translated']:>4}")
+        for item in info["untranslated_tokens"]:
+            print(f"    {item['token']:<24} x{item['count']:<3} например: {item['example']}")
+    total = report["total"]
+    print(f"\nИтого фраз: {total['phrases']}, переведено полностью: {total['translated']} ({total['coverage']:.1%})")
+    if total["untranslated_tokens"]:
+        print("Непереведённые токены: " + ", ".join(total["untranslated_tokens"]))
+
+
+if __name__ == "__main__":
+    main()
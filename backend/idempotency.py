@@ -0,0 +1,364 @@
+"""
+Идемпотентность денежных запросов Telepets.
+
+Клиент передаёт заголовок Idempotency-Key; первый запрос выполняется, его ответ
+сохраняется в `idempotency_keys` (и в памяти процесса), повторы с тем же ключом
+получают сохранённый ответ без повторного выполнения. Одновременные дубли ждут
+завершения первого запроса: в своём процессе — на future, между воркерами —
+опрашивая строку в статусе pending. Пока обработчик выполняется, pending-строка
+продлевается, поэтому перехватить можно только ключ упавшего воркера.
+
+Ответ сохраняется отдельной транзакцией после commit обработчика. Если эта запись
+не удалась, ключ остаётся pending: дубли получают 409, а после
+IDEMPOTENCY_PENDING_TIMEOUT повтор выполнится заново.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.future import select
+
+from db import session_scope, dialect_insert
+from models import IdempotencyKey
+from config.settings import (
+    IDEMPOTENCY_HEADER,
+    IDEMPOTENCY_PATHS,
+    IDEMPOTENCY_TTL_SECONDS,
+    IDEMPOTENCY_PENDING_TIMEOUT,
+    IDEMPOTENCY_HEARTBEAT_INTERVAL,
+    IDEMPOTENCY_WAIT_SECONDS,
+    IDEMPOTENCY_MEMORY_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_COMPLETED = "completed"
+REPLAY_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+_POLL_INTERVAL = 0.2
+
+
+class StoredResponse(NamedTuple):
+    request_hash: str
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    expires_at: datetime
+
+
+class _KeyBusy(Exception):
+    """Запрос с этим ключом ещё выполняется другим воркером."""
+
+
+class ResponseMemory:
+    """LRU сохранённых ответов в памяти процесса — повтор без запроса к БД."""
+
+    def __init__(self, max_size: int = IDEMPOTENCY_MEMORY_SIZE):
+        self._max_size = max_size
+        self._items: "OrderedDict[str, StoredResponse]" = OrderedDict()
+
+    def get(self, key_hash: str) -> Optional[StoredResponse]:
+        stored = self._items.get(key_hash)
+        if stored is None:
+            return None
+        if stored.expires_at <= datetime.utcnow():
+            del self._items[key_hash]
+            return None
+        self._items.move_to_end(key_hash)
+        return stored
+
+    def put(self, key_hash: str, stored: StoredResponse) -> None:
+        self._items[key_hash] = stored
+        self._items.move_to_end(key_hash)
+        while len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+def _encode_headers(headers: List[Tuple[bytes, bytes]]) -> str:
+    return json.dumps([[k.decode("latin-1"), v.decode("latin-1")] for k, v in headers])
+
+
+def _decode_headers(raw: Optional[str]) -> List[Tuple[bytes, bytes]]:
+    if not raw:
+        return []
+    return [(k.encode("latin-1"), v.encode("latin-1")) for k, v in json.loads(raw)]
+
+
+def _stored_from_record(record: IdempotencyKey) -> StoredResponse:
+    return StoredResponse(
+        request_hash=record.request_hash,
+        status=record.response_status,
+        headers=_decode_headers(record.response_headers),
+        body=(record.response_body or "").encode("utf-8"),
+        expires_at=record.expires_at.replace(tzinfo=None),
+    )
+
+
+async def _json_response(send, status: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """ASGI-middleware идемпотентности для путей из IDEMPOTENCY_PATHS (только POST)."""
+
+    def __init__(self, app):
+        self.app = app
+        self._patterns = [re.compile(p) for p in IDEMPOTENCY_PATHS]
+        self._header = IDEMPOTENCY_HEADER.lower().encode("latin-1")
+        self.memory = ResponseMemory()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _applies(self, scope) -> bool:
+        return (
+            scope.get("type") == "http"
+            and scope.get("method") == "POST"
+            and any(p.match(scope.get("path", "")) for p in self._patterns)
+        )
+
+    async def __call__(self, scope, receive, send):
+        if not self._applies(scope):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        raw_key = headers.get(self._header)
+        if not raw_key:
+            await self.app(scope, receive, send)
+            return
+        key = raw_key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _json_response(send, 400, f"Некорректный заголовок {IDEMPOTENCY_HEADER}")
+            return
+
+        body = await self._read_body(receive)
+        key_hash = hashlib.sha256(
+            "\n".join([scope["method"], scope["path"], headers.get(b"authorization", b"").decode("latin-1"), key]).encode("utf-8")
+        ).hexdigest()
+        request_hash = hashlib.sha256(scope.get("query_string", b"") + b"\n" + body).hexdigest()
+
+        try:
+            await self._handle(scope, receive, send, body, key_hash, request_hash)
+        except _KeyBusy:
+            await _json_response(send, 409, "Запрос с этим ключом идемпотентности ещё выполняется")
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        return b"".join(chunks)
+
+    async def _handle(self, scope, receive, send, body: bytes, key_hash: str, request_hash: str) -> None:
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            stored = self.memory.get(key_hash)
+            if stored is not None:
+                await self._replay(send, stored, request_hash)
+                return
+
+            waiting = self._inflight.get(key_hash)
+            if waiting is not None:
+                # Дубль в этом же процессе: ждём первое выполнение и перечитываем результат
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise _KeyBusy()
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiting), remaining)
+                except asyncio.TimeoutError:
+                    raise _KeyBusy()
+                continue
+
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key_hash] = future
+            try:
+                stored = await self._claim(key_hash, request_hash, scope, deadline)
+                if stored is not None:
+                    self.memory.put(key_hash, stored)
+                    await self._replay(send, stored, request_hash)
+                    return
+                await self._execute(scope, receive, send, body, key_hash, request_hash)
+                return
+            finally:
+                self._inflight.pop(key_hash, None)
+                future.set_result(None)
+
+    async def _claim(self, key_hash: str, request_hash: str, scope, deadline: float) -> Optional[StoredResponse]:
+        """Занимает ключ (None) или возвращает уже сохранённый ответ."""
+        while True:
+            now = datetime.utcnow()
+            async with session_scope() as db:
+                values = dict(
+                    key_hash=key_hash,
+                    request_hash=request_hash,
+                    method=scope["method"],
+                    path=scope["path"],
+                    status=STATUS_PENDING,
+                    expires_at=now + timedelta(seconds=IDEMPOTENCY_PENDING_TIMEOUT),
+                )
+                insert = dialect_insert(db, IdempotencyKey)
+                if insert is not None:
+                    inserted = (await db.execute(
+                        insert.values(**values)
+                        .on_conflict_do_nothing(index_elements=["key_hash"])
+                        .returning(IdempotencyKey.id)
+                    )).scalar_one_or_none()
+                    if inserted is not None:
+                        return None
+                else:
+                    try:
+                        async with db.begin_nested():
+                            db.add(IdempotencyKey(**values))
+                        return None
+                    except IntegrityError:
+                        pass
+
+                record = (await db.execute(
+                    select(IdempotencyKey).where(IdempotencyKey.key_hash == key_hash)
+                )).scalar_one_or_none()
+                if record is None:
+                    # Строку только что удалили — пробуем занять снова
+                    continue
+                if record.expires_at.replace(tzinfo=None) <= now:
+                    # Просроченный ответ или зависшее выполнение упавшего воркера
+                    await db.execute(
+                        delete(IdempotencyKey)
+                        .where(IdempotencyKey.id == record.id, IdempotencyKey.expires_at == record.expires_at)
+                    )
+                    continue
+                if record.status == STATUS_COMPLETED:
+                    return _stored_from_record(record)
+
+            if time.monotonic() >= deadline:
+                raise _KeyBusy()
+            await asyncio.sleep(_POLL_INTERVAL)
+
+    async def _execute(self, scope, receive, send, body: bytes, key_hash: str, request_hash: str) -> None:
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response = {"status": None, "headers": [], "body": bytearray()}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = list(message.get("headers") or [])
+            elif message["type"] == "http.response.body":
+                response["body"].extend(message.get("body", b""))
+            await send(message)
+
+        heartbeat = asyncio.create_task(self._heartbeat(key_hash))
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await self._forget(key_hash)
+            raise
+        finally:
+            heartbeat.cancel()
+
+        status = response["status"]
+        try:
+            text = bytes(response["body"]).decode("utf-8")
+        except UnicodeDecodeError:
+            text = None
+        if status is None or status >= 500 or text is None:
+            # Сбой не кэшируем: повтор с тем же ключом выполнится заново
+            await self._forget(key_hash)
+            return
+
+        expires_at = datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+        try:
+            async with session_scope() as db:
+                await db.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.key_hash == key_hash)
+                    .values(
+                        status=STATUS_COMPLETED,
+                        response_status=status,
+                        response_headers=_encode_headers(response["headers"]),
+                        response_body=text,
+                        expires_at=expires_at,
+                    )
+                )
+        except Exception as e:
+            logger.error(f"Не удалось сохранить идемпотентный ответ: {e}")
+            return
+        self.memory.put(
+            key_hash,
+            StoredResponse(request_hash, status, response["headers"], bytes(response["body"]), expires_at),
+        )
+
+    @staticmethod
+    async def _heartbeat(key_hash: str) -> None:
+        """Продлевает pending-ключ, чтобы долгий запрос не перехватил другой воркер."""
+        while True:
+            await asyncio.sleep(IDEMPOTENCY_HEARTBEAT_INTERVAL)
+            try:
+                async with session_scope() as db:
+                    await db.execute(
+                        update(IdempotencyKey)
+                        .where(IdempotencyKey.key_hash == key_hash, IdempotencyKey.status == STATUS_PENDING)
+                        .values(expires_at=datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_PENDING_TIMEOUT))
+                    )
+            except Exception as e:
+                logger.warning(f"Не удалось продлить ключ идемпотентности: {e}")
+
+    @staticmethod
+    async def _forget(key_hash: str) -> None:
+        try:
+            async with session_scope() as db:
+                await db.execute(
+                    delete(IdempotencyKey)
+                    .where(IdempotencyKey.key_hash == key_hash, IdempotencyKey.status == STATUS_PENDING)
+                )
+        except Exception as e:
+            logger.error(f"Не удалось освободить ключ идемпотентности: {e}")
+
+    @staticmethod
+    async def _replay(send, stored: StoredResponse, request_hash: str) -> None:
+        if stored.request_hash != request_hash:
+            await _json_response(send, 422, "Ключ идемпотентности уже использован с другими параметрами")
+            return
+        await send({
+            "type": "http.response.start",
+            "status": stored.status,
+            "headers": stored.headers + [(REPLAY_HEADER, b"true")],
+        })
+        await send({"type": "http.response.body", "body": stored.body})
+
+
+async def purge_expired_keys() -> int:
+    """Удаляет просроченные ключи идемпотентности. Возвращает число удалённых строк."""
+    async with session_scope() as db:
+        result = await db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow())
+        )
+        return result.rowcount or 0
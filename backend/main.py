@@ -8,8 +8,13 @@ from .api import monitoring, debug, pet_images
 from .api import auth_api
 from .api import market
 from .api import user_profile
-from .tasks import start_health_decrease_task, start_auction_finalize_task
+from .tasks import start_health_decrease_task, start_auction_finalize_task, start_idempotency_cleanup_task, start_ledger_task
+from .tasks import start_economy_rollup_task, start_transactions_archive_task, start_creature_pool_task
 from .monitoring import start_monitoring_task, MonitoringMiddleware
+from .idempotency import IdempotencyMiddleware
+# Тот же модуль, что импортирует AuctionService (через sys.path), чтобы хаб был один
+from services.auction_events import auction_events
+from services.wallet_cache import wallet_cache
 from .config.settings import (
     APP_VERSION,
     API_HOST,
@@ -73,6 +78,27 @@ async def lifespan(app: FastAPI):
         # Запуск фоновой задачи финализации аукционов
         await start_auction_finalize_task()
         logger.info("Фоновая задача аукционов запущена")
+
+        # Шина событий живого канала аукционов
+        await auction_events.start()
+
+        # Межворкерная инвалидация кэша кошельков
+        await wallet_cache.start()
+
+        # Очистка просроченных ключей идемпотентности
+        await start_idempotency_cleanup_task()
+
+        # Чекпоинты и сверка леджера
+        await start_ledger_task()
+
+        # Почасовые роллапы экономики
+        await start_economy_rollup_task()
+
+        # Перенос старых транзакций в холодный архив
+        await start_transactions_archive_task()
+
+        # Дозаполнение пула готовых существ для POST /create
+        await start_creature_pool_task()
     
     # Запуск задачи мониторинга
     asyncio.create_task(start_monitoring_task())
@@ -82,6 +108,8 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Выключение Telepets API")
+    await auction_events.stop()
+    await wallet_cache.stop()
 
 app = FastAPI(
     title="Telepets API",
@@ -92,6 +120,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Идемпотентность денежных запросов (внутри CORS, чтобы повторы получали CORS-заголовки)
+app.add_middleware(IdempotencyMiddleware)
+
 # Добавляем CORS middleware
 app.add_middleware(
     CORSMiddleware,
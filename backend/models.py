@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Text, Boolean
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Enum, ForeignKey, Text, Boolean, Index, LargeBinary, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from config.settings import HEALTH_MAX, INITIAL_COINS, ANONYMOUS_MODE_ENABLED
+from generator.enums import Habitat, CreatureType, Size
+from generator.similarity import creature_signature, pack_signature
 import enum
+import json
 
 Base = declarative_base()
 
@@ -40,12 +43,18 @@ class Pet(Base):
     state = Column(Enum(PetState), default=PetState.egg, nullable=False)
     status = Column(Enum(PetLifeStatus), default=PetLifeStatus.alive, nullable=False)
     health = Column(Integer, default=HEALTH_MAX, nullable=False)
-    # Полное JSON-описание существа (характеристики), как в cache/*_prompts.json → ключ creature
+    # Полное JSON-описание существа (характеристики)
     creature_json = Column(Text, nullable=True)
-    # Промпты стадий на английском
-    prompt_egg_en = Column(Text, nullable=True)
-    prompt_baby_en = Column(Text, nullable=True)
-    prompt_adult_en = Column(Text, nullable=True)
+    # Денормализованные признаки существа для фильтрации в SQL (заполняются вместе с creature_json)
+    habitat = Column(Enum(Habitat, name='creaturehabitat'), nullable=True, index=True)
+    creature_type = Column(Enum(CreatureType, name='creaturetype'), nullable=True, index=True)
+    size = Column(Enum(Size, name='creaturesize'), nullable=True, index=True)
+    surface = Column(String, nullable=True, index=True)
+    # Сид детерминированной генерации: существо и промпты стадий — чистая функция сида и версии генератора
+    creature_seed = Column(BigInteger, nullable=True)
+    generator_version = Column(Integer, nullable=True)   # promt_gen.GENERATOR_VERSION на момент генерации
+    # MinHash-сигнатура признаков (generator.similarity); корзины LSH — в creature_signature_bands
+    creature_signature = Column(LargeBinary, nullable=True)
     # Картинки по стадиям (base64 PNG). Для текущей и прошлых стадий заполняются, для будущих — null
     image_egg_b64 = Column(Text, nullable=True)
     image_baby_b64 = Column(Text, nullable=True)
@@ -53,6 +62,84 @@ class Pet(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), nullable=True)
 
+    def set_creature(self, creature: dict) -> None:
+        """Сохраняет описание существа и заполняет денормализованные колонки"""
+        creature = creature or {}
+        self.creature_json = json.dumps(creature, ensure_ascii=False)
+        self.habitat = _enum_by_value(Habitat, creature.get("habitat"))
+        self.creature_type = _enum_by_value(CreatureType, creature.get("type"))
+        self.size = _enum_by_value(Size, creature.get("size"))
+        self.surface = creature.get("surface")
+        self.creature_signature = pack_signature(creature_signature(creature)) if creature else None
+
+    def creature_summary(self) -> dict | None:
+        """Краткое описание существа из колонок, без разбора creature_json"""
+        if self.habitat is None and self.creature_type is None:
+            return None
+        return {
+            "habitat": self.habitat.value if self.habitat else None,
+            "type": self.creature_type.value if self.creature_type else None,
+            "size": self.size.value if self.size else None,
+            "surface": self.surface,
+        }
+
+def _enum_by_value(enum_cls, value):
+    """Находит член Enum по значению (как в creature_json); None, если не найден"""
+    if value is None:
+        return None
+    for member in enum_cls:
+        if member.value == value:
+            return member
+    return None
+
+class Prompt(Base):
+    """Текст промпта, общий для всех ссылок на него: ключ — sha256 текста, текст сжат zlib"""
+    __tablename__ = 'prompts'
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), nullable=False)
+    text_z = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('content_hash', name='uq_prompts_content_hash'),
+    )
+
+class PetPrompt(Base):
+    """EN-промпт стадии питомца без сида (у питомцев с сидом промпты восстанавливаются)"""
+    __tablename__ = 'pet_prompts'
+    id = Column(Integer, primary_key=True, index=True)
+    pet_id = Column(Integer, ForeignKey('pets.id'), nullable=False)
+    stage = Column(String(8), nullable=False)
+    prompt_id = Column(Integer, ForeignKey('prompts.id', name='fk_pet_prompts_prompt_id'), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('pet_id', 'stage', name='uq_pet_prompts_pet_stage'),
+    )
+
+class CreatureSignatureBand(Base):
+    """Корзина LSH сигнатуры питомца: питомцы с общей (band, bucket) — кандидаты в похожие"""
+    __tablename__ = 'creature_signature_bands'
+    id = Column(Integer, primary_key=True, index=True)
+    pet_id = Column(Integer, ForeignKey('pets.id'), nullable=False, index=True)
+    band = Column(Integer, nullable=False)
+    bucket = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index('ix_creature_signature_bands_band_bucket', 'band', 'bucket'),
+    )
+
+class CreaturePoolEntry(Base):
+    """
+    Заранее сгенерированное существо для мгновенного создания питомца.
+    Промпты стадий не хранятся — восстанавливаются из creature_seed, как у питомца.
+    """
+    __tablename__ = 'creature_pool'
+    id = Column(Integer, primary_key=True, index=True)
+    creature_seed = Column(BigInteger, nullable=False)
+    generator_version = Column(Integer, nullable=True)
+    creature_json = Column(Text, nullable=False)
+    image_egg_b64 = Column(Text, nullable=True)       # только при CREATURE_POOL_WITH_IMAGES
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class Notification(Base):
     __tablename__ = 'notifications'
     id = Column(Integer, primary_key=True, index=True)
@@ -100,6 +187,7 @@ class Wallet(Base):
     coins_locked = Column(Integer, default=0, nullable=False)       # Замороженные монеты (холды под ставки)
     total_earned = Column(Integer, default=0, nullable=False)  # Всего заработано
     total_spent = Column(Integer, default=0, nullable=False)   # Всего потрачено
+    ledger_tail_count = Column(Integer, default=0, nullable=False)  # Транзакций после последнего чекпоинта леджера
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -123,6 +211,82 @@ class Transaction(Base):
     # Связи
     user = relationship("User", back_populates="transactions")
 
+    __table_args__ = (
+        # Хвост леджера после чекпоинта и выписки за период — по индексу, без полного скана
+        Index('ix_transactions_user_id_id', 'user_id', 'id'),
+        Index('ix_transactions_user_id_created_at', 'user_id', 'created_at'),
+    )
+
+class LedgerCheckpoint(Base):
+    """
+    Чекпоинт леджера пользователя: баланс и итоги по типам транзакций
+    по транзакцию last_transaction_id включительно (нарастающим итогом).
+    """
+    __tablename__ = 'ledger_checkpoints'
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, ForeignKey('users.user_id'), nullable=False)
+    last_transaction_id = Column(Integer, nullable=False)
+    as_of = Column(DateTime(timezone=True), nullable=False)       # created_at последней учтённой транзакции
+    balance = Column(Integer, nullable=False)                     # balance_after последней учтённой транзакции
+    transactions_count = Column(Integer, nullable=False, default=0)
+    totals = Column(Text, nullable=False)                         # JSON {тип: {"total_amount", "count"}}
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'last_transaction_id', name='uq_ledger_checkpoints_user_txn'),
+        Index('ix_ledger_checkpoints_user_id_as_of', 'user_id', 'as_of'),
+    )
+
+class TransactionArchive(Base):
+    """
+    Холодный сегмент истории транзакций: строки одного пользователя за месяц, сжатые zlib (JSON).
+    Архивируется префикс таблицы transactions по id, граница — водяной знак 'transactions_archive'.
+    """
+    __tablename__ = 'transaction_archives'
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, ForeignKey('users.user_id'), nullable=False)
+    period = Column(String(7), nullable=False)                     # 'YYYY-MM'
+    first_transaction_id = Column(Integer, nullable=False)
+    last_transaction_id = Column(Integer, nullable=False)
+    first_at = Column(DateTime(timezone=True), nullable=False)
+    last_at = Column(DateTime(timezone=True), nullable=False)
+    transactions_count = Column(Integer, nullable=False)
+    opening_balance = Column(Integer, nullable=False)              # balance_before первой строки
+    closing_balance = Column(Integer, nullable=False)              # balance_after последней строки
+    totals = Column(Text, nullable=False)                          # JSON {тип: {"total_amount", "count"}}
+    payload = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_transaction_archives_user_id_last_id', 'user_id', 'last_transaction_id'),
+        Index('ix_transaction_archives_user_id_first_at', 'user_id', 'first_at'),
+    )
+
+class EconomyRollup(Base):
+    """
+    Почасовой роллап экономики: сумма и число транзакций по (час, тип, источник).
+    Заполняется фоновым агрегатором по водяному знаку `rollup_watermarks`.
+    """
+    __tablename__ = 'economy_rollups'
+    id = Column(Integer, primary_key=True, index=True)
+    hour = Column(DateTime(timezone=True), nullable=False)   # начало часа (UTC)
+    transaction_type = Column(String, nullable=False)        # значение TransactionType
+    source = Column(String, nullable=False)                  # источник из transaction_data ('other', если не указан)
+    amount_total = Column(BigInteger, nullable=False, default=0)
+    transactions_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('hour', 'transaction_type', 'source', name='uq_economy_rollups_bucket'),
+    )
+
+class RollupWatermark(Base):
+    """Водяной знак потокового агрегатора: последняя учтённая строка источника."""
+    __tablename__ = 'rollup_watermarks'
+    name = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class Achievement(Base):
     """Достижения пользователя"""
     __tablename__ = 'achievements'
@@ -135,6 +299,42 @@ class Achievement(Base):
     is_claimed = Column(Boolean, default=False)       # Получена ли награда
     created_at = Column(DateTime(timezone=True), server_default=func.now()) 
 
+class RewardClaim(Base):
+    """
+    Счётчик получений награды за период: одна строка на (user_id, reward_type, period_key).
+    Лимиты REWARD_LIMITS проверяются атомарным upsert по уникальному ключу, без сканирования транзакций.
+    """
+    __tablename__ = 'reward_claims'
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, ForeignKey('users.user_id'), nullable=False)
+    reward_type = Column(String, nullable=False)   # Ключ из REWARD_LIMITS (daily_login, game, ...)
+    period_key = Column(String, nullable=False)    # Дата UTC '2026-10-18' или иной ключ периода
+    claims_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'reward_type', 'period_key', name='uq_reward_claims_period'),
+    )
+
+class IdempotencyKey(Base):
+    """
+    Сохранённый ответ денежного запроса по заголовку Idempotency-Key.
+    key_hash — sha256 от (метод, путь, авторизация, ключ); status: pending → completed.
+    """
+    __tablename__ = 'idempotency_keys'
+    id = Column(Integer, primary_key=True, index=True)
+    key_hash = Column(String(64), unique=True, nullable=False)
+    request_hash = Column(String(64), nullable=False)   # отпечаток параметров и тела запроса
+    method = Column(String, nullable=False)
+    path = Column(String, nullable=False)
+    status = Column(String, nullable=False, default='pending')
+    response_status = Column(Integer, nullable=True)
+    response_headers = Column(Text, nullable=True)     # JSON [[name, value], ...]
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
 # ===== МАРКЕТ / АУКЦИОНЫ =====
 
 class AuctionStatus(enum.Enum):
@@ -165,6 +365,12 @@ class Auction(Base):
     end_time = Column(DateTime(timezone=True), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Индексы под keyset-пагинацию листинга: (status, ключ сортировки, id)
+    __table_args__ = (
+        Index('ix_auctions_status_end_time_id', 'status', 'end_time', 'id'),
+        Index('ix_auctions_status_current_price_id', 'status', 'current_price', 'id'),
+    )
+
 class AuctionBid(Base):
     __tablename__ = 'auction_bids'
     id = Column(Integer, primary_key=True, index=True)
@@ -173,6 +379,20 @@ class AuctionBid(Base):
     amount = Column(Integer, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+class AuctionProxyBid(Base):
+    """Скрытая максимальная ставка: движок сам повышает цену за участника при перебитии"""
+    __tablename__ = 'auction_proxy_bids'
+    id = Column(Integer, primary_key=True, index=True)
+    auction_id = Column(Integer, ForeignKey('auctions.id'), nullable=False, index=True)
+    user_id = Column(String, ForeignKey('users.user_id'), nullable=False)
+    max_amount = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('auction_id', 'user_id', name='uq_auction_proxy_bids_auction_user'),
+    )
+
 class WalletHold(Base):
     __tablename__ = 'wallet_holds'
     id = Column(Integer, primary_key=True, index=True)
@@ -192,4 +412,28 @@ class PetOwnershipHistory(Base):
     to_user_id = Column(String, ForeignKey('users.user_id'), nullable=True)
     price = Column(Integer, nullable=True)
     auction_id = Column(Integer, ForeignKey('auctions.id'), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class MarketStat(Base):
+    """
+    Роллап рынка по группе (habitat, creature_type, stage).
+    Обновляется инкрементально при каждой продаже; медиана — потоковый скетч P²,
+    объём за 24 часа — почасовые корзины (JSON).
+    """
+    __tablename__ = 'market_stats'
+    id = Column(Integer, primary_key=True, index=True)
+    # Имена членов Enum (AQUATIC, BEAST, adult); 'unknown' — признак не заполнен
+    habitat = Column(String, nullable=False)
+    creature_type = Column(String, nullable=False)
+    stage = Column(String, nullable=False)
+    sales_count = Column(Integer, nullable=False, default=0)
+    volume_total = Column(Integer, nullable=False, default=0)
+    last_price = Column(Integer, nullable=True)
+    last_sale_at = Column(DateTime(timezone=True), nullable=True)
+    median_sketch = Column(Text, nullable=True)
+    hourly_buckets = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('habitat', 'creature_type', 'stage', name='uq_market_stats_group'),
+    )
@@ -1,69 +1,462 @@
 #!/usr/bin/env python3
 """
-Хранилище стадийных промптов и описания существа для детерминированной генерации
+Хранилище стадийных промптов питомцев.
+
+Единственный источник промптов — таблица pet_prompts (ключ (pet_id, stage) → prompts.id) в
+основной БД. Тексты дедуплицированы: одинаковый промпт хранится в prompts один раз (ключ —
+sha256 текста, текст сжат zlib). У питомцев с сидом промпты не хранятся, а восстанавливаются из
+(Pet.creature_seed, Pet.generator_version) — пока вывод этой версии генератора совпадает с
+зафиксированным отпечатком; иначе читаются из pet_prompts, куда их заранее сохраняет
+
+    python backend/prompt_store.py materialize [--version N]
+
+Чтения стадийных промптов идут через процессный LRU `prompt_cache` по
+(pet_id, stage) — и для сохранённых, и для восстановленных промптов; запись инвалидирует
+ключ сразу и ещё раз после commit. Прежние файлы `*_prompts.json` (по одному на питомца в каталоге
+изображений) и колонки pets.prompt_*_en переносятся сюда: колонки — миграцией 000017,
+файлы — командой
+
+    python backend/prompt_store.py ingest [каталог] [--remove]
 """
 from __future__ import annotations
 
-import os
-import json
+import glob
 import hashlib
-from typing import Dict, Any, Tuple, Optional
+import json
+import os
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 
+from sqlalchemy import and_, delete, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 
-def _get_hash_prefix(text: str, length: int = 32) -> str:
-    return hashlib.md5(text.encode("utf-8")).hexdigest()[:length]
+from config.settings import PROMPT_CACHE_SIZE
+from db import dialect_insert, run_after_commit, session_scope
+from models import Pet, PetPrompt, Prompt
+from generator.promt_gen import restore_seeded, seeded_version_intact
 
+STAGES = ("egg", "baby", "adult")
+# Ключей на один запрос пакетного чтения/записи
+BATCH_CHUNK = 500
 
-def _ensure_dir(path: str) -> None:
-    os.makedirs(path, exist_ok=True)
+COMPRESSION_LEVEL = 6
 
+PromptKey = Tuple[int, str]  # (pet_id, stage)
 
-def get_prompt_store_path(user_id: str, pet_name: str) -> str:
-    from config.settings import FILE_SETTINGS
-    base_dir = FILE_SETTINGS.get("output_dir", os.path.join("cache", "pet_images"))
-    _ensure_dir(base_dir)
-    key = f"{user_id}_{pet_name}"
-    filename = f"{_get_hash_prefix(key)}_prompts.json"
-    return os.path.join(base_dir, filename)
+# Ключи, записанные сессией: её чтения идут мимо кэша, пока запись может откатиться
+_WRITTEN_KEY = "prompt_store_written"
 
 
-def generate_and_store_prompts(user_id: str, pet_name: str) -> Dict[str, Any]:
+class PromptCache:
     """
-    Генерирует описание существа и стадийные промпты, сохраняет на диск.
-    Возвращает словарь с ключами: creature, stage_prompts
+    LRU промптов стадий по (pet_id, stage). Хранится пара (identity, prompt_en), identity —
+    (creature_seed, generator_version): при чтении она сверяется с питомцем, поэтому кэш не
+    отдаёт промпт чужого существа.
+    Отсутствующие промпты не кэшируются.
     """
-    # Подключаем генератор
+
+    def __init__(self, max_size: int = PROMPT_CACHE_SIZE):
+        self._max_size = max_size
+        self._items: "OrderedDict[PromptKey, Tuple[Optional[int], str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: PromptKey, identity: Tuple[Optional[int], Optional[int]]) -> Optional[str]:
+        item = self._items.get(key)
+        if item is None or item[0] != identity:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def put(self, key: PromptKey, identity: Tuple[Optional[int], Optional[int]], prompt_en: Optional[str]) -> None:
+        if not prompt_en:
+            return
+        self._items[key] = (identity, prompt_en)
+        self._items.move_to_end(key)
+        while len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[PromptKey]) -> None:
+        for key in keys:
+            self._items.pop(key, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_size": self._max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+        }
+
+
+prompt_cache = PromptCache()
+
+
+def prompt_hash(text: str) -> str:
+    """Ключ текста в prompts (sha256, hex)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _compress(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def _decompress(text_z: bytes) -> str:
+    return zlib.decompress(text_z).decode("utf-8")
+
+
+def _written_keys(db: AsyncSession) -> set:
+    return db.sync_session.info.get(_WRITTEN_KEY) or set()
+
+
+def _identity(pet: Pet) -> Tuple[Optional[int], Optional[int]]:
+    return pet.creature_seed, pet.generator_version
+
+
+def seed_restorable(pet: Pet) -> bool:
+    """Промпты питомца восстанавливаются из сида (а не читаются из pet_prompts)"""
+    return pet.creature_seed is not None and seeded_version_intact(pet.generator_version)
+
+
+def seeded_prompt_en(pet: Pet, stage: str) -> Optional[str]:
+    """EN-промпт стадии, восстановленный из сида питомца; None — восстановить нельзя"""
+    if pet.creature_seed is None:
+        return None
+    stored = restore_seeded(pet.creature_seed, pet.generator_version)
+    if stored is None:
+        return None
+    return (stored["stage_prompts"].get(stage) or {}).get("en")
+
+
+class PromptStore:
+    """Асинхронное хранилище промптов: get/put по (pet_id, stage) и пакетные операции"""
+
+    @staticmethod
+    async def get(db: AsyncSession, pet_id: int, stage: str) -> Optional[str]:
+        text_z = (await db.execute(
+            select(Prompt.text_z)
+            .join(PetPrompt, PetPrompt.prompt_id == Prompt.id)
+            .where(PetPrompt.pet_id == pet_id, PetPrompt.stage == stage)
+        )).scalar_one_or_none()
+        return _decompress(text_z) if text_z is not None else None
+
+    @staticmethod
+    async def get_many(db: AsyncSession, keys: Iterable[PromptKey]) -> Dict[PromptKey, str]:
+        """Промпты по набору ключей; отсутствующих ключей в ответе нет"""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[PromptKey, str] = {}
+        # Общий для нескольких питомцев текст распаковывается один раз
+        texts: Dict[int, str] = {}
+        for start in range(0, len(keys), BATCH_CHUNK):
+            chunk = keys[start:start + BATCH_CHUNK]
+            by_pet: Dict[int, List[str]] = {}
+            for pet_id, stage in chunk:
+                by_pet.setdefault(pet_id, []).append(stage)
+            rows = await db.execute(
+                select(PetPrompt.pet_id, PetPrompt.stage, Prompt.id, Prompt.text_z)
+                .join(Prompt, PetPrompt.prompt_id == Prompt.id)
+                .where(or_(*(
+                    and_(PetPrompt.pet_id == pet_id, PetPrompt.stage.in_(stages))
+                    for pet_id, stages in by_pet.items()
+                )))
+            )
+            for pet_id, stage, prompt_id, text_z in rows:
+                if prompt_id not in texts:
+                    texts[prompt_id] = _decompress(text_z)
+                found[(pet_id, stage)] = texts[prompt_id]
+        return found
+
+    @staticmethod
+    async def intern(db: AsyncSession, texts: Iterable[str]) -> Dict[str, int]:
+        """
+        id текстов в prompts {текст: id}; отсутствующие тексты добавляются, уже сохранённые
+        (в том числе другими питомцами) переиспользуются. Без commit.
+        """
+        by_hash = {prompt_hash(text): text for text in texts if text}
+        hashes = list(by_hash)
+        ids: Dict[str, int] = {}
+        for start in range(0, len(hashes), BATCH_CHUNK):
+            chunk = hashes[start:start + BATCH_CHUNK]
+            insert = dialect_insert(db, Prompt)
+            if insert is not None:
+                await db.execute(
+                    insert.values([
+                        {"content_hash": content_hash, "text_z": _compress(by_hash[content_hash])}
+                        for content_hash in chunk
+                    ]).on_conflict_do_nothing(index_elements=["content_hash"])
+                )
+            else:
+                existing = set((await db.execute(
+                    select(Prompt.content_hash).where(Prompt.content_hash.in_(chunk))
+                )).scalars())
+                db.add_all([
+                    Prompt(content_hash=content_hash, text_z=_compress(by_hash[content_hash]))
+                    for content_hash in chunk
+                    if content_hash not in existing
+                ])
+                await db.flush()
+            for prompt_id, content_hash in (await db.execute(
+                select(Prompt.id, Prompt.content_hash).where(Prompt.content_hash.in_(chunk))
+            )).all():
+                ids[by_hash[content_hash]] = prompt_id
+        return ids
+
+    @staticmethod
+    async def put(db: AsyncSession, pet_id: int, stage: str, prompt_en: str) -> None:
+        """Записывает промпт стадии (перезаписывая прежний). Без commit."""
+        await PromptStore.put_many(db, {(pet_id, stage): prompt_en})
+
+    @staticmethod
+    async def put_many(db: AsyncSession, items: Mapping[PromptKey, str], overwrite: bool = True) -> int:
+        """
+        Пакетная запись {(pet_id, stage): prompt_en}: тексты — через intern, в pet_prompts —
+        ссылки на них. overwrite=False — существующие ключи не трогаются. Возвращает число
+        переданных ключей. Без commit.
+        """
+        prompt_ids = await PromptStore.intern(db, items.values())
+        rows = [
+            {"pet_id": pet_id, "stage": stage, "prompt_id": prompt_ids[prompt_en]}
+            for (pet_id, stage), prompt_en in items.items()
+            if prompt_en
+        ]
+        keys = [(row["pet_id"], row["stage"]) for row in rows]
+        db.sync_session.info.setdefault(_WRITTEN_KEY, set()).update(keys)
+        prompt_cache.invalidate(keys)
+
+        async def _invalidate() -> None:
+            prompt_cache.invalidate(keys)
+
+        run_after_commit(db, _invalidate)
+        for start in range(0, len(rows), BATCH_CHUNK):
+            chunk = rows[start:start + BATCH_CHUNK]
+            insert = dialect_insert(db, PetPrompt)
+            if insert is not None:
+                insert = insert.values(chunk)
+                if overwrite:
+                    insert = insert.on_conflict_do_update(
+                        index_elements=["pet_id", "stage"],
+                        set_={"prompt_id": insert.excluded.prompt_id},
+                    )
+                else:
+                    insert = insert.on_conflict_do_nothing(index_elements=["pet_id", "stage"])
+                await db.execute(insert)
+                continue
+            existing = {
+                (row.pet_id, row.stage): row
+                for row in (await db.execute(select(PetPrompt).where(or_(*(
+                    and_(PetPrompt.pet_id == item["pet_id"], PetPrompt.stage == item["stage"]) for item in chunk
+                ))))).scalars()
+            }
+            for item in chunk:
+                row = existing.get((item["pet_id"], item["stage"]))
+                if row is None:
+                    db.add(PetPrompt(**item))
+                elif overwrite:
+                    row.prompt_id = item["prompt_id"]
+        await db.flush()
+        return len(rows)
+
+    @staticmethod
+    async def prune(db: AsyncSession) -> int:
+        """Удаляет тексты, на которые не ссылается ни один питомец (после перезаписей). Без commit."""
+        result = await db.execute(
+            delete(Prompt)
+            .where(Prompt.id.not_in(select(PetPrompt.prompt_id)))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount or 0
+
+    @staticmethod
+    async def stage_prompt_en(db: AsyncSession, pet: Pet, stage: str) -> Optional[str]:
+        """EN-промпт стадии: из кэша, восстановленный из сида питомца или из хранилища"""
+        key = (pet.id, stage)
+        cacheable = key not in _written_keys(db)
+        if cacheable:
+            cached = prompt_cache.get(key, _identity(pet))
+            if cached is not None:
+                return cached
+        if seed_restorable(pet):
+            prompt_en = seeded_prompt_en(pet, stage)
+        else:
+            prompt_en = await PromptStore.get(db, pet.id, stage)
+        if cacheable:
+            prompt_cache.put(key, _identity(pet), prompt_en)
+        return prompt_en
+
+    @staticmethod
+    async def stage_prompts_en(db: AsyncSession, pets: Sequence[Pet]) -> Dict[int, Dict[str, Optional[str]]]:
+        """
+        EN-промпты всех стадий для набора питомцев: из кэша, остальные — одним запросом к
+        хранилищу. {pet_id: {"egg_en", "baby_en", "adult_en"}} — формат ответов API.
+        """
+        written = _written_keys(db)
+        found: Dict[PromptKey, Optional[str]] = {}
+        missing: List[PromptKey] = []
+        for pet in pets:
+            for stage in STAGES:
+                key = (pet.id, stage)
+                cached = prompt_cache.get(key, _identity(pet)) if key not in written else None
+                if cached is not None:
+                    found[key] = cached
+                elif seed_restorable(pet):
+                    found[key] = seeded_prompt_en(pet, stage)
+                else:
+                    missing.append(key)
+        found.update(await PromptStore.get_many(db, missing))
+
+        identities = {pet.id: _identity(pet) for pet in pets}
+        for key, prompt_en in found.items():
+            if key not in written:
+                prompt_cache.put(key, identities[key[0]], prompt_en)
+        return {
+            pet.id: {f"{stage}_en": found.get((pet.id, stage)) for stage in STAGES}
+            for pet in pets
+        }
+
+
+def _read_prompt_file(path: str) -> Optional[Dict[str, Any]]:
     try:
-        from backend.generator.promt_gen import CreatureGenerator
-    except Exception:
-        # fallback на относительный импорт
-        from .generator.promt_gen import CreatureGenerator  # type: ignore
-
-    generator = CreatureGenerator()
-    creature = generator.generate_creature()
-    stage_prompts = generator.generate_stage_prompts(creature)
-
-    # Сериализуем creature через JSON описание
-    creature_json = json.loads(generator.generate_json_description(creature))
-
-    payload = {
-        "user_id": user_id,
-        "pet_name": pet_name,
-        "creature": creature_json,
-        "stage_prompts": stage_prompts,
-    }
-
-    path = get_prompt_store_path(user_id, pet_name)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(payload, dict) or not payload.get("user_id") or not payload.get("pet_name"):
+        return None
     return payload
 
 
-def load_prompts(user_id: str, pet_name: str) -> Optional[Dict[str, Any]]:
-    path = get_prompt_store_path(user_id, pet_name)
-    if not os.path.exists(path):
-        return None
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+async def ingest_files(directory: str, remove: bool = False) -> Dict[str, int]:
+    """
+    Переносит `*_prompts.json` из directory в pet_prompts (не перезаписывая уже
+    сохранённые промпты) и дописывает creature_json питомцам, у которых его нет; в конце
+    удаляет тексты без ссылок.
+    remove=True — удаляет обработанные файлы (перенесённые и ненужные питомцам с сидом).
+    """
+    stats = {"files": 0, "ingested": 0, "seeded": 0, "missing_pet": 0, "invalid": 0, "pruned": 0}
+    paths = sorted(glob.glob(os.path.join(directory, "*_prompts.json")))
+    for start in range(0, len(paths), BATCH_CHUNK):
+        chunk = paths[start:start + BATCH_CHUNK]
+        payloads = []
+        for path in chunk:
+            stats["files"] += 1
+            payload = _read_prompt_file(path)
+            if payload is None:
+                stats["invalid"] += 1
+            else:
+                payloads.append((path, payload))
+        processed = []
+        async with session_scope() as db:
+            user_ids = {payload["user_id"] for _, payload in payloads}
+            pets = {
+                (pet.user_id, pet.name): pet
+                for pet in (await db.execute(select(Pet).where(Pet.user_id.in_(user_ids)))).scalars()
+            } if user_ids else {}
+            items: Dict[PromptKey, str] = {}
+            for path, payload in payloads:
+                pet = pets.get((payload["user_id"], payload["pet_name"]))
+                if pet is None:
+                    stats["missing_pet"] += 1
+                    continue
+                processed.append(path)
+                if seed_restorable(pet):
+                    stats["seeded"] += 1
+                    continue
+                stage_prompts = payload.get("stage_prompts") or {}
+                for stage in STAGES:
+                    prompt_en = (stage_prompts.get(stage) or {}).get("en")
+                    if prompt_en:
+                        items[(pet.id, stage)] = prompt_en
+                if pet.creature_json is None and payload.get("creature"):
+                    pet.set_creature(payload["creature"])
+                stats["ingested"] += 1
+            await PromptStore.put_many(db, items, overwrite=False)
+        if remove:
+            for path in processed:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+    async with session_scope() as db:
+        stats["pruned"] = await PromptStore.prune(db)
+    return stats
+
+
+async def materialize_seeded(version: Optional[int] = None) -> Dict[str, int]:
+    """
+    Сохраняет в pet_prompts промпты питомцев с сидом (только версии version, если задана), не
+    перезаписывая уже сохранённые. Запускается до правки генератора, меняющей вывод версии:
+    после неё сиды этой версии не восстанавливаются и промпты читаются отсюда.
+    """
+    stats = {"pets": 0, "stored": 0, "unrestorable": 0}
+    last_id = 0
+    while True:
+        async with session_scope() as db:
+            query = (
+                select(Pet)
+                .where(Pet.id > last_id, Pet.creature_seed.is_not(None))
+                .order_by(Pet.id)
+                .limit(BATCH_CHUNK)
+            )
+            if version is not None:
+                query = query.where(Pet.generator_version == version)
+            pets = (await db.execute(query)).scalars().all()
+            if not pets:
+                break
+            items: Dict[PromptKey, str] = {}
+            for pet in pets:
+                stats["pets"] += 1
+                stored = restore_seeded(pet.creature_seed, pet.generator_version)
+                if stored is None:
+                    stats["unrestorable"] += 1
+                    continue
+                for stage in STAGES:
+                    prompt_en = (stored["stage_prompts"].get(stage) or {}).get("en")
+                    if prompt_en:
+                        items[(pet.id, stage)] = prompt_en
+            stats["stored"] += await PromptStore.put_many(db, items, overwrite=False)
+            last_id = pets[-1].id
+    return stats
+
+
+def main():
+    """CLI: перенос файлов промптов в хранилище и сохранение промптов питомцев с сидом"""
+    import argparse
+    import asyncio
+
+    from config.settings import FILE_SETTINGS
+
+    parser = argparse.ArgumentParser(description="Хранилище промптов питомцев")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="перенести *_prompts.json в pet_prompts")
+    ingest.add_argument("directory", nargs="?", default=FILE_SETTINGS.get("output_dir", os.path.join("cache", "pet_images")))
+    ingest.add_argument("--remove", action="store_true", help="удалить обработанные файлы")
+    materialize = sub.add_parser("materialize", help="сохранить промпты питомцев с сидом в pet_prompts")
+    materialize.add_argument("--version", type=int, default=None, help="только питомцы этой версии генератора")
+    args = parser.parse_args()
+
+    if args.command == "materialize":
+        stats = asyncio.run(materialize_seeded(args.version))
+        print(
+            f"Питомцев с сидом: {stats['pets']}, записано промптов: {stats['stored']}, "
+            f"не восстанавливаются: {stats['unrestorable']}"
+        )
+        return
+    stats = asyncio.run(ingest_files(args.directory, remove=args.remove))
+    print(
+        f"Файлов: {stats['files']}, перенесено: {stats['ingested']}, у питомцев с сидом: {stats['seeded']}, "
+        f"питомец не найден: {stats['missing_pet']}, повреждены: {stats['invalid']}, "
+        f"удалено текстов без ссылок: {stats['pruned']}"
+    )
 
 
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,20 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update
+from sqlalchemy import update, and_, or_
 from datetime import datetime, timedelta
-from typing import Optional, Tuple
+from typing import Optional, Tuple, List, Dict, Any
+import base64
+import json
 
 from models import (
     Pet,
+    PetState,
     PetLifeStatus,
+    Habitat,
+    CreatureType,
     Auction,
     AuctionBid,
+    AuctionProxyBid,
     AuctionStatus,
     Wallet,
     WalletHold,
@@ -23,15 +29,26 @@ from config.settings import (
     AUCTION_MIN_BID_INCREMENT_ABS,
     MARKET_FEE_PERCENT,
     AUCTION_MAX_ACTIVE_PER_USER,
+    AUCTION_LIST_MAX_PAGE_SIZE,
 )
 from economy import EconomyService
 from telegram_client import telegram_client
+from db import run_after_commit
 from services.user_profile import UserProfileService
+from services.market_stats import MarketStatsService
+from services.auction_events import auction_events, EVENT_BID, EVENT_EXTENSION, EVENT_CLOSE, EVENT_BUY_NOW
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Поддерживаемые сортировки листинга: ключ → (колонка, направление)
+AUCTION_SORTS = {
+    "end_time": (Auction.end_time, "asc"),
+    "price_asc": (Auction.current_price, "asc"),
+    "price_desc": (Auction.current_price, "desc"),
+}
+
 
 class AuctionService:
     """Сервис аукционов. Логика изолирована от остальной экономики.
@@ -61,6 +78,97 @@ class AuctionService:
         abs_inc = max(min_inc_abs or AUCTION_MIN_BID_INCREMENT_ABS, AUCTION_MIN_BID_INCREMENT_ABS)
         return current_price + max(pct_inc, abs_inc)
 
+    # ===== Листинг (keyset-пагинация) =====
+    @staticmethod
+    def _encode_cursor(sort: str, auction: Auction) -> str:
+        column, _ = AUCTION_SORTS[sort]
+        value = getattr(auction, column.key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        raw = json.dumps({"s": sort, "v": value, "id": auction.id}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(sort: str, cursor: str) -> Tuple[Any, int]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            if data["s"] != sort:
+                raise ValueError("sort mismatch")
+            value = data["v"]
+            if sort == "end_time":
+                value = datetime.fromisoformat(value)
+            else:
+                value = int(value)
+            return value, int(data["id"])
+        except Exception:
+            raise ValueError("Некорректный курсор пагинации")
+
+    @staticmethod
+    async def search_auctions(
+        db: AsyncSession,
+        status: AuctionStatus = AuctionStatus.active,
+        sort: str = "end_time",
+        cursor: Optional[str] = None,
+        limit: int = 20,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        has_buy_now: Optional[bool] = None,
+        stage: Optional[PetState] = None,
+        habitat: Optional[Habitat] = None,
+        creature_type: Optional[CreatureType] = None,
+    ) -> Tuple[List[Auction], Optional[str]]:
+        """Листинг аукционов с фильтрами и keyset-пагинацией.
+
+        Страница выбирается условием `(ключ, id) > курсор` по индексам
+        (status, end_time, id) / (status, current_price, id), поэтому любая
+        страница стоит столько же, сколько первая. Возвращает (лоты, next_cursor).
+        """
+        if sort not in AUCTION_SORTS:
+            raise ValueError(f"Неизвестная сортировка: {sort}")
+        limit = max(1, min(limit, AUCTION_LIST_MAX_PAGE_SIZE))
+        column, direction = AUCTION_SORTS[sort]
+
+        q = select(Auction).where(Auction.status == status)
+        if min_price is not None:
+            q = q.where(Auction.current_price >= min_price)
+        if max_price is not None:
+            q = q.where(Auction.current_price <= max_price)
+        if has_buy_now is True:
+            q = q.where(Auction.buy_now_price.is_not(None))
+        elif has_buy_now is False:
+            q = q.where(Auction.buy_now_price.is_(None))
+
+        if stage is not None or habitat is not None or creature_type is not None:
+            q = q.join(Pet, Pet.id == Auction.pet_id)
+            if stage is not None:
+                q = q.where(Pet.state == stage)
+            if habitat is not None:
+                q = q.where(Pet.habitat == habitat)
+            if creature_type is not None:
+                q = q.where(Pet.creature_type == creature_type)
+
+        if cursor:
+            value, last_id = AuctionService._decode_cursor(sort, cursor)
+            if direction == "asc":
+                q = q.where(or_(column > value, and_(column == value, Auction.id > last_id)))
+            else:
+                q = q.where(or_(column < value, and_(column == value, Auction.id < last_id)))
+
+        if direction == "asc":
+            q = q.order_by(column.asc(), Auction.id.asc())
+        else:
+            q = q.order_by(column.desc(), Auction.id.desc())
+
+        # Берём на одну запись больше, чтобы понять, есть ли следующая страница
+        result = await db.execute(q.limit(limit + 1))
+        auctions = list(result.scalars().all())
+        next_cursor = None
+        if len(auctions) > limit:
+            auctions = auctions[:limit]
+            next_cursor = AuctionService._encode_cursor(sort, auctions[-1])
+        return auctions, next_cursor
+
     @staticmethod
     async def create_auction(
         db: AsyncSession,
@@ -113,8 +221,7 @@ class AuctionService:
             end_time=end_time,
         )
         db.add(auction)
-        await db.commit()
-        await db.refresh(auction)
+        await db.flush()
         logger.info(f"Создан аукцион {auction.id} для питомца {pet_id} продавцом {seller_user_id}")
         return auction
 
@@ -128,6 +235,122 @@ class AuctionService:
         if amount <= 0:
             raise ValueError("Ставка должна быть > 0")
 
+        auction = await AuctionService._get_active_auction_for_bidder(db, auction_id, bidder_user_id)
+
+        # Минимально допустимая ставка
+        min_next = AuctionService._calc_min_next_bid(
+            auction.current_price,
+            auction.min_increment_abs,
+            auction.min_increment_pct,
+        )
+        if amount < min_next:
+            raise ValueError(f"Слишком маленькая ставка. Минимум: {min_next}")
+
+        # Проверяем доступный баланс с учётом холдов (свой hold на этом лоте тоже доступен)
+        available = await AuctionService._available_for_auction(db, auction, bidder_user_id)
+        if available < amount:
+            raise ValueError("Недостаточно монет для ставки")
+
+        prev_end_time = auction.end_time
+        bid = await AuctionService._set_leader(db, auction, bidder_user_id, amount)
+        # Прокси-ставки других участников отвечают сразу, одним расчётом
+        await AuctionService._resolve_proxy_bids(db, auction)
+
+        await db.flush()
+        logger.info(f"Новая ставка {amount} в аукционе {auction.id} от {bidder_user_id}")
+        AuctionService._emit_bid_events(db, auction, prev_end_time)
+        return auction, bid
+
+    @staticmethod
+    async def place_proxy_bid(
+        db: AsyncSession,
+        auction_id: int,
+        bidder_user_id: str,
+        max_amount: int,
+    ) -> Tuple[Auction, AuctionProxyBid]:
+        """Регистрирует (или повышает) скрытую максимальную ставку участника.
+
+        Движок поднимает цену за участника шагами `_calc_min_next_bid` только при
+        перебитии; вся «война» прокси-ставок решается одним расчётом.
+        """
+        if max_amount <= 0:
+            raise ValueError("Ставка должна быть > 0")
+
+        auction = await AuctionService._get_active_auction_for_bidder(db, auction_id, bidder_user_id)
+
+        if auction.current_winner_user_id == bidder_user_id:
+            # Лидер может поднять свой максимум, не поднимая цену
+            if max_amount <= auction.current_price:
+                raise ValueError(f"Максимальная ставка должна быть больше текущей цены: {auction.current_price}")
+        else:
+            min_next = AuctionService._calc_min_next_bid(
+                auction.current_price,
+                auction.min_increment_abs,
+                auction.min_increment_pct,
+            )
+            if max_amount < min_next:
+                raise ValueError(f"Слишком маленькая ставка. Минимум: {min_next}")
+
+        available = await AuctionService._available_for_auction(db, auction, bidder_user_id)
+        if available < max_amount:
+            raise ValueError("Недостаточно монет для максимальной ставки")
+
+        proxy_result = await db.execute(
+            select(AuctionProxyBid).where(
+                AuctionProxyBid.auction_id == auction.id,
+                AuctionProxyBid.user_id == bidder_user_id,
+            )
+        )
+        proxy = proxy_result.scalar_one_or_none()
+        if proxy:
+            if max_amount <= proxy.max_amount:
+                raise ValueError("Новый максимум должен быть больше предыдущего")
+            proxy.max_amount = max_amount
+        else:
+            proxy = AuctionProxyBid(auction_id=auction.id, user_id=bidder_user_id, max_amount=max_amount)
+            db.add(proxy)
+        await db.flush()
+
+        prev_end_time = auction.end_time
+        price_bid = await AuctionService._resolve_proxy_bids(db, auction)
+
+        await db.flush()
+        logger.info(f"Прокси-ставка до {max_amount} в аукционе {auction.id} от {bidder_user_id}")
+        if price_bid is not None:
+            # Сумма максимума скрыта: наружу уходит только новая цена и лидер
+            AuctionService._emit_bid_events(db, auction, prev_end_time)
+        return auction, proxy
+
+    @staticmethod
+    def _emit(db: AsyncSession, event_type: str, auction: Auction, **extra: Any) -> None:
+        """Событие живого канала уходит только после успешного commit единицы работы."""
+        event = auction_events.build(event_type, auction, **extra)
+        run_after_commit(db, lambda: auction_events.publish_event(event))
+
+    @staticmethod
+    def _emit_bid_events(db: AsyncSession, auction: Auction, prev_end_time: datetime) -> None:
+        """Сообщает живому каналу о новой цене и, если был soft-close, о продлении."""
+        AuctionService._emit(db, EVENT_BID, auction)
+        if prev_end_time and auction.end_time and auction.end_time > prev_end_time:
+            AuctionService._emit(
+                db,
+                EVENT_EXTENSION,
+                auction,
+                previous_end_time=prev_end_time.isoformat(),
+            )
+
+    @staticmethod
+    async def get_proxy_bid(db: AsyncSession, auction_id: int, user_id: str) -> Optional[AuctionProxyBid]:
+        result = await db.execute(
+            select(AuctionProxyBid).where(
+                AuctionProxyBid.auction_id == auction_id,
+                AuctionProxyBid.user_id == user_id,
+            )
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def _get_active_auction_for_bidder(db: AsyncSession, auction_id: int, bidder_user_id: str) -> Auction:
         auction = await AuctionService._get_auction(db, auction_id)
         if not auction:
             raise ValueError("Аукцион не найден")
@@ -137,80 +360,160 @@ class AuctionService:
             raise ValueError("Аукцион уже завершен по времени")
         if auction.seller_user_id == bidder_user_id:
             raise PermissionError("Нельзя ставить на свой аукцион")
+        return auction
 
-        # Минимально допустимая ставка
-        min_next = AuctionService._calc_min_next_bid(
-            auction.current_price,
-            auction.min_increment_abs,
-            auction.min_increment_pct,
+    @staticmethod
+    async def _get_active_holds(db: AsyncSession, auction_id: int) -> Dict[str, WalletHold]:
+        result = await db.execute(
+            select(WalletHold).where(
+                WalletHold.auction_id == auction_id,
+                WalletHold.status == WalletHoldStatus.active,
+            )
         )
-        if amount < min_next:
-            raise ValueError(f"Слишком маленькая ставка. Минимум: {min_next}")
+        return {hold.user_id: hold for hold in result.scalars().all()}
 
-        # Проверяем доступный баланс с учётом холдов
-        wallet = await AuctionService._get_wallet(db, bidder_user_id)
+    @staticmethod
+    async def _available_for_auction(db: AsyncSession, auction: Auction, user_id: str) -> int:
+        """Свободные монеты пользователя плюс его активный hold на этом лоте."""
+        wallet = await AuctionService._get_wallet(db, user_id)
         if not wallet:
-            wallet = await EconomyService.create_user_wallet(db, bidder_user_id)
+            wallet = await EconomyService.create_user_wallet(db, user_id)
         available = wallet.coins - (wallet.coins_locked or 0)
-        if available < amount:
-            raise ValueError("Недостаточно монет для ставки")
+        if auction.current_winner_user_id == user_id:
+            holds = await AuctionService._get_active_holds(db, auction.id)
+            own_hold = holds.get(user_id)
+            if own_hold:
+                available += own_hold.amount
+        return available
 
-        # Снимаем hold у предыдущего лидера, если он был
-        if auction.current_winner_user_id:
-            prev_hold_result = await db.execute(
-                select(WalletHold)
-                .where(
-                    WalletHold.auction_id == auction.id,
-                    WalletHold.user_id == auction.current_winner_user_id,
-                    WalletHold.status == WalletHoldStatus.active,
-                )
-                .order_by(WalletHold.created_at.desc())
-            )
-            prev_hold = prev_hold_result.scalar_one_or_none()
+    @staticmethod
+    async def _set_leader(db: AsyncSession, auction: Auction, user_id: str, amount: int) -> AuctionBid:
+        """Делает пользователя лидером по цене amount с одной корректировкой hold-ов."""
+        holds = await AuctionService._get_active_holds(db, auction.id)
+        prev_leader = auction.current_winner_user_id
+
+        if prev_leader == user_id and user_id in holds:
+            # Лидер повышает сам себя: меняем сумму существующего hold
+            hold = holds[user_id]
+            await EconomyService.adjust_locked_coins(db, user_id, amount - hold.amount)
+            hold.amount = amount
+        else:
+            # Сначала замораживаем средства нового лидера: проверка баланса атомарна в SQL
+            await EconomyService.adjust_locked_coins(db, user_id, amount)
+            db.add(WalletHold(
+                user_id=user_id,
+                auction_id=auction.id,
+                amount=amount,
+                status=WalletHoldStatus.active,
+            ))
+
+            # Снимаем hold у предыдущего лидера, если он был
+            prev_hold = holds.get(prev_leader) if prev_leader else None
             if prev_hold:
-                prev_wallet = await AuctionService._get_wallet(db, prev_hold.user_id)
-                if prev_wallet and prev_wallet.coins_locked >= prev_hold.amount:
-                    prev_wallet.coins_locked -= prev_hold.amount
+                try:
+                    await EconomyService.adjust_locked_coins(db, prev_hold.user_id, -prev_hold.amount)
+                except ValueError as e:
+                    logger.warning(f"Не удалось разморозить hold {prev_hold.id} аукциона {auction.id}: {e}")
                 prev_hold.status = WalletHoldStatus.released
                 prev_hold.released_at = datetime.utcnow()
-                # Уведомляем предыдущего лидера о перебитии
-                try:
-                    await telegram_client.send_auction_outbid(prev_hold.user_id, auction.id, amount)
-                except Exception:
-                    pass
-
-        # Создаем новый hold
-        wallet.coins_locked += amount
-        hold = WalletHold(
-            user_id=bidder_user_id,
-            auction_id=auction.id,
-            amount=amount,
-            status=WalletHoldStatus.active,
-        )
-        db.add(hold)
+                # Уведомляем предыдущего лидера о перебитии (после commit)
+                outbid_user_id = prev_hold.user_id
+                run_after_commit(db, lambda: AuctionService._notify(
+                    telegram_client.send_auction_outbid(outbid_user_id, auction.id, amount)
+                ))
 
         # Записываем ставку
         bid = AuctionBid(
             auction_id=auction.id,
-            bidder_user_id=bidder_user_id,
+            bidder_user_id=user_id,
             amount=amount,
         )
         db.add(bid)
 
         # Обновляем текущую цену и лидера
         auction.current_price = amount
-        auction.current_winner_user_id = bidder_user_id
+        auction.current_winner_user_id = user_id
 
         # Soft-close продление
+        soft_close = auction.soft_close_seconds or AUCTION_SOFT_CLOSE_SECONDS
         remaining = (auction.end_time - datetime.utcnow()).total_seconds()
-        if remaining <= (auction.soft_close_seconds or AUCTION_SOFT_CLOSE_SECONDS):
-            auction.end_time = datetime.utcnow() + timedelta(seconds=auction.soft_close_seconds or AUCTION_SOFT_CLOSE_SECONDS)
+        if remaining <= soft_close:
+            auction.end_time = datetime.utcnow() + timedelta(seconds=soft_close)
 
-        await db.commit()
-        await db.refresh(auction)
-        await db.refresh(bid)
-        logger.info(f"Новая ставка {amount} в аукционе {auction.id} от {bidder_user_id}")
-        return auction, bid
+        await db.flush()
+        return bid
+
+    @staticmethod
+    async def _resolve_proxy_bids(db: AsyncSession, auction: Auction) -> Optional[AuctionBid]:
+        """Разрешает конкуренцию прокси-ставок за один проход.
+
+        Вместо пошаговой перебивки (N ставок) считаем итог сразу: побеждает
+        наибольший максимум (при равенстве — действующий лидер, затем более
+        ранняя прокси-ставка), цена = следующий шаг над вторым максимумом,
+        но не выше максимума победителя. Максимумы ограничены доступными
+        средствами участника на момент расчёта.
+        """
+        proxies_result = await db.execute(
+            select(AuctionProxyBid)
+            .where(AuctionProxyBid.auction_id == auction.id)
+            .order_by(AuctionProxyBid.created_at.asc(), AuctionProxyBid.id.asc())
+        )
+        proxies = proxies_result.scalars().all()
+        if not proxies:
+            return None
+
+        leader = auction.current_winner_user_id
+        threshold = AuctionService._calc_min_next_bid(
+            auction.current_price,
+            auction.min_increment_abs,
+            auction.min_increment_pct,
+        )
+
+        # Доступные средства всех участников — одним запросом
+        wallets_result = await db.execute(
+            select(Wallet).where(Wallet.user_id.in_([p.user_id for p in proxies]))
+        )
+        wallets = {w.user_id: w for w in wallets_result.scalars().all()}
+        holds = await AuctionService._get_active_holds(db, auction.id)
+
+        # (user_id, эффективный максимум, приоритет при равенстве)
+        entries: List[Tuple[str, int, int]] = []
+        if leader:
+            entries.append((leader, auction.current_price, -1))
+        for priority, proxy in enumerate(proxies):
+            wallet = wallets.get(proxy.user_id)
+            if not wallet:
+                continue
+            funds = wallet.coins - (wallet.coins_locked or 0)
+            own_hold = holds.get(proxy.user_id)
+            if own_hold:
+                funds += own_hold.amount
+            effective_max = min(proxy.max_amount, funds)
+            if proxy.user_id == leader:
+                entries[0] = (leader, max(auction.current_price, effective_max), -1)
+            elif effective_max >= threshold:
+                entries.append((proxy.user_id, effective_max, priority))
+
+        challengers = [e for e in entries if e[0] != leader]
+        if not challengers:
+            return None
+
+        ranked = sorted(entries, key=lambda e: (-e[1], e[2]))
+        top_user, top_max, _ = ranked[0]
+        if len(ranked) > 1:
+            second_max = ranked[1][1]
+            step_over_second = AuctionService._calc_min_next_bid(
+                second_max,
+                auction.min_increment_abs,
+                auction.min_increment_pct,
+            )
+            price = min(top_max, max(threshold, step_over_second))
+        else:
+            price = threshold
+
+        if top_user == leader and price <= auction.current_price:
+            return None
+        return await AuctionService._set_leader(db, auction, top_user, price)
 
     @staticmethod
     async def buy_now(
@@ -246,6 +549,7 @@ class AuctionService:
             final_price=price,
             skip_hold=True,
         )
+        AuctionService._emit(db, EVENT_BUY_NOW, auction, final_price=price)
         return auction
 
     @staticmethod
@@ -263,9 +567,9 @@ class AuctionService:
             raise ValueError("Нельзя отменить аукцион с активной ставкой")
 
         auction.status = AuctionStatus.cancelled
-        await db.commit()
-        await db.refresh(auction)
+        await db.flush()
         logger.info(f"Аукцион {auction.id} отменен продавцом {seller_user_id}")
+        AuctionService._emit(db, EVENT_CLOSE, auction)
         return auction
 
     @staticmethod
@@ -284,16 +588,17 @@ class AuctionService:
                 final_price=auction.current_price,
                 skip_hold=False,
             )
+            AuctionService._emit(db, EVENT_CLOSE, auction, final_price=auction.current_price)
         else:
             auction.status = AuctionStatus.expired
-            await db.commit()
-            await db.refresh(auction)
+            await db.flush()
             logger.info(f"Аукцион {auction.id} завершен без ставок")
+            AuctionService._emit(db, EVENT_CLOSE, auction)
             # Уведомляем продавца об истечении без продажи
-            try:
-                await telegram_client.send_auction_expired(auction.seller_user_id, auction.id)
-            except Exception:
-                pass
+            seller_user_id = auction.seller_user_id
+            run_after_commit(db, lambda: AuctionService._notify(
+                telegram_client.send_auction_expired(seller_user_id, auction.id)
+            ))
         return auction
 
     @staticmethod
@@ -329,16 +634,10 @@ class AuctionService:
             hold = hold_result.scalar_one_or_none()
             if not hold or hold.amount < final_price:
                 raise ValueError("Нет достаточного хода средств для финализации")
-            # Списываем через уменьшение coins и coins_locked
-            winner_wallet = await AuctionService._get_wallet(db, winner_user_id)
-            if not winner_wallet or winner_wallet.coins_locked < hold.amount or winner_wallet.coins < final_price:
-                raise ValueError("Недостаточно средств у победителя при финализации")
-            winner_wallet.coins_locked -= hold.amount
-            winner_wallet.coins -= final_price
             hold.status = WalletHoldStatus.captured
             hold.captured_at = datetime.utcnow()
 
-            # Транзакция market_purchase как запись истории
+            # Списание и снятие заморозки одним атомарным UPDATE вместе с записью market_purchase
             await EconomyService.create_transaction(
                 db=db,
                 user_id=winner_user_id,
@@ -346,6 +645,7 @@ class AuctionService:
                 amount=final_price,
                 description=f"Покупка на рынке (аукцион {auction.id})",
                 transaction_data={"auction_id": auction.id, "pet_id": auction.pet_id},
+                release_locked=hold.amount,
             )
 
         # Начисляем продавцу за вычетом комиссии
@@ -379,29 +679,32 @@ class AuctionService:
         )
         db.add(history)
 
+        # Инкрементальная статистика рынка в той же транзакции
+        await MarketStatsService.record_sale(db, pet, final_price)
+
         # Закрываем аукцион
         auction.status = AuctionStatus.completed
-        await db.commit()
-        await db.refresh(auction)
+        await db.flush()
         logger.info(f"Аукцион {auction.id} завершен. Победитель {winner_user_id}, цена {final_price}")
 
-        # Уведомления
+        # Уведомления (имя покупателя читаем сейчас, отправка — после commit)
+        winner_info = await UserProfileService.get_public_user_info(db, winner_user_id)
+        winner_name = winner_info["public_name"] if winner_info else "Неизвестный игрок"
+        auction_id = auction.id
+        seller_user_id = auction.seller_user_id
+        run_after_commit(db, lambda: AuctionService._notify(
+            telegram_client.send_auction_won(winner_user_id, auction_id, final_price)
+        ))
+        run_after_commit(db, lambda: AuctionService._notify(
+            telegram_client.send_pet_sold(seller_user_id, auction_id, seller_amount, winner_name)
+        ))
+
+    @staticmethod
+    async def _notify(send) -> None:
+        """Отправка уведомления: ошибки Telegram не влияют на сделку."""
         try:
-            # Получаем анонимные имена для уведомлений
-            winner_info = await UserProfileService.get_public_user_info(db, winner_user_id)
-            seller_info = await UserProfileService.get_public_user_info(db, auction.seller_user_id)
-            
-            # Уведомляем победителя
-            await telegram_client.send_auction_won(winner_user_id, auction.id, final_price)
-            
-            # Уведомляем продавца
-            await telegram_client.send_pet_sold(
-                auction.seller_user_id, 
-                auction.id, 
-                seller_amount,
-                winner_info.public_name if winner_info else "Неизвестный игрок"
-            )
+            await send
         except Exception as e:
-            logger.warning(f"Ошибка отправки уведомлений для аукциона {auction.id}: {e}")
+            logger.warning(f"Ошибка отправки уведомления по аукциону: {e}")
 
 
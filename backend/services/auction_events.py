@@ -0,0 +1,232 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from models import Auction
+from config.settings import (
+    DATABASE_URL,
+    AUCTION_EVENTS_BUS,
+    AUCTION_EVENTS_PG_CHANNEL,
+    AUCTION_EVENTS_QUEUE_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Типы событий живого канала аукционов
+EVENT_BID = "bid"
+EVENT_EXTENSION = "extension"
+EVENT_CLOSE = "close"
+EVENT_BUY_NOW = "buy_now"
+
+EventHandler = Callable[[Dict[str, Any]], None]
+
+
+class LocalEventBus:
+    """
+    Шина в пределах одного процесса: событие сразу отдаётся локальному хабу.
+    Используется по умолчанию, в тестах и при одном воркере.
+    """
+
+    def __init__(self):
+        self._handler: Optional[EventHandler] = None
+
+    def attach(self, handler: EventHandler) -> None:
+        self._handler = handler
+
+    async def start(self) -> None:
+        return None
+
+    async def stop(self) -> None:
+        return None
+
+    async def publish(self, event: Dict[str, Any]) -> None:
+        if self._handler:
+            self._handler(event)
+
+
+class PostgresEventBus:
+    """
+    Межворкерная шина на LISTEN/NOTIFY PostgreSQL.
+    Каждый воркер слушает канал и раздаёт события своим подписчикам,
+    в том числе те, что опубликовал сам.
+    """
+
+    def __init__(self, dsn: str, channel: str, connect_args: Optional[dict] = None):
+        self._dsn = dsn
+        self._channel = channel
+        self._connect_args = connect_args or {}
+        self._handler: Optional[EventHandler] = None
+        self._conn = None
+        self._lock = asyncio.Lock()
+
+    def attach(self, handler: EventHandler) -> None:
+        self._handler = handler
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        if not self._handler:
+            return
+        try:
+            self._handler(json.loads(payload))
+        except Exception as e:
+            logger.warning(f"Некорректное событие аукциона из шины: {e}")
+
+    async def start(self) -> None:
+        import asyncpg
+
+        self._conn = await asyncpg.connect(self._dsn, **self._connect_args)
+        await self._conn.add_listener(self._channel, self._on_notify)
+        logger.info(f"Шина событий аукционов: LISTEN {self._channel}")
+
+    async def stop(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            await self._conn.remove_listener(self._channel, self._on_notify)
+            await self._conn.close()
+        finally:
+            self._conn = None
+
+    async def publish(self, event: Dict[str, Any]) -> None:
+        if self._conn is None:
+            # Шина ещё не поднята — раздаём хотя бы локальным подписчикам
+            if self._handler:
+                self._handler(event)
+            return
+        async with self._lock:
+            await self._conn.execute("SELECT pg_notify($1, $2)", self._channel, json.dumps(event))
+
+
+class AuctionSubscription:
+    """Подписка одного сокета: очередь событий и набор аукционов (None — все)."""
+
+    def __init__(self, hub: "AuctionEventHub", queue_size: int):
+        self.hub = hub
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.auction_ids: Optional[Set[int]] = None
+
+    def put(self, event: Dict[str, Any]) -> None:
+        # Медленный клиент не должен тормозить остальных: вытесняем самое старое событие
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(event)
+
+    async def get(self) -> Dict[str, Any]:
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self.hub.unsubscribe(self)
+
+
+class AuctionEventHub:
+    """
+    In-process pub/sub событий аукционов.
+    Публикация идёт через шину (локальную или межворкерную), шина возвращает
+    события в `_dispatch`, который раскладывает их по очередям подписчиков.
+    """
+
+    def __init__(self, bus=None, queue_size: int = AUCTION_EVENTS_QUEUE_SIZE):
+        self._queue_size = queue_size
+        self._by_auction: Dict[int, Set[AuctionSubscription]] = defaultdict(set)
+        self._all: Set[AuctionSubscription] = set()
+        self._bus = None
+        self.set_bus(bus or LocalEventBus())
+
+    def set_bus(self, bus) -> None:
+        """Подменяет шину (например, на LocalEventBus в тестах)."""
+        self._bus = bus
+        self._bus.attach(self._dispatch)
+
+    async def start(self) -> None:
+        try:
+            await self._bus.start()
+        except Exception as e:
+            logger.error(f"Не удалось запустить шину событий аукционов, использую локальную: {e}")
+            self.set_bus(LocalEventBus())
+
+    async def stop(self) -> None:
+        await self._bus.stop()
+
+    def subscribe(self, auction_ids: Optional[Iterable[int]] = None) -> AuctionSubscription:
+        sub = AuctionSubscription(self, self._queue_size)
+        self.update(sub, auction_ids)
+        return sub
+
+    def update(self, sub: AuctionSubscription, auction_ids: Optional[Iterable[int]]) -> None:
+        """Меняет набор аукционов подписки; None — подписка на все аукционы.
+        Некорректные id — ValueError до изменения подписки: прежняя подписка сохраняется."""
+        new_ids = {int(a) for a in auction_ids} if auction_ids is not None else None
+        self._detach(sub)
+        if new_ids is None:
+            sub.auction_ids = None
+            self._all.add(sub)
+            return
+        sub.auction_ids = new_ids
+        for auction_id in sub.auction_ids:
+            self._by_auction[auction_id].add(sub)
+
+    def unsubscribe(self, sub: AuctionSubscription) -> None:
+        self._detach(sub)
+
+    def _detach(self, sub: AuctionSubscription) -> None:
+        self._all.discard(sub)
+        for auction_id in sub.auction_ids or ():
+            subs = self._by_auction.get(auction_id)
+            if subs is None:
+                continue
+            subs.discard(sub)
+            if not subs:
+                del self._by_auction[auction_id]
+
+    def _dispatch(self, event: Dict[str, Any]) -> None:
+        auction_id = event.get("auction_id")
+        for sub in list(self._all) + list(self._by_auction.get(auction_id, ())):
+            sub.put(event)
+
+    @staticmethod
+    def snapshot(auction: Auction) -> Dict[str, Any]:
+        """Публичное состояние лота для событий и начального кадра сокета."""
+        return {
+            "auction_id": auction.id,
+            "status": auction.status.value,
+            "current_price": auction.current_price,
+            "buy_now_price": auction.buy_now_price,
+            "current_winner_user_id": auction.current_winner_user_id,
+            "end_time": auction.end_time.isoformat() if auction.end_time else None,
+        }
+
+    def build(self, event_type: str, auction: Auction, **extra: Any) -> Dict[str, Any]:
+        """Фиксирует событие по текущему состоянию лота (публиковать можно позже, после commit)."""
+        return {"type": event_type, **self.snapshot(auction), **extra, "ts": datetime.utcnow().isoformat()}
+
+    async def publish_event(self, event: Dict[str, Any]) -> None:
+        """Публикует готовое событие. Ошибки шины не должны ломать сделку."""
+        try:
+            await self._bus.publish(event)
+        except Exception as e:
+            logger.warning(f"Ошибка публикации события {event.get('type')} по аукциону {event.get('auction_id')}: {e}")
+            self._dispatch(event)
+
+    async def publish(self, event_type: str, auction: Auction, **extra: Any) -> None:
+        await self.publish_event(self.build(event_type, auction, **extra))
+
+
+def _build_bus():
+    if AUCTION_EVENTS_BUS == "postgres":
+        if not DATABASE_URL.startswith(("postgresql://", "postgres://", "postgresql+asyncpg://")):
+            logger.warning("AUCTION_EVENTS_BUS=postgres требует PostgreSQL, использую локальную шину")
+            return LocalEventBus()
+        from db import connect_args
+
+        dsn = DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
+        return PostgresEventBus(dsn, AUCTION_EVENTS_PG_CHANNEL, connect_args)
+    return LocalEventBus()
+
+
+# Глобальный хаб событий
+auction_events = AuctionEventHub(_build_bus())
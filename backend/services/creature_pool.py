@@ -0,0 +1,168 @@
+"""
+Пул заранее сгенерированных существ.
+
+POST /create не генерирует существо сам: он забирает из creature_pool самую старую строку
+(удаление в той же транзакции, что и создание питомца — при откате строка возвращается в пул)
+и переносит в питомца сид с версией генератора, creature_json и, если включено, готовое изображение яйца.
+Фоновая задача дозаполняет пул до CREATURE_POOL_HIGH_WATERMARK, как только он опускается до
+CREATURE_POOL_LOW_WATERMARK, поэтому задержка создания не зависит ни от генератора, ни от HF.
+Пустой пул не ошибка: эндпоинт генерирует существо на месте, как раньше.
+"""
+
+from typing import Any, Dict, List, Optional
+import base64
+import itertools
+import json
+import logging
+import os
+import secrets
+
+from sqlalchemy import delete, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from models import CreaturePoolEntry
+from services.stages import StageLifecycleService
+from services.creature_similarity import CreatureSimilarityService
+from generator.promt_gen import SEED_BITS, SEEDED_GENERATORS, seeded_version_intact
+from config.settings import (
+    CREATURE_POOL_HIGH_WATERMARK,
+    CREATURE_POOL_LOW_WATERMARK,
+    CREATURE_POOL_WITH_IMAGES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Сколько раз claim берёт следующую строку, если текущую перехватил другой запрос
+CLAIM_ATTEMPTS = 3
+
+
+def _claimable_versions() -> List[int]:
+    """Версии генератора, существа которых восстанавливаются из сида"""
+    return [version for version in SEEDED_GENERATORS if seeded_version_intact(version)]
+
+
+class CreaturePoolService:
+    """Сервис пула готовых существ"""
+
+    @staticmethod
+    async def size(db: AsyncSession) -> int:
+        return (await db.execute(select(func.count(CreaturePoolEntry.id)))).scalar_one()
+
+    @staticmethod
+    async def claim(db: AsyncSession) -> Optional[Dict[str, Any]]:
+        """
+        Забирает одно готовое существо. Возвращает артефакты в формате
+        StageLifecycleService.build_creation_artifacts или None, если пул пуст. Без commit.
+        Существа версий генератора, которые больше не восстанавливаются из сида, не выдаются.
+        """
+        versions = _claimable_versions()
+        for _ in range(CLAIM_ATTEMPTS):
+            # Postgres пропускает строки, уже забранные параллельными запросами; в SQLite FOR UPDATE
+            # не рендерится, и гонку разрешает проверка rowcount удаления
+            row = (await db.execute(
+                select(
+                    CreaturePoolEntry.id,
+                    CreaturePoolEntry.creature_seed,
+                    CreaturePoolEntry.generator_version,
+                    CreaturePoolEntry.creature_json,
+                    CreaturePoolEntry.image_egg_b64,
+                )
+                .where(CreaturePoolEntry.generator_version.in_(versions))
+                .order_by(CreaturePoolEntry.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )).first()
+            if row is None:
+                return None
+            taken = await db.execute(
+                delete(CreaturePoolEntry)
+                .where(CreaturePoolEntry.id == row.id)
+                .execution_options(synchronize_session=False)
+            )
+            if taken.rowcount == 1:
+                return {
+                    "stored": {
+                        "seed": row.creature_seed,
+                        "generator_version": row.generator_version,
+                        "creature": json.loads(row.creature_json),
+                        "stage_prompts": {},
+                    },
+                    "egg_image_path": None,
+                    "egg_image_b64": row.image_egg_b64,
+                }
+        return None
+
+    @staticmethod
+    async def prune_stale(db: AsyncSession) -> int:
+        """Удаляет существа версий, которые больше не восстанавливаются из сида. Без commit."""
+        result = await db.execute(
+            delete(CreaturePoolEntry)
+            .where(or_(
+                CreaturePoolEntry.generator_version.is_(None),
+                CreaturePoolEntry.generator_version.not_in(_claimable_versions()),
+            ))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount or 0
+
+    @staticmethod
+    async def deficit(db: AsyncSession) -> int:
+        """Сколько существ добавить: 0, пока пул выше нижней отметки, иначе — до верхней"""
+        size = await CreaturePoolService.size(db)
+        if size > CREATURE_POOL_LOW_WATERMARK:
+            return 0
+        return max(CREATURE_POOL_HIGH_WATERMARK - size, 0)
+
+    @staticmethod
+    def roll_entries(count: int) -> List[Dict[str, Any]]:
+        """
+        Генерирует count существ со случайными сидами (и изображениями яйца, если включено);
+        похожие на недавние перебрасываются. Синхронно и без БД — фоновая задача вызывает в executor.
+        """
+        entries = []
+        for _ in range(count):
+            stored = CreatureSimilarityService.generate_distinct(
+                secrets.randbits(SEED_BITS) for _ in itertools.count()
+            )
+            image_b64 = None
+            if CREATURE_POOL_WITH_IMAGES:
+                egg_prompt = (stored["stage_prompts"].get("egg") or {}).get("en")
+                image_b64 = CreaturePoolService._render_egg_image(stored["seed"], egg_prompt)
+            entries.append({
+                "creature_seed": stored["seed"],
+                "generator_version": stored["generator_version"],
+                "creature_json": json.dumps(stored["creature"], ensure_ascii=False),
+                "image_egg_b64": image_b64,
+            })
+        return entries
+
+    @staticmethod
+    def _render_egg_image(seed: int, prompt_en: Optional[str]) -> Optional[str]:
+        """PNG яйца через HF в base64; временные файлы генерации удаляются. None при неудаче."""
+        if not prompt_en:
+            return None
+        try:
+            image_path, _ = StageLifecycleService._generate_png_for_stage("pool", str(seed), "egg", prompt_en)
+        except Exception as e:
+            logger.warning(f"Изображение яйца для пула не сгенерировано: {e}")
+            return None
+        if not image_path:
+            return None
+        try:
+            with open(image_path, "rb") as f:
+                return base64.b64encode(f.read()).decode("utf-8")
+        finally:
+            for path in (image_path, image_path[:-len(".png")] + "_data.json"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    async def add(db: AsyncSession, entries: List[Dict[str, Any]]) -> int:
+        """Кладёт готовые существа в пул. Без commit."""
+        db.add_all([CreaturePoolEntry(**entry) for entry in entries])
+        await db.flush()
+        return len(entries)
+
@@ -0,0 +1,143 @@
+"""
+Похожие существа.
+
+У каждого питомца хранится MinHash-сигнатура признаков (Pet.creature_signature) и её корзины
+LSH (creature_signature_bands, индекс по (band, bucket)). Новые существа — из пула и
+сгенерированные на месте — проверяются по индексу последних CREATURE_RECENT_INDEX_SIZE
+существ процесса: похожее перегенерируется со следующим сидом. Индекс прогревается из БД
+при старте. Отчёт по всей популяции строится из корзин: кандидаты — питомцы с общей
+корзиной, похожесть подтверждается сигнатурами.
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+import itertools
+import json
+
+from sqlalchemy import and_, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from models import CreaturePoolEntry, CreatureSignatureBand, Pet
+from generator.similarity import (
+    RecentCreatureIndex,
+    band_buckets,
+    cluster_size_histogram,
+    creature_signature,
+    generate_distinct,
+    near_duplicate_clusters,
+    unpack_signature,
+)
+from config.settings import (
+    CREATURE_DISTINCT_ATTEMPTS,
+    CREATURE_DUPLICATE_THRESHOLD,
+    CREATURE_RECENT_INDEX_SIZE,
+)
+
+# Индекс недавних существ процесса (общий для пула и создания питомца на месте)
+RECENT_CREATURES = RecentCreatureIndex(CREATURE_RECENT_INDEX_SIZE, CREATURE_DUPLICATE_THRESHOLD)
+
+# Питомцев на один IN-запрос при загрузке сигнатур для отчёта
+_LOAD_CHUNK = 500
+
+
+class CreatureSimilarityService:
+    """Сервис похожести существ"""
+
+    @staticmethod
+    def generate_distinct(seeds: Iterable[int]) -> Dict[str, Any]:
+        """
+        Существо (формат generate_seeded) по первому из CREATURE_DISTINCT_ATTEMPTS сидов,
+        не похожее на недавние; выбранное запоминается в индексе. Синхронно, без БД.
+        """
+        return generate_distinct(itertools.islice(seeds, CREATURE_DISTINCT_ATTEMPTS), RECENT_CREATURES)
+
+    @staticmethod
+    async def index_pet(db: AsyncSession, pet: Pet) -> None:
+        """Перезаписывает корзины LSH питомца по Pet.creature_signature. Без commit."""
+        await db.execute(delete(CreatureSignatureBand).where(CreatureSignatureBand.pet_id == pet.id))
+        if pet.creature_signature:
+            db.add_all([
+                CreatureSignatureBand(pet_id=pet.id, band=band, bucket=bucket)
+                for band, bucket in band_buckets(unpack_signature(pet.creature_signature))
+            ])
+        await db.flush()
+
+    @staticmethod
+    async def warm_recent(db: AsyncSession) -> int:
+        """Заполняет индекс процесса последними питомцами и существами из пула"""
+        signatures = (await db.execute(
+            select(Pet.creature_signature)
+            .where(Pet.creature_signature.is_not(None))
+            .order_by(Pet.id.desc())
+            .limit(CREATURE_RECENT_INDEX_SIZE)
+        )).scalars().all()
+        pooled = (await db.execute(select(CreaturePoolEntry.creature_json))).scalars().all()
+        RECENT_CREATURES.clear()
+        for data in reversed(signatures):
+            RECENT_CREATURES.add(unpack_signature(data))
+        for creature_json in pooled:
+            RECENT_CREATURES.add(creature_signature(json.loads(creature_json)))
+        return len(RECENT_CREATURES)
+
+    @staticmethod
+    async def duplicates_report(db: AsyncSession, limit: int = 10) -> Dict[str, Any]:
+        """
+        Распределение похожих по популяции: доля питомцев, у которых есть похожий, размеры
+        кластеров похожих, группы (среда, тип) с наибольшим числом похожих и крупнейшие кластеры.
+        """
+        population = (await db.execute(
+            select(func.count(Pet.id)).where(Pet.creature_signature.is_not(None))
+        )).scalar_one()
+
+        shared = (
+            select(CreatureSignatureBand.band, CreatureSignatureBand.bucket)
+            .group_by(CreatureSignatureBand.band, CreatureSignatureBand.bucket)
+            .having(func.count() > 1)
+            .subquery()
+        )
+        rows = (await db.execute(
+            select(CreatureSignatureBand.band, CreatureSignatureBand.bucket, CreatureSignatureBand.pet_id)
+            .join(shared, and_(
+                CreatureSignatureBand.band == shared.c.band,
+                CreatureSignatureBand.bucket == shared.c.bucket,
+            ))
+            .order_by(CreatureSignatureBand.band, CreatureSignatureBand.bucket, CreatureSignatureBand.pet_id)
+        )).all()
+        groups: Dict[tuple, List[int]] = {}
+        for band, bucket, pet_id in rows:
+            groups.setdefault((band, bucket), []).append(pet_id)
+
+        pet_ids = sorted({pet_id for members in groups.values() for pet_id in members})
+        signatures = {}
+        kinds = {}
+        for start in range(0, len(pet_ids), _LOAD_CHUNK):
+            chunk = pet_ids[start:start + _LOAD_CHUNK]
+            for pet_id, data, habitat, creature_type in (await db.execute(
+                select(Pet.id, Pet.creature_signature, Pet.habitat, Pet.creature_type).where(Pet.id.in_(chunk))
+            )).all():
+                signatures[pet_id] = unpack_signature(data)
+                kinds[pet_id] = (
+                    habitat.value if habitat else None,
+                    creature_type.value if creature_type else None,
+                )
+
+        clusters = near_duplicate_clusters(groups.values(), signatures, CREATURE_DUPLICATE_THRESHOLD)
+        duplicated = sum(len(cluster) for cluster in clusters)
+        by_group = Counter(kinds[pet_id] for cluster in clusters for pet_id in cluster)
+        return {
+            "population": population,
+            "threshold": CREATURE_DUPLICATE_THRESHOLD,
+            "duplicated_pets": duplicated,
+            "duplicated_share": round(duplicated / population, 4) if population else 0.0,
+            "clusters": len(clusters),
+            "cluster_sizes": cluster_size_histogram(clusters),
+            "by_group": [
+                {"habitat": habitat, "creature_type": creature_type, "duplicated_pets": count}
+                for (habitat, creature_type), count in by_group.most_common(limit)
+            ],
+            "largest_clusters": [
+                {"size": len(cluster), "pet_ids": cluster[:limit]} for cluster in clusters[:limit]
+            ],
+            "recent_index": {"size": len(RECENT_CREATURES), "capacity": RECENT_CREATURES.capacity},
+        }
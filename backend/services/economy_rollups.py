@@ -0,0 +1,343 @@
+"""
+Почасовые роллапы экономики: сколько монет выпущено и выведено по типу транзакции и источнику.
+
+Транзакции сворачиваются потоково по водяному знаку (id последней учтённой строки), а не
+в транзакции каждой операции: иначе строка текущего часа стала бы общей горячей точкой для
+всех денежных запросов. Водяной знак сдвигается условным UPDATE в той же транзакции, что и
+роллапы, поэтому два воркера не учтут одну строку дважды. Хвост после водяного знака при
+чтении досчитывается на лету: ответ точный, а стоимость — O(часов + хвост), а не O(транзакций).
+Точность держится на том, что ни одна пишущая транзакция не живёт дольше ECONOMY_ROLLUP_LAG_SECONDS.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import logging
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from db import dialect_insert
+from models import EconomyRollup, RollupWatermark, Transaction, TransactionArchive, TransactionType
+from config.settings import ECONOMY_ROLLUP_CHUNK, ECONOMY_ROLLUP_LAG_SECONDS
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = "economy_rollups"
+OTHER_SOURCE = "other"
+MARKET_SOURCE = "market"
+MAX_SOURCE_LENGTH = 64
+
+# (начало часа, тип, источник) -> [сумма, число транзакций]
+Buckets = Dict[Tuple[datetime, str, str], List[int]]
+
+
+def transaction_source(raw_data: Optional[str]) -> str:
+    """Источник транзакции: `source` или `action` из transaction_data, сделки рынка — 'market'."""
+    if not raw_data:
+        return OTHER_SOURCE
+    try:
+        data = json.loads(raw_data)
+    except (TypeError, ValueError):
+        return OTHER_SOURCE
+    if not isinstance(data, dict):
+        return OTHER_SOURCE
+    for key in ("source", "action"):
+        value = data.get(key)
+        if value:
+            return str(value)[:MAX_SOURCE_LENGTH]
+    if data.get("auction_id") is not None:
+        return MARKET_SOURCE
+    return OTHER_SOURCE
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _hour_start(dt: datetime) -> datetime:
+    return _naive_utc(dt).replace(minute=0, second=0, microsecond=0)
+
+
+def _direction(transaction_type: str) -> str:
+    from economy import CREDIT_TRANSACTION_TYPES, DEBIT_TRANSACTION_TYPES  # локальный импорт, чтобы избежать циклов
+
+    ttype = TransactionType(transaction_type)
+    if ttype in CREDIT_TRANSACTION_TYPES:
+        return "mint"
+    if ttype in DEBIT_TRANSACTION_TYPES:
+        return "sink"
+    return "neutral"
+
+
+def _aggregate(rows: Iterable[Any]) -> Buckets:
+    buckets: Buckets = defaultdict(lambda: [0, 0])
+    for row in rows:
+        key = (_hour_start(row.created_at), row.transaction_type.value, transaction_source(row.transaction_data))
+        bucket = buckets[key]
+        bucket[0] += row.amount
+        bucket[1] += 1
+    return buckets
+
+
+async def ensure_watermark(db: AsyncSession, name: str) -> int:
+    """Значение водяного знака name; строка создаётся (с нулём) при первом обращении."""
+    last_id = (await db.execute(
+        select(RollupWatermark.last_id).where(RollupWatermark.name == name)
+    )).scalar_one_or_none()
+    if last_id is not None:
+        return last_id
+    insert = dialect_insert(db, RollupWatermark)
+    if insert is not None:
+        await db.execute(insert.values(name=name, last_id=0).on_conflict_do_nothing(index_elements=["name"]))
+        return (await db.execute(
+            select(RollupWatermark.last_id).where(RollupWatermark.name == name)
+        )).scalar_one()
+    db.add(RollupWatermark(name=name, last_id=0))
+    await db.flush()
+    return 0
+
+
+async def move_watermark(db: AsyncSession, name: str, expected: int, new_id: int) -> bool:
+    """Сдвигает водяной знак, только если он всё ещё равен expected (иначе порцию взял другой воркер)."""
+    moved = await db.execute(
+        update(RollupWatermark)
+        .where(RollupWatermark.name == name, RollupWatermark.last_id == expected)
+        .values(last_id=new_id, updated_at=func.now())
+    )
+    return moved.rowcount == 1
+
+
+class EconomyRollupService:
+    """Сервис почасовых роллапов экономики"""
+
+    @staticmethod
+    async def _upsert(db: AsyncSession, buckets: Buckets) -> None:
+        if not buckets:
+            return
+        rows = [
+            {"hour": hour, "transaction_type": ttype, "source": source,
+             "amount_total": amount, "transactions_count": count}
+            for (hour, ttype, source), (amount, count) in buckets.items()
+        ]
+        table = EconomyRollup.__table__
+        insert = dialect_insert(db, table)
+        if insert is not None:
+            await db.execute(
+                insert.on_conflict_do_update(
+                    index_elements=["hour", "transaction_type", "source"],
+                    set_={
+                        "amount_total": table.c.amount_total + insert.excluded.amount_total,
+                        "transactions_count": table.c.transactions_count + insert.excluded.transactions_count,
+                        "updated_at": func.now(),
+                    },
+                ),
+                rows,
+            )
+            return
+        for row in rows:
+            existing = (await db.execute(
+                select(EconomyRollup).where(
+                    EconomyRollup.hour == row["hour"],
+                    EconomyRollup.transaction_type == row["transaction_type"],
+                    EconomyRollup.source == row["source"],
+                ).with_for_update()
+            )).scalar_one_or_none()
+            if existing:
+                existing.amount_total += row["amount_total"]
+                existing.transactions_count += row["transactions_count"]
+            else:
+                db.add(EconomyRollup(**row))
+        await db.flush()
+
+    @staticmethod
+    async def fold(
+        db: AsyncSession,
+        chunk_size: int = ECONOMY_ROLLUP_CHUNK,
+        lag_seconds: int = ECONOMY_ROLLUP_LAG_SECONDS,
+        now: Optional[datetime] = None,
+    ) -> int:
+        """
+        Сворачивает следующую порцию транзакций старше lag_seconds. Без commit.
+        Возвращает число учтённых транзакций (0 — нечего сворачивать или порцию взял другой воркер).
+        """
+        last_id = await ensure_watermark(db, WATERMARK_NAME)
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=lag_seconds)
+        rows = (await db.execute(
+            select(
+                Transaction.id, Transaction.created_at, Transaction.transaction_type,
+                Transaction.amount, Transaction.transaction_data,
+            )
+            .where(Transaction.id > last_id)
+            .order_by(Transaction.id)
+            .limit(chunk_size)
+        )).all()
+
+        # Останавливаемся на первой слишком свежей строке. Это защищает строки с меньшим id,
+        # ещё не закоммиченные, только если их транзакция короче лага: created_at на PostgreSQL —
+        # начало транзакции, а id берётся из последовательности при вставке. Строка, закоммиченная
+        # после того, как водяной знак прошёл её id, не попадёт ни в роллапы, ни в хвост series().
+        # Поэтому пишущие транзакции ограничены таймаутами БД (DB_*_TIMEOUT_SECONDS), а массовые
+        # начисления коммитятся пакетами. На SQLite писатель один, и id коммитятся по порядку.
+        ready = []
+        for row in rows:
+            if row.created_at is None or _naive_utc(row.created_at) > cutoff:
+                break
+            ready.append(row)
+        if not ready:
+            return 0
+
+        if not await move_watermark(db, WATERMARK_NAME, last_id, ready[-1].id):
+            logger.info("Порцию роллапа экономики уже свернул другой воркер")
+            return 0
+        await EconomyRollupService._upsert(db, _aggregate(ready))
+        return len(ready)
+
+    @staticmethod
+    async def fold_all(db: AsyncSession, chunk_size: int = ECONOMY_ROLLUP_CHUNK, **kwargs) -> int:
+        """Сворачивает всё, что готово, порциями по chunk_size. Без commit."""
+        total = 0
+        while True:
+            folded = await EconomyRollupService.fold(db, chunk_size=chunk_size, **kwargs)
+            total += folded
+            if folded < chunk_size:
+                return total
+
+    @staticmethod
+    async def rebuild(db: AsyncSession, chunk_size: int = ECONOMY_ROLLUP_CHUNK) -> int:
+        """
+        Пересобирает роллапы с нуля (после ручных правок истории). Без commit.
+        Архивные месяцы сворачиваются из сегментов transaction_archives, остальное — из горячей таблицы.
+        """
+        from services.transaction_archive import TransactionArchiveService, _decode  # локальный импорт, чтобы избежать циклов
+
+        await db.execute(delete(EconomyRollup))
+        archived = 0
+        last_segment = 0
+        while True:
+            segments = (await db.execute(
+                select(TransactionArchive.id, TransactionArchive.user_id, TransactionArchive.payload)
+                .where(TransactionArchive.id > last_segment)
+                .order_by(TransactionArchive.id)
+                .limit(chunk_size)
+            )).all()
+            if not segments:
+                break
+            rows = [row for segment in segments for row in _decode(segment.user_id, segment.payload)]
+            await EconomyRollupService._upsert(db, _aggregate(rows))
+            archived += len(rows)
+            last_segment = segments[-1].id
+
+        # Архив — префикс transactions по id, горячая таблица сворачивается с его границы
+        await ensure_watermark(db, WATERMARK_NAME)
+        await db.execute(
+            update(RollupWatermark)
+            .where(RollupWatermark.name == WATERMARK_NAME)
+            .values(last_id=await TransactionArchiveService.archived_upto(db))
+        )
+        processed = archived + await EconomyRollupService.fold_all(db, chunk_size=chunk_size)
+        logger.info(f"Роллапы экономики пересобраны: {processed} транзакций (из архива {archived})")
+        return processed
+
+    @staticmethod
+    async def series(
+        db: AsyncSession,
+        since: datetime,
+        until: Optional[datetime] = None,
+        bucket: str = "hour",
+        transaction_type: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Временной ряд эмиссии и стоков за [since, until]: роллапы плюс несвёрнутый хвост.
+        bucket — 'hour' или 'day'; фильтры — значение TransactionType и источник.
+        Границы окна округляются до начала часа.
+        """
+        if bucket not in ("hour", "day"):
+            raise ValueError("bucket должен быть 'hour' или 'day'")
+        if transaction_type is not None:
+            try:
+                TransactionType(transaction_type)
+            except ValueError:
+                raise ValueError(f"Неизвестный тип транзакции: {transaction_type}")
+        since_hour = _hour_start(since)
+        until = _naive_utc(until) if until else datetime.utcnow()
+        if until < since_hour:
+            raise ValueError("Конец периода раньше начала")
+
+        query = select(
+            EconomyRollup.hour, EconomyRollup.transaction_type, EconomyRollup.source,
+            EconomyRollup.amount_total, EconomyRollup.transactions_count,
+        ).where(EconomyRollup.hour >= since_hour, EconomyRollup.hour <= until)
+        if transaction_type:
+            query = query.where(EconomyRollup.transaction_type == transaction_type)
+        if source:
+            query = query.where(EconomyRollup.source == source)
+
+        buckets: Buckets = defaultdict(lambda: [0, 0])
+        for row in (await db.execute(query)).all():
+            bucket_row = buckets[(_hour_start(row.hour), row.transaction_type, row.source)]
+            bucket_row[0] += row.amount_total
+            bucket_row[1] += row.transactions_count
+
+        # Несвёрнутый хвост (последние минуты) — прямо из transactions, по первичному ключу
+        last_id = (await db.execute(
+            select(RollupWatermark.last_id).where(RollupWatermark.name == WATERMARK_NAME)
+        )).scalar_one_or_none() or 0
+        tail_query = select(
+            Transaction.created_at, Transaction.transaction_type, Transaction.amount, Transaction.transaction_data,
+        ).where(Transaction.id > last_id, Transaction.created_at >= since_hour)
+        if transaction_type:
+            tail_query = tail_query.where(Transaction.transaction_type == TransactionType(transaction_type))
+        tail = [
+            row for row in (await db.execute(tail_query)).all()
+            if row.created_at is not None and _hour_start(row.created_at) <= until
+        ]
+        for key, (amount, count) in _aggregate(tail).items():
+            if source and key[2] != source:
+                continue
+            bucket_row = buckets[key]
+            bucket_row[0] += amount
+            bucket_row[1] += count
+
+        series: Dict[Tuple[datetime, str, str], List[int]] = defaultdict(lambda: [0, 0])
+        for (hour, ttype, src), (amount, count) in buckets.items():
+            at = hour.replace(hour=0) if bucket == "day" else hour
+            point = series[(at, ttype, src)]
+            point[0] += amount
+            point[1] += count
+
+        totals = {"minted": 0, "sunk": 0}
+        by_source: Dict[str, Dict[str, int]] = defaultdict(lambda: {"minted": 0, "sunk": 0})
+        points = []
+        for (at, ttype, src), (amount, count) in sorted(series.items()):
+            direction = _direction(ttype)
+            points.append({
+                "at": at.isoformat() + "Z",
+                "transaction_type": ttype,
+                "source": src,
+                "direction": direction,
+                "amount": amount,
+                "count": count,
+            })
+            if direction == "mint":
+                totals["minted"] += amount
+                by_source[src]["minted"] += amount
+            elif direction == "sink":
+                totals["sunk"] += amount
+                by_source[src]["sunk"] += amount
+
+        return {
+            "since": since_hour.isoformat() + "Z",
+            "until": until.isoformat() + "Z",
+            "bucket": bucket,
+            "series": points,
+            "totals": {**totals, "net": totals["minted"] - totals["sunk"]},
+            "by_source": dict(sorted(by_source.items())),
+            "watermark": last_id,
+            "tail_transactions": len(tail),
+        }
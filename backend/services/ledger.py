@@ -0,0 +1,368 @@
+"""
+Чекпоинты леджера пользователей.
+
+Каждые LEDGER_CHECKPOINT_EVERY транзакций пользователя фоновая задача сворачивает
+хвост в чекпоинт: баланс и итоги по типам нарастающим итогом. Статистика, баланс
+на момент времени и выписка считаются как «последний чекпоинт + короткий хвост»
+по индексу (user_id, id), без агрегации всей истории. Исторические запросы
+дочитывают холодный архив (services.transaction_archive), текущие — нет:
+архиватор ставит чекпоинт поверх каждой переносимой строки.
+Сверка потоково проходит транзакции по id и проверяет цепочку
+balance_before/balance_after, чекпоинты и итоговый баланс кошельков.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import case, func, update
+from models import LedgerCheckpoint, Transaction, TransactionType, Wallet
+from services.transaction_archive import TransactionArchiveService
+from config.settings import (
+    LEDGER_CHECKPOINT_EVERY,
+    LEDGER_RECONCILE_CHUNK,
+    LEDGER_STATEMENT_MAX_LIMIT,
+)
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Tuple
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+Totals = Dict[str, Dict[str, int]]
+
+# Сколько расхождений сверки сохраняется в отчёте
+MAX_REPORTED_MISMATCHES = 100
+
+
+def _naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _merge_totals(base: Totals, extra: Totals, sign: int = 1) -> Totals:
+    merged = {k: dict(v) for k, v in base.items()}
+    for ttype, row in extra.items():
+        acc = merged.setdefault(ttype, {"total_amount": 0, "count": 0})
+        acc["total_amount"] += sign * row["total_amount"]
+        acc["count"] += sign * row["count"]
+    return {k: v for k, v in merged.items() if v["count"]}
+
+
+def _signed_amount(transaction_type: TransactionType, amount: int) -> int:
+    from economy import CREDIT_TRANSACTION_TYPES, DEBIT_TRANSACTION_TYPES  # локальный импорт, чтобы избежать циклов
+
+    if transaction_type in CREDIT_TRANSACTION_TYPES:
+        return amount
+    if transaction_type in DEBIT_TRANSACTION_TYPES:
+        return -amount
+    return 0
+
+
+class LedgerService:
+    """Сервис чекпоинтов и сверки леджера"""
+
+    # Последний отчёт фоновой сверки (для мониторинга)
+    last_report: Optional[Dict[str, Any]] = None
+
+    @staticmethod
+    async def _checkpoint_before(
+        db: AsyncSession,
+        user_id: str,
+        at: Optional[datetime] = None,
+    ) -> Optional[LedgerCheckpoint]:
+        """Последний чекпоинт пользователя (не позже момента at, если задан)."""
+        query = select(LedgerCheckpoint).where(LedgerCheckpoint.user_id == user_id)
+        if at is not None:
+            query = query.where(LedgerCheckpoint.as_of <= at)
+        query = query.order_by(LedgerCheckpoint.last_transaction_id.desc()).limit(1)
+        return (await db.execute(query)).scalar_one_or_none()
+
+    @staticmethod
+    async def _tail_totals(
+        db: AsyncSession,
+        user_id: str,
+        after_id: int,
+        until: Optional[datetime] = None,
+        upto_id: Optional[int] = None,
+        include_archive: bool = False,
+    ) -> Tuple[Totals, int]:
+        """
+        Итоги по типам для транзакций после after_id (не позже until и не дальше upto_id).
+        include_archive — досчитать архивные строки, если after_id старше границы архива.
+        """
+        query = (
+            select(
+                Transaction.transaction_type,
+                func.sum(Transaction.amount).label("total_amount"),
+                func.count(Transaction.id).label("count"),
+            )
+            .where(Transaction.user_id == user_id, Transaction.id > after_id)
+            .group_by(Transaction.transaction_type)
+        )
+        if until is not None:
+            query = query.where(Transaction.created_at <= until)
+        if upto_id is not None:
+            query = query.where(Transaction.id <= upto_id)
+        totals: Totals = {}
+        count = 0
+        for row in (await db.execute(query)).all():
+            totals[row.transaction_type.value] = {"total_amount": row.total_amount or 0, "count": row.count}
+            count += row.count
+        if include_archive and after_id < await TransactionArchiveService.archived_upto(db):
+            archived, archived_count = await TransactionArchiveService.totals(db, user_id, after_id, until, upto_id)
+            totals = _merge_totals(totals, archived)
+            count += archived_count
+        return totals, count
+
+    @staticmethod
+    async def totals_at(
+        db: AsyncSession,
+        user_id: str,
+        at: Optional[datetime] = None,
+    ) -> Tuple[Totals, int]:
+        """Итоги по типам и число транзакций на момент at (по умолчанию — сейчас)."""
+        at = _naive_utc(at)
+        checkpoint = await LedgerService._checkpoint_before(db, user_id, at)
+        base: Totals = json.loads(checkpoint.totals) if checkpoint else {}
+        # Текущие итоги архив не затрагивает: последний чекпоинт стоит поверх него
+        tail, tail_count = await LedgerService._tail_totals(
+            db, user_id, checkpoint.last_transaction_id if checkpoint else 0, at, include_archive=at is not None
+        )
+        count = (checkpoint.transactions_count if checkpoint else 0) + tail_count
+        return _merge_totals(base, tail), count
+
+    @staticmethod
+    async def get_stats(db: AsyncSession, user_id: str) -> Dict[str, Any]:
+        """Итоги по типам транзакций: чекпоинт + хвост вместо GROUP BY по всей истории."""
+        totals, count = await LedgerService.totals_at(db, user_id)
+        return {"transaction_stats": totals, "transactions_count": count}
+
+    @staticmethod
+    async def balance_at(db: AsyncSession, user_id: str, at: datetime) -> Optional[int]:
+        """Баланс пользователя на момент at; None — транзакций до этого момента не было."""
+        at = _naive_utc(at)
+        checkpoint = await LedgerService._checkpoint_before(db, user_id, at)
+        query = (
+            select(Transaction.balance_after)
+            .where(Transaction.user_id == user_id, Transaction.created_at <= at)
+            .order_by(Transaction.id.desc())
+            .limit(1)
+        )
+        if checkpoint is not None:
+            query = query.where(Transaction.id > checkpoint.last_transaction_id)
+        balance = (await db.execute(query)).scalar_one_or_none()
+        if balance is not None:
+            return balance
+        after_id = checkpoint.last_transaction_id if checkpoint else 0
+        if after_id < await TransactionArchiveService.archived_upto(db):
+            balance = await TransactionArchiveService.balance_at(db, user_id, at, after_id)
+            if balance is not None:
+                return balance
+        return checkpoint.balance if checkpoint else None
+
+    @staticmethod
+    async def statement(
+        db: AsyncSession,
+        user_id: str,
+        start: datetime,
+        end: datetime,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """Выписка за период [start, end]: входящий/исходящий баланс, итоги по типам, транзакции."""
+        start, end = _naive_utc(start), _naive_utc(end)
+        if end < start:
+            raise ValueError("Конец периода раньше начала")
+        limit = max(1, min(limit, LEDGER_STATEMENT_MAX_LIMIT))
+        opening = await LedgerService.balance_at(db, user_id, start)
+        closing = await LedgerService.balance_at(db, user_id, end)
+        totals_end, count_end = await LedgerService.totals_at(db, user_id, end)
+        totals_start, count_start = await LedgerService.totals_at(db, user_id, start)
+
+        rows = (await db.execute(
+            select(Transaction)
+            .where(
+                Transaction.user_id == user_id,
+                Transaction.created_at > start,
+                Transaction.created_at <= end,
+            )
+            .order_by(Transaction.id)
+            .limit(limit)
+        )).scalars().all()
+        if await TransactionArchiveService.archived_upto(db):
+            archived = await TransactionArchiveService.rows(db, user_id, after_at=start, until=end, limit=limit)
+            rows = (archived + list(rows))[:limit]
+
+        return {
+            "user_id": user_id,
+            "start": start,
+            "end": end,
+            "opening_balance": opening,
+            "closing_balance": closing,
+            "transactions_count": count_end - count_start,
+            "totals": _merge_totals(totals_end, totals_start, sign=-1),
+            "transactions": [
+                {
+                    "id": t.id,
+                    "type": t.transaction_type.value,
+                    "amount": t.amount,
+                    "balance_before": t.balance_before,
+                    "balance_after": t.balance_after,
+                    "description": t.description,
+                    "created_at": t.created_at,
+                }
+                for t in rows
+            ],
+            "truncated": len(rows) == limit and count_end - count_start > limit,
+        }
+
+    @staticmethod
+    async def checkpoint_user(db: AsyncSession, user_id: str) -> Optional[LedgerCheckpoint]:
+        """Сворачивает хвост пользователя в новый чекпоинт (без commit)."""
+        previous = await LedgerService._checkpoint_before(db, user_id)
+        after_id = previous.last_transaction_id if previous else 0
+        last = (await db.execute(
+            select(Transaction.id, Transaction.balance_after, Transaction.created_at)
+            .where(Transaction.user_id == user_id, Transaction.id > after_id)
+            .order_by(Transaction.id.desc())
+            .limit(1)
+        )).one_or_none()
+        if last is None:
+            return None
+
+        # Хвост фиксируем по last.id: транзакции, вставленные параллельно, попадут в следующий чекпоинт
+        tail, tail_count = await LedgerService._tail_totals(db, user_id, after_id, upto_id=last.id)
+
+        checkpoint = LedgerCheckpoint(
+            user_id=user_id,
+            last_transaction_id=last.id,
+            as_of=_naive_utc(last.created_at) or datetime.utcnow(),
+            balance=last.balance_after,
+            transactions_count=(previous.transactions_count if previous else 0) + tail_count,
+            totals=json.dumps(_merge_totals(json.loads(previous.totals) if previous else {}, tail)),
+        )
+        db.add(checkpoint)
+        await db.execute(
+            update(Wallet)
+            .where(Wallet.user_id == user_id)
+            .values(ledger_tail_count=case(
+                (Wallet.ledger_tail_count > tail_count, Wallet.ledger_tail_count - tail_count),
+                else_=0,
+            ))
+            .execution_options(synchronize_session=False)
+        )
+        await db.flush()
+        return checkpoint
+
+    @staticmethod
+    async def build_checkpoints(
+        db: AsyncSession,
+        min_tail: int = LEDGER_CHECKPOINT_EVERY,
+        max_users: int = 500,
+    ) -> int:
+        """Чекпоинты для пользователей с длинным хвостом (без commit). Возвращает их число."""
+        user_ids = (await db.execute(
+            select(Wallet.user_id)
+            .where(Wallet.ledger_tail_count >= min_tail)
+            .limit(max_users)
+        )).scalars().all()
+        created = 0
+        for user_id in user_ids:
+            if await LedgerService.checkpoint_user(db, user_id):
+                created += 1
+        return created
+
+    @staticmethod
+    async def reconcile(
+        db: AsyncSession,
+        user_id: Optional[str] = None,
+        chunk_size: int = LEDGER_RECONCILE_CHUNK,
+    ) -> Dict[str, Any]:
+        """
+        Потоковая сверка леджера (порциями по id, память — O(число пользователей)):
+        balance_after - balance_before совпадает с суммой транзакции, balance_before
+        совпадает с balance_after предыдущей транзакции пользователя, чекпоинты — с
+        транзакциями, на которых они стоят, а последний баланс — с кошельком.
+        Архивные строки не перепроверяются: цепочка продолжается от баланса на конец архива.
+        """
+        last_balance: Dict[str, int] = {}
+        archived_balance: Dict[str, int] = {}
+        if await TransactionArchiveService.archived_upto(db):
+            archived_balance = await TransactionArchiveService.closing_balances(db, [user_id] if user_id else None)
+        mismatches: List[Dict[str, Any]] = []
+        mismatch_count = 0
+        checked = 0
+        cursor = 0
+
+        def report(kind: str, **details) -> None:
+            nonlocal mismatch_count
+            mismatch_count += 1
+            if len(mismatches) < MAX_REPORTED_MISMATCHES:
+                mismatches.append({"kind": kind, **details})
+
+        while True:
+            query = (
+                select(
+                    Transaction.id, Transaction.user_id, Transaction.transaction_type,
+                    Transaction.amount, Transaction.balance_before, Transaction.balance_after,
+                )
+                .where(Transaction.id > cursor)
+                .order_by(Transaction.id)
+                .limit(chunk_size)
+            )
+            if user_id:
+                query = query.where(Transaction.user_id == user_id)
+            rows = (await db.execute(query)).all()
+            if not rows:
+                break
+
+            checkpoints = {
+                (cp.user_id, cp.last_transaction_id): cp.balance
+                for cp in (await db.execute(
+                    select(LedgerCheckpoint.user_id, LedgerCheckpoint.last_transaction_id, LedgerCheckpoint.balance)
+                    .where(LedgerCheckpoint.last_transaction_id.in_([r.id for r in rows]))
+                )).all()
+            }
+
+            for row in rows:
+                checked += 1
+                delta = _signed_amount(row.transaction_type, row.amount)
+                if row.balance_after - row.balance_before != delta:
+                    report("amount", user_id=row.user_id, transaction_id=row.id,
+                           expected=row.balance_before + delta, actual=row.balance_after)
+                previous = last_balance.get(row.user_id, archived_balance.get(row.user_id))
+                if previous is not None and row.balance_before != previous:
+                    report("chain", user_id=row.user_id, transaction_id=row.id,
+                           expected=previous, actual=row.balance_before)
+                cp_balance = checkpoints.get((row.user_id, row.id))
+                if cp_balance is not None and cp_balance != row.balance_after:
+                    report("checkpoint", user_id=row.user_id, transaction_id=row.id,
+                           expected=row.balance_after, actual=cp_balance)
+                last_balance[row.user_id] = row.balance_after
+            cursor = rows[-1].id
+
+        # Итоговый баланс цепочки против кошелька (у пользователей без горячих строк — конец архива)
+        last_balance = {**archived_balance, **last_balance}
+        user_ids = list(last_balance)
+        for i in range(0, len(user_ids), chunk_size):
+            part = user_ids[i:i + chunk_size]
+            for wallet_user_id, coins in (await db.execute(
+                select(Wallet.user_id, Wallet.coins).where(Wallet.user_id.in_(part))
+            )).all():
+                if coins != last_balance[wallet_user_id]:
+                    report("wallet", user_id=wallet_user_id, expected=last_balance[wallet_user_id], actual=coins)
+
+        result = {
+            "checked_transactions": checked,
+            "users": len(last_balance),
+            "mismatch_count": mismatch_count,
+            "mismatches": mismatches,
+            "finished_at": datetime.utcnow(),
+        }
+        if mismatch_count:
+            logger.warning(f"Сверка леджера: {mismatch_count} расхождений на {checked} транзакциях")
+        else:
+            logger.info(f"Сверка леджера: {checked} транзакций, расхождений нет")
+        if user_id is None:
+            LedgerService.last_report = result
+        return result
@@ -0,0 +1,249 @@
+"""
+Инкрементальная статистика рынка по группам (habitat, creature_type, stage).
+
+Каждая продажа обновляет одну строку `market_stats` в той же транзакции, что и сделка:
+счётчики, последнюю цену, потоковый скетч медианы (P²) и почасовые корзины за 24 часа.
+Чтение статистики не сканирует историю владения и аукционы.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import delete
+from models import MarketStat, Pet, PetOwnershipHistory
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Tuple
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_GROUP = "unknown"
+VOLUME_WINDOW_HOURS = 24
+
+
+class P2Quantile:
+    """
+    Потоковая оценка квантиля алгоритмом P² (Jain & Chlamtac, 1985).
+    Хранит пять маркеров независимо от числа наблюдений; состояние сериализуется в JSON.
+    """
+
+    def __init__(self, p: float = 0.5, state: Optional[Dict[str, Any]] = None):
+        self.p = p
+        self.count = 0
+        self.heights: List[float] = []
+        self.positions: List[int] = []
+        if state:
+            self.count = int(state.get("n", 0))
+            self.heights = [float(h) for h in state.get("q", [])]
+            self.positions = [int(x) for x in state.get("pos", [])]
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"n": self.count, "q": self.heights, "pos": self.positions}
+
+    def _desired(self) -> List[float]:
+        p = self.p
+        return [1 + (self.count - 1) * f for f in (0.0, p / 2, p, (1 + p) / 2, 1.0)]
+
+    def add(self, x: float) -> None:
+        x = float(x)
+        if self.count < 5:
+            self.heights.append(x)
+            self.heights.sort()
+            self.count += 1
+            if self.count == 5:
+                self.positions = [1, 2, 3, 4, 5]
+            return
+
+        q, pos = self.heights, self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while k < 3 and x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            pos[i] += 1
+        self.count += 1
+
+        desired = self._desired()
+        for i in (1, 2, 3):
+            d = desired[i] - pos[i]
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or (d <= -1 and pos[i - 1] - pos[i] < -1):
+                s = 1 if d > 0 else -1
+                candidate = q[i] + s / (pos[i + 1] - pos[i - 1]) * (
+                    (pos[i] - pos[i - 1] + s) * (q[i + 1] - q[i]) / (pos[i + 1] - pos[i])
+                    + (pos[i + 1] - pos[i] - s) * (q[i] - q[i - 1]) / (pos[i] - pos[i - 1])
+                )
+                if not (q[i - 1] < candidate < q[i + 1]):
+                    # Параболическая оценка вышла за соседей — линейная
+                    candidate = q[i] + s * (q[i + s] - q[i]) / (pos[i + s] - pos[i])
+                q[i] = candidate
+                pos[i] += s
+
+    def value(self) -> Optional[float]:
+        if self.count == 0:
+            return None
+        if self.count < 5:
+            # Пока наблюдений мало — точная медиана
+            mid = (self.count - 1) * self.p
+            lo = int(mid)
+            hi = min(lo + 1, self.count - 1)
+            return self.heights[lo] + (self.heights[hi] - self.heights[lo]) * (mid - lo)
+        return self.heights[2]
+
+
+def _hour(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() // 3600)
+
+
+def _load_json(raw: Optional[str], default):
+    if not raw:
+        return default
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return default
+
+
+def _window(buckets: Dict[str, List[int]], now_hour: int) -> Dict[str, List[int]]:
+    """Оставляет только корзины последних VOLUME_WINDOW_HOURS часов."""
+    oldest = now_hour - VOLUME_WINDOW_HOURS + 1
+    return {h: b for h, b in buckets.items() if int(h) >= oldest}
+
+
+class MarketStatsService:
+    """Сервис роллапа рыночной статистики"""
+
+    @staticmethod
+    def group_of(pet: Pet) -> Tuple[str, str, str]:
+        """Ключ группы питомца: имена Enum или 'unknown'"""
+        return (
+            pet.habitat.name if pet.habitat is not None else UNKNOWN_GROUP,
+            pet.creature_type.name if pet.creature_type is not None else UNKNOWN_GROUP,
+            pet.state.name if pet.state is not None else UNKNOWN_GROUP,
+        )
+
+    @staticmethod
+    async def _get_or_create_for_update(db: AsyncSession, group: Tuple[str, str, str]) -> MarketStat:
+        habitat, creature_type, stage = group
+        query = (
+            select(MarketStat)
+            .where(
+                MarketStat.habitat == habitat,
+                MarketStat.creature_type == creature_type,
+                MarketStat.stage == stage,
+            )
+            .with_for_update()
+        )
+        stat = (await db.execute(query)).scalar_one_or_none()
+        if stat:
+            return stat
+
+        dialect = db.bind.dialect.name if db.bind is not None else ""
+        if dialect in ("postgresql", "sqlite"):
+            # Параллельная первая продажа в группе не должна падать на уникальном ключе
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            await db.execute(
+                insert(MarketStat)
+                .values(habitat=habitat, creature_type=creature_type, stage=stage, sales_count=0, volume_total=0)
+                .on_conflict_do_nothing(index_elements=["habitat", "creature_type", "stage"])
+            )
+            return (await db.execute(query)).scalar_one()
+
+        stat = MarketStat(habitat=habitat, creature_type=creature_type, stage=stage, sales_count=0, volume_total=0)
+        db.add(stat)
+        return stat
+
+    @staticmethod
+    async def record_sale(db: AsyncSession, pet: Pet, price: int, sold_at: Optional[datetime] = None) -> MarketStat:
+        """Учитывает продажу в роллапе. Без commit — вызывается внутри транзакции сделки."""
+        sold_at = sold_at or datetime.utcnow()
+        stat = await MarketStatsService._get_or_create_for_update(db, MarketStatsService.group_of(pet))
+
+        stat.sales_count = (stat.sales_count or 0) + 1
+        stat.volume_total = (stat.volume_total or 0) + price
+        if stat.last_sale_at is None or sold_at >= stat.last_sale_at.replace(tzinfo=None):
+            stat.last_price = price
+            stat.last_sale_at = sold_at
+
+        sketch = P2Quantile(state=_load_json(stat.median_sketch, None))
+        sketch.add(price)
+        stat.median_sketch = json.dumps(sketch.to_state())
+
+        hour = _hour(sold_at)
+        buckets = _window(_load_json(stat.hourly_buckets, {}), hour)
+        volume, count, floor = buckets.get(str(hour), [0, 0, price])
+        buckets[str(hour)] = [volume + price, count + 1, min(floor, price)]
+        stat.hourly_buckets = json.dumps(buckets)
+
+        await db.flush()
+        return stat
+
+    @staticmethod
+    def to_dict(stat: MarketStat, now: Optional[datetime] = None) -> Dict[str, Any]:
+        buckets = _window(_load_json(stat.hourly_buckets, {}), _hour(now or datetime.utcnow()))
+        median = P2Quantile(state=_load_json(stat.median_sketch, None)).value()
+        return {
+            "habitat": stat.habitat,
+            "creature_type": stat.creature_type,
+            "stage": stat.stage,
+            "sales_count": stat.sales_count or 0,
+            "volume_total": stat.volume_total or 0,
+            "last_price": stat.last_price,
+            "last_sale_at": stat.last_sale_at,
+            "median_price": round(median) if median is not None else None,
+            "sales_24h": sum(b[1] for b in buckets.values()),
+            "volume_24h": sum(b[0] for b in buckets.values()),
+            "floor_price_24h": min((b[2] for b in buckets.values()), default=None),
+        }
+
+    @staticmethod
+    async def get_stats(
+        db: AsyncSession,
+        habitat: Optional[str] = None,
+        creature_type: Optional[str] = None,
+        stage: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Статистика по группам; фильтры — имена Enum (AQUATIC, BEAST, adult)"""
+        query = select(MarketStat)
+        if habitat:
+            query = query.where(MarketStat.habitat == habitat)
+        if creature_type:
+            query = query.where(MarketStat.creature_type == creature_type)
+        if stage:
+            query = query.where(MarketStat.stage == stage)
+        query = query.order_by(MarketStat.habitat, MarketStat.creature_type, MarketStat.stage)
+        now = datetime.utcnow()
+        return [MarketStatsService.to_dict(s, now) for s in (await db.execute(query)).scalars().all()]
+
+    @staticmethod
+    async def rebuild(db: AsyncSession) -> int:
+        """
+        Пересобирает роллап из истории продаж на аукционах.
+        Группа берётся по текущим признакам питомца (стадия на момент продажи не хранится).
+        Без commit — вызывающий фиксирует результат.
+        """
+        await db.execute(delete(MarketStat))
+        result = await db.execute(
+            select(PetOwnershipHistory, Pet)
+            .join(Pet, Pet.id == PetOwnershipHistory.pet_id)
+            .where(PetOwnershipHistory.auction_id.isnot(None), PetOwnershipHistory.price.isnot(None))
+            .order_by(PetOwnershipHistory.created_at, PetOwnershipHistory.id)
+        )
+        processed = 0
+        for history, pet in result.all():
+            sold_at = history.created_at.replace(tzinfo=None) if history.created_at else None
+            await MarketStatsService.record_sale(db, pet, history.price, sold_at)
+            processed += 1
+        await db.flush()
+        logger.info(f"Статистика рынка пересобрана: {processed} продаж")
+        return processed
@@ -4,6 +4,7 @@ from __future__ import annotations
 import os
 import json
 import asyncio
+import itertools
 from typing import Optional, Tuple, Dict, Any
 
 from config.settings import (
@@ -13,40 +14,31 @@ from config.settings import (
     get_stage_negative_prompt,
     get_realism_prompt,
 )
-from prompt_store import generate_and_store_prompts, load_prompts
+from prompt_store import PromptStore, seed_restorable
 from generator.image_gen import HFImageGenerator
-from generator.promt_gen import CreatureGenerator
+from generator.promt_gen import creature_seed, get_creature_generator
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from models import Pet, PetState
+from services.creature_similarity import CreatureSimilarityService
 from pet_generator_alternative import pet_generator_alternative
 
 
 class StageLifecycleService:
     @staticmethod
-    def ensure_prompts(user_id: str, pet_name: str) -> Dict[str, Any]:
-        stored = load_prompts(user_id, pet_name)
-        if not stored:
-            stored = generate_and_store_prompts(user_id, pet_name)
-        return stored or {}
-
-    @staticmethod
-    def _generate_png_for_stage(user_id: str, pet_name: str, stage_key: str) -> Tuple[Optional[str], Dict[str, Any]]:
-        """Пытается сгенерировать PNG через HF по сохранённому промпту. Возвращает (path, metadata)."""
-        stored = StageLifecycleService.ensure_prompts(user_id, pet_name)
-        stage_prompts = (stored.get("stage_prompts", {}) or {})
-        prompt_en = (stage_prompts.get(stage_key, {}) or {}).get("en")
-
-        # 1) Пытаемся взять промпт из БД (источник истины)
-        if not prompt_en:
-            try:
-                prompt_en = StageLifecycleService._get_prompt_from_db_sync(user_id, pet_name, stage_key)
-            except Exception:
-                prompt_en = None
-
+    def _generate_png_for_stage(
+        user_id: str,
+        pet_name: str,
+        stage_key: str,
+        prompt_en: Optional[str] = None,
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Пытается сгенерировать PNG через HF по промпту стадии. Возвращает (path, metadata).
+
+        Синхронно и без БД (HF блокирует): из event loop — только через render_stage_png.
+        """
         if not prompt_en:
             # Fallback: сгенерировать рандомного зверя (для совместимости)
-            cg = CreatureGenerator()
+            cg = get_creature_generator()
             gen = HFImageGenerator()
             result = gen.generate_creature_image(cg, output_dir=get_file_settings()["output_dir"], stage=stage_key)
             if result and result.get("success"):
@@ -97,68 +89,94 @@ class StageLifecycleService:
         return image_path, metadata
 
     @staticmethod
-    def get_or_generate_image(user_id: str, pet_name: str, stage_key: str, health: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
-        image_path, metadata = StageLifecycleService._generate_png_for_stage(user_id, pet_name, stage_key)
+    async def render_stage_png(
+        user_id: str,
+        pet_name: str,
+        stage_key: str,
+        prompt_en: Optional[str] = None,
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
+        """_generate_png_for_stage в executor: генерация через HF не блокирует event loop"""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, StageLifecycleService._generate_png_for_stage, user_id, pet_name, stage_key, prompt_en
+        )
+
+    @staticmethod
+    async def get_or_generate_image(
+        user_id: str,
+        pet_name: str,
+        stage_key: str,
+        health: Optional[int] = None,
+        prompt_en: Optional[str] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        image_path, metadata = await StageLifecycleService.render_stage_png(user_id, pet_name, stage_key, prompt_en)
         if image_path:
             return image_path, metadata
         # Fallback SVG
-        loop = asyncio.get_event_loop()
-        return loop.run_until_complete(pet_generator_alternative.generate_pet_image(user_id, pet_name, stage_key, health or 100))
+        return await pet_generator_alternative.generate_pet_image(user_id, pet_name, stage_key, health or 100)
 
     @staticmethod
     async def warm_stage_image_async(user_id: str, pet_name: str, stage_key: str, health: int) -> None:
-        def _run() -> None:
-            try:
-                StageLifecycleService.get_or_generate_image(user_id, pet_name, stage_key, health)
-            except Exception:
-                pass
+        try:
+            await StageLifecycleService.get_or_generate_image(user_id, pet_name, stage_key, health)
+        except Exception:
+            pass
 
-        await asyncio.get_event_loop().run_in_executor(None, _run)
+    @staticmethod
+    async def build_creation_artifacts(user_id: str, pet_name: str) -> Dict[str, Any]:
+        """Готовит существо, промпты всех стадий и изображение яйца без обращения к БД.
+
+        Существо — чистая функция сида (user_id, pet_name), поэтому промпты не пишутся
+        ни на диск, ни в БД: их в любой момент можно восстановить по Pet.creature_seed.
+        Если существо похоже на одно из недавних, берётся запасной сид (user_id, pet_name, attempt).
+        Выполняется до записи в БД, чтобы медленная генерация не держала транзакцию открытой.
+        """
+        stored = CreatureSimilarityService.generate_distinct(
+            creature_seed(user_id, pet_name, attempt) for attempt in itertools.count()
+        )
+        egg_prompt = ((stored.get("stage_prompts", {}) or {}).get("egg", {}) or {}).get("en")
+        image_path: Optional[str] = None
+        try:
+            image_path, _ = await StageLifecycleService.get_or_generate_image(
+                user_id, pet_name, "egg", health=100, prompt_en=egg_prompt
+            )
+        except Exception:
+            image_path = None
+        return {"stored": stored, "egg_image_path": image_path}
 
     @staticmethod
-    async def prepare_on_create(db: AsyncSession, user_id: str, pet_name: str) -> None:
-        """Генерирует creature-json и промпты для всех стадий, сохраняет в БД;
-        затем генерирует изображение для стадии egg и сохраняет base64 в БД."""
-        stored = StageLifecycleService.ensure_prompts(user_id, pet_name)
+    async def apply_creation_artifacts(db: AsyncSession, pet: Pet, artifacts: Dict[str, Any]) -> None:
+        """Записывает creature_json, промпты стадий и изображение яйца в питомца (артефакты
+        build_creation_artifacts или CreaturePoolService.claim). Без commit."""
+        stored = artifacts.get("stored") or {}
         stage_prompts = (stored.get("stage_prompts", {}) or {})
+        pet.creature_seed = stored.get("seed")
+        pet.generator_version = stored.get("generator_version") if pet.creature_seed is not None else None
+        pet.set_creature(stored.get("creature", {}))
+        StageLifecycleService._apply_stage_image(pet, "egg", artifacts.get("egg_image_path"))
+        # Изображение яйца из пула готовых существ — уже в base64
+        if artifacts.get("egg_image_b64"):
+            pet.image_egg_b64 = artifacts["egg_image_b64"]
+        await db.flush()
+        # Промпты пишутся только у существ, которые не восстанавливаются из сида
+        if not seed_restorable(pet):
+            await PromptStore.put_many(db, {
+                (pet.id, stage_key): (stage_prompts.get(stage_key, {}) or {}).get("en")
+                for stage_key in ("egg", "baby", "adult")
+            })
+        await CreatureSimilarityService.index_pet(db, pet)
 
-        # Сохраняем creature_json и промпты в БД (источник истины — БД)
+    @staticmethod
+    async def prepare_on_create(db: AsyncSession, user_id: str, pet_name: str) -> None:
+        """Генерирует creature-json и промпты для всех стадий, сохраняет в БД;
+        затем генерирует изображение для стадии egg и сохраняет base64 в БД. Без commit."""
+        artifacts = await StageLifecycleService.build_creation_artifacts(user_id, pet_name)
         result = await db.execute(select(Pet).where(Pet.user_id == user_id, Pet.name == pet_name))
         pet = result.scalar_one_or_none()
         if pet:
-            pet.creature_json = json.dumps(stored.get("creature", {}), ensure_ascii=False)
-            egg_en = (stage_prompts.get("egg", {}) or {}).get("en")
-            baby_en = (stage_prompts.get("baby", {}) or {}).get("en")
-            adult_en = (stage_prompts.get("adult", {}) or {}).get("en")
-            if egg_en:
-                pet.prompt_egg_en = egg_en
-            if baby_en:
-                pet.prompt_baby_en = baby_en
-            if adult_en:
-                pet.prompt_adult_en = adult_en
-            await db.commit()
-
-        # Сразу генерируем изображение для первой стадии (egg) и сохраняем в БД как base64
-        image_path, metadata = StageLifecycleService.get_or_generate_image(user_id, pet_name, "egg", health=100)
-        try:
-            await StageLifecycleService.persist_stage_artifacts(db, user_id, pet_name, "egg", (stage_prompts.get("egg", {}) or {}).get("en"), image_path)
-        except Exception:
-            pass
+            await StageLifecycleService.apply_creation_artifacts(db, pet, artifacts)
 
     @staticmethod
-    async def persist_stage_artifacts(db: AsyncSession, user_id: str, pet_name: str, stage_key: str, prompt_en: Optional[str], image_path: Optional[str]) -> None:
-        """Сохраняет promt_en и image_b64 текущей стадии в таблицу pets."""
-        result = await db.execute(select(Pet).where(Pet.user_id == user_id, Pet.name == pet_name))
-        pet = result.scalar_one_or_none()
-        if not pet:
-            return
-        # Промпты
-        if stage_key == 'egg' and prompt_en:
-            pet.prompt_egg_en = prompt_en
-        elif stage_key == 'baby' and prompt_en:
-            pet.prompt_baby_en = prompt_en
-        elif stage_key == 'adult' and prompt_en:
-            pet.prompt_adult_en = prompt_en
+    def _apply_stage_image(pet: Pet, stage_key: str, image_path: Optional[str]) -> None:
         # Картинка в base64
         if image_path and os.path.exists(image_path):
             try:
@@ -173,38 +191,23 @@ class StageLifecycleService:
                     pet.image_adult_b64 = b64
             except Exception:
                 pass
-        await db.commit()
+
+    @staticmethod
+    async def persist_stage_artifacts(db: AsyncSession, user_id: str, pet_name: str, stage_key: str, prompt_en: Optional[str], image_path: Optional[str]) -> None:
+        """Сохраняет image_b64 текущей стадии в pets, а promt_en (у питомцев, чьи промпты не
+        восстанавливаются из сида) — в pet_prompts. Без commit."""
+        result = await db.execute(select(Pet).where(Pet.user_id == user_id, Pet.name == pet_name))
+        pet = result.scalar_one_or_none()
+        if not pet:
+            return
+        StageLifecycleService._apply_stage_image(pet, stage_key, image_path)
+        await db.flush()
+        if prompt_en and not seed_restorable(pet):
+            await PromptStore.put(db, pet.id, stage_key, prompt_en)
 
     @staticmethod
     async def wipe_images_on_death(db: AsyncSession, pet: Pet) -> None:
         pet.image_egg_b64 = None
         pet.image_baby_b64 = None
         pet.image_adult_b64 = None
-        await db.commit()
-
-    # ===== Helpers =====
-    @staticmethod
-    def _get_prompt_from_db_sync(user_id: str, pet_name: str, stage_key: str) -> Optional[str]:
-        """Синхронный helper для получения промпта из БД (используется в sync-пайплайне генерации изображений)."""
-        from db import AsyncSessionLocal
-        from models import Pet
-        import asyncio as _asyncio
-
-        async def _fetch() -> Optional[str]:
-            async with AsyncSessionLocal() as _db:
-                res = await _db.execute(select(Pet).where(Pet.user_id == user_id, Pet.name == pet_name))
-                pet = res.scalar_one_or_none()
-                if not pet:
-                    return None
-                if stage_key == 'egg':
-                    return pet.prompt_egg_en
-                if stage_key == 'baby':
-                    return pet.prompt_baby_en
-                if stage_key == 'adult':
-                    return pet.prompt_adult_en
-                return None
-
-        loop = _asyncio.get_event_loop()
-        return loop.run_until_complete(_fetch())
-
-
+        await db.flush()
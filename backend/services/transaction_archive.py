@@ -0,0 +1,319 @@
+"""
+Холодный архив истории транзакций.
+
+Горячая таблица transactions хранит последние TRANSACTIONS_HOT_MONTHS месяцев; более старые
+строки архиватор переносит в сжатые сегменты transaction_archives (пользователь × месяц).
+Переносится всегда префикс таблицы по id: всё до водяного знака 'transactions_archive' лежит
+в архиве, всё новее — в горячей таблице, и каждая строка ровно в одном из мест. Перед переносом
+у пользователя ставится чекпоинт леджера не раньше последней архивной строки, поэтому текущие
+итоги и баланс считаются только по горячей таблице. В архив заглядывают лишь исторические
+запросы: баланс на дату, выписка, длинная история и сверка.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import logging
+import zlib
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from models import LedgerCheckpoint, RollupWatermark, Transaction, TransactionArchive, TransactionStatus, TransactionType
+from services.economy_rollups import WATERMARK_NAME as ROLLUP_WATERMARK_NAME, ensure_watermark, move_watermark
+from config.settings import TRANSACTIONS_ARCHIVE_CHUNK, TRANSACTIONS_HOT_MONTHS
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = "transactions_archive"
+COMPRESSION_LEVEL = 6
+# Размер списка id в одном DELETE ... WHERE id IN (...)
+DELETE_BATCH = 500
+
+Totals = Dict[str, Dict[str, int]]
+
+
+def _naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def archive_horizon(now: Optional[datetime] = None, hot_months: int = TRANSACTIONS_HOT_MONTHS) -> datetime:
+    """Начало самого старого горячего месяца: строки раньше него уходят в архив."""
+    now = _naive_utc(now) or datetime.utcnow()
+    month_index = now.year * 12 + now.month - 1 - max(1, hot_months) + 1
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _encode(rows: Iterable[Any]) -> bytes:
+    data = [
+        [
+            row.id, row.transaction_type.value, row.amount, row.balance_before, row.balance_after,
+            row.description, row.status.value if row.status else None, row.transaction_data,
+            _naive_utc(row.created_at).isoformat(),
+        ]
+        for row in rows
+    ]
+    return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def _decode(user_id: str, payload: bytes) -> List[Transaction]:
+    """Строки сегмента как несвязанные с сессией объекты Transaction (только для чтения)."""
+    return [
+        Transaction(
+            id=tid,
+            user_id=user_id,
+            transaction_type=TransactionType(ttype),
+            amount=amount,
+            balance_before=balance_before,
+            balance_after=balance_after,
+            description=description,
+            status=TransactionStatus(status) if status else None,
+            transaction_data=transaction_data,
+            created_at=datetime.fromisoformat(created_at),
+        )
+        for tid, ttype, amount, balance_before, balance_after, description, status, transaction_data, created_at
+        in json.loads(zlib.decompress(payload).decode("utf-8"))
+    ]
+
+
+def _totals(rows: Iterable[Any]) -> Totals:
+    totals: Totals = {}
+    for row in rows:
+        acc = totals.setdefault(row.transaction_type.value, {"total_amount": 0, "count": 0})
+        acc["total_amount"] += row.amount
+        acc["count"] += 1
+    return totals
+
+
+def _segment(user_id: str, period: str, rows: List[Any]) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "period": period,
+        "first_transaction_id": rows[0].id,
+        "last_transaction_id": rows[-1].id,
+        "first_at": _naive_utc(rows[0].created_at),
+        "last_at": _naive_utc(rows[-1].created_at),
+        "transactions_count": len(rows),
+        "opening_balance": rows[0].balance_before,
+        "closing_balance": rows[-1].balance_after,
+        "totals": json.dumps(_totals(rows)),
+        "payload": _encode(rows),
+    }
+
+
+class TransactionArchiveService:
+    """Перенос старых транзакций в холодный архив и чтение из него"""
+
+    @staticmethod
+    async def archived_upto(db: AsyncSession) -> int:
+        """id последней заархивированной транзакции (0 — архив пуст)."""
+        return (await db.execute(
+            select(RollupWatermark.last_id).where(RollupWatermark.name == WATERMARK_NAME)
+        )).scalar_one_or_none() or 0
+
+    @staticmethod
+    async def archive(
+        db: AsyncSession,
+        before: Optional[datetime] = None,
+        chunk_size: int = TRANSACTIONS_ARCHIVE_CHUNK,
+    ) -> int:
+        """
+        Переносит в архив следующую порцию транзакций старше before (по умолчанию — archive_horizon()).
+        Без commit. Возвращает число перенесённых строк (0 — нечего переносить или порцию взял другой воркер).
+        """
+        from services.ledger import LedgerService  # локальный импорт, чтобы избежать циклов
+
+        before = _naive_utc(before) or archive_horizon()
+        archived_upto = await ensure_watermark(db, WATERMARK_NAME)
+        # Ещё не свёрнутые в роллапы экономики строки не трогаем: агрегатор читает горячую таблицу
+        folded_upto = await ensure_watermark(db, ROLLUP_WATERMARK_NAME)
+        rows = (await db.execute(
+            select(
+                Transaction.id, Transaction.user_id, Transaction.transaction_type, Transaction.amount,
+                Transaction.balance_before, Transaction.balance_after, Transaction.description,
+                Transaction.status, Transaction.transaction_data, Transaction.created_at,
+            )
+            .where(Transaction.id > archived_upto)
+            .order_by(Transaction.id)
+            .limit(chunk_size)
+        )).all()
+
+        # Переносим только префикс по id: граница архива — одно число
+        batch = []
+        for row in rows:
+            if row.id > folded_upto or row.created_at is None or _naive_utc(row.created_at) >= before:
+                break
+            batch.append(row)
+        if not batch:
+            return 0
+
+        if not await move_watermark(db, WATERMARK_NAME, archived_upto, batch[-1].id):
+            logger.info("Порцию архива транзакций уже перенёс другой воркер")
+            return 0
+
+        by_user: Dict[str, List[Any]] = defaultdict(list)
+        for row in batch:
+            by_user[row.user_id].append(row)
+
+        # Чекпоинт не раньше последней архивной строки: get_stats и checkpoint_user
+        # продолжают работать только с горячей таблицей
+        covered = dict((await db.execute(
+            select(LedgerCheckpoint.user_id, func.max(LedgerCheckpoint.last_transaction_id))
+            .where(LedgerCheckpoint.user_id.in_(list(by_user)))
+            .group_by(LedgerCheckpoint.user_id)
+        )).all())
+        for user_id, user_rows in by_user.items():
+            if (covered.get(user_id) or 0) < user_rows[-1].id:
+                await LedgerService.checkpoint_user(db, user_id)
+
+        segments = []
+        for user_id, user_rows in by_user.items():
+            by_period: Dict[str, List[Any]] = defaultdict(list)
+            for row in user_rows:
+                by_period[_naive_utc(row.created_at).strftime("%Y-%m")].append(row)
+            segments.extend(_segment(user_id, period, part) for period, part in by_period.items())
+        await db.execute(insert(TransactionArchive.__table__), segments)
+
+        ids = [row.id for row in batch]
+        for i in range(0, len(ids), DELETE_BATCH):
+            await db.execute(
+                delete(Transaction)
+                .where(Transaction.id.in_(ids[i:i + DELETE_BATCH]))
+                .execution_options(synchronize_session=False)
+            )
+        return len(batch)
+
+    @staticmethod
+    async def archive_all(db: AsyncSession, chunk_size: int = TRANSACTIONS_ARCHIVE_CHUNK, **kwargs) -> int:
+        """Переносит в архив всё, что старше горизонта, порциями по chunk_size. Без commit."""
+        total = 0
+        while True:
+            moved = await TransactionArchiveService.archive(db, chunk_size=chunk_size, **kwargs)
+            total += moved
+            if moved < chunk_size:
+                return total
+
+    # ----- Чтение архива -----
+
+    @staticmethod
+    async def _segments(
+        db: AsyncSession,
+        user_id: str,
+        after_id: int = 0,
+        upto_id: Optional[int] = None,
+        after_at: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        newest_first: bool = False,
+    ) -> List[TransactionArchive]:
+        query = select(TransactionArchive).where(
+            TransactionArchive.user_id == user_id,
+            TransactionArchive.last_transaction_id > after_id,
+        )
+        if upto_id is not None:
+            query = query.where(TransactionArchive.first_transaction_id <= upto_id)
+        if after_at is not None:
+            query = query.where(TransactionArchive.last_at > after_at)
+        if until is not None:
+            query = query.where(TransactionArchive.first_at <= until)
+        order = TransactionArchive.last_transaction_id
+        query = query.order_by(order.desc() if newest_first else order)
+        return (await db.execute(query)).scalars().all()
+
+    @staticmethod
+    async def rows(
+        db: AsyncSession,
+        user_id: str,
+        after_id: int = 0,
+        upto_id: Optional[int] = None,
+        after_at: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        newest_first: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[Transaction]:
+        """
+        Архивные транзакции пользователя: id в (after_id, upto_id], время в (after_at, until].
+        Возвращаются несвязанные с сессией объекты Transaction в порядке id (или обратном).
+        """
+        after_at, until = _naive_utc(after_at), _naive_utc(until)
+        result: List[Transaction] = []
+        for segment in await TransactionArchiveService._segments(
+            db, user_id, after_id, upto_id, after_at, until, newest_first
+        ):
+            part = [
+                row for row in _decode(user_id, segment.payload)
+                if row.id > after_id
+                and (upto_id is None or row.id <= upto_id)
+                and (after_at is None or row.created_at > after_at)
+                and (until is None or row.created_at <= until)
+            ]
+            result.extend(reversed(part) if newest_first else part)
+            if limit is not None and len(result) >= limit:
+                return result[:limit]
+        return result
+
+    @staticmethod
+    async def totals(
+        db: AsyncSession,
+        user_id: str,
+        after_id: int = 0,
+        until: Optional[datetime] = None,
+        upto_id: Optional[int] = None,
+    ) -> Tuple[Totals, int]:
+        """Итоги по типам архивных транзакций после after_id; целые сегменты не распаковываются."""
+        until = _naive_utc(until)
+        totals: Totals = {}
+        count = 0
+        for segment in await TransactionArchiveService._segments(db, user_id, after_id, upto_id, until=until):
+            whole = (
+                segment.first_transaction_id > after_id
+                and (upto_id is None or segment.last_transaction_id <= upto_id)
+                and (until is None or _naive_utc(segment.last_at) <= until)
+            )
+            if whole:
+                part_totals = json.loads(segment.totals)
+            else:
+                part_totals = _totals(
+                    row for row in _decode(user_id, segment.payload)
+                    if row.id > after_id
+                    and (upto_id is None or row.id <= upto_id)
+                    and (until is None or row.created_at <= until)
+                )
+            for ttype, row in part_totals.items():
+                acc = totals.setdefault(ttype, {"total_amount": 0, "count": 0})
+                acc["total_amount"] += row["total_amount"]
+                acc["count"] += row["count"]
+                count += row["count"]
+        return totals, count
+
+    @staticmethod
+    async def balance_at(db: AsyncSession, user_id: str, at: datetime, after_id: int = 0) -> Optional[int]:
+        """balance_after последней архивной транзакции не позже at (и после after_id)."""
+        rows = await TransactionArchiveService.rows(
+            db, user_id, after_id=after_id, until=at, newest_first=True, limit=1
+        )
+        return rows[0].balance_after if rows else None
+
+    @staticmethod
+    async def closing_balances(db: AsyncSession, user_ids: Optional[List[str]] = None) -> Dict[str, int]:
+        """Баланс на конец архива по пользователям — начало цепочки для сверки горячей таблицы."""
+        latest = (
+            select(
+                TransactionArchive.user_id,
+                func.max(TransactionArchive.last_transaction_id).label("last_id"),
+            )
+            .group_by(TransactionArchive.user_id)
+        )
+        if user_ids is not None:
+            latest = latest.where(TransactionArchive.user_id.in_(user_ids))
+        latest = latest.subquery()
+        return dict((await db.execute(
+            select(TransactionArchive.user_id, TransactionArchive.closing_balance).join(
+                latest,
+                (TransactionArchive.user_id == latest.c.user_id)
+                & (TransactionArchive.last_transaction_id == latest.c.last_id),
+            )
+        )).all())
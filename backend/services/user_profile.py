@@ -8,7 +8,7 @@ from sqlalchemy import func
 from models import User
 from config.settings import MIN_DISPLAY_NAME_LENGTH, MAX_DISPLAY_NAME_LENGTH, ANONYMOUS_MODE_ENABLED
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import re
 
 logger = logging.getLogger(__name__)
@@ -68,6 +68,21 @@ class UserProfileService:
             logger.error(f"Ошибка получения публичной информации о пользователе {user_id}: {e}")
             return None
     
+    @staticmethod
+    async def get_public_names(db: AsyncSession, user_ids: List[str]) -> Dict[str, str]:
+        """Возвращает публичные имена для набора пользователей одним запросом"""
+        unique_ids = list({uid for uid in user_ids if uid})
+        if not unique_ids:
+            return {}
+        try:
+            result = await db.execute(
+                select(User).where(User.user_id.in_(unique_ids))
+            )
+            return {user.user_id: user.public_name for user in result.scalars().all()}
+        except Exception as e:
+            logger.error(f"Ошибка получения публичных имён пользователей: {e}")
+            return {}
+    
     @staticmethod
     async def update_user_profile(
         db: AsyncSession, 
@@ -105,11 +120,9 @@ class UserProfileService:
             if display_name is not None:
                 user.display_name = display_name.strip() if display_name else None
             
-            # Обновляем время изменения
+            # Обновляем время изменения; commit — у вызывающего
             user.updated_at = func.now()
-            
-            await db.commit()
-            await db.refresh(user)
+            await db.flush()
             
             logger.info(f"Обновлен профиль пользователя {user_id}: анонимность={user.is_anonymous}, display_name={user.display_name}")
             # Возвращаем полную актуальную структуру профиля, как в GET
@@ -120,7 +133,6 @@ class UserProfileService:
             raise e
         except Exception as e:
             logger.error(f"Ошибка обновления профиля пользователя {user_id}: {e}")
-            await db.rollback()
             return None
     
     @staticmethod
@@ -137,16 +149,13 @@ class UserProfileService:
             
             user.telegram_username = telegram_username
             user.updated_at = func.now()
-            
-            await db.commit()
-            await db.refresh(user)
+            await db.flush()
             
             logger.info(f"Установлен telegram_username для пользователя {user_id}: {telegram_username}")
             return True
             
         except Exception as e:
             logger.error(f"Ошибка установки telegram_username для пользователя {user_id}: {e}")
-            await db.rollback()
             return False
     
     @staticmethod
@@ -0,0 +1,257 @@
+"""
+Процессный кэш кошельков для горячих чтений: /summary, /economy/wallet, /economy/balance,
+`new_balance` после списаний и кнопка кошелька в боте.
+
+Запись сквозная: пути, меняющие кошелёк, кладут в сессию снимок из RETURNING своего UPDATE,
+а после commit корневой транзакции снимки синхронно переходят в кэш — чтение сразу после
+`await db.commit()` уже видит новое значение. Откат отбрасывает снимки, откат SAVEPOINT
+превращает их в инвалидацию. Заполнение кэша из БД защищено поколениями: значение,
+прочитанное транзакцией, начавшейся до чужой записи, не перетрёт более свежее.
+Другим воркерам после commit уходит инвалидация через шину, TTL — последняя страховка.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config.settings import (
+    DATABASE_URL,
+    WALLET_CACHE_SIZE,
+    WALLET_CACHE_TTL_SECONDS,
+    WALLET_CACHE_BUS,
+    WALLET_CACHE_PG_CHANNEL,
+)
+from services.auction_events import LocalEventBus, PostgresEventBus
+
+logger = logging.getLogger(__name__)
+
+EVENT_INVALIDATE = "wallet_invalidate"
+
+# Ключи в session.info: снимки записей текущей транзакции и поколение кэша на её начало
+_STAGED_KEY = "wallet_cache_staged"
+_TOKEN_KEY = "wallet_cache_token"
+
+
+class WalletSnapshot(NamedTuple):
+    """Неизменяемая копия кошелька для чтений (без ORM-объекта и сессии)."""
+
+    user_id: str
+    coins: int
+    coins_locked: int
+    total_earned: int
+    total_spent: int
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    @property
+    def available(self) -> int:
+        return max(0, self.coins - (self.coins_locked or 0))
+
+    @classmethod
+    def from_row(cls, row) -> "WalletSnapshot":
+        return cls(
+            user_id=row.user_id,
+            coins=row.coins,
+            coins_locked=row.coins_locked or 0,
+            total_earned=row.total_earned or 0,
+            total_spent=row.total_spent or 0,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+        )
+
+
+class WalletCache:
+    """LRU снимков кошельков с TTL, сквозной записью и межворкерной инвалидацией."""
+
+    def __init__(self, max_size: int = WALLET_CACHE_SIZE, ttl: float = WALLET_CACHE_TTL_SECONDS, bus=None):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._items: "OrderedDict[str, Tuple[WalletSnapshot, float]]" = OrderedDict()
+        # Поколение записи по user_id; вытесненные поколения учитываются через _floor
+        self._counter = 0
+        self._generations: "OrderedDict[str, int]" = OrderedDict()
+        self._floor = 0
+        self._origin = uuid.uuid4().hex
+        self.hits = 0
+        self.misses = 0
+        self._bus = None
+        self.set_bus(bus or LocalEventBus())
+
+    # ----- Шина инвалидации -----
+
+    def set_bus(self, bus) -> None:
+        self._bus = bus
+        self._bus.attach(self._on_event)
+
+    async def start(self) -> None:
+        try:
+            await self._bus.start()
+        except Exception as e:
+            logger.error(f"Не удалось запустить шину инвалидации кошельков, использую локальную: {e}")
+            self.set_bus(LocalEventBus())
+
+    async def stop(self) -> None:
+        await self._bus.stop()
+
+    def _on_event(self, event: Dict[str, Any]) -> None:
+        if event.get("type") != EVENT_INVALIDATE or event.get("origin") == self._origin:
+            return
+        for user_id in event.get("user_ids") or ():
+            self.invalidate(user_id)
+
+    async def _publish(self, user_ids) -> None:
+        try:
+            await self._bus.publish({"type": EVENT_INVALIDATE, "origin": self._origin, "user_ids": user_ids})
+        except Exception as e:
+            logger.warning(f"Ошибка публикации инвалидации кошельков: {e}")
+
+    # ----- Процессный кэш -----
+
+    def get(self, user_id: str) -> Optional[WalletSnapshot]:
+        item = self._items.get(user_id)
+        if item is None:
+            self.misses += 1
+            return None
+        snapshot, expires_at = item
+        if expires_at <= time.monotonic():
+            del self._items[user_id]
+            self.misses += 1
+            return None
+        self._items.move_to_end(user_id)
+        self.hits += 1
+        return snapshot
+
+    def _store(self, snapshot: WalletSnapshot) -> None:
+        self._items[snapshot.user_id] = (snapshot, time.monotonic() + self._ttl)
+        self._items.move_to_end(snapshot.user_id)
+        while len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+
+    def _bump(self, user_id: str) -> None:
+        self._counter += 1
+        self._generations[user_id] = self._counter
+        self._generations.move_to_end(user_id)
+        while len(self._generations) > self._max_size:
+            _, generation = self._generations.popitem(last=False)
+            self._floor = max(self._floor, generation)
+
+    def token(self) -> int:
+        """Текущее поколение кэша — берётся в начале транзакции, которая будет заполнять кэш."""
+        return self._counter
+
+    def fill(self, snapshot: WalletSnapshot, token: Optional[int]) -> None:
+        """Кладёт прочитанное из БД, если после начала читающей транзакции кошелёк не менялся."""
+        if token is None or self._generations.get(snapshot.user_id, self._floor) > token:
+            return
+        self._store(snapshot)
+
+    def invalidate(self, user_id: str) -> None:
+        self._bump(user_id)
+        self._items.pop(user_id, None)
+
+    def apply(self, staged: Dict[str, Optional[WalletSnapshot]]) -> None:
+        """Применяет записи закоммиченной транзакции и рассылает инвалидацию другим воркерам."""
+        for user_id, snapshot in staged.items():
+            self._bump(user_id)
+            if snapshot is None:
+                self._items.pop(user_id, None)
+            else:
+                self._store(snapshot)
+        if isinstance(self._bus, LocalEventBus):
+            return
+        try:
+            asyncio.get_running_loop().create_task(self._publish(list(staged)))
+        except RuntimeError:
+            pass
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._generations.clear()
+        self._floor = self._counter
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_size": self._max_size,
+            "ttl_seconds": self._ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+            "bus": type(self._bus).__name__,
+        }
+
+    # ----- Записи внутри транзакции -----
+
+    @staticmethod
+    def stage(db, snapshot: WalletSnapshot) -> None:
+        """Запоминает значение кошелька после записи; в кэш оно попадёт после commit."""
+        db.sync_session.info.setdefault(_STAGED_KEY, {})[snapshot.user_id] = snapshot
+
+    @staticmethod
+    def staged(db, user_id: str) -> Tuple[bool, Optional[WalletSnapshot]]:
+        """(была ли запись в текущей транзакции, её значение или None, если оно неизвестно)."""
+        staged = db.sync_session.info.get(_STAGED_KEY) or {}
+        if user_id not in staged:
+            return False, None
+        return True, staged[user_id]
+
+    @staticmethod
+    def transaction_token(db) -> Optional[int]:
+        return db.sync_session.info.get(_TOKEN_KEY)
+
+
+def _build_bus():
+    if WALLET_CACHE_BUS == "postgres":
+        if not DATABASE_URL.startswith(("postgresql://", "postgres://", "postgresql+asyncpg://")):
+            logger.warning("WALLET_CACHE_BUS=postgres требует PostgreSQL, использую локальную шину")
+            return LocalEventBus()
+        from db import connect_args
+
+        dsn = DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
+        return PostgresEventBus(dsn, WALLET_CACHE_PG_CHANNEL, connect_args)
+    return LocalEventBus()
+
+
+# Глобальный кэш кошельков процесса
+wallet_cache = WalletCache(bus=_build_bus())
+
+
+@event.listens_for(Session, "after_begin")
+def _remember_token(session, transaction, connection) -> None:
+    if transaction.parent is None:
+        session.info[_TOKEN_KEY] = wallet_cache.token()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_staged(session) -> None:
+    if session.in_nested_transaction():
+        # RELEASE SAVEPOINT — записи станут видны только с commit корневой транзакции
+        return
+    session.info.pop(_TOKEN_KEY, None)
+    staged = session.info.pop(_STAGED_KEY, None)
+    if staged:
+        wallet_cache.apply(staged)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_staged(session) -> None:
+    staged = session.info.get(_STAGED_KEY)
+    if staged and session.in_nested_transaction():
+        # Откат SAVEPOINT: какие из записей выжили, неизвестно — после commit просто инвалидируем
+        for user_id in staged:
+            staged[user_id] = None
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_transaction(session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_STAGED_KEY, None)
+        session.info.pop(_TOKEN_KEY, None)
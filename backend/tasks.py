@@ -1,9 +1,15 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from db import AsyncSessionLocal
+from db import AsyncSessionLocal, session_scope
 from models import Pet, PetState, PetLifeStatus, Notification, Auction, AuctionStatus
 from services.auction import AuctionService
 from services.stages import StageLifecycleService
+from services.ledger import LedgerService
+from services.economy_rollups import EconomyRollupService
+from services.transaction_archive import TransactionArchiveService
+from services.creature_pool import CreaturePoolService
+from services.creature_similarity import CreatureSimilarityService
+from prompt_store import PromptStore
 from config.settings import (
     HEALTH_DOWN_INTERVALS, 
     HEALTH_DOWN_AMOUNTS, 
@@ -15,6 +21,14 @@ from config.settings import (
     TELEGRAM_MESSAGES,
     TASK_SLEEP_INTERVAL,
     ACHIEVEMENT_CHECK_INTERVALS,
+    IDEMPOTENCY_CLEANUP_INTERVAL,
+    LEDGER_TASK_INTERVAL,
+    LEDGER_RECONCILE_INTERVAL,
+    ECONOMY_ROLLUP_INTERVAL,
+    TRANSACTIONS_ARCHIVE_INTERVAL,
+    TRANSACTIONS_ARCHIVE_CHUNK,
+    CREATURE_POOL_CHUNK,
+    CREATURE_POOL_INTERVAL,
 )
 from telegram_client import telegram_client
 from economy import EconomyService
@@ -43,149 +57,48 @@ async def decrease_health_task():
                     select(Pet).where(Pet.status == PetLifeStatus.alive)
                 )
                 pets = result.scalars().all()
+                # Внешние эффекты (Telegram, генерация изображений) выполняются после commit тика
+                notices = []
+                transitioned = []
                 
                 for pet in pets:
                     try:
-                        # Получаем интервал и количество уменьшения для текущей стадии
-                        interval = HEALTH_DOWN_INTERVALS.get(pet.state.value, 60)
-                        decrease_amount = HEALTH_DOWN_AMOUNTS.get(pet.state.value, 5)
-                        
-                        # Уменьшаем здоровье
-                        old_health = pet.health
-                        pet.health = max(HEALTH_MIN, pet.health - decrease_amount)
-                        
-                        # Проверяем смерть питомца
-                        if pet.health <= HEALTH_MIN:
-                            stage_before_death = pet.state.value
-                            pet.status = PetLifeStatus.dead
-                            # Отменяем активный аукцион, если он есть на этого питомца
-                            try:
-                                a_res = await db.execute(
-                                    select(Auction).where(Auction.pet_id == pet.id, Auction.status == AuctionStatus.active)
-                                )
-                                a = a_res.scalar_one_or_none()
-                                if a:
-                                    a.status = AuctionStatus.cancelled
-                                    await db.commit()
-                            except Exception:
-                                pass
-                            # фиксируем момент окончания жизненного цикла
-                            pet.updated_at = datetime.utcnow()
-                            
-                            # Создаем уведомление о смерти
-                            death_message = STAGE_MESSAGES.get(stage_before_death, {}).get('death', 'Питомец умер')
-                            notification = Notification(
-                                user_id=pet.user_id,
-                                type='death',
-                                message=death_message
-                            )
-                            db.add(notification)
-                            
-                            # Отправляем уведомление в Telegram
-                            await telegram_client.send_death_notification(
-                                user_id=pet.user_id,
-                                pet_name=pet.name,
-                                stage=stage_before_death
-                            )
-                            
-                            logger.info(f"Питомец {pet.name} умер на стадии {stage_before_death}")
-                            # Стираем изображения из БД при смерти
-                            try:
-                                await StageLifecycleService.wipe_images_on_death(db, pet)
-                            except Exception:
-                                pass
-                        
-                        # Проверяем низкое здоровье
-                        elif pet.health <= HEALTH_LOW:
-                            # Создаем уведомление о низком здоровье
-                            from config.settings import HEALTH_MAX
-                            low_health_message = f"Здоровье питомца {pet.name} критически низкое: {pet.health}/{HEALTH_MAX}"
-                            notification = Notification(
-                                user_id=pet.user_id,
-                                type='low_health',
-                                message=low_health_message
-                            )
-                            db.add(notification)
-                            
-                            # Отправляем уведомление в Telegram
-                            await telegram_client.send_low_health_notification(
-                                user_id=pet.user_id,
-                                pet_name=pet.name,
-                                stage=pet.state.value,
-                                health=pet.health
-                            )
-                        
-                        # Проверяем переход на следующую стадию
-                        current_time = datetime.utcnow()
-                        # Используем момент начала текущей стадии: updated_at (если было изменение стадии)
-                        stage_started_at = (pet.updated_at or pet.created_at)
-                        stage_started_at_naive = stage_started_at.replace(tzinfo=None)
-                        time_since_stage_start = current_time - stage_started_at_naive
-                        
-                        if (
-                            pet.status == PetLifeStatus.alive and 
-                            pet.health > HEALTH_MIN and 
-                            time_since_stage_start.total_seconds() >= STAGE_TRANSITION_INTERVAL
-                        ):
-                            
-                            current_stage_index = STAGE_ORDER.index(pet.state.value)
-                            if current_stage_index < len(STAGE_ORDER) - 1:
-                                old_stage = pet.state.value
-                                new_stage = STAGE_ORDER[current_stage_index + 1]
-                                pet.state = PetState(new_stage)
-                                # фиксируем момент начала новой стадии (для корректного таймера)
-                                pet.updated_at = datetime.utcnow()
-                                # Фиксируем смену стадии сразу, чтобы другие запросы видели актуальное состояние
-                                await db.commit()
-                                
-                                # Создаем уведомление о переходе
-                                transition_message = STAGE_MESSAGES.get(old_stage, {}).get('transition', f'Питомец перешел с {old_stage} на {new_stage}')
-                                notification = Notification(
-                                    user_id=pet.user_id,
-                                    type='stage_transition',
-                                    message=transition_message
-                                )
-                                db.add(notification)
-                                
-                                # Отправляем уведомление в Telegram
-                                await telegram_client.send_stage_transition_notification(
-                                    user_id=pet.user_id,
-                                    pet_name=pet.name,
-                                    old_stage=old_stage,
-                                    new_stage=new_stage
-                                )
-                                
-                                # Начисление монет за переход стадии удалено по требованиям
-
-                                # Проверяем достижения
-                                await check_pet_achievements(db, pet.user_id, pet)
-                                
-                                logger.info(f"Питомец {pet.name} перешел с {old_stage} на {new_stage}")
-                                # Генерация и сохранение артефактов для новой стадии
-                                try:
-                                    # Берем промпт из БД как источник истины
-                                    prompt_en_db = None
-                                    try:
-                                        prompt_en_db = StageLifecycleService._get_prompt_from_db_sync(pet.user_id, pet.name, new_stage)
-                                    except Exception:
-                                        prompt_en_db = None
-
-                                    image_path, metadata = StageLifecycleService.get_or_generate_image(
-                                        pet.user_id, pet.name, new_stage, pet.health
-                                    )
-                                    await StageLifecycleService.persist_stage_artifacts(
-                                        db, pet.user_id, pet.name, new_stage, prompt_en_db, image_path
-                                    )
-                                except Exception:
-                                    pass
-                        
-                        logger.debug(f"Питомец {pet.name}: здоровье {old_health} -> {pet.health}")
-                        
+                        # Savepoint на питомца: ошибка откатывает только его изменения
+                        pet_notices = []
+                        async with db.begin_nested():
+                            new_stage = await _process_pet(db, pet, pet_notices)
+                        notices.extend(pet_notices)
+                        if new_stage:
+                            transitioned.append((pet, new_stage))
                     except Exception as e:
                         logger.error(f"Ошибка обработки питомца {pet.id}: {e}")
                         continue
                 
+                # Один commit на тик вместо commit на каждую смену стадии
                 await db.commit()
+
+                for notice in notices:
+                    try:
+                        await notice()
+                    except Exception as e:
+                        logger.warning(f"Ошибка отправки уведомления: {e}")
+
+                # Генерация и сохранение артефактов для новых стадий — вне транзакции тика
+                for pet, new_stage in transitioned:
+                    try:
+                        # Промпт стадии из хранилища или восстановленный из сида
+                        prompt_en_db = await PromptStore.stage_prompt_en(db, pet, new_stage)
+
+                        image_path, metadata = await StageLifecycleService.get_or_generate_image(
+                            pet.user_id, pet.name, new_stage, pet.health, prompt_en=prompt_en_db
+                        )
+                        await StageLifecycleService.persist_stage_artifacts(
+                            db, pet.user_id, pet.name, new_stage, prompt_en_db, image_path
+                        )
+                    except Exception:
+                        pass
+                if transitioned:
+                    await db.commit()
                 
         except Exception as e:
             logger.error(f"Ошибка в фоновой задаче: {e}")
@@ -193,6 +106,120 @@ async def decrease_health_task():
         # Ждем 1 минуту перед следующей итерацией
         await asyncio.sleep(TASK_SLEEP_INTERVAL)
 
+async def _process_pet(db: AsyncSession, pet: Pet, notices: list):
+    """
+    Один шаг жизненного цикла питомца: здоровье, смерть, переход стадии.
+    Ничего не фиксирует; уведомления складываются в notices.
+    Возвращает новую стадию, если питомец на неё перешёл.
+    """
+    # Получаем интервал и количество уменьшения для текущей стадии
+    interval = HEALTH_DOWN_INTERVALS.get(pet.state.value, 60)
+    decrease_amount = HEALTH_DOWN_AMOUNTS.get(pet.state.value, 5)
+    
+    # Уменьшаем здоровье
+    old_health = pet.health
+    pet.health = max(HEALTH_MIN, pet.health - decrease_amount)
+    
+    # Проверяем смерть питомца
+    if pet.health <= HEALTH_MIN:
+        stage_before_death = pet.state.value
+        pet.status = PetLifeStatus.dead
+        # Отменяем активный аукцион, если он есть на этого питомца
+        try:
+            a_res = await db.execute(
+                select(Auction).where(Auction.pet_id == pet.id, Auction.status == AuctionStatus.active)
+            )
+            a = a_res.scalar_one_or_none()
+            if a:
+                a.status = AuctionStatus.cancelled
+        except Exception:
+            pass
+        # фиксируем момент окончания жизненного цикла
+        pet.updated_at = datetime.utcnow()
+        
+        # Создаем уведомление о смерти
+        death_message = STAGE_MESSAGES.get(stage_before_death, {}).get('death', 'Питомец умер')
+        notification = Notification(
+            user_id=pet.user_id,
+            type='death',
+            message=death_message
+        )
+        db.add(notification)
+        
+        # Отправляем уведомление в Telegram
+        notices.append(lambda user_id=pet.user_id, pet_name=pet.name, stage=stage_before_death:
+            telegram_client.send_death_notification(user_id=user_id, pet_name=pet_name, stage=stage))
+        
+        logger.info(f"Питомец {pet.name} умер на стадии {stage_before_death}")
+        # Стираем изображения из БД при смерти
+        try:
+            await StageLifecycleService.wipe_images_on_death(db, pet)
+        except Exception:
+            pass
+    
+    # Проверяем низкое здоровье
+    elif pet.health <= HEALTH_LOW:
+        # Создаем уведомление о низком здоровье
+        from config.settings import HEALTH_MAX
+        low_health_message = f"Здоровье питомца {pet.name} критически низкое: {pet.health}/{HEALTH_MAX}"
+        notification = Notification(
+            user_id=pet.user_id,
+            type='low_health',
+            message=low_health_message
+        )
+        db.add(notification)
+        
+        # Отправляем уведомление в Telegram
+        notices.append(lambda user_id=pet.user_id, pet_name=pet.name, stage=pet.state.value, health=pet.health:
+            telegram_client.send_low_health_notification(user_id=user_id, pet_name=pet_name, stage=stage, health=health))
+    
+    # Проверяем переход на следующую стадию
+    current_time = datetime.utcnow()
+    # Используем момент начала текущей стадии: updated_at (если было изменение стадии)
+    stage_started_at = (pet.updated_at or pet.created_at)
+    stage_started_at_naive = stage_started_at.replace(tzinfo=None)
+    time_since_stage_start = current_time - stage_started_at_naive
+    
+    if (
+        pet.status == PetLifeStatus.alive and 
+        pet.health > HEALTH_MIN and 
+        time_since_stage_start.total_seconds() >= STAGE_TRANSITION_INTERVAL
+    ):
+        
+        current_stage_index = STAGE_ORDER.index(pet.state.value)
+        if current_stage_index < len(STAGE_ORDER) - 1:
+            old_stage = pet.state.value
+            new_stage = STAGE_ORDER[current_stage_index + 1]
+            pet.state = PetState(new_stage)
+            # фиксируем момент начала новой стадии (для корректного таймера)
+            pet.updated_at = datetime.utcnow()
+            
+            # Создаем уведомление о переходе
+            transition_message = STAGE_MESSAGES.get(old_stage, {}).get('transition', f'Питомец перешел с {old_stage} на {new_stage}')
+            notification = Notification(
+                user_id=pet.user_id,
+                type='stage_transition',
+                message=transition_message
+            )
+            db.add(notification)
+            
+            # Отправляем уведомление в Telegram
+            notices.append(lambda user_id=pet.user_id, pet_name=pet.name, old=old_stage, new=new_stage:
+                telegram_client.send_stage_transition_notification(
+                    user_id=user_id, pet_name=pet_name, old_stage=old, new_stage=new))
+            
+            # Начисление монет за переход стадии удалено по требованиям
+
+            # Проверяем достижения
+            await check_pet_achievements(db, pet.user_id, pet)
+            
+            logger.info(f"Питомец {pet.name} перешел с {old_stage} на {new_stage}")
+            logger.debug(f"Питомец {pet.name}: здоровье {old_health} -> {pet.health}")
+            return new_stage
+    
+    logger.debug(f"Питомец {pet.name}: здоровье {old_health} -> {pet.health}")
+    return None
+
 async def check_pet_achievements(db: AsyncSession, user_id: str, pet: Pet):
     """Проверяет достижения питомца"""
     try:
@@ -264,7 +291,9 @@ async def finalize_auctions_task():
                 for a in auctions:
                     try:
                         await AuctionService.finalize_single(db, a.id)
+                        await db.commit()
                     except Exception as e:
+                        await db.rollback()
                         logger.error(f"Ошибка финализации аукциона {a.id}: {e}")
         except Exception as e:
             logger.error(f"Ошибка в фоновой задаче аукционов: {e}")
@@ -272,4 +301,119 @@ async def finalize_auctions_task():
 
 async def start_auction_finalize_task():
     """Запускает фоновую задачу финализации аукционов"""
-    asyncio.create_task(finalize_auctions_task())
\ No newline at end of file
+    asyncio.create_task(finalize_auctions_task())
+
+async def idempotency_cleanup_task():
+    """Фоновая задача очистки просроченных ключей идемпотентности"""
+    from idempotency import purge_expired_keys
+
+    while True:
+        try:
+            removed = await purge_expired_keys()
+            if removed:
+                logger.info(f"Удалено просроченных ключей идемпотентности: {removed}")
+        except Exception as e:
+            logger.error(f"Ошибка очистки ключей идемпотентности: {e}")
+        await asyncio.sleep(IDEMPOTENCY_CLEANUP_INTERVAL)
+
+async def start_idempotency_cleanup_task():
+    """Запускает фоновую задачу очистки ключей идемпотентности"""
+    asyncio.create_task(idempotency_cleanup_task())
+
+async def ledger_task():
+    """Фоновая задача леджера: сворачивание хвостов в чекпоинты и периодическая сверка"""
+    logger.info("Запуск фоновой задачи леджера")
+    last_reconcile = None
+    while True:
+        try:
+            async with session_scope() as db:
+                created = await LedgerService.build_checkpoints(db)
+            if created:
+                logger.info(f"Создано чекпоинтов леджера: {created}")
+            now = asyncio.get_running_loop().time()
+            if last_reconcile is None or now - last_reconcile >= LEDGER_RECONCILE_INTERVAL:
+                async with AsyncSessionLocal() as db:
+                    await LedgerService.reconcile(db)
+                last_reconcile = now
+        except Exception as e:
+            logger.error(f"Ошибка в фоновой задаче леджера: {e}")
+        await asyncio.sleep(LEDGER_TASK_INTERVAL)
+
+async def start_ledger_task():
+    """Запускает фоновую задачу леджера"""
+    asyncio.create_task(ledger_task())
+
+async def economy_rollup_task():
+    """Фоновая задача почасовых роллапов экономики: сворачивает новые транзакции по водяному знаку"""
+    logger.info("Запуск фоновой задачи роллапов экономики")
+    while True:
+        try:
+            async with session_scope() as db:
+                folded = await EconomyRollupService.fold_all(db)
+            if folded:
+                logger.info(f"В роллапы экономики свёрнуто транзакций: {folded}")
+        except Exception as e:
+            logger.error(f"Ошибка в фоновой задаче роллапов экономики: {e}")
+        await asyncio.sleep(ECONOMY_ROLLUP_INTERVAL)
+
+async def start_economy_rollup_task():
+    """Запускает фоновую задачу роллапов экономики"""
+    asyncio.create_task(economy_rollup_task())
+
+async def transactions_archive_task():
+    """Фоновая задача холодного архива: переносит транзакции старше горячих месяцев порциями"""
+    logger.info("Запуск фоновой задачи архивации транзакций")
+    while True:
+        try:
+            archived = 0
+            while True:
+                # Каждая порция — отдельная короткая транзакция, чтобы не держать блокировки
+                async with session_scope() as db:
+                    moved = await TransactionArchiveService.archive(db)
+                archived += moved
+                if moved < TRANSACTIONS_ARCHIVE_CHUNK:
+                    break
+            if archived:
+                logger.info(f"В архив перенесено транзакций: {archived}")
+        except Exception as e:
+            logger.error(f"Ошибка в фоновой задаче архивации транзакций: {e}")
+        await asyncio.sleep(TRANSACTIONS_ARCHIVE_INTERVAL)
+
+async def start_transactions_archive_task():
+    """Запускает фоновую задачу архивации транзакций"""
+    asyncio.create_task(transactions_archive_task())
+
+async def creature_pool_task():
+    """Фоновая задача пула существ: дозаполняет пул готовых существ порциями"""
+    logger.info("Запуск фоновой задачи пула существ")
+    # Индекс недавних существ (отбраковка похожих) — до первого дозаполнения
+    try:
+        async with session_scope() as db:
+            warmed = await CreatureSimilarityService.warm_recent(db)
+        logger.info(f"Индекс недавних существ прогрет: {warmed}")
+    except Exception as e:
+        logger.error(f"Ошибка прогрева индекса недавних существ: {e}")
+    while True:
+        try:
+            async with session_scope() as db:
+                stale = await CreaturePoolService.prune_stale(db)
+                if stale:
+                    logger.warning(f"Из пула удалены существа невосстанавливаемых версий генератора: {stale}")
+                missing = await CreaturePoolService.deficit(db)
+            added = 0
+            while added < missing:
+                # Генерация (и рисование яиц в HF) — вне транзакции и вне event loop
+                entries = await asyncio.get_running_loop().run_in_executor(
+                    None, CreaturePoolService.roll_entries, min(CREATURE_POOL_CHUNK, missing - added)
+                )
+                async with session_scope() as db:
+                    added += await CreaturePoolService.add(db, entries)
+            if added:
+                logger.info(f"В пул добавлено существ: {added}")
+        except Exception as e:
+            logger.error(f"Ошибка в фоновой задаче пула существ: {e}")
+        await asyncio.sleep(CREATURE_POOL_INTERVAL)
+
+async def start_creature_pool_task():
+    """Запускает фоновую задачу пула существ"""
+    asyncio.create_task(creature_pool_task())
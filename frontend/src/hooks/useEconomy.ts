@@ -2,7 +2,7 @@ import { useQuery, useMutation, useQueryClient } from 'react-query'
 import { economyApi, marketApi, authApi } from '@/lib/api'
 import { getStoredUserId } from '@/utils'
 import { notifySuccess, notifyError } from '@/lib/notifications'
-import { useMemo } from 'react'
+import { useEffect, useMemo } from 'react'
 import type { Auction } from '@/types'
 
 export function useWallet() {
@@ -158,11 +158,45 @@ export function useCoinBalance(explicitCoins?: number) {
 
 // ====== РЫНОК / АУКЦИОНЫ ======
 
-export function useAuctions(status: string = 'active', page: number = 1, pageSize: number = 20) {
-  const { data, isLoading, error, refetch } = useQuery(['auctions', status, page, pageSize], () => marketApi.listAuctions({ status, page, page_size: pageSize }), {
-    refetchInterval: 5000,
+export function useAuctions(status: string = 'active', cursor: string | undefined = undefined, pageSize: number = 20) {
+  const { data, isLoading, error, refetch } = useQuery(['auctions', status, cursor, pageSize], () => marketApi.listAuctions({ status, cursor, page_size: pageSize }), {
+    refetchInterval: 30000, // страховка на случай обрыва живого канала (useAuctionFeed)
   })
-  return { auctions: (data?.items || []) as Auction[], page: data?.page || page, pageSize: data?.page_size || pageSize, isLoading, error, refetch }
+  return { auctions: (data?.items || []) as Auction[], nextCursor: data?.next_cursor, pageSize: data?.page_size || pageSize, isLoading, error, refetch }
+}
+
+// Живой канал листинга: события ставок/продлений/закрытия обновляют кэш без поллинга
+export function useAuctionFeed() {
+  const queryClient = useQueryClient()
+
+  useEffect(() => {
+    let socket: WebSocket | null = null
+    let retryTimer: ReturnType<typeof setTimeout> | undefined
+    let closed = false
+
+    const connect = () => {
+      socket = marketApi.openAuctionSocket()
+      socket.onmessage = (message) => {
+        try {
+          const event = JSON.parse(message.data)
+          if (event.type === 'ack') return
+          queryClient.invalidateQueries('auctions')
+        } catch {
+          // игнорируем некорректные кадры
+        }
+      }
+      socket.onclose = () => {
+        if (!closed) retryTimer = setTimeout(connect, 3000)
+      }
+    }
+
+    connect()
+    return () => {
+      closed = true
+      if (retryTimer) clearTimeout(retryTimer)
+      socket?.close()
+    }
+  }, [queryClient])
 }
 
 export function usePlaceBid() {
@@ -40,6 +40,16 @@ const authClient = axios.create({
 const AUTH_TOKEN_PATH = '/auth/token'
 let isIssuingToken = false
 
+// Денежные запросы несут Idempotency-Key: повтор после сетевого сбоя не спишет монеты дважды
+const IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+const newIdempotencyKey = (): string =>
+  typeof crypto !== 'undefined' && 'randomUUID' in crypto
+    ? crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`
+
+const idempotent = () => ({ headers: { [IDEMPOTENCY_HEADER]: newIdempotencyKey() } })
+
 // Request interceptor
 api.interceptors.request.use(
   async (config) => {
@@ -85,6 +95,12 @@ api.interceptors.request.use(
 api.interceptors.response.use(
   (response) => response,
   (error) => {
+    const config = error.config
+    // Ответ не дошёл: повторяем денежный запрос один раз с тем же ключом — сервер вернёт сохранённый ответ
+    if (!error.response && config?.headers?.[IDEMPOTENCY_HEADER] && !config._idempotentRetry) {
+      config._idempotentRetry = true
+      return api.request(config)
+    }
     if (error.response?.status === 401) {
       // Handle unauthorized
       localStorage.removeItem('auth_token')
@@ -101,6 +117,7 @@ export const petApi = {
       params: { user_id, name, override: override ? 'true' : 'false' },
       // Создание питомца может занимать заметное время — увеличим таймаут для запроса
       timeout: 60000,
+      ...idempotent(),
     })
     return response.data
   },
@@ -135,7 +152,8 @@ export const petApi = {
   // Increase pet health with cost
   healthUpWithCost: async (user_id: string, pet_name?: string): Promise<HealthUpResponse> => {
     const response = await api.post<any>(`/economy/actions/${encodeURIComponent(user_id)}/health_up`, null, {
-      params: { pet_name }
+      params: { pet_name },
+      ...idempotent(),
     })
     // Бэкенд возвращает обёртку { success, coins_spent, new_balance, pet_info }
     // Возвращаем только pet_info, чтобы интерфейс совпадал с HealthUpResponse
@@ -186,7 +204,8 @@ export const economyApi = {
       price_usd: number
       package_id: string
     }>(`/economy/purchase/${user_id}`, null, {
-      params: { package_id }
+      params: { package_id },
+      ...idempotent(),
     })
     return response.data
   },
@@ -210,7 +229,7 @@ export const economyApi = {
       reward_amount: number
       new_balance: number
       message: string
-    }>(`/economy/rewards/${user_id}/daily_login`)
+    }>(`/economy/rewards/${user_id}/daily_login`, null, idempotent())
     return response.data
   },
 
@@ -222,7 +241,8 @@ export const economyApi = {
     pet: { id: number; name: string; state: string; health: number; status: string }
   }> => {
     const response = await api.post(`/economy/actions/${encodeURIComponent(user_id)}/resurrect`, null, {
-      params: { pet_name }
+      params: { pet_name },
+      ...idempotent(),
     })
     return response.data
   },
@@ -235,7 +255,8 @@ export const economyApi = {
     message: string
   }> => {
     const response = await api.post(`/economy/games/${encodeURIComponent(user_id)}/claim`, null, {
-      params: { game, score }
+      params: { game, score },
+      ...idempotent(),
     })
     return response.data
   },
@@ -270,7 +291,18 @@ export const monitoringApi = {
 
 // Market API
 export const marketApi = {
-  listAuctions: async (params?: { status?: string; page?: number; page_size?: number }): Promise<{ items: Auction[]; page: number; page_size: number }> => {
+  listAuctions: async (params?: {
+    status?: string
+    page_size?: number
+    cursor?: string
+    sort?: 'end_time' | 'price_asc' | 'price_desc'
+    min_price?: number
+    max_price?: number
+    has_buy_now?: boolean
+    stage?: string
+    habitat?: string
+    creature_type?: string
+  }): Promise<{ items: Auction[]; page_size: number; next_cursor?: string }> => {
     const response = await api.get('/market/auctions', { params })
     return response.data
   },
@@ -294,12 +326,12 @@ export const marketApi = {
   },
 
   placeBid: async (payload: { auction_id: number; amount: number }): Promise<{ auction: Auction; bid: AuctionBid }> => {
-    const response = await api.post(`/market/auctions/${payload.auction_id}/bids`, null, { params: { amount: payload.amount } })
+    const response = await api.post(`/market/auctions/${payload.auction_id}/bids`, null, { params: { amount: payload.amount }, ...idempotent() })
     return response.data
   },
 
   buyNow: async (payload: { auction_id: number }): Promise<{ id: number; status: string }> => {
-    const response = await api.post(`/market/auctions/${payload.auction_id}/buy_now`)
+    const response = await api.post(`/market/auctions/${payload.auction_id}/buy_now`, null, idempotent())
     return response.data
   },
 
@@ -307,6 +339,16 @@ export const marketApi = {
     const response = await api.post(`/market/auctions/${payload.auction_id}/cancel`)
     return response.data
   },
+
+  // Живой канал: без auctionId — мультиплексированный канал листинга
+  openAuctionSocket: (auctionId?: number): WebSocket => {
+    const base = API_BASE_URL.startsWith('http')
+      ? API_BASE_URL.replace(/^http/, 'ws')
+      : `${window.location.protocol === 'https:' ? 'wss' : 'ws'}://${window.location.host}${API_BASE_URL}`
+    const path = auctionId ? `/market/ws/auctions/${auctionId}` : '/market/ws/auctions'
+    const token = localStorage.getItem('auth_token')
+    return new WebSocket(`${base}${path}${token ? `?token=${encodeURIComponent(token)}` : ''}`)
+  },
 }
 
 // Auth API (MVP): авто-выдача токена по user_id — используем authClient без интерсепторов
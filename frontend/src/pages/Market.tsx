@@ -1,5 +1,5 @@
 import { useState } from 'react'
-import { useAuctions } from '@/hooks/useEconomy'
+import { useAuctions, useAuctionFeed } from '@/hooks/useEconomy'
 import AuctionCard from '@/components/market/AuctionCard'
 import CreateAuctionModal from '@/components/market/CreateAuctionModal'
 import { Button } from '@/components/ui/Button'
@@ -9,7 +9,8 @@ import { Plus } from 'lucide-react'
 
 export default function Market() {
   const [showCreate, setShowCreate] = useState(false)
-  const { auctions, isLoading, error, refetch } = useAuctions('active', 1, 20)
+  const { auctions, isLoading, error, refetch } = useAuctions('active', undefined, 20)
+  useAuctionFeed()
 
   return (
     <div className="space-y-6">
@@ -17,6 +17,7 @@ export default defineConfig({
       '/api': {
         target: 'http://127.0.0.1:3000',
         changeOrigin: true,
+        ws: true, // живой канал аукционов
         rewrite: (path) => path.replace(/^\/api/, ''),
       },
       // Проксируем картинки питомцев на бэкенд, иначе запросы уйдут на dev‑сервер Vite
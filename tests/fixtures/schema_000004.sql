@@ -0,0 +1,155 @@
+-- Схема базы на ревизии 000004 (до миграций 000005+), как её строила create_all того времени
+CREATE TABLE pets (
+	id INTEGER NOT NULL,
+	user_id VARCHAR NOT NULL,
+	name VARCHAR NOT NULL,
+	state VARCHAR(5) NOT NULL,
+	status VARCHAR(5) NOT NULL,
+	health INTEGER NOT NULL,
+	creature_json TEXT,
+	prompt_egg_en TEXT,
+	prompt_baby_en TEXT,
+	prompt_adult_en TEXT,
+	image_egg_b64 TEXT,
+	image_baby_b64 TEXT,
+	image_adult_b64 TEXT,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+	updated_at DATETIME,
+	PRIMARY KEY (id)
+);
+CREATE INDEX ix_pets_id ON pets (id);
+CREATE INDEX ix_pets_user_id ON pets (user_id);
+CREATE TABLE notifications (
+	id INTEGER NOT NULL,
+	user_id VARCHAR NOT NULL,
+	type VARCHAR NOT NULL,
+	message VARCHAR NOT NULL,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+	status VARCHAR,
+	PRIMARY KEY (id)
+);
+CREATE INDEX ix_notifications_id ON notifications (id);
+CREATE INDEX ix_notifications_user_id ON notifications (user_id);
+CREATE TABLE users (
+	id INTEGER NOT NULL,
+	user_id VARCHAR NOT NULL,
+	username VARCHAR,
+	telegram_username VARCHAR,
+	display_name VARCHAR,
+	is_anonymous BOOLEAN NOT NULL,
+	first_name VARCHAR,
+	last_name VARCHAR,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+	updated_at DATETIME,
+	PRIMARY KEY (id)
+);
+CREATE UNIQUE INDEX ix_users_user_id ON users (user_id);
+CREATE INDEX ix_users_id ON users (id);
+CREATE TABLE wallets (
+	id INTEGER NOT NULL,
+	user_id VARCHAR NOT NULL,
+	coins INTEGER NOT NULL,
+	coins_locked INTEGER NOT NULL,
+	total_earned INTEGER NOT NULL,
+	total_spent INTEGER NOT NULL,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+	updated_at DATETIME,
+	PRIMARY KEY (id),
+	UNIQUE (user_id),
+	FOREIGN KEY(user_id) REFERENCES users (user_id)
+);
+CREATE INDEX ix_wallets_id ON wallets (id);
+CREATE TABLE transactions (
+	id INTEGER NOT NULL,
+	user_id VARCHAR NOT NULL,
+	transaction_type VARCHAR(15) NOT NULL,
+	amount INTEGER NOT NULL,
+	balance_before INTEGER NOT NULL,
+	balance_after INTEGER NOT NULL,
+	description VARCHAR NOT NULL,
+	status VARCHAR(9),
+	transaction_data TEXT,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (user_id)
+);
+CREATE INDEX ix_transactions_id ON transactions (id);
+CREATE TABLE achievements (
+	id INTEGER NOT NULL,
+	user_id VARCHAR NOT NULL,
+	achievement_type VARCHAR NOT NULL,
+	title VARCHAR NOT NULL,
+	description VARCHAR NOT NULL,
+	coins_reward INTEGER,
+	is_claimed BOOLEAN,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (user_id)
+);
+CREATE INDEX ix_achievements_id ON achievements (id);
+CREATE TABLE auctions (
+	id INTEGER NOT NULL,
+	pet_id INTEGER NOT NULL,
+	seller_user_id VARCHAR NOT NULL,
+	start_price INTEGER NOT NULL,
+	current_price INTEGER NOT NULL,
+	buy_now_price INTEGER,
+	min_increment_abs INTEGER,
+	min_increment_pct INTEGER,
+	soft_close_seconds INTEGER NOT NULL,
+	status VARCHAR(9) NOT NULL,
+	current_winner_user_id VARCHAR,
+	started_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+	end_time DATETIME NOT NULL,
+	updated_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(pet_id) REFERENCES pets (id),
+	FOREIGN KEY(seller_user_id) REFERENCES users (user_id),
+	FOREIGN KEY(current_winner_user_id) REFERENCES users (user_id)
+);
+CREATE INDEX ix_auctions_id ON auctions (id);
+CREATE TABLE auction_bids (
+	id INTEGER NOT NULL,
+	auction_id INTEGER NOT NULL,
+	bidder_user_id VARCHAR NOT NULL,
+	amount INTEGER NOT NULL,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+	PRIMARY KEY (id),
+	FOREIGN KEY(auction_id) REFERENCES auctions (id),
+	FOREIGN KEY(bidder_user_id) REFERENCES users (user_id)
+);
+CREATE INDEX ix_auction_bids_id ON auction_bids (id);
+CREATE INDEX ix_auction_bids_auction_id ON auction_bids (auction_id);
+CREATE TABLE wallet_holds (
+	id INTEGER NOT NULL,
+	user_id VARCHAR NOT NULL,
+	auction_id INTEGER NOT NULL,
+	amount INTEGER NOT NULL,
+	status VARCHAR(8) NOT NULL,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+	released_at DATETIME,
+	captured_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (user_id),
+	FOREIGN KEY(auction_id) REFERENCES auctions (id)
+);
+CREATE INDEX ix_wallet_holds_auction_id ON wallet_holds (auction_id);
+CREATE INDEX ix_wallet_holds_id ON wallet_holds (id);
+CREATE INDEX ix_wallet_holds_user_id ON wallet_holds (user_id);
+CREATE TABLE pet_ownership_history (
+	id INTEGER NOT NULL,
+	pet_id INTEGER NOT NULL,
+	from_user_id VARCHAR,
+	to_user_id VARCHAR,
+	price INTEGER,
+	auction_id INTEGER,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+	PRIMARY KEY (id),
+	FOREIGN KEY(pet_id) REFERENCES pets (id),
+	FOREIGN KEY(from_user_id) REFERENCES users (user_id),
+	FOREIGN KEY(to_user_id) REFERENCES users (user_id),
+	FOREIGN KEY(auction_id) REFERENCES auctions (id)
+);
+CREATE INDEX ix_pet_ownership_history_id ON pet_ownership_history (id);
+CREATE TABLE alembic_version (version_num varchar(32) not null primary key);
+INSERT INTO alembic_version (version_num) VALUES ('000004');
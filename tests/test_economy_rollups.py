@@ -0,0 +1,163 @@
+"""
+Роллапы экономики и долгие пишущие транзакции.
+
+Водяной знак агрегатора не двигается назад, поэтому строка, закоммиченная позже лага
+за строками с бо́льшим id, теряется навсегда. test_late_commit_behind_watermark_is_lost
+воспроизводит этот разрыв; остальные тесты проверяют, что массовое начисление — самый
+долгий писатель — коммитит каждый пакет и не держит строки незакоммиченными.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='telepets_test_'), 'test.db')}"
+)
+
+import db as db_module  # noqa: E402
+from api import economy as economy_api  # noqa: E402
+from economy import EconomyService  # noqa: E402
+from models import (  # noqa: E402
+    EconomyRollup, RollupWatermark, Transaction, TransactionStatus, TransactionType, User, Wallet,
+)
+from services.economy_rollups import EconomyRollupService  # noqa: E402
+
+db_module.engine.echo = False
+
+NOW = datetime(2026, 10, 19, 12, 30)
+
+
+async def _reset():
+    await db_module.init_db()
+    async with db_module.session_scope() as db:
+        for model in (EconomyRollup, RollupWatermark, Transaction, Wallet, User):
+            await db.execute(delete(model))
+
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    asyncio.run(_reset())
+
+
+def _transaction(row_id, created_at, amount=10):
+    return Transaction(
+        id=row_id, user_id="rollup", transaction_type=TransactionType.earning, amount=amount,
+        balance_before=0, balance_after=amount, description="test", status=TransactionStatus.completed,
+        transaction_data='{"source": "test"}', created_at=created_at,
+    )
+
+
+async def _insert(*transactions):
+    async with db_module.session_scope() as db:
+        db.add_all(transactions)
+
+
+async def _fold():
+    async with db_module.session_scope() as db:
+        return await EconomyRollupService.fold_all(db, now=NOW)
+
+
+async def _rolled_up_count():
+    async with db_module.AsyncSessionLocal() as db:
+        folded = (await db.execute(select(func.sum(EconomyRollup.transactions_count)))).scalar() or 0
+        series = await EconomyRollupService.series(db, since=NOW - timedelta(hours=3), until=NOW)
+        return folded, sum(point["count"] for point in series["series"])
+
+
+def test_late_commit_behind_watermark_is_lost():
+    old = NOW - timedelta(hours=1)
+    asyncio.run(_insert(_transaction(1, old), _transaction(3, old)))
+    assert asyncio.run(_fold()) == 2
+
+    # Строка 2 принадлежала транзакции, начатой час назад и закоммиченной только сейчас:
+    # created_at старше лага, но водяной знак уже прошёл её id
+    asyncio.run(_insert(_transaction(2, old)))
+    assert asyncio.run(_fold()) == 0
+    assert asyncio.run(_rolled_up_count()) == (2, 2)
+
+
+def test_fold_stops_at_row_newer_than_lag():
+    asyncio.run(_insert(_transaction(1, NOW - timedelta(hours=1)), _transaction(2, NOW - timedelta(seconds=30))))
+    assert asyncio.run(_fold()) == 1
+    # Свежая строка досчитывается хвостом
+    assert asyncio.run(_rolled_up_count()) == (1, 2)
+
+
+class _CsvRequest:
+    def __init__(self, body: str):
+        self._body = body.encode("utf-8")
+
+    async def stream(self):
+        yield self._body
+
+
+async def _admin_credit(body: str):
+    async with db_module.AsyncSessionLocal() as db:
+        return await economy_api.admin_credit_from_csv(
+            _CsvRequest(body), reason="Событие", batch_id="b1", current_user={"user_id": "admin"}, db=db,
+        )
+
+
+async def _committed_credits() -> int:
+    async with db_module.AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(func.count()).select_from(Transaction).where(Transaction.transaction_type == TransactionType.earning)
+        )).scalar_one()
+
+
+@pytest.fixture
+def committed_before_chunk(monkeypatch):
+    """Число закоммиченных начислений, видимых из другого соединения, перед каждым пакетом"""
+    seen = []
+    credit_many = EconomyService.credit_many
+
+    async def tracking(db, entries, **kwargs):
+        seen.append(await _committed_credits())
+        return await credit_many(db, entries, **kwargs)
+
+    monkeypatch.setattr(economy_api, "CREDIT_BATCH_CHUNK_SIZE", 2)
+    monkeypatch.setattr(EconomyService, "credit_many", staticmethod(tracking))
+    return seen
+
+
+def test_admin_credit_commits_each_chunk(committed_before_chunk):
+    result = asyncio.run(_admin_credit("user_id,amount\n" + "".join(f"u{i},10\n" for i in range(5))))
+    assert result["entries"] == 5
+    assert committed_before_chunk == [0, 2, 4]
+    assert asyncio.run(_committed_credits()) == 5
+
+
+def test_admin_credit_bad_line_credits_nothing(committed_before_chunk):
+    body = "".join(f"u{i},10\n" for i in range(5)) + "u5,-1\n"
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(_admin_credit(body))
+    assert error.value.status_code == 400
+    assert committed_before_chunk == []
+    assert asyncio.run(_committed_credits()) == 0
+
+
+def test_admin_credit_reports_committed_prefix(committed_before_chunk, monkeypatch):
+    tracking = EconomyService.credit_many
+
+    async def failing(db, entries, **kwargs):
+        if len(committed_before_chunk) == 1:
+            raise RuntimeError("database is gone")
+        return await tracking(db, entries, **kwargs)
+
+    monkeypatch.setattr(EconomyService, "credit_many", staticmethod(failing))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(_admin_credit("".join(f"u{i},10\n" for i in range(5))))
+    # Не 5xx: ответ сохранится под Idempotency-Key, и повтор не начислит первый пакет ещё раз
+    assert error.value.status_code == 409
+    assert error.value.detail["credited"]["entries"] == 2
+    assert asyncio.run(_committed_credits()) == 2
@@ -0,0 +1,104 @@
+"""
+Версии генерации по сиду: отпечатки вывода и откат на pet_prompts при их несовпадении.
+
+Падение test_fingerprints_pinned значит, что правка справочников, переводчика или настроек
+стадий изменила вывод уже выпущенной версии: сохранённые сиды дали бы другие промпты.
+Такую выборку нужно оформить новой версией (SEEDED_GENERATORS), а прежнюю оставить как есть.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+from sqlalchemy import delete
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='telepets_test_'), 'test.db')}"
+
+import db as db_module  # noqa: E402
+from generator import promt_gen  # noqa: E402
+from models import Pet, PetPrompt  # noqa: E402
+from prompt_store import PromptStore, materialize_seeded, prompt_cache  # noqa: E402
+
+db_module.engine.echo = False
+
+
+@pytest.fixture
+def change_output(monkeypatch):
+    """Функция, после которой вывод всех версий «изменился»: отпечатки не совпадают с зафиксированными"""
+    def change():
+        monkeypatch.setattr(promt_gen, "GENERATOR_FINGERPRINTS", {version: "0" * 64 for version in promt_gen.SEEDED_GENERATORS})
+        promt_gen.seeded_version_intact.cache_clear()
+        prompt_cache.clear()
+
+    yield change
+    promt_gen.seeded_version_intact.cache_clear()
+    prompt_cache.clear()
+
+
+@pytest.mark.parametrize("version", sorted(promt_gen.SEEDED_GENERATORS))
+def test_fingerprints_pinned(version):
+    assert promt_gen.seeded_fingerprint(version) == promt_gen.GENERATOR_FINGERPRINTS[version]
+
+
+def test_versions_differ_and_are_recorded():
+    v1 = promt_gen.generate_seeded(42, 1)
+    current = promt_gen.generate_seeded(42)
+    assert v1["generator_version"] == 1
+    assert current["generator_version"] == promt_gen.GENERATOR_VERSION
+    assert v1["creature"] != current["creature"]
+
+
+def test_restore_refuses_unknown_version():
+    assert promt_gen.restore_seeded(42, None) is None
+    assert promt_gen.restore_seeded(42, max(promt_gen.SEEDED_GENERATORS) + 1) is None
+    with pytest.raises(ValueError):
+        promt_gen.generate_seeded(42, max(promt_gen.SEEDED_GENERATORS) + 1)
+
+
+def test_restore_refuses_changed_output(change_output):
+    change_output()
+    assert promt_gen.restore_seeded(42, 1) is None
+
+
+async def _create_pets():
+    await db_module.init_db()
+    async with db_module.session_scope() as db:
+        kept = Pet(user_id="versions", name="Kept", health=100, creature_seed=7, generator_version=1)
+        lost = Pet(user_id="versions", name="Lost", health=100, creature_seed=8, generator_version=1)
+        db.add_all([kept, lost])
+        await db.flush()
+        return kept.id, lost.id
+
+
+async def _adult_prompts(pet_ids):
+    async with db_module.AsyncSessionLocal() as db:
+        pets = [await db.get(Pet, pet_id) for pet_id in pet_ids]
+        single = [await PromptStore.stage_prompt_en(db, pet, "adult") for pet in pets]
+        many = await PromptStore.stage_prompts_en(db, pets)
+        return single, [many[pet.id]["adult_en"] for pet in pets]
+
+
+async def _delete_prompts(pet_id):
+    async with db_module.session_scope() as db:
+        await db.execute(delete(PetPrompt).where(PetPrompt.pet_id == pet_id))
+
+
+def test_changed_output_falls_back_to_stored_prompts(change_output):
+    kept_id, lost_id = asyncio.run(_create_pets())
+    expected = promt_gen.generate_seeded(7, 1)["stage_prompts"]["adult"]["en"]
+
+    # До правки генератора промпты восстанавливаются из сида; сохраняются промпты только одного питомца
+    single, many = asyncio.run(_adult_prompts([kept_id]))
+    assert single == many == [expected]
+    assert asyncio.run(materialize_seeded(version=1))["pets"] == 2
+    asyncio.run(_delete_prompts(lost_id))
+
+    change_output()
+    single, many = asyncio.run(_adult_prompts([kept_id, lost_id]))
+    # Сохранённый промпт отдаётся как есть, у второго питомца промпта нет — а не промпт другого существа
+    assert single == many == [expected, None]
@@ -0,0 +1,142 @@
+"""
+Миграции Alembic на SQLite: апгрейд до головы через настоящие alembic.ini и env.py.
+
+env.py перед миграциями выполняет create_all, поэтому новые таблицы уже существуют
+в форме головы — миграции обязаны проверять колонки, а не только наличие таблиц.
+"""
+
+import json
+import sqlite3
+import sys
+import zlib
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+
+from generator.promt_gen import GENERATOR_VERSION, generate_seeded  # noqa: E402
+
+SCHEMA_000004 = ROOT / "tests" / "fixtures" / "schema_000004.sql"
+
+PETS = [
+    # (egg, baby, adult); у питомцев с сидом колонки промптов пусты
+    ("egg one", "baby one", "adult 1"),
+    ("egg one", "baby one", "adult 2"),
+    ("egg two", "baby one", "adult 3"),
+    ("egg two", "baby two", "adult 4"),
+    (None, None, None),
+]
+
+
+def _config(db_path: Path, monkeypatch) -> Config:
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_path}")
+    return Config(str(ROOT / "alembic.ini"))
+
+
+def _head(config: Config) -> str:
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
+def _seed_000004(db_path: Path) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(SCHEMA_000004.read_text(encoding="utf-8"))
+        conn.executemany(
+            "INSERT INTO pets (user_id, name, state, status, health, prompt_egg_en, prompt_baby_en, prompt_adult_en)"
+            " VALUES (?, ?, 'egg', 'alive', 100, ?, ?, ?)",
+            [(f"user{i}", f"pet{i}", *prompts) for i, prompts in enumerate(PETS)],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _rows(db_path: Path, sql: str) -> list:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_upgrade_000004_database_to_head(tmp_path, monkeypatch):
+    db_path = tmp_path / "telepets.db"
+    _seed_000004(db_path)
+    config = _config(db_path, monkeypatch)
+
+    command.upgrade(config, "head")
+
+    assert _rows(db_path, "SELECT version_num FROM alembic_version") == [(_head(config),)]
+    pet_columns = {row[1] for row in _rows(db_path, "PRAGMA table_info(pets)")}
+    assert not {"prompt_egg_en", "prompt_baby_en", "prompt_adult_en"} & pet_columns
+
+    stored = {
+        (pet_id, stage): zlib.decompress(text_z).decode("utf-8")
+        for pet_id, stage, text_z in _rows(
+            db_path,
+            "SELECT pp.pet_id, pp.stage, p.text_z FROM pet_prompts pp JOIN prompts p ON p.id = pp.prompt_id",
+        )
+    }
+    expected = {
+        (pet_id, stage): text
+        for pet_id, prompts in enumerate(PETS, start=1)
+        for stage, text in zip(("egg", "baby", "adult"), prompts)
+        if text
+    }
+    assert stored == expected
+    # Одинаковые тексты хранятся один раз
+    assert _rows(db_path, "SELECT COUNT(*) FROM prompts") == [(len(set(expected.values())),)]
+
+
+def test_upgrade_is_repeatable(tmp_path, monkeypatch):
+    db_path = tmp_path / "telepets.db"
+    _seed_000004(db_path)
+    config = _config(db_path, monkeypatch)
+
+    command.upgrade(config, "head")
+    command.upgrade(config, "head")
+
+    assert _rows(db_path, "SELECT COUNT(*) FROM pet_prompts") == [(sum(1 for p in PETS for t in p if t),)]
+
+
+
+def test_generator_version_backfill(tmp_path, monkeypatch):
+    db_path = tmp_path / "telepets.db"
+    _seed_000004(db_path)
+    config = _config(db_path, monkeypatch)
+    command.upgrade(config, "000018")
+
+    # Сиды до версионирования: существо версии 1, текущей версии и не восстанавливаемое
+    seeds = {"v1": 11, "current": 12, "unknown": 13}
+    creatures = {
+        "v1": generate_seeded(seeds["v1"], 1)["creature"],
+        "current": generate_seeded(seeds["current"])["creature"],
+        "unknown": {"habitat": "nowhere"},
+    }
+    assert creatures["v1"] != generate_seeded(seeds["v1"])["creature"]
+    conn = sqlite3.connect(db_path)
+    try:
+        for name in seeds:
+            conn.execute(
+                "INSERT INTO pets (user_id, name, state, status, health, creature_seed, creature_json)"
+                " VALUES ('seeded', ?, 'egg', 'alive', 100, ?, ?)",
+                (name, seeds[name], json.dumps(creatures[name], ensure_ascii=False)),
+            )
+            conn.execute(
+                "INSERT INTO creature_pool (creature_seed, creature_json) VALUES (?, ?)",
+                (seeds[name], json.dumps(creatures[name], ensure_ascii=False)),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+    command.upgrade(config, "head")
+
+    versions = dict(_rows(db_path, "SELECT name, generator_version FROM pets WHERE user_id = 'seeded'"))
+    assert versions == {"v1": 1, "current": GENERATOR_VERSION, "unknown": None}
+    pool = dict(_rows(db_path, "SELECT creature_seed, generator_version FROM creature_pool"))
+    assert pool == {seeds["v1"]: 1, seeds["current"]: GENERATOR_VERSION}